@@ -30,7 +30,7 @@ class PsiObject(object):
 
     """Special class to handle internal array and functions of Psi adaptive psychophysical method (Kontsevich & Tyler, 1999)."""
     
-    def __init__(self, x, alpha, beta, xPrecision, aPrecision, bPrecision, delta=0, stepType='lin', TwoAFC=False, prior=None):
+    def __init__(self, x, alpha, beta, xPrecision, aPrecision, bPrecision, delta=0, stepType='lin', TwoAFC=False, prior=None, dtype=float64):
         global stats
         from scipy import stats  # takes a while to load so do it lazy
 
@@ -58,39 +58,68 @@ class PsiObject(object):
         if prior is None or prior.shape != (1, len(self.alpha),len(self.beta), 1):
             if prior is not None:
                 warnings.warn("Prior has incompatible dimensions. Using uniform (1/N) probabilities.")
-            self._probLambda = ndarray(shape=(1,len(self.alpha),len(self.beta),1))
+            self._probLambda = ndarray(shape=(1,len(self.alpha),len(self.beta),1), dtype=dtype)
             self._probLambda.fill(1/(len(self.alpha)*len(self.beta)))
         else:
             if prior.shape == (1, len(self.alpha), len(self.beta), 1):
-                self._probLambda = prior
+                self._probLambda = prior.astype(dtype, copy=False)
             else:
-                self._probLambda = prior.reshape(1, len(self.alpha), len(self.beta), 1)
+                self._probLambda = prior.reshape(1, len(self.alpha), len(self.beta), 1).astype(dtype, copy=False)
             
         #Create P(r | lambda, x)
         if TwoAFC:
             self._probResponseGivenLambdaX = (1-self._r) + (2*self._r-1) * ((.5 + .5 * stats.norm.cdf(self._x, self._alpha, self._beta)) * (1 - self.delta) + self.delta / 2)
         else: # Yes/No
             self._probResponseGivenLambdaX = (1-self._r) + (2*self._r-1) * (stats.norm.cdf(self._x, self._alpha, self._beta)*(1-self.delta)+self.delta/2)
-        
-    def update(self, response=None):
-        if response is not None:    #response should only be None when Psi is first initialized
-            self._probLambda = self._probLambdaGivenXResponse[response,:,:,self.nextIntensityIndex].reshape((1,len(self.alpha),len(self.beta),1))
-            
+        # float32 halves the memory (and time) of the 4D arrays
+        self._probResponseGivenLambdaX = self._probResponseGivenLambdaX.astype(dtype, copy=False)
+
+    def update(self, response=None, state=None):
+        """Updates the posterior with the response to nextIntensity.
+        `state` can be the result of lookAhead(response), computed earlier,
+        in which case it is used as it is."""
+        if state is None:
+            if response is not None:    #response should only be None when Psi is first initialized
+                probLambda = self._posterior(response)
+            else:
+                probLambda = self._probLambda
+            state = self._computeState(probLambda)
+        (self._probLambda, self._probResponseGivenX,
+         self._probLambdaGivenXResponse, self._entropyXResponse,
+         self._expectedEntropyX, self.nextIntensityIndex) = state
+        self.nextIntensity = self.x[self.nextIntensityIndex]
+
+    def lookAhead(self, response):
+        """Returns the state that update(response) would give, without
+        changing this object. Pass it to update() to apply it."""
+        return self._computeState(self._posterior(response))
+
+    def _posterior(self, response):
+        return self._probLambdaGivenXResponse[response,:,:,self.nextIntensityIndex].reshape((1,len(self.alpha),len(self.beta),1))
+
+    def _computeState(self, probLambda):
+        # the 4D arrays are updated in place where possible, to keep the
+        # number of [r,a,b,x] sized temporaries down
         #Create P(r | x)
-        self._probResponseGivenX = sum(self._probResponseGivenLambdaX * self._probLambda, axis=(1,2)).reshape((len(self.r),1,1,len(self.x)))
-        
+        probLambdaGivenXResponse = self._probResponseGivenLambdaX * probLambda
+        probResponseGivenX = sum(probLambdaGivenXResponse, axis=(1,2)).reshape((len(self.r),1,1,len(self.x)))
+
         #Create P(lambda | x, r)
-        self._probLambdaGivenXResponse = self._probLambda*self._probResponseGivenLambdaX/self._probResponseGivenX
-        
+        probLambdaGivenXResponse /= probResponseGivenX
+
         #Create H(x, r)
-        self._entropyXResponse = -1* sum(self._probLambdaGivenXResponse * log10(self._probLambdaGivenXResponse), axis=(1,2)).reshape((len(self.r),1,1,len(self.x)))
-        
+        logProb = log10(probLambdaGivenXResponse)
+        logProb *= probLambdaGivenXResponse
+        entropyXResponse = -1* sum(logProb, axis=(1,2)).reshape((len(self.r),1,1,len(self.x)))
+        del logProb
+
         #Create E[H(x)]
-        self._expectedEntropyX = sum(self._entropyXResponse * self._probResponseGivenX, axis=0).reshape((1,1,1,len(self.x)))
-        
+        expectedEntropyX = sum(entropyXResponse * probResponseGivenX, axis=0).reshape((1,1,1,len(self.x)))
+
         #Generate next intensity
-        self.nextIntensityIndex = argmin(self._expectedEntropyX, axis=3)[0][0][0]
-        self.nextIntensity = self.x[self.nextIntensityIndex]
+        nextIntensityIndex = argmin(expectedEntropyX, axis=3)[0][0][0]
+        return (probLambda, probResponseGivenX, probLambdaGivenXResponse,
+                entropyXResponse, expectedEntropyX, nextIntensityIndex)
         
     def estimateLambda(self):
         return (sum(sum(self._alpha.reshape((len(self.alpha),1))*self._probLambda.squeeze(), axis=1)), sum(sum(self._beta.reshape((1,len(self.beta)))*self._probLambda.squeeze(), axis=1)))
@@ -37,7 +37,7 @@ from builtins import input
 from builtins import zip
 from builtins import range
 from builtins import object
-__all__ = ['QuestObject']
+__all__ = ['QuestObject', 'grid_analysis']
 
 import math
 import copy
@@ -52,6 +52,56 @@ def getinf(x):
     return num.nonzero( num.isinf( num.atleast_1d(x) ) )
 
 
+def _weibull_table(beta, delta, gamma, pThreshold, grain, dim):
+    """x2, p2 and xThreshold of the psychometric function (see
+    QuestObject.recompute)"""
+    i2 = num.arange(-dim,dim+1)
+    x2 = i2*grain
+    p2 = delta*gamma+(1-delta)*(1-(1-gamma)*num.exp(-10**(beta*x2)))
+    if p2[0] >= pThreshold or p2[-1] <= pThreshold:
+        raise RuntimeError('psychometric function range [%.2f %.2f] omits %.2f threshold'%(p2[0],p2[-1],pThreshold)) # XXX
+    if len(getinf(p2)[0]):
+        raise RuntimeError('psychometric function p2 is not finite')
+    index = num.nonzero( p2[1:]-p2[:-1] )[0] # strictly monotonic subset
+    if len(index) < 2:
+        raise RuntimeError('psychometric function has only %g strictly monotonic points'%len(index))
+    xThreshold = num.interp([pThreshold],p2[index],x2[index])[0]
+    p2 = delta*gamma+(1-delta)*(1-(1-gamma)*num.exp(-10**(beta*(x2+xThreshold))))
+    if len(getinf(p2)[0]):
+        raise RuntimeError('psychometric function p2 is not finite')
+    return x2, p2, xThreshold
+
+
+def _log(x):
+    """log(x), with log(0) = -inf and no warning"""
+    with num.errstate(divide='ignore'):
+        return num.log(x)
+
+
+def _windows(table, n):
+    """A view of table[:, start:start+n] for every start, with shape
+    (table.shape[0], nStarts, n)"""
+    nStarts = table.shape[1] - n + 1
+    return num.lib.stride_tricks.as_strided(
+        table, (table.shape[0], nStarts, n),
+        (table.strides[0], table.strides[1], table.strides[1]),
+        writeable=False)
+
+
+def _table_starts(intensities, tGuess, grain, n, nColumns):
+    """The first column of s2 used for the pdf (of n points) at each of the
+    intensities (the indices that QuestObject.update uses)"""
+    inten = num.clip(num.asarray(intensities, dtype=float), -1e10, 1e10) # make intensity finite
+    starts = n - 1 - n//2 - num.round((inten-tGuess)/grain)
+    return num.clip(starts, 0, nColumns-n).astype(num.int_)
+
+
+def _normalized_log(logPdf):
+    """logPdf minus the log of its sum"""
+    top = num.max(logPdf)
+    return logPdf - (top + math.log(num.sum(num.exp(logPdf-top))))
+
+
 class QuestObject(object):
 
     """Measure threshold using a Weibull psychometric function.
@@ -112,6 +162,11 @@ class QuestObject(object):
     intensities outside of this interval have zero prior probability,
     i.e. they are impossible.
 
+    pdf is the posterior pdf, and logPdf its log. The posterior is
+    updated in the log domain, and pdf is exp(logPdf). To reanalyze many
+    staircases with several beta, delta and gamma values, see
+    grid_analysis().
+
     """
     def __init__(self,tGuess,tGuessSd,pThreshold,beta,delta,gamma,grain=0.01,range=None):
         """Initialize Quest parameters.
@@ -226,7 +281,7 @@ class QuestObject(object):
 
         This was converted from the Psychtoolbox's QuestPdf function.
         """
-        i=int(round((t-self.tGuess)/self.grain))+1+self.dim/2
+        i=int(round((t-self.tGuess)/self.grain))+1+self.dim//2
         i=min(len(self.pdf),max(1,i))-1
         p=self.pdf[i]
         return p
@@ -291,8 +346,8 @@ class QuestObject(object):
         parameters in 'self' to recompute the psychometric
         function. It then uses the newly computed psychometric
         function and the history in self.intensity and self.response
-        to recompute the pdf. (recompute() does nothing if q.updatePdf
-        is False.)
+        to recompute the pdf, in one vectorized pass over the history.
+        (recompute() does nothing if q.updatePdf is False.)
 
         This was converted from the Psychtoolbox's QuestRecompute function."""
         if not self.updatePdf:
@@ -302,28 +357,19 @@ class QuestObject(object):
             self.gamma = 0.5
         self.i = num.arange(-self.dim/2, self.dim/2+1)
         self.x = self.i * self.grain
-        self.pdf = num.exp(-0.5*(self.x/self.tGuessSd)**2)
-        self.pdf = self.pdf/num.sum(self.pdf)
-        i2 = num.arange(-self.dim,self.dim+1)
-        self.x2 = i2*self.grain
-        self.p2 = self.delta*self.gamma+(1-self.delta)*(1-(1-self.gamma)*num.exp(-10**(self.beta*self.x2)))
-        if self.p2[0] >= self.pThreshold or self.p2[-1] <= self.pThreshold:
-            raise RuntimeError('psychometric function range [%.2f %.2f] omits %.2f threshold'%(self.p2[0],self.p2[-1],self.pThreshold)) # XXX
-        if len(getinf(self.p2)[0]):
-            raise RuntimeError('psychometric function p2 is not finite')
-        index = num.nonzero( self.p2[1:]-self.p2[:-1] )[0] # strictly monotonic subset
-        if len(index) < 2:
-            raise RuntimeError('psychometric function has only %g strictly monotonic points'%len(index))
-        self.xThreshold = num.interp([self.pThreshold],self.p2[index],self.x2[index])[0]
-        self.p2 = self.delta*self.gamma+(1-self.delta)*(1-(1-self.gamma)*num.exp(-10**(self.beta*(self.x2+self.xThreshold))))
-        if len(getinf(self.p2)[0]):
-            raise RuntimeError('psychometric function p2 is not finite')
+        logPrior = -0.5*(self.x/self.tGuessSd)**2
+        if len(getinf(logPrior)[0]) or num.any(num.isnan(logPrior)):
+            raise RuntimeError('prior pdf is not finite')
+        self.x2, self.p2, self.xThreshold = _weibull_table(
+            self.beta, self.delta, self.gamma, self.pThreshold, self.grain,
+            self.dim)
         self.s2 = num.array( ((1-self.p2)[::-1], self.p2[::-1]) )
         if not hasattr(self,'intensity') or not hasattr(self,'response'):
             self.intensity = []
             self.response = []
         if len(getinf(self.s2)[0]):
             raise RuntimeError('psychometric function s2 is not finite')
+        self._logS2 = _log(self.s2)
 
         eps = 1e-14
 
@@ -333,25 +379,25 @@ class QuestObject(object):
         pE = 1/(1+math.exp(pE/(pL-pH)))
         self.quantileOrder=(pE-pL)/(pH-pL)
 
-        if len(getinf(self.pdf)[0]):
-            raise RuntimeError('prior pdf is not finite')
-
-        # recompute the pdf from the historical record of trials
-        for intensity, response in zip(self.intensity,self.response):
-            inten = max(-1e10,min(1e10,intensity)) # make intensity finite
-            ii = len(self.pdf) + self.i-round((inten-self.tGuess)/self.grain)-1
-            if ii[0]<0:
-                ii = ii-ii[0]
-            if ii[-1]>=self.s2.shape[1]:
-                ii = ii+self.s2.shape[1]-ii[-1]-1
-            iii = ii.astype(num.int_)
-            if not num.allclose(ii,iii):
-                raise ValueError('truncation error')
-            self.pdf = self.pdf*self.s2[response,iii]
-            if self.normalizePdf and k%100==0:
-                self.pdf = self.pdf/num.sum(self.pdf) # avoid underflow; keep the pdf normalized
+        # recompute the pdf from the historical record of trials, in one
+        # pass: the (log) prior plus the log likelihood rows of s2 that
+        # update() would have used for each trial, summed. Trials with the
+        # same row are counted rather than gathered again.
+        self.logPdf = _normalized_log(logPrior)
+        if len(self.intensity):
+            n = len(self.x)
+            starts = _table_starts(self.intensity, self.tGuess, self.grain,
+                                   n, self.s2.shape[1])
+            nStarts = self.s2.shape[1] - n + 1
+            keys = num.asarray(self.response, dtype=num.int_)*nStarts + starts
+            keys, counts = num.unique(keys, return_counts=True)
+            rows = _windows(self._logS2, n)[keys//nStarts, keys%nStarts]
+            with num.errstate(invalid='ignore'):
+                self.logPdf = self.logPdf + num.dot(counts, rows)
         if self.normalizePdf:
-            self.pdf = self.pdf/num.sum(self.pdf) # avoid underflow; keep the pdf normalized
+            self.logPdf = _normalized_log(self.logPdf) # avoid underflow; keep the pdf normalized
+        self.pdf = num.exp(self.logPdf)
+        self._logPdfOf = self.pdf # see update()
         if len(getinf(self.pdf)[0]):
             raise RuntimeError('prior pdf is not finite')
 
@@ -369,28 +415,123 @@ class QuestObject(object):
         if response < 0 or response > self.s2.shape[0]:
             raise RuntimeError('response %g out of range 0 to %d'%(response,self.s2.shape[0]))
         if self.updatePdf:
+            if getattr(self, '_logPdfOf', None) is not self.pdf:
+                # the pdf was set directly, or this was unpickled from an
+                # older version without the log pdf
+                self.logPdf = _log(self.pdf)
+                self._logS2 = _log(self.s2)
+            n = len(self.pdf)
             inten = max(-1e10,min(1e10,intensity)) # make intensity finite
-            ii = len(self.pdf) + self.i-round((inten-self.tGuess)/self.grain)-1
-            if ii[0]<0 or ii[-1] > self.s2.shape[1]:
+            start = int(n - 1 - n//2 - round((inten-self.tGuess)/self.grain))
+            if start < 0 or start + n > self.s2.shape[1]:
                 if self.warnPdf:
                     low=(1-len(self.pdf)-self.i[0])*self.grain+self.tGuess
                     high=(self.s2.shape[1]-len(self.pdf)-self.i[-1])*self.grain+self.tGuess
                     warnings.warn( 'intensity %.2f out of range %.2f to %.2f. Pdf will be inexact.'%(intensity,low,high),
                                    RuntimeWarning,stacklevel=2)
-                if ii[0]<0:
-                    ii = ii-ii[0]
-                else:
-                    ii = ii+self.s2.shape[1]-ii[-1]-1
-            iii = ii.astype(num.int_)
-            if not num.allclose(ii,iii):
-                raise ValueError('truncation error')
-            self.pdf = self.pdf*self.s2[response,iii]
+                start = min(max(start, 0), self.s2.shape[1] - n)
+            self.logPdf = self.logPdf + self._logS2[response,start:start+n]
             if self.normalizePdf:
-                self.pdf=self.pdf/num.sum(self.pdf)
+                self.logPdf = _normalized_log(self.logPdf)
+            self.pdf = num.exp(self.logPdf)
+            self._logPdfOf = self.pdf
         # keep a historical record of the trials
         self.intensity.append(intensity)
         self.response.append(response)
 
+
+def grid_analysis(intensities, responses, tGuess, tGuessSd, pThreshold,
+                  beta=3.5, delta=0.01, gamma=0.5, grain=0.01, range=None):
+    """Reanalyze the histories of many staircases with a grid of
+    psychometric function parameters, all at once.
+
+    intensities and responses are sequences with the history of each
+    staircase (as QuestObject.intensity and QuestObject.response).
+    tGuess and tGuessSd can be a single value or one for each staircase;
+    pThreshold, grain and range are as for QuestObject. Each of beta,
+    delta and gamma can be a single value or a sequence of values, and
+    every combination is analyzed.
+
+    Returns a dict with the 'beta', 'delta' and 'gamma' values and, for
+    each staircase and combination of them (an array of shape
+    [staircase, beta, delta, gamma]), the 'mean', 'sd' and 'mode' of the
+    posterior pdf (as q.mean(), q.sd() and q.mode()[0] would give after
+    setting the parameters and calling q.recompute()), and its
+    'logLikelihood': the log of the probability of the responses given
+    the parameters (and the prior), with which parameters can be compared
+    (as in beta_analysis) without underflow.
+
+    The counts of the trials of each staircase at each table position are
+    put in a sparse matrix once, and the log likelihoods for each
+    combination of parameters are the product of that with the windows of
+    the log of the psychometric function.
+    """
+    from scipy import sparse  # only needed here
+
+    nStaircases = len(intensities)
+    if len(responses) != nStaircases:
+        raise ValueError('intensities and responses must have a history for each staircase')
+    betas, deltas, gammas = [num.atleast_1d(num.asarray(v, dtype=float))
+                             for v in (beta, delta, gamma)]
+    if num.any(gammas > pThreshold):
+        raise ValueError('gamma must not be greater than pThreshold')
+    tGuess = num.broadcast_to(num.asarray(tGuess, dtype=float), (nStaircases,))
+    tGuessSd = num.broadcast_to(num.asarray(tGuessSd, dtype=float), (nStaircases,))
+    grain = float(grain)
+    if range is None:
+        dim = 500
+    else:
+        if range <= 0:
+            raise ValueError('argument "range" must be greater than zero.')
+        dim = 2*math.ceil(range/grain/2.0)
+    x = num.arange(-dim/2, dim/2+1)*grain
+    n = len(x)
+    nColumns = 2*dim+1
+    nStarts = nColumns - n + 1
+
+    # the trials of every staircase, counted by their row of the windows
+    staircaseN, keys = [], []
+    for k, (theseIntens, theseResps) in enumerate(zip(intensities, responses)):
+        if len(theseIntens) != len(theseResps):
+            raise ValueError('staircase %i has %i intensities but %i responses'
+                             %(k, len(theseIntens), len(theseResps)))
+        starts = _table_starts(theseIntens, tGuess[k], grain, n, nColumns)
+        keys.append(num.asarray(theseResps, dtype=num.int_)*nStarts + starts)
+        staircaseN.append(num.full(len(starts), k, dtype=num.int_))
+    keys = num.concatenate(keys) if keys else num.zeros(0, num.int_)
+    staircaseN = num.concatenate(staircaseN) if staircaseN else keys
+    counts = sparse.coo_matrix(
+        (num.ones(len(keys)), (staircaseN, keys)),
+        shape=(nStaircases, 2*nStarts)).tocsr()
+
+    logPrior = -0.5*(x[None, :]/tGuessSd[:, None])**2
+    logPrior = logPrior - num.log(num.sum(num.exp(logPrior), axis=1))[:, None]
+
+    shape = (nStaircases, len(betas), len(deltas), len(gammas))
+    out = dict(beta=betas, delta=deltas, gamma=gammas,
+               mean=num.empty(shape), sd=num.empty(shape),
+               mode=num.empty(shape), logLikelihood=num.empty(shape))
+    for bN, b in enumerate(betas):
+        for dN, d in enumerate(deltas):
+            for gN, g in enumerate(gammas):
+                x2, p2, xThreshold = _weibull_table(b, d, g, pThreshold, grain, dim)
+                logS2 = _log(num.array( ((1-p2)[::-1], p2[::-1]) ))
+                windows = _windows(logS2, n).reshape(2*nStarts, n)
+                logPdf = logPrior + counts.dot(windows)
+                top = num.max(logPdf, axis=1)
+                with num.errstate(invalid='ignore'):
+                    pdf = num.exp(logPdf - top[:, None])
+                    total = num.sum(pdf, axis=1)
+                    mean = num.dot(pdf, x)/total
+                    sd = num.sqrt(num.maximum(num.dot(pdf, x**2)/total - mean**2, 0))
+                index = (slice(None), bN, dN, gN)
+                out['mean'][index] = tGuess + mean
+                out['sd'][index] = sd
+                out['mode'][index] = tGuess + x[num.argmax(logPdf, axis=1)]
+                out['logLikelihood'][index] = top + num.log(total)
+    return out
+
+
 def demo():
     """Demo script for Quest routines.
 
@@ -18,10 +18,12 @@ if sys.version_info.major == 3 and sys.version_info.minor >= 6:
 from .utils import (checkValidFilePath, isValidVariableName, importTrialTypes,
                     sliceFromString, indicesFromString, importConditions,
                     createFactorialTrialList, bootStraps, functionFromStaircase,
-                    getDateStr)
+                    getDateStr, loadColumnar, clearConditionsCache)
 
 from .fit import (FitFunction, FitCumNormal, FitLogistic, FitNakaRushton,
-                  FitWeibull)
+                  FitWeibull, bootstrapFit, BootstrapFit)
+
+from .simulation import simulateStaircase, StaircaseSimulation
 
 try:
     # import openpyxl
@@ -62,7 +62,9 @@ class _ComparisonMixin(object):
                 if not np.ma.allclose(val, getattr(other, key)):
                     return False
             elif isinstance(val, np.ndarray):
-                if not np.allclose(val, getattr(other, key)):
+                otherVal = getattr(other, key)
+                if (np.shape(val) != np.shape(otherVal) or
+                        not np.allclose(val, otherVal)):
                     return False
             elif isinstance(val, (pd.DataFrame, pd.Series)):
                 if not val.equals(getattr(other, key)):
@@ -529,6 +531,10 @@ class DataHandler(_ComparisonMixin, dict):
         """
         if not thisType in self:
             self.addDataType(thisType)
+        if position is None and hasattr(self.trials, '_dataPosition'):
+            # the trial handler knows the repeat of the current trial
+            # from its sequence, without counting what has already run
+            position = self.trials._dataPosition()
         if position is None:
             # 'ran' is always the first thing to update
             repN = sum(self['ran'][self.trials.thisIndex])
@@ -540,13 +546,11 @@ class DataHandler(_ComparisonMixin, dict):
             position.append(repN)
 
         # check whether data falls within bounds
-        posArr = np.asarray(position)
-        shapeArr = np.asarray(self.dataShape)
-        if not np.alltrue(posArr < shapeArr):
+        if any(pos >= size for pos, size in zip(position, self.dataShape)):
             # array isn't big enough
             logging.warning('need a bigger array for: ' + thisType)
             # not implemented yet!
-            self[thisType] = extendArr(self[thisType], posArr)
+            self[thisType] = extendArr(self[thisType], np.asarray(position))
         # check for ndarrays with more than one value and for non-numeric data
         if (self.isNumeric[thisType] and
                 ((type(value) == np.ndarray and len(value) > 1) or
@@ -6,18 +6,144 @@ from __future__ import absolute_import, print_function
 # from future import standard_library
 # standard_library.install_aliases()
 from builtins import str
+import os
 import sys
 import copy
 import pickle
 import atexit
+import shutil
+import codecs
+import pandas as pd
 
 from psychopy import logging
 from psychopy.tools.filetools import (openOutputFile, genDelimiter,
                                       genFilenameFromDelimiter)
-from .utils import checkValidFilePath
+from .utils import checkValidFilePath, columnarFormats, _saveAsColumnar
 from .base import _ComparisonMixin
 
 
+def _wideTextRow(entry, names, delim):
+    """Format one entry (a dict) as a single line of wide-format text,
+    with the cells in the order given by `names`.
+    """
+    cells = []
+    for name in names:
+        if name in entry:
+            ename = str(entry[name])
+            if ',' in ename or '\n' in ename:
+                cells.append(u'"%s"%s' % (ename, delim))
+            else:
+                cells.append(u'%s%s' % (ename, delim))
+        else:
+            cells.append(delim)
+    cells.append(u'\n')
+    return u''.join(cells)
+
+
+class _WideTextStream(object):
+    """Appends finished entries to an open wide-format text file, one row
+    at a time, so that they need not be kept in memory until the end of the
+    run.
+
+    The column order is fixed once a column has been written. Names that
+    first appear mid-run are added to the end of the schema and later rows
+    simply contain more cells than earlier ones. If that happens, the
+    header row is rewritten once when the stream is closed (the body is
+    copied across as raw bytes, so memory use stays bounded).
+    """
+
+    def __init__(self, fileName, names, delim=None, append=False,
+                 encoding='utf-8-sig', fileCollisionMethod='rename'):
+        if delim is None:
+            delim = genDelimiter(fileName)
+        fileName = genFilenameFromDelimiter(fileName, delim)
+        self.delim = delim
+        self.encoding = encoding
+        self.names = []
+        self._namesSet = set()
+        self.addNames(names)
+        self.nRows = 0
+        self.f = openOutputFile(fileName, append=append,
+                                fileCollisionMethod=fileCollisionMethod,
+                                encoding=encoding)
+        self.fileName = self.f.name
+        self._headerStart = self.f.tell()
+        self.f.write(self._header())
+        self.f.flush()
+        self._bodyStart = self.f.tell()
+        self._nHeaderNames = len(self.names)
+
+    def _header(self):
+        return u''.join([u'%s%s' % (name, self.delim)
+                         for name in self.names]) + u'\n'
+
+    def addNames(self, names):
+        """Append any names not yet in the schema (order is preserved).
+        """
+        for name in names:
+            if name not in self._namesSet:
+                self._namesSet.add(name)
+                self.names.append(name)
+
+    def write(self, entry):
+        """Write a single entry (dict) as a row and flush it to the OS so
+        that it survives a crash of the Python process.
+        """
+        self.addNames(entry)
+        self.f.write(_wideTextRow(entry, self.names, self.delim))
+        self.f.flush()
+        self.nRows += 1
+
+    def readDataFrame(self):
+        """Read the rows written so far back in as a DataFrame (using the
+        pandas csv parser rather than a Python loop)
+        """
+        self.f.flush()
+        with open(self.fileName, 'rb') as f:
+            f.seek(self._bodyStart)
+            # the extra name absorbs the delimiter at the end of each row
+            dataFrame = pd.read_csv(f, sep=self.delim, encoding='utf-8',
+                                    header=None,
+                                    names=self.names + ['__end__'],
+                                    skip_blank_lines=False)
+        return dataFrame[self.names]
+
+    def close(self):
+        """Close the file, updating the header row if new columns were
+        added after it was written.
+        """
+        if self.f is None:
+            return
+        self.f.close()
+        self.f = None
+        if len(self.names) != self._nHeaderNames:
+            self._rewriteHeader()
+        logging.info('saved data to %r' % self.fileName)
+
+    def _rewriteHeader(self):
+        tmpName = self.fileName + '.tmp'
+        with open(self.fileName, 'rb') as src, open(tmpName, 'wb') as dst:
+            # anything already in the file before we started (appendFiles)
+            remaining = self._headerStart
+            while remaining > 0:
+                chunk = src.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                dst.write(chunk)
+                remaining -= len(chunk)
+            encoding = self.encoding
+            if (self._headerStart > 0 and
+                    codecs.lookup(encoding).name == 'utf-8-sig'):
+                # the byte order mark belongs at the start of the file only
+                encoding = 'utf-8'
+            dst.write(codecs.encode(self._header(), encoding))
+            src.seek(self._bodyStart)
+            shutil.copyfileobj(src, dst)
+        os.remove(self.fileName)
+        os.rename(tmpName, self.fileName)
+        self._nHeaderNames = len(self.names)
+
+
 class ExperimentHandler(_ComparisonMixin):
     """A container class for keeping track of multiple loops/handlers
 
@@ -40,7 +166,9 @@ class ExperimentHandler(_ComparisonMixin):
                  saveWideText=True,
                  dataFileName='',
                  autoLog=True,
-                 appendFiles=False):
+                 appendFiles=False,
+                 streamWideText=False,
+                 dataFormat=None):
         """
         :parameters:
 
@@ -75,6 +203,16 @@ class ExperimentHandler(_ComparisonMixin):
             saveWideText : True (default) or False
 
             autoLog : True (default) or False
+
+            streamWideText : True or False (default)
+                If True (and `saveWideText` is True) each entry is written to
+                the wide-format text file as soon as :meth:`nextEntry` is
+                called, rather than all at once when the experiment ends.
+                Completed entries are then not kept in memory (`.entries`
+                stays empty, so neither :meth:`getAllEntries` nor the
+                psydat file will contain them) and a crash loses at most
+                the current, unfinished entry. Columns that first appear
+                mid-run are added to the right of the existing ones.
         """
         self.loops = []
         self.loopsUnfinished = []
@@ -95,6 +233,12 @@ class ExperimentHandler(_ComparisonMixin):
         self.dataNames = []  # names of all the data (eg. resp.keys)
         self.autoLog = autoLog
         self.appendFiles = appendFiles
+        self.streamWideText = streamWideText
+        self._stream = None
+        if dataFormat is not None and dataFormat not in columnarFormats:
+            raise ValueError("dataFormat should be None or one of %s, not %r"
+                             % (sorted(columnarFormats), dataFormat))
+        self.dataFormat = dataFormat
 
         if dataFileName in ['', None]:
             logging.warning('ExperimentHandler created with no dataFileName'
@@ -233,9 +377,41 @@ class ExperimentHandler(_ComparisonMixin):
         # add the extraInfo dict to the data
         if type(self.extraInfo) == dict:
             this.update(self.extraInfo)
-        self.entries.append(this)
+        if self._isStreaming():
+            self._streamEntry(this)
+        else:
+            self.entries.append(this)
         self.thisEntry = {}
 
+    def _isStreaming(self):
+        # getattr() because handlers unpickled from older psydat files
+        # won't have the attribute
+        return (getattr(self, 'streamWideText', False) and
+                self.saveWideText and
+                self.dataFileName not in ['', None])
+
+    def _streamEntry(self, entry):
+        """Write a single entry to the wide-text stream, opening the file
+        (and writing the header) on first use.
+        """
+        if self._stream is None:
+            names = self._getAllParamNames()
+            names.extend(self.dataNames)
+            names.extend(self._getExtraInfo()[0])
+            self._stream = _WideTextStream(self.dataFileName + '.csv', names,
+                                           append=self.appendFiles)
+        self._stream.write(entry)
+
+    def _closeStream(self, saveOrphan=True):
+        """Write any final (orphan) entry and close the wide-text stream
+        """
+        if saveOrphan and self.thisEntry:
+            self._streamEntry(self.thisEntry)
+            self.thisEntry = {}
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
     def getAllEntries(self):
         """Fetches a copy of all the entries including a final (orphan) entry
         if that exists. This allows entries to be saved even if nextEntry() is
@@ -321,27 +497,63 @@ class ExperimentHandler(_ComparisonMixin):
             names.sort()
         # write a header line
         if not matrixOnly:
-            for heading in names:
-                f.write(u'%s%s' % (heading, delim))
-            f.write('\n')
+            f.write(u''.join([u'%s%s' % (heading, delim)
+                              for heading in names]) + u'\n')
 
         # write the data for each entry
         for entry in self.getAllEntries():
-            for name in names:
-                if name in entry:
-                    ename = str(entry[name])
-                    if ',' in ename or '\n' in ename:
-                        fmt = u'"%s"%s'
-                    else:
-                        fmt = u'%s%s'
-                    f.write(fmt % (entry[name], delim))
-                else:
-                    f.write(delim)
-            f.write('\n')
+            f.write(_wideTextRow(entry, names, delim))
         if f != sys.stdout:
             f.close()
         logging.info('saved data to %r' % f.name)
 
+    def saveAsColumnar(self, fileName, dataFormat='npz', sortColumns=False,
+                       fileCollisionMethod='rename'):
+        """Saves the same table as :meth:`saveAsWideText` (one row per
+        entry, including the loop and extraInfo columns) but as typed
+        columns in a binary format, written in a single pass.
+
+        Numeric columns (ignoring missing values) are stored as numbers and
+        everything else as strings. Load the file(s) again with
+        :func:`~psychopy.data.loadColumnar`.
+
+        :Parameters:
+
+            fileName:
+                the extension for the format ('.npz', '.parquet' or
+                '.hdf5') will be appended if not already present.
+
+            dataFormat:
+                'npz' (default, needs only numpy), 'parquet' (needs pyarrow
+                or fastparquet) or 'hdf5' (needs pytables)
+
+            sortColumns:
+                will sort columns alphabetically by header name if True
+
+            fileCollisionMethod:
+                Collision method passed to
+                :func:`~psychopy.tools.fileerrortools.handleFileCollision`
+
+        :Returns:
+
+            the name of the file that was saved
+        """
+        if getattr(self, '_stream', None) is not None:
+            dataFrame = self._stream.readDataFrame()
+            if self.thisEntry:
+                orphan = pd.DataFrame([self.thisEntry])
+                dataFrame = pd.concat([dataFrame, orphan], ignore_index=True,
+                                      sort=False)
+        else:
+            names = self._getAllParamNames()
+            names.extend(self.dataNames)
+            names.extend(self._getExtraInfo()[0])
+            dataFrame = pd.DataFrame(self.getAllEntries(), columns=names)
+        if sortColumns:
+            dataFrame = dataFrame[sorted(dataFrame.columns)]
+        return _saveAsColumnar(dataFrame, fileName, dataFormat=dataFormat,
+                               fileCollisionMethod=fileCollisionMethod)
+
     def saveAsPickle(self, fileName, fileCollisionMethod='rename'):
         """Basically just saves a copy of self (with data) to a pickle file.
 
@@ -352,25 +564,30 @@ class ExperimentHandler(_ComparisonMixin):
             fileCollisionMethod: Collision method passed to
             :func:`~psychopy.tools.fileerrortools.handleFileCollision`
         """
-        # Store the current state of self.savePickle and self.saveWideText
-        # for later use:
-        # We are going to set both to False before saving,
+        # Store the current state of self.savePickle, self.saveWideText
+        # and self.dataFormat for later use:
+        # We are going to unset them before saving,
         # so PsychoPy won't try to save again after loading the pickled
         # .psydat file from disk.
         #
-        # After saving, the initial state of self.savePickle and
-        # self.saveWideText is restored.
+        # After saving, their initial state is restored.
         #
         # See
         # https://groups.google.com/d/msg/psychopy-dev/Z4m_UX88q8U/UGuh1eeyjMEJ
         savePickle = self.savePickle
         saveWideText = self.saveWideText
+        dataFormat = getattr(self, 'dataFormat', None)
 
         self.savePickle = False
         self.saveWideText = False
+        self.dataFormat = None
 
         origEntries = self.entries
         self.entries = self.getAllEntries()
+        # an open file can't be pickled, so the stream is detached while
+        # pickling (and carries on afterwards)
+        stream = getattr(self, '_stream', None)
+        self._stream = None
 
         # otherwise use default location
         if not fileName.endswith('.psydat'):
@@ -384,9 +601,11 @@ class ExperimentHandler(_ComparisonMixin):
             logging.info('saved data to %s' % f.name)
 
         self.entries = origEntries  # revert list of completed entries post-save
+        self._stream = stream
         self.savePickle = savePickle
         self.saveWideText = saveWideText
-        
+        self.dataFormat = dataFormat
+
     def close(self):
         if self.dataFileName not in ['', None]:
             if self.autoLog:
@@ -394,7 +613,13 @@ class ExperimentHandler(_ComparisonMixin):
                 logging.debug(msg)
             if self.savePickle:
                 self.saveAsPickle(self.dataFileName)
-            if self.saveWideText:
+            # before the stream is closed, as it reads the streamed rows
+            if getattr(self, 'dataFormat', None):
+                self.saveAsColumnar(self.dataFileName,
+                                    dataFormat=self.dataFormat)
+            if self._isStreaming():
+                self._closeStream()
+            elif self.saveWideText:
                 self.saveAsWideText(self.dataFileName + '.csv')
         self.abort()
         self.autoLog = False
@@ -410,3 +635,7 @@ class ExperimentHandler(_ComparisonMixin):
         """
         self.savePickle = False
         self.saveWideText = False
+        self.dataFormat = None
+        if getattr(self, '_stream', None) is not None:
+            # rows already written are kept but no more are added
+            self._closeStream(saveOrphan=False)
@@ -4,6 +4,10 @@
 from __future__ import absolute_import, division, print_function
 
 from builtins import object
+from builtins import range
+import functools
+import warnings
+
 import numpy as np
 # from scipy import optimize  # DON'T. It's slow and crashes on some machines
 
@@ -242,6 +246,166 @@ class FitCumNormal(_baseFunctionFit):
               special.erfinv(((yy - _chance) / (1 - _chance) - 0.5) * 2))
         return xx
 
+class BootstrapFit(object):
+    """The outcome of :func:`bootstrapFit`: the fit of the data and the
+    fits of the bootstrap resamples.
+
+    :Attributes:
+
+        fit : the fit (e.g. a FitWeibull) of the original data
+
+        params : (nResamples, nParams) array of the parameters fitted to
+            each resample (NaN where the fit failed)
+
+        levels : the response levels at which thresholds were computed
+
+        thresholds : (nResamples, nLevels) array of the thresholds
+            (``fit.inverse(levels)``) for each resample
+    """
+
+    def __init__(self, fit, params, levels, thresholds):
+        self.fit = fit
+        self.params = params
+        self.levels = levels
+        self.thresholds = thresholds
+
+    @property
+    def nFailed(self):
+        """The number of resamples that couldn't be fitted"""
+        return int(np.sum(np.isnan(self.params).any(axis=1)))
+
+    def paramsCI(self, ci=95):
+        """The percentile confidence intervals of the parameters, as a
+        (2, nParams) array of the lower and upper limits"""
+        tail = (100 - ci) / 2.0
+        return np.nanpercentile(self.params, [tail, 100 - tail], axis=0)
+
+    def thresholdCI(self, ci=95):
+        """The percentile confidence intervals of the thresholds, as a
+        (2, nLevels) array of the lower and upper limits"""
+        tail = (100 - ci) / 2.0
+        return np.nanpercentile(self.thresholds, [tail, 100 - tail], axis=0)
+
+
+def _fitResamples(start, stop, rng, fitClass, xx, yy, sems, guess,
+                  expectedMin, optimize_kws, levels):
+    """Draws and fits a chunk of (stop - start) resamples. Returns their
+    params and thresholds, NaN where the fit fails"""
+    from .utils import _resample
+    n = stop - start
+    if yy.ndim == 2:
+        # resample the trials of each condition (row)
+        yyResamples = _resample(yy, n, rng).mean(axis=1).T
+        xxResamples = np.tile(xx, (n, 1))
+        semsResamples = [sems] * n
+    else:
+        # resample the (xx, yy) pairs
+        indices = rng.randint(0, len(xx), size=(n, len(xx)))
+        xxResamples = xx[indices]
+        yyResamples = yy[indices]
+        if np.size(sems) > 1:
+            semsResamples = sems[indices]
+        else:
+            semsResamples = [sems] * n
+
+    params = np.full((n, len(guess)), np.nan)
+    thresholds = np.full((n, len(levels)), np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # e.g. covariance can't be estimated
+        for sampleN in range(n):
+            try:
+                fit = fitClass(xxResamples[sampleN], yyResamples[sampleN],
+                               sems=semsResamples[sampleN], guess=guess,
+                               display=0, expectedMin=expectedMin,
+                               optimize_kws=optimize_kws)
+            except Exception:
+                # a resample that can't be fitted (e.g. no convergence, or
+                # fewer distinct points than parameters) is left as NaN
+                continue
+            params[sampleN] = fit.params
+            thresholds[sampleN] = fit.inverse(levels)
+    return params, thresholds
+
+
+def bootstrapFit(fitClass, xx, yy, n=1000, sems=1.0, guess=None,
+                 expectedMin=0.5, levels=None, optimize_kws=None, seed=None,
+                 nProcesses=1):
+    """Fit a function to the data and to `n` bootstrap resamples of it, to
+    get confidence intervals of its parameters and thresholds::
+
+        boot = data.bootstrapFit(data.FitWeibull, intensities, responses,
+                                 n=10000)
+        lower, upper = boot.thresholdCI(95)
+
+    :Parameters:
+
+        fitClass : FitWeibull, FitLogistic, FitCumNormal, FitNakaRushton
+            (or another subclass of _baseFunctionFit)
+
+        xx : array
+            The x values (e.g. intensities).
+
+        yy : array
+            Either the y values of each of `xx` (e.g. the responses of
+            each trial of a staircase), in which case the (xx, yy) pairs
+            are resampled; or a 2D array with a row of trials (responses)
+            for each of `xx`, in which case the trials of each row are
+            resampled (as :func:`bootStraps`) and the function is fitted to
+            their means.
+
+        n : int
+            The number of resamples.
+
+        sems, expectedMin, optimize_kws :
+            As for `fitClass` (`sems` that are an array are resampled with
+            the pairs).
+
+        guess : list or None
+            The starting parameters for the fit of the data. The fits of
+            the resamples start from the parameters of that fit.
+
+        levels : float, list or None
+            The y values at which thresholds are computed, with the
+            inverse of the fitted function. The default is halfway between
+            `expectedMin` and 1 (0.75 for 2AFC).
+
+        seed : int or None
+            Seeds the resampling.
+
+        nProcesses : int or None
+            The number of processes that fit the resamples, in chunks of
+            250 (all the cpus if None). For more than one, the script needs
+            an ``if __name__ == '__main__':`` guard on Windows and macOS.
+
+    :Returns:
+
+        a :class:`BootstrapFit`
+    """
+    xx = np.asarray(xx, dtype=float)
+    yy = np.asarray(yy, dtype=float)
+    if np.size(sems) > 1:
+        sems = np.asarray(sems, dtype=float)
+    if levels is None:
+        levels = expectedMin + (1 - expectedMin) / 2.0
+    levels = np.atleast_1d(np.asarray(levels, dtype=float))
+
+    # the fit of the data (this raises any problems with the arguments)
+    fitYY = yy.mean(axis=1) if yy.ndim == 2 else yy
+    fit = fitClass(xx, fitYY, sems=sems, guess=guess, display=0,
+                   expectedMin=expectedMin, optimize_kws=optimize_kws)
+
+    from .utils import _mapChunks
+    fitChunk = functools.partial(
+        _fitResamples, fitClass=fitClass, xx=xx, yy=yy, sems=sems,
+        guess=list(fit.params), expectedMin=expectedMin,
+        optimize_kws=optimize_kws, levels=levels)
+    results = _mapChunks(fitChunk, n, 250, seed=seed, nProcesses=nProcesses)
+
+    params = np.concatenate([result[0] for result in results])
+    thresholds = np.concatenate([result[1] for result in results])
+    return BootstrapFit(fit, params, levels, thresholds)
+
+
 class FitFunction(object):
     """Deprecated: - use the specific functions; FitWeibull, FitLogistic...
     """
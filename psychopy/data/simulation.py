@@ -0,0 +1,574 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Monte-Carlo simulation of staircases.
+
+:func:`simulateStaircase` runs many simulated observers through the
+procedure of a StairHandler, QuestHandler or PsiHandler at once: the
+observers are rows of numpy arrays that step through their trials
+together, rather than each running through the handler's iterator. Use it
+to choose step sizes, up/down rules, priors or grids before running an
+experiment::
+
+    stairs = data.StairHandler(0.5, stepSizes=[4, 2, 1], nTrials=50,
+                               nUp=1, nDown=3)
+    sim = data.simulateStaircase(stairs, thresholds=0.1, nObservers=10000)
+    print(sim.summary())
+
+Observers are simulated in chunks, each with its own random seed, so that
+the chunks can be run in parallel processes and the results are the same
+whatever the number of processes.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from builtins import object
+import functools
+
+import numpy as np
+
+from .staircase import StairHandler, QuestHandler, PsiHandler
+from .utils import _mapChunks
+
+__all__ = ['simulateStaircase', 'StaircaseSimulation']
+
+# staircase directions
+_START, _UP, _DOWN = 0, 1, -1
+
+
+class StaircaseSimulation(object):
+    """The outcome of :func:`simulateStaircase`, with one entry (or row)
+    per simulated observer.
+
+    :Attributes:
+
+        thresholds : the actual thresholds of the observers
+
+        estimates : the threshold estimated by the staircase
+
+        slopes : the slope (beta) estimated by a PsiHandler (else None)
+
+        intensities : (nObservers, maxTrials) array of the intensities
+            presented, NaN after an observer's staircase finished
+
+        responses : (nObservers, maxTrials) array of the responses
+            (1 or 0, and -1 after the staircase finished)
+
+        nTrials : the number of trials that each staircase ran
+
+        finished : whether each staircase finished before maxTrials
+    """
+
+    def __init__(self, thresholds, estimates, intensities, responses,
+                 nTrials, finished, slopes=None):
+        self.thresholds = thresholds
+        self.estimates = estimates
+        self.intensities = intensities
+        self.responses = responses
+        self.nTrials = nTrials
+        self.finished = finished
+        self.slopes = slopes
+
+    @property
+    def errors(self):
+        """The estimated minus the actual thresholds"""
+        return self.estimates - self.thresholds
+
+    def bias(self):
+        """Mean error of the threshold estimates"""
+        return np.nanmean(self.errors)
+
+    def sd(self):
+        """Standard deviation of the threshold estimates (about their
+        bias)"""
+        return np.nanstd(self.errors)
+
+    def variance(self):
+        """Variance of the threshold estimates (about their bias)"""
+        return np.nanvar(self.errors)
+
+    def rmse(self):
+        """Root mean squared error of the threshold estimates"""
+        return np.sqrt(np.nanmean(self.errors ** 2))
+
+    def summary(self, ci=95):
+        """A dict of summary statistics of the threshold estimates: their
+        mean and median, the bias, sd, variance and rmse of the errors,
+        the central `ci` % interval of the errors, the mean number of
+        trials and the number of observers whose staircase didn't finish
+        (or gave no estimate).
+        """
+        errors = self.errors
+        tail = (100 - ci) / 2.0
+        return {'meanEstimate': np.nanmean(self.estimates),
+                'medianEstimate': np.nanmedian(self.estimates),
+                'bias': self.bias(),
+                'sd': self.sd(),
+                'variance': self.variance(),
+                'rmse': self.rmse(),
+                'errorInterval': np.nanpercentile(errors, [tail, 100 - tail]),
+                'meanTrials': np.mean(self.nTrials),
+                'nUnfinished': int(np.sum(~self.finished |
+                                          np.isnan(self.estimates)))}
+
+
+def _weibullObserver(intensities, thresholds, beta=3.5, chance=0.5):
+    """A Weibull psychometric function (as :class:`FitWeibull`) of linear
+    intensities, where `thresholds` are its alpha parameter"""
+    x = np.maximum(intensities, 0) / thresholds
+    return chance + (1.0 - chance) * (1 - np.exp(-x ** beta))
+
+
+def _tableObserver(intensities, thresholds, x2, p2):
+    """The psychometric function of a QuestObject (table p2 of x2 =
+    intensity - threshold), as used by QuestObject.simulate()"""
+    return np.interp(intensities - thresholds, x2, p2)
+
+
+def _normCdfObserver(intensities, thresholds, sd, delta, twoAFC):
+    """The psychometric function of a PsiObject, with thresholds as its
+    location (alpha) and `sd` as its slope (beta)"""
+    from scipy import special
+    p = special.ndtr((intensities - thresholds) / sd)
+    if twoAFC:
+        p = 0.5 + 0.5 * p
+    return p * (1 - delta) + delta / 2.0
+
+
+def _pdfQuantile(pdf, x, quantileOrder):
+    """Quantiles of each row of `pdf` (unnormalized) on the grid `x`, as
+    QuestObject.quantile() (linear interpolation of the cumulative pdf at
+    the points where it increases)"""
+    cdf = np.cumsum(pdf, axis=1)
+    target = np.asarray(quantileOrder) * cdf[:, -1]
+    rows = np.arange(len(pdf))
+    above = np.argmax(cdf >= target[:, None], axis=1)
+    # interpolate from the last point before `above` where the cdf
+    # increased (the first point always counts as an increase). That's
+    # nearly always the point just before it
+    below = np.maximum(above - 1, 0)
+    flat = (below > 0) & (cdf[rows, below] <= cdf[rows, below - 1])
+    if flat.any():
+        flatRows = rows[flat]
+        flatCdf = cdf[flatRows]
+        increased = np.ones(flatCdf.shape, dtype=bool)
+        increased[:, 1:] = flatCdf[:, 1:] > flatCdf[:, :-1]
+        lastIncrease = np.maximum.accumulate(
+            np.where(increased, np.arange(cdf.shape[1]), 0), axis=1)
+        below[flat] = lastIncrease[np.arange(len(flatRows)), below[flat]]
+    cdfBelow = cdf[rows, below]
+    cdfAbove = cdf[rows, above]
+    step = np.where(above > below, cdfAbove - cdfBelow, 1.0)
+    frac = np.clip((target - cdfBelow) / step, 0, 1)
+    return x[below] + frac * (x[above] - x[below])
+
+
+class _StairSimulator(object):
+    """Simulates the rules of a StairHandler"""
+
+    def __init__(self, stairs, observer, nLastReversals):
+        self.startVal = stairs._nextIntensity
+        self.stepSizes = np.asarray(stairs.stepSizes, dtype=float)
+        self.stepType = stairs.stepType
+        self.nUp = stairs.nUp
+        self.nDown = stairs.nDown
+        self.applyInitialRule = stairs.applyInitialRule
+        self.nReversals = stairs.nReversals
+        self.nTrials = stairs.nTrials
+        self.minVal = stairs.minVal
+        self.maxVal = stairs.maxVal
+        self.nLastReversals = nLastReversals
+        if observer is None:
+            observer = _weibullObserver
+        self.observer = observer
+
+    def _step(self, intensity, stepSize, up):
+        """The intensities after a step up (or down) of stepSize"""
+        sign = np.where(up, 1.0, -1.0)
+        if self.stepType == 'db':
+            intensity = intensity * 10.0 ** (sign * stepSize / 20.0)
+        elif self.stepType == 'log':
+            intensity = intensity * 10.0 ** (sign * stepSize)
+        elif self.stepType == 'lin':
+            intensity = intensity + sign * stepSize
+        if self.maxVal is not None:
+            intensity = np.where(up, np.minimum(intensity, self.maxVal),
+                                 intensity)
+        if self.minVal is not None:
+            intensity = np.where(up, intensity,
+                                 np.maximum(intensity, self.minVal))
+        return intensity
+
+    def run(self, thresholds, rng, maxTrials):
+        n = len(thresholds)
+        nextIntensity = np.full(n, self.startVal, dtype=float)
+        direction = np.full(n, _START)
+        counter = np.zeros(n, dtype=int)  # correct (+) or incorrect (-) run
+        lastResponse = np.full(n, -1)
+        nRev = np.zeros(n, dtype=int)
+        stepSize = np.full(n, self.stepSizes[0])
+        # the last few reversal intensities, for the estimate
+        lastReversals = np.full((n, self.nLastReversals), np.nan)
+        finished = np.zeros(n, dtype=bool)
+        nTrials = np.zeros(n, dtype=int)
+        rows = np.arange(n)
+        intensities = []
+        responses = []
+        for trialN in range(maxTrials):
+            active = ~finished
+            if not active.any():
+                break
+            intensity = nextIntensity
+            response = rng.random_sample(n) < self.observer(intensity,
+                                                            thresholds)
+            intensities.append(np.where(active, intensity, np.nan))
+            responses.append(np.where(active, response, -1))
+            nTrials += active
+
+            # the run of correct (or incorrect) responses
+            onRun = response == lastResponse
+            newCounter = np.where(response, np.where(onRun, counter + 1, 1),
+                                  np.where(onRun, counter - 1, -1))
+            # which way the rule says to go
+            initial = self.applyInitialRule & (nRev == 0)
+            nDownMet = newCounter >= self.nDown
+            nUpMet = ~nDownMet & (newCounter <= -self.nUp)
+            goDown = np.where(initial, response, nDownMet)
+            goUp = np.where(initial, ~response, nUpMet)
+            reversal = active & ((goDown & (direction == _UP)) |
+                                 (goUp & (direction == _DOWN)))
+            # a reversal at the end of the initial 1-up 1-down rule
+            endInitial = reversal & initial
+            revRows = rows[reversal]
+            lastReversals[revRows,
+                          nRev[revRows] % self.nLastReversals] = \
+                intensity[revRows]
+            newNRev = nRev + reversal
+            if len(self.stepSizes) > 1:
+                newStep = self.stepSizes[np.minimum(newNRev,
+                                                    len(self.stepSizes) - 1)]
+                stepSize = np.where(reversal, newStep, stepSize)
+            # take the step
+            initialStep = self.applyInitialRule & ((newNRev == 0) |
+                                                   endInitial)
+            down = np.where(initialStep, response, nDownMet)
+            up = np.where(initialStep, ~response, nUpMet)
+            moved = active & (up | down)
+            newIntensity = np.where(moved,
+                                    self._step(intensity, stepSize, up),
+                                    intensity)
+            newCounter[moved] = 0
+
+            # keep the new state for the observers still running
+            newDirection = np.where(goDown, _DOWN,
+                                    np.where(goUp, _UP, direction))
+            direction = np.where(active, newDirection, direction)
+            counter = np.where(active, newCounter, counter)
+            lastResponse = np.where(active, response, lastResponse)
+            nextIntensity = np.where(active, newIntensity, nextIntensity)
+            nRev = newNRev
+            finished |= (nRev >= self.nReversals) & (nTrials >= self.nTrials)
+
+        estimates = np.full(n, np.nan)
+        hasReversals = nRev > 0
+        estimates[hasReversals] = np.nanmean(lastReversals[hasReversals],
+                                             axis=1)
+        return {'estimates': estimates, 'nTrials': nTrials,
+                'finished': finished,
+                'intensities': _columns(intensities, n),
+                'responses': _columns(responses, n, fill=-1)}
+
+
+class _QuestSimulator(object):
+    """Simulates the posterior grids of a QuestHandler, one row per
+    observer"""
+
+    def __init__(self, quest, observer, estimate):
+        q = quest._quest
+        self.pdf = q.pdf / np.sum(q.pdf)
+        self.x = q.x + q.tGuess  # grid of thresholds
+        self.i0 = len(q.pdf) - 1 + q.i[0]
+        self.tGuess = q.tGuess
+        self.grain = q.grain
+        self.s2 = q.s2
+        self.quantileOrder = q.quantileOrder
+        self.startVal = quest._nextIntensity
+        self.method = quest.method
+        self.nTrials = quest.nTrials
+        self.stopInterval = quest.stopInterval
+        self.minVal = quest.minVal
+        self.maxVal = quest.maxVal
+        self.estimate = estimate
+        if observer is None:
+            observer = functools.partial(_tableObserver, x2=q.x2, p2=q.p2)
+        self.observer = observer
+
+    def _update(self, pdf, intensities, responses, s2Windows):
+        """Multiplies each row of `pdf` by the likelihood of its response
+        (as QuestObject.update)"""
+        intensities = np.clip(intensities, -1e10, 1e10)
+        start = self.i0 - np.round((intensities - self.tGuess) / self.grain)
+        start = np.clip(start, 0, s2Windows.shape[1] - 1)
+        pdf *= s2Windows[responses.astype(int), start.astype(int)]
+        # normalize, to avoid underflow
+        pdf /= np.sum(pdf, axis=1)[:, None]
+
+    def _statistic(self, pdf, method):
+        """The mean, mode or a quantile of each row of `pdf`"""
+        if method == 'mean':
+            return np.dot(pdf, self.x) / np.sum(pdf, axis=1)
+        elif method == 'mode':
+            return self.x[np.argmax(pdf, axis=1)]
+        elif method == 'median':
+            return _pdfQuantile(pdf, self.x, 0.5)
+        return _pdfQuantile(pdf, self.x, self.quantileOrder)
+
+    def run(self, thresholds, rng, maxTrials):
+        n = len(thresholds)
+        pdf = np.tile(self.pdf, (n, 1))
+        # a view of every window of s2 that a pdf can be multiplied by, as
+        # [response, start, pdf index]
+        nStarts = self.s2.shape[1] - pdf.shape[1] + 1
+        strides = self.s2.strides
+        s2Windows = np.lib.stride_tricks.as_strided(
+            self.s2, (2, nStarts, pdf.shape[1]),
+            (strides[0], strides[1], strides[1]), writeable=False)
+        nextIntensity = np.full(n, self.startVal, dtype=float)
+        finished = np.zeros(n, dtype=bool)
+        nTrials = np.zeros(n, dtype=int)
+        intensities = []
+        responses = []
+        for trialN in range(maxTrials):
+            active = ~finished
+            if not active.any():
+                break
+            rows = np.flatnonzero(active)
+            intensity = nextIntensity[rows]
+            response = (rng.random_sample(n)[rows] <
+                        self.observer(intensity, thresholds[rows]))
+            intensities.append(np.where(active, nextIntensity, np.nan))
+            responses.append(np.full(n, -1))
+            responses[-1][rows] = response
+            nTrials[rows] += 1
+
+            activePdf = pdf[rows]
+            self._update(activePdf, intensity, response, s2Windows)
+            pdf[rows] = activePdf
+            done = np.zeros(len(rows), dtype=bool)
+            if self.nTrials is not None:
+                done |= nTrials[rows] >= self.nTrials
+            if self.stopInterval is not None:
+                interval = (_pdfQuantile(activePdf, self.x, 0.95) -
+                            _pdfQuantile(activePdf, self.x, 0.05))
+                done |= np.abs(interval) < self.stopInterval
+            finished[rows] = done
+            # the next intensities
+            intensity = self._statistic(activePdf, self.method)
+            if self.maxVal is not None:
+                intensity = np.minimum(intensity, self.maxVal)
+            if self.minVal is not None:
+                intensity = np.maximum(intensity, self.minVal)
+            nextIntensity[rows] = intensity
+
+        return {'estimates': self._statistic(pdf, self.estimate),
+                'nTrials': nTrials, 'finished': finished,
+                'intensities': _columns(intensities, n),
+                'responses': _columns(responses, n, fill=-1)}
+
+
+class _PsiSimulator(object):
+    """Simulates the posteriors of a PsiHandler, one row per observer.
+
+    The expected entropy of each intensity is worked out from two matrix
+    products with the likelihood table rather than from the full
+    [observer, response, alpha, beta, intensity] array of posteriors.
+    """
+
+    def __init__(self, psi, observer):
+        p = psi._psi
+        nAlpha, nBeta = len(p.alpha), len(p.beta)
+        self.x = p.x
+        self.alphas = np.repeat(p.alpha, nBeta)
+        self.betas = np.tile(p.beta, nAlpha)
+        self.prior = p._probLambda.ravel() / np.sum(p._probLambda)
+        # likelihoods as [response, lambda, intensity]
+        self.likelihood = p._probResponseGivenLambdaX.reshape(
+            2, nAlpha * nBeta, len(p.x))
+        # and as [lambda, response * intensity] for the matrix products
+        self._lik = self._forDot(self.likelihood)
+        self._likLogLik = self._forDot(_xLog10(self.likelihood))
+        self.startIndex = p.nextIntensityIndex
+        self.nTrials = psi.nTrials
+        if observer is None:
+            observer = functools.partial(
+                _normCdfObserver, sd=np.median(p.beta), delta=p.delta,
+                twoAFC=p._TwoAFC)
+        self.observer = observer
+
+    @staticmethod
+    def _forDot(table):
+        return np.ascontiguousarray(
+            table.transpose(1, 0, 2).reshape(table.shape[1], -1))
+
+    def _nextIndices(self, posterior):
+        """The intensity (index) of least expected entropy for each row of
+        `posterior`"""
+        shape = (len(posterior), 2, len(self.x))
+        pResponse = np.dot(posterior, self._lik).reshape(shape)
+        # sum over lambda of p(lambda|x,r) * log10(p(lambda|x,r)), times
+        # p(r|x), expanded so that nothing bigger than [r, x] is needed
+        postLogLik = (np.dot(_xLog10(posterior), self._lik) +
+                      np.dot(posterior, self._likLogLik)).reshape(shape)
+        expectedEntropy = np.sum(_xLog10(pResponse) - postLogLik, axis=1)
+        return np.argmin(expectedEntropy, axis=1)
+
+    def run(self, thresholds, rng, maxTrials):
+        n = len(thresholds)
+        nTrials = min(self.nTrials, maxTrials)
+        posterior = np.tile(self.prior, (n, 1))
+        nextIndex = np.full(n, self.startIndex, dtype=int)
+        intensities = []
+        responses = []
+        for trialN in range(nTrials):
+            intensity = self.x[nextIndex]
+            response = rng.random_sample(n) < self.observer(intensity,
+                                                            thresholds)
+            intensities.append(intensity)
+            responses.append(response.astype(int))
+            posterior *= self.likelihood[response.astype(int), :,
+                                         nextIndex]
+            posterior /= np.sum(posterior, axis=1)[:, None]
+            if trialN < nTrials - 1:
+                nextIndex = self._nextIndices(posterior)
+
+        return {'estimates': np.dot(posterior, self.alphas),
+                'slopes': np.dot(posterior, self.betas),
+                'nTrials': np.full(n, nTrials),
+                'finished': np.full(n, nTrials == self.nTrials),
+                'intensities': _columns(intensities, n),
+                'responses': _columns(responses, n, fill=-1)}
+
+
+def _xLog10(values):
+    """values * log10(values), taking 0 * log(0) as 0"""
+    out = np.zeros_like(values)
+    positive = values > 0
+    out[positive] = values[positive] * np.log10(values[positive])
+    return out
+
+
+def _columns(columns, n, fill=np.nan):
+    """Stacks a list of per-trial arrays into an (n, nTrials) array"""
+    if not columns:
+        return np.full((n, 0), fill)
+    return np.stack(columns, axis=1)
+
+
+def _simulateChunk(start, stop, rng, simulator, thresholds, maxTrials):
+    return simulator.run(thresholds[start:stop], rng, maxTrials)
+
+
+def simulateStaircase(staircase, thresholds, nObservers=None,
+                      observer=None, maxTrials=1000, estimate='mean',
+                      nLastReversals=6, seed=None, nProcesses=1):
+    """Simulate many observers running through a staircase.
+
+    The observers are simulated together, as rows of numpy arrays, with
+    the rules of `staircase` (a StairHandler, QuestHandler or PsiHandler
+    that has been created but not run). With the default observers::
+
+        stairs = data.QuestHandler(-1, 0.5, nTrials=40)
+        sim = data.simulateStaircase(stairs, thresholds=-1.2,
+                                     nObservers=5000)
+        sim.bias(), sim.sd()
+
+    :Parameters:
+
+        staircase : StairHandler, QuestHandler or PsiHandler
+            Sets the procedure (start value, step sizes and rules, the
+            QUEST prior and psychometric function, the Psi grids and
+            prior...). It is not changed.
+
+        thresholds : float or array
+            The actual threshold of each simulated observer (in the units
+            of the staircase's intensities). A single value is used for
+            all of `nObservers` observers.
+
+        nObservers : int or None
+            The number of observers (if `thresholds` is a single value).
+
+        observer : callable or None
+            `observer(intensities, thresholds)` gives the probability of a
+            response of 1 for arrays of intensities and the corresponding
+            thresholds. The defaults are: for a StairHandler, a 2AFC
+            Weibull function (beta=3.5) of the intensity, with the
+            threshold as its alpha; for a QuestHandler, its own
+            psychometric function (as QuestObject.simulate); for a
+            PsiHandler its own psychometric function, with the threshold as
+            alpha and the median of its beta range as the slope. It must
+            be picklable (e.g. not a lambda) to run in several processes.
+
+        maxTrials : int
+            Staircases that haven't finished by then are stopped.
+
+        estimate : 'mean', 'mode', 'median' or 'quantile'
+            For a QuestHandler, the statistic of the posterior used as the
+            threshold estimate. ('quantile' is QUEST's quantileOrder.)
+            PsiHandler estimates are the posterior mean of alpha.
+
+        nLastReversals : int
+            For a StairHandler, the estimate is the mean intensity of this
+            many of the last reversals.
+
+        seed : int or None
+            Seeds the random responses.
+
+        nProcesses : int or None
+            Observers are simulated in chunks of 1000. With several chunks,
+            they can be run in this many processes (all the cpus if None),
+            which needs an ``if __name__ == '__main__':`` guard in the
+            script on Windows and macOS.
+
+    :Returns:
+
+        a :class:`StaircaseSimulation`
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    if thresholds.ndim == 0:
+        if nObservers is None:
+            raise ValueError("nObservers is needed when thresholds is a "
+                             "single value")
+        thresholds = np.full(nObservers, float(thresholds))
+    if isinstance(staircase, PsiHandler):
+        simulator = _PsiSimulator(staircase, observer)
+    elif isinstance(staircase, QuestHandler):
+        simulator = _QuestSimulator(staircase, observer, estimate)
+    elif type(staircase) is StairHandler:
+        simulator = _StairSimulator(staircase, observer, nLastReversals)
+    else:
+        raise TypeError("simulateStaircase() supports StairHandler, "
+                        "QuestHandler and PsiHandler, not {}".format(
+                            type(staircase).__name__))
+
+    simulateChunk = functools.partial(
+        _simulateChunk, simulator=simulator, thresholds=thresholds,
+        maxTrials=maxTrials)
+    results = _mapChunks(simulateChunk, len(thresholds), 1000, seed=seed,
+                         nProcesses=nProcesses)
+
+    def joined(key, fill=np.nan):
+        if results[0].get(key) is None:
+            return None
+        arrays = [result[key] for result in results]
+        if arrays[0].ndim == 2:
+            # pad to the longest chunk
+            width = max(array.shape[1] for array in arrays)
+            arrays = [np.pad(array, ((0, 0), (0, width - array.shape[1])),
+                             'constant', constant_values=fill)
+                      for array in arrays]
+        return np.concatenate(arrays)
+
+    return StaircaseSimulation(
+        thresholds, joined('estimates'), joined('intensities'),
+        joined('responses', fill=-1), joined('nTrials'),
+        joined('finished'), slopes=joined('slopes'))
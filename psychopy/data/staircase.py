@@ -15,6 +15,8 @@ import sys
 import os
 import pickle
 import copy
+import functools
+import threading
 import warnings
 import collections
 import numpy as np
@@ -1076,6 +1078,59 @@ class QuestHandler(StairHandler):
             self.finished = False
 
 
+class _LookAhead(object):
+    """Computes `branch(response)` for each of the possible `responses` on
+    a background thread, while the trial is running, so that `addResponse`
+    of a handler only has to pick the branch of the response it gets.
+
+    It is a cache: copies (and pickles) of the handler don't get it, and it
+    doesn't affect comparisons between handlers.
+    """
+
+    def __init__(self, branch, responses):
+        self._branches = {}
+        self._thread = threading.Thread(target=self._run,
+                                        args=(branch, list(responses)))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, branch, responses):
+        for response in responses:
+            try:
+                self._branches[response] = branch(response)
+            except Exception:
+                # the handler does the update itself (and raises the error)
+                pass
+
+    def get(self, response):
+        """Waits for the branches and returns the one for `response` (or
+        None if there isn't one)
+        """
+        self._thread.join()
+        try:
+            return self._branches.get(response)
+        except TypeError:  # not hashable, so not one of the responses
+            return None
+
+    def __deepcopy__(self, memo):
+        return None
+
+    def __reduce__(self):
+        # the thread can't be pickled, so unpickling gives no cache
+        return _noLookAhead, ()
+
+    def __eq__(self, other):
+        return other is None or isinstance(other, _LookAhead)
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def _noLookAhead():
+    """Returns the unpickled value of a `_LookAhead` (None)"""
+    return None
+
+
 class PsiObject_(PsiObject, _ComparisonMixin):
     """A PsiObject that implements the == and != operators.
     """
@@ -1130,7 +1185,9 @@ class PsiHandler(StairHandler):
                  prior=None,
                  fromFile=False,
                  extraInfo=None,
-                 name=''):
+                 name='',
+                 lookAhead=False,
+                 dtype='float64'):
         """Initializes the handler and creates an internal Psi Object for
         grid approximation.
 
@@ -1203,6 +1260,24 @@ class PsiHandler(StairHandler):
                 Optional name for the PsiHandler used in PsychoPy's built-in
                 logging system.
 
+            lookAhead   (bool)
+                If True, the update of the posterior for each of the two
+                possible responses is computed on a background thread while
+                the trial runs (from the call to `next()`), and
+                `addResponse()` just picks the one for the response given.
+                This takes the update (which can take hundreds of ms with
+                fine grids) out of the time between the response and the
+                next stimulus, at the cost of twice the computation and
+                three times the memory of the 4-D grids. The intensities
+                are the same as without it. Defaults to False.
+
+            dtype   (str)
+                The numpy data type of the 4-D grids, 'float64' or
+                'float32'. 'float32' halves their memory and the time of
+                the updates; the posterior is then less precise, which can
+                change the choice between intensities that are almost
+                equally informative. Defaults to 'float64'.
+
         :Raises:
 
             NotImplementedError
@@ -1235,9 +1310,12 @@ class PsiHandler(StairHandler):
         self._psi = PsiObject_(
             intensRange, alphaRange, betaRange, intensPrecision,
             alphaPrecision, betaPrecision, delta=delta,
-            stepType=stepType, TwoAFC=twoAFC, prior=prior)
+            stepType=stepType, TwoAFC=twoAFC, prior=prior,
+            dtype=np.dtype(dtype))
 
         self._psi.update(None)
+        self.lookAhead = lookAhead
+        self._lookAhead = None
 
     def addResponse(self, result, intensity=None):
         """Add a 1 or 0 to signify a correct / detected or
@@ -1256,7 +1334,13 @@ class PsiHandler(StairHandler):
         if self.getExp() is not None:
             # update the experiment handler too
             self.getExp().addData(self.name + ".response", result)
-        self._psi.update(result)
+        # the update of Psi uses the intensity it chose (nextIntensity), so
+        # a branch of the look-ahead is valid even with a custom intensity
+        state = None
+        if getattr(self, '_lookAhead', None) is not None:
+            state = self._lookAhead.get(result)
+            self._lookAhead = None
+        self._psi.update(result, state=state)
 
     def __next__(self):
         """Advances to next trial and returns it.
@@ -1266,6 +1350,9 @@ class PsiHandler(StairHandler):
             # update pointer for next trial
             self.thisTrialN += 1
             self.intensities.append(self._psi.nextIntensity)
+            if (getattr(self, 'lookAhead', False) and
+                    self._lookAhead is None):
+                self._lookAhead = _LookAhead(self._psi.lookAhead, [0, 1])
             return self._psi.nextIntensity
         else:
             self._terminate()
@@ -1338,7 +1425,8 @@ class QuestPlusHandler(StairHandler):
                  psychometricFunc='weibull', stimScale='log10',
                  stimSelectionMethod='minEntropy',
                  stimSelectionOptions=None, paramEstimationMethod='mean',
-                 extraInfo=None, name='', label='', **kwargs):
+                 extraInfo=None, name='', label='', lookAhead=False,
+                 **kwargs):
         """
         QUEST+ implementation. Currently only supports parameter estimation of
         a Weibull-shaped psychometric function.
@@ -1449,6 +1537,16 @@ class QuestPlusHandler(StairHandler):
         label : str
             Only used by :class:`MultiStairHandler`, and otherwise ignored.
 
+        lookAhead : bool
+            If `True`, the update of the posterior and the choice of the
+            next intensity are computed for each of the `responseVals` on a
+            background thread while the trial runs (from the call to
+            `next()`), and `addResponse()` just picks the one for the
+            response given. This takes the update out of the time between
+            the response and the next stimulus, at the cost of holding a
+            copy of the QUEST+ grids for each response. The branches are
+            not used if `addResponse()` is given a custom `intensity`.
+
         kwargs : dict
             Additional keyword arguments. These might be passed, for example,
             through a :class:`MultiStairHandler`, and will be ignored. A
@@ -1590,6 +1688,10 @@ class QuestPlusHandler(StairHandler):
         else:
             self._nextIntensity = self._qp.next_intensity
 
+        self.lookAhead = lookAhead
+        self._lookAhead = None
+        self._qpNextIntensity = None
+
     @property
     def startIntensity(self):
         return self.startVal
@@ -1605,8 +1707,25 @@ class QuestPlusHandler(StairHandler):
         if self.getExp() is not None:
             # update the experiment handler too
             self.getExp().addData(self.name + ".response", response)
-        self._qp.update(intensity=self.intensities[-1],
-                        response=response)
+        branch = None
+        if getattr(self, '_lookAhead', None) is not None:
+            # wait even if the branches can't be used, as they are
+            # computed from self._qp
+            branch = self._lookAhead.get(response)
+            self._lookAhead = None
+        if branch is not None and intensity is None:
+            self._qp, self._qpNextIntensity = branch
+        else:
+            self._qp.update(intensity=self.intensities[-1],
+                            response=response)
+            self._qpNextIntensity = None
+
+    def _branch(self, intensity, response):
+        """Returns a copy of the QUEST+ object updated with `response`
+        to `intensity`, and the next intensity it chooses"""
+        qp = copy.deepcopy(self._qp)
+        qp.update(intensity=intensity, response=response)
+        return qp, qp.next_intensity
 
     def __next__(self):
         self._checkFinished()
@@ -1615,8 +1734,16 @@ class QuestPlusHandler(StairHandler):
             self.thisTrialN += 1
             if self.thisTrialN == 0 and self.startIntensity is not None:
                 self.intensities.append(self.startVal)
+            elif getattr(self, '_qpNextIntensity', None) is not None:
+                self.intensities.append(self._qpNextIntensity)
+                self._qpNextIntensity = None
             else:
                 self.intensities.append(self._qp.next_intensity)
+            if (getattr(self, 'lookAhead', False) and
+                    self._lookAhead is None):
+                self._lookAhead = _LookAhead(
+                    functools.partial(self._branch, self.intensities[-1]),
+                    self.responseVals)
 
             # We never actually use self._nextIntensity in the
             # QuestPlusHandler; it's mere purpose here is to make the
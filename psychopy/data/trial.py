@@ -20,10 +20,25 @@ from psychopy.constants import PY3
 from psychopy.tools.arraytools import shuffleArray
 from psychopy.tools.filetools import (openOutputFile, genDelimiter,
                                       genFilenameFromDelimiter)
-from .utils import importConditions
+from .utils import importConditions, _saveAsColumnar
 from .base import _BaseTrialHandler, DataHandler
 
 
+def _countRepeats(order):
+    """For each trial of `order` (an array of condition indices), the
+    number of times that its condition has come up before, e.g.
+    [2, 0, 2, 2, 0] gives [0, 0, 1, 2, 1]
+    """
+    order = np.asarray(order, dtype=int)
+    nPerCondition = np.bincount(order)
+    firstOfCondition = np.cumsum(nPerCondition) - nPerCondition
+    byCondition = np.argsort(order, kind='mergesort')  # stable sort
+    repeats = np.empty_like(order)
+    repeats[byCondition] = (np.arange(len(order)) -
+                            firstOfCondition[order[byCondition]])
+    return repeats
+
+
 class TrialType(dict):
     """This is just like a dict, except that you can access keys with obj.key
     """
@@ -178,6 +193,7 @@ class TrialHandler(_BaseTrialHandler):
             self.sequenceIndices = self._createSequence()
         else:
             self.sequenceIndices = []
+        self._order, self._dataRepNs = self._createPlan()
 
         self.originPath, self.origin = self.getOriginPathAndFile(originPath)
         self._exp = None  # the experiment handler that owns me!
@@ -261,21 +277,23 @@ class TrialHandler(_BaseTrialHandler):
         indices = np.asarray(self._makeIndices(self.trialList), dtype=int)
 
         if self.method == 'random':
-            sequenceIndices = []
-            seed = self.seed
-            for thisRep in range(self.nReps):
-                thisRepSeq = shuffleArray(indices.flat, seed=seed).tolist()
-                seed = None  # so that we only seed the first pass through!
-                sequenceIndices.append(thisRepSeq)
-            sequenceIndices = np.transpose(sequenceIndices)
+            # draw the random numbers for all the repeats at once (one row
+            # per repeat) and only use the seed once. These are the same
+            # numbers as shuffling each repeat in turn with shuffleArray
+            if self.seed is not None:
+                np.random.seed(self.seed)
+            rand = np.random.random((self.nReps, indices.size))
+            sequenceIndices = indices.ravel()[np.argsort(rand, -1)].T
         elif self.method == 'sequential':
             sequenceIndices = np.repeat(indices, self.nReps, 1)
         elif self.method == 'fullRandom':
             # indices*nReps, flatten, shuffle, unflatten; only use seed once
-            sequential = np.repeat(indices, self.nReps, 1)  # = sequential
-            randomFlat = shuffleArray(sequential.flat, seed=self.seed)
-            sequenceIndices = np.reshape(
-                randomFlat, (len(indices), self.nReps))
+            sequential = np.repeat(indices.ravel(), self.nReps)
+            if self.seed is not None:
+                np.random.seed(self.seed)
+            rand = np.random.random(sequential.shape)
+            sequenceIndices = np.reshape(sequential[np.argsort(rand)],
+                                         (len(indices), self.nReps))
         if self.autoLog:
             msg = 'Created sequence: %s, trialTypes=%d, nReps=%i, seed=%s'
             vals = (self.method, len(indices), self.nReps, str(self.seed))
@@ -284,34 +302,40 @@ class TrialHandler(_BaseTrialHandler):
 
     def _makeIndices(self, inputArray):
         """
-        Creates an array of tuples the same shape as the input array
-        where each tuple contains the indices to itself in the array.
+        Creates an array of ints with the shape of the input array plus
+        one dimension, where each entry contains the indices to itself in
+        the array (e.g. a list of 3 conditions gives [[0], [1], [2]]).
 
         Useful for shuffling and then using as a reference.
         """
         # make sure its an array of objects (can be strings etc)
-        inputArray = np.asarray(inputArray, 'O')
-        # get some simple variables for later
-        dims = inputArray.shape
-        dimsProd = np.product(dims)
-        dimsN = len(dims)
-        dimsList = list(range(dimsN))
-        listOfLists = []
-        # this creates space for an array of any objects
-        arrayOfTuples = np.ones(dimsProd, 'O')
-
-        # for each dimension create list of its indices (using modulo)
-        for thisDim in dimsList:
-            prevDimsProd = np.product(dims[:thisDim])
-            # NB this means modulus in python
-            thisDimVals = np.arange(dimsProd) / prevDimsProd % dims[thisDim]
-            listOfLists.append(thisDimVals)
-
-        # convert to array
-        indexArr = np.asarray(listOfLists)
-        for n in range(dimsProd):
-            arrayOfTuples[n] = tuple((indexArr[:, n]))
-        return (np.reshape(arrayOfTuples, dims)).tolist()
+        dims = np.asarray(inputArray, 'O').shape
+        # the indices of each entry along each dimension, in the order
+        # where the first dimension varies fastest
+        dimIndices = np.unravel_index(np.arange(int(np.prod(dims))), dims,
+                                      order='F')
+        return np.reshape(np.stack(dimIndices, -1), dims + (len(dims),))
+
+    def _createPlan(self):
+        """Flattens the sequence into the trial order (an array of
+        condition indices, indexed by thisN) and, for each trial, the
+        repeat of its condition (the column of .data it is stored in).
+
+        This lets .next() and .getFutureTrial() index straight into the
+        sequence and .data find where to store values without counting
+        the trials that have already run.
+        """
+        order = np.asarray(self.sequenceIndices, dtype=int).T.ravel()
+        return order, _countRepeats(order)
+
+    def _dataPosition(self):
+        """The [row, column] position of the current trial in the arrays
+        of .data, or None if there isn't a current trial
+        """
+        dataRepNs = getattr(self, '_dataRepNs', None)
+        if dataRepNs is None or not 0 <= self.thisN < len(dataRepNs):
+            return None
+        return [self.thisIndex, dataRepNs[self.thisN]]
 
     def __next__(self):
         """Advances to next trial and returns it.
@@ -351,8 +375,8 @@ class TrialHandler(_BaseTrialHandler):
 
         # fetch the trial info
         if self.method in ('random', 'sequential', 'fullRandom'):
-            self.thisIndex = self.sequenceIndices[
-                self.thisTrialN][self.thisRepN]
+            self.thisIndex = int(self.sequenceIndices[
+                self.thisTrialN][self.thisRepN])
             self.thisTrial = self.trialList[self.thisIndex]
             self.data.add('ran', 1)
             self.data.add('order', self.thisN)
@@ -372,9 +396,7 @@ class TrialHandler(_BaseTrialHandler):
         # check that we don't go out of bounds for either positive or negative
         if n > self.nRemaining or self.thisN + n < 0:
             return None
-        seqs = np.array(self.sequenceIndices).transpose().flat
-        condIndex = seqs[self.thisN + n]
-        return self.trialList[condIndex]
+        return self.trialList[self._order[self.thisN + n]]
 
     def getEarlierTrial(self, n=-1):
         """Returns the condition information from n trials previously.
@@ -634,6 +656,31 @@ class TrialHandler(_BaseTrialHandler):
                            fileCollisionMethod=fileCollisionMethod,
                            encoding=encoding)
 
+        header, dataOut = self._getWideRows()
+        df = pd.DataFrame(dataOut, columns=header)
+
+        if not matrixOnly:
+            # write the header row:
+            f.write(delim.join(header) + '\n')
+
+        # write the data matrix:
+        for trial in dataOut:
+            f.write(delim.join([str(trial[prmName]) for prmName in header])
+                    + '\n')
+
+        if f != sys.stdout:
+            f.close()
+            logging.info('saved wide-format data to %s' % f.name)
+
+        # Converts numbers to numeric, such as float64, boolean to bool.
+        # Otherwise they all are "object" type, i.e. strings
+        # df = df.convert_objects()
+        return df
+
+    def _getWideRows(self):
+        """Returns the header (list of names) and a list of dicts, one per
+        trial in chronological order, for the wide-format outputs
+        """
         # collect parameter names related to the stimuli:
         if self.trialList[0]:
             header = list(self.trialList[0].keys())
@@ -648,7 +695,6 @@ class TrialHandler(_BaseTrialHandler):
         if self.extraInfo is not None:
             for key in self.extraInfo:
                 header.insert(0, key)
-        df = pd.DataFrame(columns=header)
 
         # loop through each trial, gathering the actual values:
         dataOut = []
@@ -697,33 +743,26 @@ class TrialHandler(_BaseTrialHandler):
 
                 # store this trial's data
                 dataOut.append(nextEntry)
-                df = df.append(nextEntry, ignore_index=True)
-
-        if not matrixOnly:
-            # write the header row:
-            nextLine = ''
-            for prmName in header:
-                nextLine = nextLine + prmName + delim
-            # remove the final orphaned tab character
-            f.write(nextLine[:-1] + '\n')
-
-        # write the data matrix:
-        for trial in dataOut:
-            nextLine = ''
-            for prmName in header:
-                nextLine = nextLine + str(trial[prmName]) + delim
-            # remove the final orphaned tab character
-            nextLine = nextLine[:-1]
-            f.write(nextLine + '\n')
+        return header, dataOut
 
-        if f != sys.stdout:
-            f.close()
-            logging.info('saved wide-format data to %s' % f.name)
+    def saveAsColumnar(self, fileName, dataFormat='npz',
+                       fileCollisionMethod='rename'):
+        """Save the same table as :meth:`saveAsWideText` (one row per
+        trial) but as typed columns in a binary format ('npz', 'parquet' or
+        'hdf5'), which is much faster to load for analysis.
 
-        # Converts numbers to numeric, such as float64, boolean to bool.
-        # Otherwise they all are "object" type, i.e. strings
-        # df = df.convert_objects()
-        return df
+        See :meth:`ExperimentHandler.saveAsColumnar` for details. Returns
+        the name of the file that was saved (or -1 if no trials were run).
+        """
+        if self.thisTrialN < 1 and self.thisRepN < 1:
+            # if both are < 1 we haven't started
+            logging.info('TrialHandler.saveAsColumnar called but no '
+                         'trials completed. Nothing saved')
+            return -1
+        header, dataOut = self._getWideRows()
+        return _saveAsColumnar(pd.DataFrame(dataOut, columns=header),
+                               fileName, dataFormat=dataFormat,
+                               fileCollisionMethod=fileCollisionMethod)
 
     def saveAsJson(self,
                    fileName=None,
@@ -860,8 +899,6 @@ class TrialHandler2(_BaseTrialHandler):
         self.nReps = int(nReps)
         self.nTotal = self.nReps * len(self.trialList)
         self.nRemaining = self.nTotal  # subtract 1 each trial
-        self.remainingIndices = []
-        self.prevIndices = []
         self.method = method
         self.thisRepN = 0  # records which repetition or pass we are on
         self.thisTrialN = -1  # records trial number within this repetition
@@ -872,6 +909,8 @@ class TrialHandler2(_BaseTrialHandler):
         self.extraInfo = extraInfo
         self.seed = seed
         self._rng = np.random.RandomState(seed=seed)
+        # the whole sequence is drawn now and .next() just moves along it
+        self._order, self._trialNs, self._repNs = self._createSequence()
 
         # store a list of dicts, convert to pandas DataFrame on access
         self._data = []
@@ -879,6 +918,62 @@ class TrialHandler2(_BaseTrialHandler):
         self.originPath, self.origin = self.getOriginPathAndFile(originPath)
         self._exp = None  # the experiment handler that owns me!
 
+    def _createSequence(self):
+        """Draws the whole sequence of trials in advance, as arrays (indexed
+        by thisN) of the condition index, thisTrialN and thisRepN of each
+        trial. This is called automatically when the TrialHandler2 is
+        initialised.
+
+        The random numbers are drawn in the same order as shuffling each
+        repeat as it starts, so a given seed gives the same trials.
+        """
+        nConds = len(self.trialList)
+        if self.method == 'sequential':
+            order = np.tile(np.arange(nConds), self.nReps)
+        elif self.method == 'random':
+            order = np.tile(np.arange(nConds), (self.nReps, 1))
+            for thisRep in order:
+                self._rng.shuffle(thisRep)  # shuffle in-place
+            order = order.ravel()
+        elif self.method == 'fullRandom':
+            order = np.tile(np.arange(nConds), self.nReps)
+            self._rng.shuffle(order)
+        else:
+            order = np.zeros(0, dtype=int)  # no trials
+
+        trialNs = np.arange(len(order))
+        if self.method == 'fullRandom':
+            # thisTrialN runs on through the whole sequence and thisRepN is
+            # how many times this condition has come up before
+            repNs = _countRepeats(order)
+        else:
+            # thisRepN counts from 1 for the other methods
+            nPerRep = max(nConds, 1)
+            repNs = trialNs // nPerRep + 1
+            trialNs = trialNs % nPerRep
+        return order, trialNs, repNs
+
+    @property
+    def remainingIndices(self):
+        """The condition indices of the trials still to come in the current
+        repeat (of the whole sequence for 'fullRandom'). Read only.
+        """
+        if self.thisN < 0:
+            return []
+        if self.method == 'fullRandom':
+            end = len(self._order)
+        else:
+            nPerRep = max(len(self.trialList), 1)
+            end = (self.thisN // nPerRep + 1) * nPerRep
+        return self._order[self.thisN + 1:end].tolist()
+
+    @property
+    def prevIndices(self):
+        """The condition indices of the trials before the current one.
+        Read only.
+        """
+        return self._order[:max(self.thisN, 0)].tolist()
+
     def __iter__(self):
         return self
 
@@ -968,48 +1063,22 @@ class TrialHandler2(_BaseTrialHandler):
                     break  # break out of the forever loop
                 # do stuff here for the trial
         """
-        # update pointer for next trials
-        self.thisTrialN += 1  # number of trial this pass
+        # move the cursor (thisN) on to the next trial of the sequence
         self.thisN += 1  # number of trial in total
         self.nRemaining -= 1
-        if self.thisIndex is not None:
-            self.prevIndices.append(self.thisIndex)
-
-        # thisRepN has exceeded nReps
-        if self.remainingIndices == []:
-            # we've just started, or just starting a new repeat
-            sequence = list(range(len(self.trialList)))
-            if (self.method == 'fullRandom' and
-                        self.thisN < (self.nReps * len(self.trialList))):
-                # we've only just started on a fullRandom sequence
-                sequence *= self.nReps
-                self._rng.shuffle(sequence)
-                self.remainingIndices = sequence
-            elif (self.method in ('sequential', 'random') and
-                          self.thisRepN < self.nReps):
-                # start a new repetition
-                self.thisTrialN = 0
-                self.thisRepN += 1
-                if self.method == 'random':
-                    self._rng.shuffle(sequence)  # shuffle in-place
-                self.remainingIndices = sequence
-            else:
-                # we've finished
-                self.finished = True
-                self._terminate()  # raises Stop (code won't go beyond here)
+        if self.thisN >= len(self._order):
+            # we've finished
+            self.thisTrialN += 1
+            self.finished = True
+            self._terminate()  # raises Stop (code won't go beyond here)
 
         # fetch the trial info
-        if len(self.trialList) == 0:
-            self.thisIndex = 0
-            self.thisTrial = {}
-        else:
-            self.thisIndex = self.remainingIndices.pop(0)
-            # if None then use empty dict
-            thisTrial = self.trialList[self.thisIndex] or {}
-            self.thisTrial = copy.copy(thisTrial)
-        # for fullRandom check how many times this has come up before
-        if self.method == 'fullRandom':
-            self.thisRepN = self.prevIndices.count(self.thisIndex)
+        self.thisIndex = int(self._order[self.thisN])
+        self.thisTrialN = int(self._trialNs[self.thisN])
+        self.thisRepN = int(self._repNs[self.thisN])
+        # if None then use empty dict
+        thisTrial = self.trialList[self.thisIndex] or {}
+        self.thisTrial = copy.copy(thisTrial)
 
         # update data structure with new info
         self._data.append(self.thisTrial)  # update the data list of dicts
@@ -1033,9 +1102,7 @@ class TrialHandler2(_BaseTrialHandler):
         # offsets:
         if n > self.nRemaining or self.thisN + n < 0:
             return None
-        seqs = np.array(self.sequenceIndices).transpose().flat
-        condIndex = seqs[self.thisN + n]
-        return self.trialList[condIndex]
+        return self.trialList[self._order[self.thisN + n]]
 
     def getEarlierTrial(self, n=-1):
         """Returns the condition information from n trials previously.
@@ -1127,6 +1194,24 @@ class TrialHandler2(_BaseTrialHandler):
         if (fileName is not None) and (fileName != 'stdout'):
             logging.info('saved wide-format data to %s' % f.name)
 
+    def saveAsColumnar(self, fileName, dataFormat='npz',
+                       fileCollisionMethod='rename'):
+        """Save the same table as :meth:`saveAsWideText` (one row per
+        trial) but as typed columns in a binary format ('npz', 'parquet' or
+        'hdf5'), which is much faster to load for analysis.
+
+        See :meth:`ExperimentHandler.saveAsColumnar` for details. Returns
+        the name of the file that was saved (or -1 if no trials were run).
+        """
+        if self.thisTrialN < 1 and self.thisRepN < 1:
+            # if both are < 1 we haven't started
+            logging.info('TrialHandler.saveAsColumnar called but no '
+                         'trials completed. Nothing saved')
+            return -1
+        return _saveAsColumnar(self.data[self.columns], fileName,
+                               dataFormat=dataFormat,
+                               fileCollisionMethod=fileCollisionMethod)
+
     def saveAsJson(self,
                    fileName=None,
                    encoding='utf-8',
@@ -1363,6 +1448,11 @@ class TrialHandlerExt(TrialHandler):
             self.sequenceIndices = self._createSequence()
         else:
             self.sequenceIndices = []
+        self._order, self._dataRepNs = self._createPlan()
+        if self.trialWeights is not None:
+            # the rows of .data aren't the conditions, so positions are
+            # worked out by getCurrentTrialPosInDataHandler() instead
+            self._dataRepNs = None
 
         self.originPath, self.origin = self.getOriginPathAndFile(originPath)
         self._exp = None  # the experiment handler that owns me!
@@ -1811,6 +1901,30 @@ class TrialHandlerExt(TrialHandler):
                            fileCollisionMethod=fileCollisionMethod,
                            encoding=encoding)
 
+        header, dataOut = self._getWideRows()
+
+        # write a header row:
+        if not matrixOnly:
+            f.write(delim.join(header) + '\n')
+        # write the data matrix:
+        for trial in dataOut:
+            line = delim.join([str(trial[prm]) for prm in header])
+            f.write(line + '\n')
+
+        if (fileName is not None) and (fileName != 'stdout'):
+            f.close()
+            logging.info('saved wide-format data to %s' % f.name)
+
+    def saveAsJson(self,
+                   fileName=None,
+                   encoding='utf-8',
+                   fileCollisionMethod='rename'):
+        raise NotImplementedError('Not implemented for TrialHandlerExt.')
+
+    def _getWideRows(self):
+        """Returns the header (list of names) and a list of dicts, one per
+        trial in chronological order, for the wide-format outputs
+        """
         # collect parameter names related to the stimuli:
         if self.trialList[0]:
             header = list(self.trialList[0].keys())
@@ -1886,20 +2000,4 @@ class TrialHandlerExt(TrialHandler):
             for key in self.extraInfo:
                 header.insert(0, key)
 
-        # write a header row:
-        if not matrixOnly:
-            f.write(delim.join(header) + '\n')
-        # write the data matrix:
-        for trial in dataOut:
-            line = delim.join([str(trial[prm]) for prm in header])
-            f.write(line + '\n')
-
-        if (fileName is not None) and (fileName != 'stdout'):
-            f.close()
-            logging.info('saved wide-format data to %s' % f.name)
-
-    def saveAsJson(self,
-                   fileName=None,
-                   encoding='utf-8',
-                   fileCollisionMethod='rename'):
-        raise NotImplementedError('Not implemented for TrialHandlerExt.')
+        return header, dataOut
@@ -10,8 +10,10 @@ from builtins import range
 from past.builtins import basestring
 import os
 import re
+import glob
 import pickle
 import time
+import copy
 import codecs
 import numpy as np
 import pandas as pd
@@ -22,6 +24,7 @@ from pkg_resources import parse_version
 from psychopy import logging, exceptions
 from psychopy.constants import PY3
 from psychopy.tools.filetools import pathToString
+from psychopy.tools.fileerrortools import handleFileCollision
 
 try:
     import openpyxl
@@ -43,6 +46,9 @@ except ImportError:
 
 _nonalphanumeric_re = re.compile(r'\W')  # will match all bad var name chars
 
+# file extensions for the columnar (binary) data formats
+columnarFormats = {'npz': '.npz', 'parquet': '.parquet', 'hdf5': '.hdf5'}
+
 
 def checkValidFilePath(filepath, makeValid=True):
     """Checks whether file path location (e.g. is a valid folder)
@@ -168,7 +174,89 @@ def indicesFromString(indsString):
         pass
 
 
-def importConditions(fileName, returnFieldNames=False, selection=""):
+# parsed conditions files:
+#     {(path, mtime, size): (trialList, fieldNames, mutableNames)}
+_conditionsCache = OrderedDict()
+conditionsCacheSize = 32  # max number of files kept in _conditionsCache
+_diskCacheExt = '.psycache'
+_diskCacheVersion = 1
+
+
+def clearConditionsCache():
+    """Empty the in-memory cache of parsed conditions files used by
+    :func:`importConditions` (files on disk are not affected)
+    """
+    _conditionsCache.clear()
+
+
+def _getCachedConditions(fileName, parseFunc, useCache=True,
+                         diskCache=False):
+    """Returns (trialList, fieldNames, mutableNames) for fileName from the
+    memory cache, the on-disk cache or, failing those, by calling
+    `parseFunc()` (which returns trialList, fieldNames).
+
+    The trialList returned is the cached object itself so mustn't be
+    modified (see `_copyConditions`).
+    """
+    if not (useCache or diskCache):
+        return parseFunc() + ([],)
+    stat = os.stat(fileName)
+    key = (os.path.abspath(fileName), stat.st_mtime, stat.st_size)
+    cached = _conditionsCache.pop(key, None)
+    cacheName = fileName + _diskCacheExt
+    if cached is None and diskCache and os.path.isfile(cacheName):
+        try:
+            with open(cacheName, 'rb') as f:
+                stored = pickle.load(f)
+            if (stored['version'] == _diskCacheVersion and
+                    stored['key'][1:] == key[1:]):
+                cached = (stored['trialList'], stored['fieldNames'],
+                          stored['mutableNames'])
+                logging.debug(u"Read cached conditions from {}"
+                              .format(cacheName))
+        except Exception:
+            logging.warning(u"Ignoring unreadable conditions cache {}"
+                            .format(cacheName))
+    if cached is None:
+        trialList, fieldNames = parseFunc()
+        mutableNames = set()
+        for row in trialList:
+            for name, val in row.items():
+                if isinstance(val, (list, dict, set)):
+                    mutableNames.add(name)
+        cached = trialList, fieldNames, sorted(mutableNames)
+        if diskCache:
+            stored = {'version': _diskCacheVersion, 'key': key,
+                      'trialList': trialList, 'fieldNames': fieldNames,
+                      'mutableNames': cached[2]}
+            try:
+                with open(cacheName, 'wb') as f:
+                    pickle.dump(stored, f, pickle.HIGHEST_PROTOCOL)
+            except (IOError, OSError):
+                logging.warning(u"Could not write conditions cache {}"
+                                .format(cacheName))
+    if useCache:
+        _conditionsCache[key] = cached  # (re)insert as most recently used
+        while len(_conditionsCache) > conditionsCacheSize:
+            _conditionsCache.popitem(last=False)
+    return cached
+
+
+def _copyConditions(trialList, mutableNames):
+    """Copies each condition (and any mutable values, such as lists, in the
+    columns `mutableNames`) so that changes made by the caller don't alter
+    the cached conditions
+    """
+    trialList = [row.copy() for row in trialList]
+    for name in mutableNames:
+        for row in trialList:
+            if name in row:
+                row[name] = copy.deepcopy(row[name])
+    return trialList
+
+
+def importConditions(fileName, returnFieldNames=False, selection="",
+                     useCache=True, diskCache=False):
     """Imports a list of conditions from an .xlsx, .csv, or .pkl file
 
     The output is suitable as an input to :class:`TrialHandler`
@@ -203,6 +291,16 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
         - slice(-10, 2, None)  # the same as above
         - random(5) * 8  # five random vals 0-8
 
+    Parsed files are kept in a (least-recently-used) cache keyed by the
+    file's path, modification time and size, so repeated imports of an
+    unchanged file (e.g. nested loops or several runs in one session) don't
+    parse it again. The `selection` is applied to the cached conditions.
+    Use `useCache=False` to always re-read the file and
+    :func:`clearConditionsCache` to empty the cache.
+
+    If `diskCache=True` the parsed conditions are also stored in a file
+    next to the conditions file (with `.psycache` appended to its name) and
+    used by later sessions for as long as the conditions file is unchanged.
     """
 
     def _attemptImport(fileName, sep=',', dec='.'):
@@ -261,137 +359,148 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
         """
         # convert the resulting dataframe to a numpy recarray
         trialsArr = dataframe.to_records(index=False)
-        # Check for new line characters in strings, and replace escaped characters
-        for record in trialsArr:
-            for idx, element in enumerate(record):
-                if isinstance(element, str):
-                    record[idx] = element.replace('\\n', '\n')
         if trialsArr.shape == ():
             # convert 0-D to 1-D with one element:
             trialsArr = trialsArr[np.newaxis]
         fieldNames = list(trialsArr.dtype.names)
         _assertValidVarNames(fieldNames, fileName)
 
-        # convert the record array into a list of dicts
-        trialList = []
-        for trialN, trialType in enumerate(trialsArr):
-            thisTrial = OrderedDict()
-            for fieldN, fieldName in enumerate(fieldNames):
-                val = trialsArr[trialN][fieldN]
-
-                if isinstance(val, basestring):
-                    if val.startswith('[') and val.endswith(']'):
-                        # val = eval('%s' %unicode(val.decode('utf8')))
-                        val = eval(val)
-                elif type(val) == np.string_:
-                    val = str(val.decode('utf-8-sig'))
-                    # if it looks like a list, convert it:
-                    if val.startswith('[') and val.endswith(']'):
-                        # val = eval('%s' %unicode(val.decode('utf8')))
-                        val = eval(val)
-                elif np.isnan(val):
-                    val = None
-                thisTrial[fieldName] = val
-            trialList.append(thisTrial)
+        # convert one column at a time (numeric columns need no checks of
+        # the individual values) and then zip those into a list of dicts
+        columns = []
+        for fieldName in fieldNames:
+            col = trialsArr[fieldName]
+            vals = list(col)
+            if col.dtype.kind == 'f':
+                for ii in np.flatnonzero(np.isnan(col)):
+                    vals[ii] = None
+            elif col.dtype.kind not in 'iub':
+                for ii, val in enumerate(vals):
+                    if isinstance(val, basestring):
+                        # replace escaped new line characters
+                        val = val.replace('\\n', '\n')
+                        if val.startswith('[') and val.endswith(']'):
+                            val = eval(val)
+                    elif type(val) == np.string_:
+                        val = str(val.decode('utf-8-sig'))
+                        # if it looks like a list, convert it:
+                        if val.startswith('[') and val.endswith(']'):
+                            val = eval(val)
+                    elif np.isnan(val):
+                        val = None
+                    vals[ii] = val
+            columns.append(vals)
+        trialList = [OrderedDict(zip(fieldNames, row))
+                     for row in zip(*columns)]
         return trialList, fieldNames
 
-    if (fileName.endswith(('.csv', '.tsv'))
-            or (fileName.endswith(('.xlsx', '.xls', '.xlsm')) and haveXlrd)):
-        if fileName.endswith(('.csv', '.tsv', '.dlm')):  # delimited text file
-            for sep, dec in [ (',', '.'), (';', ','),  # most common in US, EU
-                              ('\t', '.'), ('\t', ','), (';', '.')]:
-                try:
-                    trialList, fieldNames = _attemptImport(fileName=fileName,
-                                                           sep=sep, dec=dec)
-                    break  # seems to have worked
-                except exceptions.ConditionsImportError as e:
-                    continue  # try a different format
-        else:
-            trialList, fieldNames = _attemptImport(fileName=fileName)
-
-    elif fileName.endswith(('.xlsx','.xlsm')):  # no xlsread so use openpyxl
-        if not haveOpenpyxl:
-            raise ImportError('openpyxl or xlrd is required for loading excel '
-                              'files, but neither was found.')
+    def _importFile():
+        """Parses the file (no cache) and returns trialList, fieldNames
+        """
+        if (fileName.endswith(('.csv', '.tsv'))
+                or (fileName.endswith(('.xlsx', '.xls', '.xlsm'))
+                    and haveXlrd)):
+            if fileName.endswith(('.csv', '.tsv', '.dlm')):  # delimited text
+                # most common in US, EU first
+                for sep, dec in [(',', '.'), (';', ','),
+                                 ('\t', '.'), ('\t', ','), (';', '.')]:
+                    try:
+                        trialList, fieldNames = _attemptImport(
+                            fileName=fileName, sep=sep, dec=dec)
+                        break  # seems to have worked
+                    except exceptions.ConditionsImportError as e:
+                        continue  # try a different format
+            else:
+                trialList, fieldNames = _attemptImport(fileName=fileName)
 
-        # data_only was added in 1.8
-        if parse_version(openpyxl.__version__) < parse_version('1.8'):
-            wb = load_workbook(filename=fileName)
-        else:
-            wb = load_workbook(filename=fileName, data_only=True)
-        ws = wb.worksheets[0]
+        elif fileName.endswith(('.xlsx','.xlsm')):  # no xlsread; use openpyxl
+            if not haveOpenpyxl:
+                raise ImportError('openpyxl or xlrd is required for loading '
+                                  'excel files, but neither was found.')
 
-        logging.debug(u"Read excel file with openpyxl: {}".format(fileName))
-        try:
-            # in new openpyxl (2.3.4+) get_highest_xx is deprecated
-            nCols = ws.max_column
-            nRows = ws.max_row
-        except Exception:
-            # version openpyxl 1.5.8 (in Standalone 1.80) needs this
-            nCols = ws.get_highest_column()
-            nRows = ws.get_highest_row()
-
-        # get parameter names from the first row header
-        fieldNames = []
-        for colN in range(nCols):
-            if parse_version(openpyxl.__version__) < parse_version('2.0'):
-                fieldName = ws.cell(_getExcelCellName(col=colN, row=0)).value
+            # data_only was added in 1.8
+            if parse_version(openpyxl.__version__) < parse_version('1.8'):
+                wb = load_workbook(filename=fileName)
             else:
-                # From 2.0, cells are referenced with 1-indexing: A1 == cell(row=1, column=1)
-                fieldName = ws.cell(row=1, column=colN + 1).value
-            fieldNames.append(fieldName)
-        _assertValidVarNames(fieldNames, fileName)
-
-        # loop trialTypes
-        trialList = []
-        for rowN in range(1, nRows):  # skip header first row
-            thisTrial = {}
+                wb = load_workbook(filename=fileName, data_only=True)
+            ws = wb.worksheets[0]
+
+            logging.debug(u"Read excel file with openpyxl: {}"
+                          .format(fileName))
+            try:
+                # in new openpyxl (2.3.4+) get_highest_xx is deprecated
+                nCols = ws.max_column
+                nRows = ws.max_row
+            except Exception:
+                # version openpyxl 1.5.8 (in Standalone 1.80) needs this
+                nCols = ws.get_highest_column()
+                nRows = ws.get_highest_row()
+
+            # get parameter names from the first row header
+            fieldNames = []
             for colN in range(nCols):
                 if parse_version(openpyxl.__version__) < parse_version('2.0'):
-                    val = ws.cell(_getExcelCellName(col=colN, row=0)).value
+                    fieldName = ws.cell(_getExcelCellName(col=colN, row=0)).value
                 else:
                     # From 2.0, cells are referenced with 1-indexing: A1 == cell(row=1, column=1)
-                    val = ws.cell(row=rowN + 1, column=colN + 1).value
-                # if it looks like a list or tuple, convert it
-                if (isinstance(val, basestring) and
-                        (val.startswith('[') and val.endswith(']') or
-                                 val.startswith('(') and val.endswith(')'))):
-                    val = eval(val)
-                fieldName = fieldNames[colN]
-                thisTrial[fieldName] = val
-            trialList.append(thisTrial)
-
-    elif fileName.endswith('.pkl'):
-        f = open(fileName, 'rb')
-        # Converting newline characters.
-        if PY3:
-            # 'b' is necessary in Python3 because byte object is 
-            # returned when file is opened in binary mode.
-            buffer = f.read().replace(b'\r\n',b'\n').replace(b'\r',b'\n')
+                    fieldName = ws.cell(row=1, column=colN + 1).value
+                fieldNames.append(fieldName)
+            _assertValidVarNames(fieldNames, fileName)
+
+            # loop trialTypes
+            trialList = []
+            for rowN in range(1, nRows):  # skip header first row
+                thisTrial = {}
+                for colN in range(nCols):
+                    if parse_version(openpyxl.__version__) < parse_version('2.0'):
+                        val = ws.cell(_getExcelCellName(col=colN, row=0)).value
+                    else:
+                        # From 2.0, cells are referenced with 1-indexing: A1 == cell(row=1, column=1)
+                        val = ws.cell(row=rowN + 1, column=colN + 1).value
+                    # if it looks like a list or tuple, convert it
+                    if (isinstance(val, basestring) and
+                            (val.startswith('[') and val.endswith(']') or
+                                     val.startswith('(') and val.endswith(')'))):
+                        val = eval(val)
+                    fieldName = fieldNames[colN]
+                    thisTrial[fieldName] = val
+                trialList.append(thisTrial)
+
+        elif fileName.endswith('.pkl'):
+            f = open(fileName, 'rb')
+            # Converting newline characters.
+            if PY3:
+                # 'b' is necessary in Python3 because byte object is 
+                # returned when file is opened in binary mode.
+                buffer = f.read().replace(b'\r\n',b'\n').replace(b'\r',b'\n')
+            else:
+                buffer = f.read().replace('\r\n','\n').replace('\r','\n')
+            try:
+                trialsArr = pickle.loads(buffer)
+            except Exception:
+                raise IOError('Could not open %s as conditions' % fileName)
+            f.close()
+            trialList = []
+            if PY3:
+                # In Python3, strings returned by pickle() is unhashable.
+                # So, we have to convert them to str.
+                trialsArr = [[str(item) if isinstance(item, str) else item
+                              for item in row] for row in trialsArr]
+            fieldNames = trialsArr[0]  # header line first
+            _assertValidVarNames(fieldNames, fileName)
+            for row in trialsArr[1:]:
+                thisTrial = {}
+                for fieldN, fieldName in enumerate(fieldNames):
+                    # type is correct, being .pkl
+                    thisTrial[fieldName] = row[fieldN]
+                trialList.append(thisTrial)
         else:
-            buffer = f.read().replace('\r\n','\n').replace('\r','\n')
-        try:
-            trialsArr = pickle.loads(buffer)
-        except Exception:
-            raise IOError('Could not open %s as conditions' % fileName)
-        f.close()
-        trialList = []
-        if PY3:
-            # In Python3, strings returned by pickle() is unhashable.
-            # So, we have to convert them to str.
-            trialsArr = [[str(item) if isinstance(item, str) else item
-                          for item in row] for row in trialsArr]
-        fieldNames = trialsArr[0]  # header line first
-        _assertValidVarNames(fieldNames, fileName)
-        for row in trialsArr[1:]:
-            thisTrial = {}
-            for fieldN, fieldName in enumerate(fieldNames):
-                # type is correct, being .pkl
-                thisTrial[fieldName] = row[fieldN]
-            trialList.append(thisTrial)
-    else:
-        raise IOError('Your conditions file should be an '
-                      'xlsx, csv, dlm, tsv or pkl file')
+            raise IOError('Your conditions file should be an '
+                          'xlsx, csv, dlm, tsv or pkl file')
+        return trialList, fieldNames
+
+    trialList, fieldNames, mutableNames = _getCachedConditions(
+        fileName, _importFile, useCache, diskCache)
 
     # if we have a selection then try to parse it
     if isinstance(selection, basestring) and len(selection) > 0:
@@ -412,11 +521,14 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
         trialList = []
         for ii in selection:
             trialList.append(allConds[int(round(ii))])
+    # the cached rows are shared so the caller gets its own copies
+    if useCache or diskCache:
+        trialList = _copyConditions(trialList, mutableNames)
 
     logging.exp('Imported %s as conditions, %d conditions, %d params' %
                 (fileName, len(trialList), len(fieldNames)))
     if returnFieldNames:
-        return (trialList, fieldNames)
+        return (trialList, list(fieldNames))
     else:
         return trialList
 
@@ -478,7 +590,9 @@ def createFactorialTrialList(factors):
 def bootStraps(dat, n=1):
     """Create a list of n bootstrapped resamples of the data
 
-    SLOW IMPLEMENTATION (Python for-loop)
+    All the resamples are drawn at once, with one array of random indices
+    for every condition, trial and resample, so the output (of
+    `dat.size * n` values) should fit comfortably in memory.
 
     Usage:
         ``out = bootStraps(dat, n=1)``
@@ -495,22 +609,53 @@ def bootStraps(dat, n=1):
             - dim[1]=trials
             - dim[2]=resamples
     """
+    return _resample(dat, n, np.random)
+
+
+def _resample(dat, n, rng):
+    """bootStraps(dat, n) with random indices from `rng` (a RandomState,
+    or the np.random module)"""
     dat = np.asarray(dat)
     if len(dat.shape) == 1:
         # have presumably been given a series of data for one stimulus
         # adds a dimension (arraynow has shape (1,Ntrials))
         dat = np.array([dat])
 
-    nTrials = dat.shape[1]
-    # initialise a matrix to store output
-    resamples = np.zeros(dat.shape + (n,), dat.dtype)
-    rand = np.random.rand
-    for stimulusN in range(dat.shape[0]):
-        thisStim = dat[stimulusN, :]  # fetch data for this stimulus
-        for sampleN in range(n):
-            indices = np.floor(nTrials * rand(nTrials)).astype('i')
-            resamples[stimulusN, :, sampleN] = np.take(thisStim, indices)
-    return resamples
+    nConditions, nTrials = dat.shape[:2]
+    indices = rng.randint(0, nTrials, size=(nConditions, nTrials, n))
+    return dat[np.arange(nConditions)[:, None, None], indices]
+
+
+def _runChunk(args):
+    func, start, stop, seed = args
+    return func(start, stop, np.random.RandomState(seed))
+
+
+def _mapChunks(func, n, chunkSize, seed=None, nProcesses=1):
+    """Calls `func(start, stop, rng)` for the chunks [start, stop) of
+    range(n) and returns the list of their results.
+
+    Each chunk gets its own RandomState, seeded from `seed`, so the results
+    are the same whatever the number of processes. When there is more than
+    one chunk and `nProcesses` isn't 1 the chunks are shared across that
+    many processes (the number of cpus if None): `func` must then be
+    picklable (a module-level function, or a functools.partial of one), and
+    on Windows and macOS the calling script needs an
+    ``if __name__ == '__main__':`` guard.
+    """
+    starts = range(0, n, chunkSize)
+    seeds = np.random.RandomState(seed).randint(2 ** 31, size=len(starts))
+    jobs = [(func, start, min(start + chunkSize, n), chunkSeed)
+            for start, chunkSeed in zip(starts, seeds)]
+    if nProcesses == 1 or len(jobs) < 2:
+        return [_runChunk(job) for job in jobs]
+    import multiprocessing
+    pool = multiprocessing.Pool(nProcesses)
+    try:
+        return pool.map(_runChunk, jobs)
+    finally:
+        pool.close()
+        pool.join()
 
 
 def functionFromStaircase(intensities, responses, bins=10):
@@ -606,3 +751,120 @@ def getDateStr(format="%Y_%b_%d_%H%M"):
             now_decoded = time.strftime("%Y_%m_%d_%H%M", time.localtime())
 
         return now_decoded
+
+
+def _inferColumnTypes(dataFrame):
+    """Give each column of a DataFrame a single, typed dtype (one pass per
+    column, no loop over rows).
+
+    Columns that are numeric apart from missing values (`None`, NaN or '')
+    become floats/ints/bools, everything else becomes strings (with missing
+    values as '').
+    """
+    dataFrame = dataFrame.infer_objects()
+    for name in dataFrame.columns:
+        col = dataFrame[name]
+        if col.dtype != object:
+            continue
+        try:
+            missing = col.isna() | col.isin([''])
+        except TypeError:  # unhashable values (lists etc) so not numeric
+            missing = col.isna()
+        else:
+            try:
+                dataFrame[name] = pd.to_numeric(col.mask(missing))
+                continue
+            except (ValueError, TypeError):
+                pass
+        dataFrame[name] = col.mask(missing, '').astype(str)
+    return dataFrame
+
+
+def _saveAsColumnar(dataFrame, fileName, dataFormat='npz',
+                    fileCollisionMethod='rename'):
+    """Write a DataFrame as typed columns in one of the `columnarFormats`.
+
+    Used by the `saveAsColumnar()` methods of the handlers. Returns the
+    name of the file that was written.
+    """
+    if dataFormat not in columnarFormats:
+        raise ValueError("dataFormat should be one of %s, not %r"
+                         % (sorted(columnarFormats), dataFormat))
+    fileName = pathToString(fileName)
+    if not fileName.endswith(columnarFormats[dataFormat]):
+        fileName += columnarFormats[dataFormat]
+    if os.path.exists(fileName):
+        fileName = handleFileCollision(
+            fileName, fileCollisionMethod=fileCollisionMethod)
+
+    dataFrame = _inferColumnTypes(dataFrame)
+    if dataFormat == 'npz':
+        # column names can contain anything so store them separately
+        names = [str(name) for name in dataFrame.columns]
+        cols = {}
+        for n, name in enumerate(dataFrame.columns):
+            values = dataFrame[name].values
+            if values.dtype == object:  # strings; store as fixed-width
+                values = values.astype(str)
+            cols['col%i' % n] = values
+        with open(fileName, 'wb') as f:
+            np.savez(f, __columns__=np.array(names, dtype=str), **cols)
+    elif dataFormat == 'parquet':
+        # needs pyarrow or fastparquet (pandas raises a helpful ImportError)
+        dataFrame.to_parquet(fileName, index=False)
+    elif dataFormat == 'hdf5':
+        # needs pytables
+        dataFrame.to_hdf(fileName, key='data', mode='w', format='table')
+    logging.info('saved columnar data to %s' % fileName)
+    return fileName
+
+
+def _loadColumnarFile(fileName):
+    if fileName.endswith(columnarFormats['npz']):
+        with np.load(fileName, allow_pickle=False) as dat:
+            names = list(dat['__columns__'])
+            cols = [dat['col%i' % n] for n in range(len(names))]
+        dataFrame = pd.DataFrame(dict(zip(range(len(names)), cols)))
+        dataFrame.columns = names
+        return dataFrame
+    elif fileName.endswith(columnarFormats['parquet']):
+        return pd.read_parquet(fileName)
+    elif fileName.endswith(columnarFormats['hdf5']):
+        return pd.read_hdf(fileName, key='data')
+    raise IOError('%s is not a columnar data file (%s)'
+                  % (fileName, ', '.join(columnarFormats.values())))
+
+
+def loadColumnar(path, dataFormat=None):
+    """Load data saved with `saveAsColumnar()` (or `ExperimentHandler`
+    with a `dataFormat`) as a single pandas DataFrame.
+
+    `path` can be a single file, a folder or a glob pattern. For a folder
+    (or pattern) every columnar file found is loaded and the sessions are
+    concatenated, in filename order, into one table. Columns missing from
+    some sessions are filled with NaN. Use `dataFormat` ('npz', 'parquet'
+    or 'hdf5') to load only files of that format from a folder.
+
+    Usage::
+
+        allData = data.loadColumnar('data/')
+        allData.groupby('participant')['resp.rt'].mean()
+    """
+    path = pathToString(path)
+    if dataFormat is None:
+        extensions = tuple(columnarFormats.values())
+    else:
+        extensions = (columnarFormats[dataFormat],)
+    if os.path.isfile(path):
+        fileNames = [path]
+    else:
+        if os.path.isdir(path):
+            path = os.path.join(path, '*')
+        fileNames = sorted(fileName for fileName in glob.glob(path)
+                           if fileName.endswith(extensions))
+    if not fileNames:
+        raise IOError('No columnar data files found at %s' % path)
+    frames = [_loadColumnarFile(fileName) for fileName in fileNames]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True, sort=False)
@@ -22,7 +22,7 @@ arial = allFonts.getFont("Arial", fontSize)
 logging.exp("{:.3f}: created font".format(c.getTime()))
 arial.preload(nChars)
 logging.exp("{:.3f}: preloaded {} chars".format(c.getTime(), nChars))
-# arial.saveToCache()  # can't yet retrieve the font but it's interesting to see!
+arial.saveToCache()  # getFont() restores these glyphs in later sessions
 
 
 txt1 = TextBox2(win, color='red', colorSpace='named', text='Toptastic', font='Times',
@@ -11,10 +11,12 @@ import sys
 import time
 import subprocess
 import json
+import collections
 import signal
 from weakref import proxy
 
 import psutil
+import numpy
 
 try:
     import psychopy.logging as psycho_logging
@@ -26,9 +28,10 @@ from .. import _pkgroot, IOHUB_DIRECTORY
 from ..util import yload, yLoader
 from ..errors import print2err, ioHubError, printExceptionDetailsToStdErr
 from ..util import isIterable, updateDict, win32MessagePump
-from ..devices import DeviceEvent, import_device
+from ..devices import DeviceEvent, import_device, groupEventsByType
 from ..devices.computer import Computer
 from ..devices.experiment import MessageEvent, LogEvent
+from ..shmem import SharedEventBuffer
 from ..constants import DeviceConstants, EventConstants
 from psychopy import constants
 
@@ -82,6 +85,10 @@ class DeviceRPC(object):
         elif 'as_type' in kwargs:
             asType = kwargs['as_type']
 
+        if asType == 'numpy':
+            return ioHubConnection.eventListsToNumpy(
+                groupEventsByType(self._logEvents(r)))
+
         conversionMethod = self._returnarg
         if asType == 'dict':
             conversionMethod = ioHubConnection.eventListToDict
@@ -90,8 +97,13 @@ class DeviceRPC(object):
         elif asType == 'namedtuple':
             conversionMethod = ioHubConnection.eventListToNamedTuple
 
+        return [conversionMethod(el) for el in self._logEvents(r)]
+
+    def _logEvents(self, r):
+        """Send any LogEvents from the Experiment device to the PsychoPy log,
+        removing them from the list of events."""
         if self.device_class != 'Experiment':
-            return [conversionMethod(el) for el in r]
+            return r
 
         EVT_TYPE_IX = DeviceEvent.EVENT_TYPE_ID_INDEX
         LOG_EVT = LogEvent.EVENT_TYPE_ID
@@ -103,7 +115,7 @@ class DeviceRPC(object):
                 ltext = l[self._log_text_index]
                 llevel = l[self._log_level_index]
                 psycho_logging.log(ltext, llevel, ltime)
-        return [conversionMethod(el) for el in r]
+        return r
 
 
 # pylint: disable=protected-access
@@ -290,6 +302,8 @@ class ioHubConnection(object):
         self._iohub_server_config = None
         self._shutdown_attempted = False
         self._cv_order = None
+        # set if the server passes global events through shared memory
+        self._sharedEvents = None
 
         self.iohub_status = self._startServer(ioHubConfig, ioHubConfigAbsPath)
         if self.iohub_status != 'OK':
@@ -353,6 +367,12 @@ class ioHubConnection(object):
             * 'dict': Each event converted to a dict object.
             * 'object': Each event is converted to a DeviceEvent subclass
                         based on the event's type.
+            * 'numpy': Events are returned as a dict of numpy structured
+                       arrays, one per event type, keyed by event type id
+                       (e.g. EventConstants.KEYBOARD_PRESS). Each type's
+                       events are converted in one go, so this is much
+                       faster when many events (e.g. eye samples) are
+                       retrieved at once.
 
         Args:
             device_label (str): Name of device to retrieve events for.
@@ -364,9 +384,15 @@ class ioHubConnection(object):
         Returns:
             tuple: List of event objects; object type controlled by 'as_type'.
         """
+        if as_type == 'numpy':
+            return self._getEventsAsNumpy(device_label)
+
         r = None
         if device_label is None:
-            events = self._sendToHubServer(('GET_EVENTS',))[1]
+            if self._sharedEvents is not None:
+                events = self._sharedEvents.readEventLists()
+            else:
+                events = self._sendToHubServer(('GET_EVENTS',))[1]
             if events is None:
                 r = self.allEvents
             else:
@@ -394,6 +420,32 @@ class ioHubConnection(object):
 
         return []
 
+    def _getEventsAsNumpy(self, device_label=None):
+        if device_label is not None:
+            return self.devices.getDevice(device_label).getEvents(
+                asType='numpy')
+        if self._sharedEvents is not None:
+            arrays = self._sharedEvents.readArrays()
+            if self.allEvents:
+                # events kept by wait() came before those just read
+                kept = self.eventListsToNumpy(
+                    groupEventsByType(self.allEvents))
+                self.allEvents = []
+                for etype, evts in arrays.items():
+                    if etype in kept:
+                        evts = numpy.concatenate((kept[etype], evts))
+                    kept[etype] = evts
+                arrays = kept
+            return arrays
+
+        # the server sends the events grouped by type
+        grouped = self._sendToHubServer(('GET_EVENTS', True))[1] or []
+        if self.allEvents:
+            # events kept by wait() came before those just received
+            grouped = groupEventsByType(self.allEvents) + list(grouped)
+            self.allEvents = []
+        return self.eventListsToNumpy(grouped)
+
     def clearEvents(self, device_label='all'):
         """Clears unread events from the ioHub Server's Event Buffer(s)
         so that unneeded events are not discarded.
@@ -420,6 +472,8 @@ class ioHubConnection(object):
         if device_label.lower() == 'all':
             self.allEvents = []
             self._sendToHubServer(('RPC', 'clearEventBuffer', [True, ]))
+            if self._sharedEvents is not None:
+                self._sharedEvents.clear()
             try:
                 self.getDevice('keyboard')._clearLocalEvents()
             except:
@@ -427,6 +481,8 @@ class ioHubConnection(object):
         elif device_label in [None, '', False]:
             self.allEvents = []
             self._sendToHubServer(('RPC', 'clearEventBuffer', [False, ]))
+            if self._sharedEvents is not None:
+                self._sharedEvents.clear()
             try:
                 self.getDevice('keyboard')._clearLocalEvents()
             except:
@@ -797,6 +853,22 @@ class ioHubConnection(object):
         r = self._sendToHubServer(('RPC', 'flushIODataStoreFile'))
         return r
 
+    def getDataStoreStats(self):
+        """Get counters from the ioDataStore, which stages events in memory
+        and writes them to the file in chunks. Useful to check that it keeps
+        up with high rate devices (e.g. eye trackers).
+
+        Args:
+            None
+
+        Returns:
+            dict: rows_staged (events received), rows_written, rows_pending,
+            chunks_written, write_time_mean and write_time_max (secs per
+            chunk). None if the ioDataStore is not enabled.
+
+        """
+        return self._sendToHubServer(('RPC', 'getDataStoreStats'))[2]
+
     def startCustomTasklet(self, task_name, task_class_path, **class_kwargs):
         """
         Instruct the iohub server to start running a custom tasklet given
@@ -1016,6 +1088,13 @@ class ioHubConnection(object):
         # >>>> Creating client side iohub device wrappers...
         self._createDeviceList(ioHubConfig['monitor_devices'])
 
+        # >>>> Open the shared memory global event buffer, if there is one
+        if ioHubConfig.get('shared_event_buffer', False):
+            sbuf_path = self._sendToHubServer(
+                ('RPC', 'getSharedEventBufferPath'))[2]
+            if sbuf_path:
+                self._sharedEvents = SharedEventBuffer(sbuf_path)
+
         return 'OK'
 
     def _waitForServerInit(self):
@@ -1264,6 +1343,23 @@ class ioHubConnection(object):
         etype = evt_data[DeviceEvent.EVENT_TYPE_ID_INDEX]
         return EventConstants.getClass(etype).createEventAsNamedTuple(evt_data)
 
+    @staticmethod
+    def eventListsToNumpy(grouped):
+        """Convert events grouped by type, as [[event_type_id, [event_list,
+        ...]], ...], into a dict of numpy structured arrays keyed by event
+        type id. Groups with the same type are joined (in order)."""
+        byType = collections.OrderedDict()
+        for etype, events in grouped:
+            byType.setdefault(etype, []).extend(events)
+        arrays = collections.OrderedDict()
+        for etype, events in byType.items():
+            evtClass = EventConstants.getClass(etype)
+            if evtClass is None:
+                arrays[etype] = events
+            else:
+                arrays[etype] = evtClass.createEventsAsNumpyArray(events)
+        return arrays
+
     # client utility methods.
     def _getDeviceList(self):
         r = self._sendToHubServer(('EXP_DEVICE', 'GET_DEVICE_LIST'))
@@ -1278,6 +1374,9 @@ class ioHubConnection(object):
                 pass
 
             self._shutdown_attempted = True
+            if self._sharedEvents is not None:
+                self._sharedEvents.close()
+                self._sharedEvents = None
             TimeoutError = psutil.TimeoutExpired
             try:
                 self.udp_client.sendTo(('STOP_IOHUB_SERVER',))
@@ -13,6 +13,7 @@ from builtins import str
 from builtins import object
 from pkg_resources import parse_version
 from ..server import DeviceEvent
+from ..devices import Computer
 from ..constants import EventConstants
 from ..errors import ioHubError, printExceptionDetailsToStdErr, print2err
 
@@ -83,6 +84,15 @@ class DataStoreFile(object):
         self.flushCounter = self.settings.get('flush_interval', 32)
         self._eventCounter = 0
 
+        # events are staged (in preallocated arrays, per table) and appended
+        # to their table in chunks of stage_rows, or once the oldest has
+        # waited stage_max_age secs
+        self.stageRows = max(int(self.settings.get('stage_rows', 1024)), 1)
+        self.stageMaxAge = self.settings.get('stage_max_age', 0.5)
+        self._stages = dict()
+        self._stats = dict(rows_staged=0, rows_written=0, chunks_written=0,
+                           write_time_total=0.0, write_time_max=0.0)
+
         self.TABLES = dict()
         self._eventGroupMappings = dict()
         self.emrtFile = open_file(self.filePath, mode=fmode)
@@ -385,19 +395,29 @@ class DataStoreFile(object):
                 return True
             return False
 
+    def _getStage(self, eventClass):
+        stage = self._stages.get(eventClass.IOHUB_DATA_TABLE)
+        if stage is None:
+            etable = self.TABLES[eventClass.IOHUB_DATA_TABLE]
+            stage = _TableStage(etable, eventClass.NUMPY_DTYPE,
+                                self.stageRows)
+            self._stages[eventClass.IOHUB_DATA_TABLE] = stage
+        return stage
+
     def _handleEvent(self, event):
         try:
             if self.checkForExperimentAndSessionIDs(event) is False:
                 return False
             etype = event[DeviceEvent.EVENT_TYPE_ID_INDEX]
             eventClass = EventConstants.getClass(etype)
-            etable = self.TABLES[eventClass.IOHUB_DATA_TABLE]
+            stage = self._getStage(eventClass)
             event[DeviceEvent.EVENT_EXPERIMENT_ID_INDEX] = self.active_experiment_id
             event[DeviceEvent.EVENT_SESSION_ID_INDEX] = self.active_session_id
 
-            np_array = np.array([tuple(event), ], dtype=eventClass.NUMPY_DTYPE)
-            etable.append(np_array)
-            self.bufferedFlush()
+            if stage.add(event):  # full
+                self._writeStage(stage)
+            self._stats['rows_staged'] += 1
+            self.flushStaleStages()
         except Exception:
             print2err("Error saving event: ", event)
             printExceptionDetailsToStdErr()
@@ -411,40 +431,100 @@ class DataStoreFile(object):
 
             etype = event[DeviceEvent.EVENT_TYPE_ID_INDEX]
             eventClass = EventConstants.getClass(etype)
-            etable = self.TABLES[eventClass.IOHUB_DATA_TABLE]
+            stage = self._getStage(eventClass)
 
-            np_events = []
             for event in events:
                 event[DeviceEvent.EVENT_EXPERIMENT_ID_INDEX] = self.active_experiment_id
                 event[DeviceEvent.EVENT_SESSION_ID_INDEX] = self.active_session_id
-                np_events.append(tuple(event))
-
-            np_array = np.array(np_events, dtype=eventClass.NUMPY_DTYPE)
-            etable.append(np_array)
-            self.bufferedFlush(len(np_events))
+                if stage.add(event):
+                    self._writeStage(stage)
+            self._stats['rows_staged'] += len(events)
+            self.flushStaleStages()
         except ioHubError as e:
             print2err(e)
         except Exception:
             printExceptionDetailsToStdErr()
 
+    def _writeStage(self, stage, bufferedFlush=True):
+        """Append the rows staged for a table to it, in one chunk."""
+        nrows = stage.count
+        if nrows == 0:
+            return
+        stime = Computer.getTime()
+        stage.table.append(stage.rows[:nrows])
+        stage.clear()
+        dur = Computer.getTime() - stime
+        stats = self._stats
+        stats['rows_written'] += nrows
+        stats['chunks_written'] += 1
+        stats['write_time_total'] += dur
+        stats['write_time_max'] = max(stats['write_time_max'], dur)
+        if bufferedFlush:
+            self.bufferedFlush(nrows)
+
+    def flushStaleStages(self):
+        """Write the staged rows of any table whose oldest row has been
+        waiting longer than stage_max_age."""
+        if self.stageMaxAge is None or self.stageMaxAge < 0:
+            return
+        oldest = Computer.getTime() - self.stageMaxAge
+        for stage in self._stages.values():
+            if stage.count and stage.firstTime <= oldest:
+                self._writeStage(stage)
+
+    def flushStages(self):
+        """Write all staged rows to their tables."""
+        for stage in self._stages.values():
+            self._writeStage(stage, bufferedFlush=False)
+
+    def getStats(self):
+        """Counters for the staging of events, to check that writing keeps
+        up with the event rate.
+
+        Returns:
+            dict: rows_staged (events received), rows_written,
+            rows_pending (staged but not yet written), chunks_written,
+            write_time_mean and write_time_max (secs per chunk).
+        """
+        stats = dict(self._stats)
+        nchunks = stats['chunks_written']
+        stats['write_time_mean'] = (stats.pop('write_time_total') / nchunks
+                                    if nchunks else 0.0)
+        stats['rows_pending'] = sum(s.count for s in self._stages.values())
+        return stats
+
     def bufferedFlush(self,eventCount=1):
         """
         If flushCounter threshold is >=0 then do some checks. If it is < 0,
         then flush only occurs when command is sent to ioHub,
         so do nothing here.
+
+        Only the file is flushed: rows staged for other tables are left
+        for their stage to fill up (or age out).
         """
         if self.flushCounter >= 0:
             if self.flushCounter == 0:
-                self.flush()
+                self._flushFile()
                 return True
             if self.flushCounter <= self._eventCounter:
-                self.flush()
+                self._flushFile()
                 self._eventCounter = 0
                 return True
             self._eventCounter += eventCount
             return False
 
     def flush(self):
+        try:
+            if self.emrtFile:
+                self.flushStages()
+                self.emrtFile.flush()
+        except tables.ClosedFileError:
+            pass
+        except Exception:
+            printExceptionDetailsToStdErr()
+
+    def _flushFile(self):
+        """Flush the hdf5 file, without writing staged rows."""
         try:
             if self.emrtFile:
                 self.emrtFile.flush()
@@ -464,6 +544,28 @@ class DataStoreFile(object):
         except Exception:
             pass
 
+class _TableStage(object):
+    """Preallocated rows for one event table, filled in place and then
+    appended to the table in one go by DataStoreFile._writeStage."""
+
+    def __init__(self, table, dtype, nrows):
+        self.table = table
+        self.rows = np.zeros(nrows, dtype=dtype)
+        self.count = 0
+        self.firstTime = None  # when the oldest staged row was added
+
+    def add(self, event):
+        """Stage an event; returns True if the stage is now full."""
+        if self.count == 0:
+            self.firstTime = Computer.getTime()
+        self.rows[self.count] = tuple(event)
+        self.count += 1
+        return self.count == len(self.rows)
+
+    def clear(self):
+        self.count = 0
+        self.firstTime = None
+
 ## -------------------- Utility Functions ------------------------ ##
 
 
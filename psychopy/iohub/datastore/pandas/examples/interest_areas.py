@@ -10,6 +10,7 @@ s
 from __future__ import print_function
 from psychopy.iohub.datastore.pandas import ioHubPandasDataView
 from psychopy.iohub.datastore.pandas.interestarea import Circle, Ellipse, Rectangle
+from psychopy.iohub.datastore.pandas.interestarea import label_interest_areas
 
 
 exp_data = ioHubPandasDataView('io_stroop.hdf5')
@@ -42,5 +43,9 @@ print()
 print('* MOUSE_MOVE events within Ellipse IAs:')
 print(ellipse.filter(exp_data.MOUSE_BUTTON_PRESS).head(25))
 print()
+print('* MOUSE_MOVE events labelled with the IA they are in:')
+labelled = label_interest_areas(exp_data.MOUSE_MOVE, [spot, ellipse, rect, circle])
+print(labelled['ia_name'].value_counts())
+print()
 
 exp_data.close()
@@ -18,6 +18,76 @@ except ImportError:
 
 from weakref import proxy
 
+import numpy as np
+
+
+def _ring_test(x, y, vertices):
+    """Return two bool arrays: True for each of the points (x[i], y[i])
+    inside the ring of (n, 2) vertices by the even-odd rule, and True for
+    each point on the ring itself."""
+    inside = np.zeros(x.shape, dtype=bool)
+    on_ring = np.zeros(x.shape, dtype=bool)
+    x0, y0 = vertices[-1]
+    for x1, y1 in vertices:
+        on_ring |= (((x - x0) * (y1 - y0) == (y - y0) * (x1 - x0)) &
+                    (x >= min(x0, x1)) & (x <= max(x0, x1)) &
+                    (y >= min(y0, y1)) & (y <= max(y0, y1)))
+        if y0 != y1:
+            crosses = (y0 > y) != (y1 > y)
+            x_cross = x0 + (y - y0) * ((x1 - x0) / (y1 - y0))
+            inside ^= crosses & (x < x_cross)
+        x0, y0 = x1, y1
+    return inside, on_ring
+
+
+def points_in_polygon(x, y, vertices):
+    """Return a bool array, True for each of the points (x[i], y[i]) that
+    is inside the polygon with the given (n, 2) vertices.
+
+    Uses the even-odd (ray casting) rule: a horizontal ray from the point
+    crosses the polygon outline an odd number of times if the point is
+    inside. The loop is over the polygon edges; each edge is tested against
+    all points at once. Points on the outline are not inside, as for
+    shapely's contains.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    inside, on_ring = _ring_test(x, y,
+                                 np.asarray(vertices, dtype=np.float64))
+    return inside & ~on_ring
+
+
+def label_interest_areas(target_df, interest_areas, x_col='x_position',
+                         y_col='y_position'):
+    """Assign every row of target_df to the interest area its position is
+    in.
+
+    Each point is tested only against the interest areas whose bounding box
+    contains it, and only until it has been found in one, so the first of
+    interest_areas that contains a point is the one it is assigned to.
+
+    Returns a copy of target_df with 'ia_id' (0 for rows not in any of the
+    interest areas) and 'ia_name' (None for those rows) columns added.
+    """
+    x = target_df[x_col].values
+    y = target_df[y_col].values
+    ia_index = np.full(len(target_df), -1, dtype=np.intp)
+    for i, ia in enumerate(interest_areas):
+        minx, miny, maxx, maxy = ia.bounds
+        candidates = np.flatnonzero((ia_index < 0) &
+                                    (x >= minx) & (x <= maxx) &
+                                    (y >= miny) & (y <= maxy))
+        hits = candidates[ia.contains_points(x[candidates], y[candidates])]
+        ia_index[hits] = i
+    labelled = target_df.copy()
+    # index -1 (no interest area) picks the last values, 0 and None
+    ia_ids = np.array([ia.ia_id for ia in interest_areas] + [0])
+    ia_names = np.array([ia.name for ia in interest_areas] + [None],
+                        dtype=object)
+    labelled['ia_id'] = ia_ids[ia_index]
+    labelled['ia_name'] = ia_names[ia_index]
+    return labelled
+
 
 class Polygon(shapely.geometry.Polygon):
     _next_id = 1
@@ -43,12 +113,45 @@ class Polygon(shapely.geometry.Polygon):
         return shapely.geometry.Polygon.contains(
             self, spy.geometry.Point(v[0], v[1]))
 
+    def contains_points(self, x, y):
+        """Vectorized contains: return a bool array, True for each of the
+        points (x[i], y[i]) that is inside the interest area."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        minx, miny, maxx, maxy = self.bounds
+        inside = (x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)
+        candidates = np.flatnonzero(inside)
+        x, y = x[candidates], y[candidates]
+        inside[candidates] = points_in_polygon(x, y, self.exterior.coords)
+        for interior in self.interiors:
+            # points in a hole, or on its outline, are outside
+            in_hole, on_hole = _ring_test(
+                x, y, np.asarray(interior.coords, dtype=np.float64))
+            inside[candidates] &= ~(in_hole | on_hole)
+        return inside
+
+    def _contains_scaled(self, x, y, r2):
+        """contains_points for a Circle or Ellipse, given the squared
+        distances r2 of the points from the center, scaled so that the
+        ellipse has radius 1. The outline is a polygon inscribed in that
+        ellipse, so only the points between the polygon's inscribed and
+        circumscribed ellipses are tested against the polygon."""
+        # (an affine transform of a regular polygon of n sides)
+        n = len(self.exterior.coords) - 1
+        inner = np.cos(np.pi / n) ** 2 * (1.0 - 1e-9)
+        inside = r2 < inner
+        edge = np.flatnonzero((r2 >= inner) & (r2 < 1.0 + 1e-9))
+        inside[edge] = Polygon.contains_points(
+            self, np.asarray(x, dtype=np.float64)[edge],
+            np.asarray(y, dtype=np.float64)[edge])
+        return inside
+
     def filter(self, target_df, x_col='x_position', y_col='y_position'):
         if self._last_target_df is not target_df:
             self._last_target_df = proxy(target_df)
             self._ia_df = None
-            self._ia_df = target_df[
-                target_df[[x_col, y_col]].apply(self.contains, axis=1)]
+            self._ia_df = target_df[self.contains_points(
+                target_df[x_col].values, target_df[y_col].values)]
             self._ia_df['ia_name'] = self.name
             self._ia_df['ia_id'] = self.ia_id
             self._ia_df['ia_name'] = self.name
@@ -65,6 +168,14 @@ class Circle(Polygon):
             radius,
             resolution=16)
         Polygon.__init__(self, name, point.exterior.coords)
+        self._center = tuple(center_point)
+        self._radius = radius
+
+    def contains_points(self, x, y):
+        dx = np.asarray(x, dtype=np.float64) - self._center[0]
+        dy = np.asarray(y, dtype=np.float64) - self._center[1]
+        return self._contains_scaled(
+            x, y, (dx * dx + dy * dy) / (self._radius * self._radius))
 
 
 class Ellipse(Polygon):
@@ -91,6 +202,19 @@ class Ellipse(Polygon):
         point = spy.affinity.rotate(
             point, angle, origin='center', use_radians=use_radians)
         Polygon.__init__(self, name, point.exterior.coords)
+        self._center = tuple(center_point)
+        self._axes = min_axis, max_axis
+        self._angle = angle if use_radians else np.deg2rad(angle)
+
+    def contains_points(self, x, y):
+        dx = np.asarray(x, dtype=np.float64) - self._center[0]
+        dy = np.asarray(y, dtype=np.float64) - self._center[1]
+        # rotate the points back by the ellipse angle, so the ellipse is
+        # axis aligned with min_axis along x and max_axis along y
+        cos_a, sin_a = np.cos(self._angle), np.sin(self._angle)
+        u = (dx * cos_a + dy * sin_a) / self._axes[0]
+        v = (dy * cos_a - dx * sin_a) / self._axes[1]
+        return self._contains_scaled(x, y, u * u + v * v)
 
 
 class Rectangle(Polygon):
@@ -100,3 +224,11 @@ class Rectangle(Polygon):
         if not ccw:
             coords = coords[::-1]
         Polygon.__init__(self, name, coords)
+        self._minx, self._maxx = min(minx, maxx), max(minx, maxx)
+        self._miny, self._maxy = min(miny, maxy), max(miny, maxy)
+
+    def contains_points(self, x, y):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        return ((x > self._minx) & (x < self._maxx) &
+                (y > self._miny) & (y < self._maxy))
@@ -335,7 +335,7 @@ class Device(ioObject):
 
             clearEvents (int): Can be used to indicate if the events being returned should also be removed from the device event buffer. True (the default) indicates to remove events being returned. False results in events being left in the device event buffer.
 
-            asType (str): Optional kwarg giving the object type to return events as. Valid values are 'namedtuple' (the default), 'dict', 'list', or 'object'.
+            asType (str): Optional kwarg giving the object type to return events as. Valid values are 'namedtuple' (the default), 'dict', 'list', 'object' or 'numpy' (a dict of numpy structured arrays, one per event type).
 
         Returns:
             (list): New events that the ioHub has received since the last getEvents() or clearEvents() call to the device. Events are ordered by the ioHub time of each event, older event at index 0. The event object type is determined by the asType parameter passed to the method. By default a namedtuple object is returned for each event.
@@ -973,6 +973,48 @@ class DeviceEvent(ioObject):
     @classmethod
     def createEventAsNamedTuple(cls, valueList):
         return cls.namedTupleClass(*valueList)
+
+    @classmethod
+    def createEventsAsNumpyArray(cls, valueLists):
+        """Convert a list of event value lists (all of this event type) into
+        a numpy structured array, in one call rather than event by event.
+
+        The fields are those of NUMPY_DTYPE, except that byte string fields
+        are unicode str fields of the same length.
+        """
+        return np.array([tuple(v) for v in valueLists],
+                        dtype=cls._getClientNumpyDtype())
+
+    @classmethod
+    def _getClientNumpyDtype(cls):
+        # NUMPY_DTYPE with byte string fields as unicode str fields
+        dtype = cls.__dict__.get('_clientNumpyDtype')
+        if dtype is None:
+            dtype = np.dtype([
+                (n, 'U%d' % cls.NUMPY_DTYPE[n].itemsize)
+                if cls.NUMPY_DTYPE[n].kind == 'S' else (n, cls.NUMPY_DTYPE[n])
+                for n in cls.NUMPY_DTYPE.names])
+            cls._clientNumpyDtype = dtype
+        return dtype
+
+
+def groupEventsByType(events):
+    """Split a list of event value lists by event type.
+
+    Returns:
+        list: [[event_type_id, [event, ...]], ...] with the events of each
+        type kept in their original order, types ordered by first
+        occurrence.
+    """
+    typeIndex = DeviceEvent.EVENT_TYPE_ID_INDEX
+    grouped = collections.OrderedDict()
+    for e in events:
+        etype = e[typeIndex]
+        rows = grouped.get(etype)
+        if rows is None:
+            grouped[etype] = rows = []
+        rows.append(e)
+    return [[etype, rows] for etype, rows in grouped.items()]
 #
 # Import Devices and DeviceEvents
 #
@@ -0,0 +1,684 @@
+# -*- coding: utf-8 -*-
+# Part of the psychopy.iohub library.
+# Copyright (C) 2012-2016 iSolver Software Solutions
+# Distributed under the terms of the GNU General Public License (GPL).
+"""
+ioHub Eye Tracker Offline Sample Event Parser
+
+Parses eye samples that have already been recorded (for example the
+MonocularEyeSampleEvent or BinocularEyeSampleEvent table of an ioDataStore
+file) into fixation, saccade and blink events, using the same steps as the
+online EyeTrackerEventParser:
+
+* binocular samples are converted to monocular samples (see parser.py),
+* gaze positions are converted to visual angles,
+* runs of missing samples between two valid samples have their angle and
+  pupil values linearly interpolated (missing samples before the first valid
+  sample are discarded),
+* velocities are calculated from the angles before they are position
+  filtered, and the velocity filter is applied to them (samples that don't
+  come out of the velocity filter, at the start and end of the data, are
+  dropped),
+* the position filter is applied to the angles. The online filters replace
+  the values of samples in place, after samples may already have been used,
+  so the angles of events are the filtered angles only if the online parser
+  would have filtered them by the time it created the event,
+* x and y velocity thresholds are calculated from the last
+  adaptive_vel_thresh_history secs of (positive) velocities of each sample,
+  and stored in the raw_x and raw_y fields of the sample,
+* each sample is categorised as a saccade sample if either velocity is at or
+  above its threshold, a missing data (blink) sample if it is not valid,
+  or as a fixation sample, and
+* a start event is created at the first sample of each run of samples of
+  the same category, and an end event at the last sample of it. The first
+  run of a session has no start event and therefore no end event either,
+  and the last run has no end event, as with the online parser.
+
+Rather than sample by sample, each step is done with numpy operations over
+the whole session, so re-parsing a recording with different settings is
+fast. Events are returned as numpy structured arrays of the NUMPY_DTYPE of
+each event class, so they can be written to or compared with an ioDataStore
+event table directly.
+
+Example:
+
+    from psychopy.iohub.devices.eyetracker.filters.offline import \\
+        OfflineEyeTrackerEventParser
+
+    parser = OfflineEyeTrackerEventParser(
+        sampling_rate=500,
+        display_device=dict(mm_size=dict(width=500, height=280),
+                            pixel_res=(1920, 1080), eye_distance=550),
+        position_filter=dict(name='MedianFilter', length=3,
+                             knot_pos='center'))
+    events = parser.parseFile('events.hdf5')
+    fixation_ends = events[EventConstants.FIXATION_END]
+    print(fixation_ends['duration'].mean())
+
+Many files can be parsed in parallel processes with parseFiles().
+"""
+from __future__ import division, absolute_import
+
+from builtins import object
+from past.builtins import basestring
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from ....constants import EventConstants
+from ....errors import print2err
+from ....util.visualangle import VisualAngleCalc
+from ... import DeviceEvent
+from ..eye_events import (MonocularEyeSampleEvent, BinocularEyeSampleEvent,
+                          FixationStartEvent, FixationEndEvent,
+                          SaccadeStartEvent, SaccadeEndEvent, BlinkStartEvent,
+                          BlinkEndEvent)
+
+LEFT_EYE = 1
+
+# filter_id of the events, as set by the online EyeTrackerEventParser
+PARSER_FILTER_ID = 23
+
+# sample category codes
+FIX, SAC, MIS = 1, 2, 3
+
+# Largest number of velocity values compared in one go when calculating the
+# adaptive velocity thresholds.
+_MAX_THRESHOLD_CHUNK_SIZE = 2 ** 21
+
+# Fields copied from a sample to the start / end / average fields of events.
+_SAMPLE_FIELDS = ('gaze_x', 'gaze_y', 'angle_x', 'angle_y', 'raw_x', 'raw_y',
+                  'pupil_measure1', 'pupil_measure1_type', 'velocity_x',
+                  'velocity_y', 'velocity_xy')
+
+
+def _knotIndex(knot_pos, length):
+    # same rules as eventfilters.MovingWindowFilter
+    if isinstance(knot_pos, basestring):
+        if knot_pos == 'center' and length % 2 == 0:
+            raise ValueError(
+                'MovingWindow length must be odd for a centered knot_pos.')
+        if knot_pos == 'center':
+            return length // 2
+        elif knot_pos == 'latest':
+            return 0
+        elif knot_pos == 'oldest':
+            return length - 1
+        raise ValueError(
+            "MovingWindow knot_pos must be an index between 0 - length-1, or "
+            "a string constant in ['center','latest','oldest']")
+    if knot_pos < 0 or knot_pos >= length:
+        raise ValueError(
+            'MovingWindow knot_pos must be between 0 and length-1.')
+    return knot_pos
+
+
+def _windows(values, length):
+    """Read only (len(values)-length+1, length) view of all windows of the
+    given length in values."""
+    n = max(len(values) - length + 1, 0)
+    stride = values.strides[0]
+    return as_strided(values, shape=(n, length), strides=(stride, stride),
+                      writeable=False)
+
+
+class FieldFilter(object):
+    """numpy equivalent of one of the eventfilters field filters, applied
+    to a whole array of values at once.
+
+    filter_settings is given in the same form as the position_filter and
+    velocity_filter settings of the online parser: a dict with the 'name' of
+    an eventfilters class (PassThroughFilter, MovingWindowFilter,
+    MedianFilter, WeightedAverageFilter or StampFilter) and its arguments.
+    """
+
+    def __init__(self, filter_settings=None):
+        settings = dict(filter_settings or {})
+        self.name = settings.pop('name', 'PassThroughFilter')
+        if self.name == 'PassThroughFilter':
+            self.length, self.knot_index = 1, 0
+        elif self.name in ('MovingWindowFilter', 'MedianFilter'):
+            self.length = settings.get('length')
+            self.knot_index = _knotIndex(settings.get('knot_pos'),
+                                         self.length)
+        elif self.name == 'WeightedAverageFilter':
+            weights = np.asarray(settings.get('weights'), dtype=np.float64)
+            self.weights = weights / np.sum(weights)
+            self.length = len(weights)
+            self.knot_index = _knotIndex(settings.get('knot_pos'),
+                                         self.length)
+        elif self.name == 'StampFilter':
+            # as online, a level above 1 returns the value of the latest
+            # sample rather than the middle one
+            self.level = settings.get('level', 1)
+            self.length = 3
+            self.knot_index = 1 if self.level <= 1 else 2
+        else:
+            raise ValueError('Unknown eye sample filter: %s' % self.name)
+
+    @property
+    def lead(self):
+        """Number of samples at the start of the data that are not output by
+        the filter (the online filter returns the sample at the knot index
+        of the window, once the window is full)."""
+        return self.knot_index
+
+    @property
+    def lag(self):
+        """Number of samples at the end of the data that are not output by
+        the filter."""
+        return self.length - 1 - self.knot_index
+
+    def apply(self, values):
+        """Return a filtered copy of values. Values that are not in the
+        knot position of a full window are left unfiltered.
+
+        As online, the values are filtered as float32 (the type of the
+        online filter buffers), so even the PassThroughFilter rounds them.
+        """
+        out = np.array(values, dtype=np.float64)
+        n = len(out) - self.length + 1
+        if n <= 0:
+            return out
+        values = np.ascontiguousarray(out, dtype=np.float32)
+        k = self.knot_index
+        if self.name == 'PassThroughFilter':
+            out[:] = values
+        elif self.name == 'MovingWindowFilter':
+            out[k:k + n] = _windows(values, self.length).mean(axis=1)
+        elif self.name == 'MedianFilter':
+            out[k:k + n] = np.median(_windows(values, self.length), axis=1)
+        elif self.name == 'WeightedAverageFilter':
+            out[k:k + n] = np.convolve(values, self.weights, 'valid')
+        elif self.name == 'StampFilter':
+            # the online filter's check for non-monotonic values is always
+            # true, so every value is replaced by the mean of its neighbours
+            out[k:k + n] = (values[:-2] + values[2:]) / 2.0
+        return out
+
+
+def adaptiveVelocityThresholds(velocities, history_length, valid=None,
+                               max_iterations=100):
+    """Calculate the adaptive velocity threshold of each sample.
+
+    The thresholds are calculated as the online parser does, from a buffer
+    holding the last history_length velocities that were > 0 (and valid):
+
+        PT = min + 3 * std of the buffer; then repeatedly
+        PT = mean + 3 * std of the buffer values below PT,
+        until PT changes by less than 1.
+
+    The buffer is only used once it has been filled (history_length + 1
+    velocities > 0 have been seen).
+
+    Args:
+        velocities (ndarray): Velocity of each sample.
+        history_length (int): Number of velocities used for a threshold.
+        valid (ndarray or None): bool mask of samples to use.
+        max_iterations (int): Upper limit on the iterations used per
+            threshold.
+
+    Returns:
+        ndarray: Threshold of each sample, NaN for samples that have none
+        (velocity <= 0, not valid, or before the buffer was full).
+    """
+    velocities = np.asarray(velocities, dtype=np.float64)
+    history_length = int(history_length)
+    thresholds = np.full(len(velocities), np.nan)
+    used = velocities > 0.0
+    if valid is not None:
+        used &= valid
+    indices = np.flatnonzero(used)
+    if history_length < 1 or len(indices) <= history_length:
+        return thresholds
+    used_velocities = np.ascontiguousarray(velocities[indices])
+    # window i holds used velocities i .. i + history_length - 1, i.e. the
+    # buffer after used velocity i + history_length - 1 has been added
+    windows = _windows(used_velocities, history_length)[1:]
+    indices = indices[history_length:]
+
+    chunk = max(_MAX_THRESHOLD_CHUNK_SIZE // history_length, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for c0 in range(0, len(windows), chunk):
+            w = np.array(windows[c0:c0 + chunk])
+            w2 = w * w
+            pt = w.min(axis=1) + 3.0 * w.std(axis=1)
+            active = np.arange(len(w))
+            for iteration in range(max_iterations):
+                if len(active) < len(w):
+                    wa, wa2 = w[active], w2[active]
+                else:
+                    wa, wa2 = w, w2
+                # mean and std of the values below the threshold of each
+                # window, as row wise dot products with the mask
+                below = (wa < pt[active, None]).astype(np.float64)
+                n = below.sum(axis=1)
+                mean = np.einsum('ij,ij->i', below, wa) / n
+                var = np.einsum('ij,ij->i', below, wa2) / n - mean * mean
+                new_pt = mean + 3.0 * np.sqrt(np.maximum(var, 0.0))
+                # NaN (nothing below the threshold) also stops, as online
+                changing = np.abs(new_pt - pt[active]) >= 1.0
+                pt[active] = new_pt
+                active = active[changing]
+                if not len(active):
+                    break
+            thresholds[indices[c0:c0 + chunk]] = pt
+    return thresholds
+
+
+class OfflineEyeTrackerEventParser(object):
+    """Parses recorded eye samples into fixation, saccade and blink events.
+
+    Takes the same keyword arguments as the online EyeTrackerEventParser:
+
+    Args:
+        sampling_rate (float): Sampling rate of the eye tracker (Hz).
+        display_device (dict): With the 'mm_size' (dict with 'width' and
+            'height'), 'pixel_res' and 'eye_distance' of the display, used
+            to convert gaze positions to visual angles.
+        position_filter (dict): Filter applied to angle_x and angle_y, see
+            FieldFilter.
+        velocity_filter (dict): Filter applied to the velocities.
+        adaptive_vel_thresh_history (float): Secs of velocities used for the
+            adaptive velocity thresholds.
+    """
+
+    def __init__(self, **kwargs):
+        self.sampling_rate = kwargs.get('sampling_rate')
+        self.vel_thresh_history_dur = kwargs.get(
+            'adaptive_vel_thresh_history', 3.0)
+        self.position_filter = FieldFilter(kwargs.get('position_filter'))
+        self.velocity_filter = FieldFilter(kwargs.get('velocity_filter'))
+
+        display_device = kwargs.get('display_device')
+        mm_size = display_device.get('mm_size')
+        if isinstance(mm_size, dict):
+            mm_size = mm_size['width'], mm_size['height']
+        self.visual_angle_calc = VisualAngleCalc(
+            mm_size, display_device.get('pixel_res'),
+            display_device.get('eye_distance'))
+        self.pix2deg = self.visual_angle_calc.pix2deg
+
+    @property
+    def history_length(self):
+        """Number of velocities used for the adaptive velocity thresholds."""
+        return int(self.vel_thresh_history_dur * self.sampling_rate)
+
+    @staticmethod
+    def toMonocular(samples):
+        """Convert samples to a MonocularEyeSampleEvent array.
+
+        Binocular samples are converted as by the online parser: left and
+        right eye values are averaged if both eyes are valid (status 0),
+        otherwise the valid eye's values are used (left if neither is).
+
+        Returns:
+            (ndarray, ndarray): the monocular samples and a bool mask of
+            valid samples.
+        """
+        names = samples.dtype.names
+        mono = np.zeros(len(samples), dtype=MonocularEyeSampleEvent.NUMPY_DTYPE)
+        status = samples['status']
+        if 'left_gaze_x' not in names:
+            for field in mono.dtype.names:
+                if field in names:
+                    mono[field] = samples[field]
+            return mono, status == 0
+
+        for field in mono.dtype.names:
+            if field in names:
+                mono[field] = samples[field]
+            elif field == 'eye':
+                mono[field] = LEFT_EYE
+            elif field.endswith('_type'):
+                mono[field] = samples['left_%s' % field]
+            else:
+                mono[field] = OfflineEyeTrackerEventParser._monocularValues(
+                    samples, field)
+        mono['type'] = EventConstants.MONOCULAR_EYE_SAMPLE
+        return mono, status != 22
+
+    @staticmethod
+    def _monocularValues(samples, field):
+        """The float64 values of a field of the monocular samples (which
+        are rounded to float32 in the MonocularEyeSampleEvent array)."""
+        if 'left_gaze_x' not in samples.dtype.names:
+            return samples[field].astype(np.float64)
+        status = samples['status']
+        left = samples['left_%s' % field].astype(np.float64)
+        right = samples['right_%s' % field].astype(np.float64)
+        return np.where(status == 20, right,
+                        np.where(status != 0, left, (left + right) / 2.0))
+
+    def processSamples(self, samples):
+        """Prepare the samples of one session for event parsing.
+
+        Args:
+            samples (ndarray): MonocularEyeSampleEvent or
+                BinocularEyeSampleEvent records, in time order.
+
+        Returns:
+            (ndarray, ndarray): The samples that would be parsed by the
+            online parser (monocular, with angles, filtered velocities and
+            the velocity thresholds in raw_x / raw_y) and a bool mask of
+            which of them are valid.
+        """
+        return self._processSamples(samples)[:2]
+
+    def _processSamples(self, samples):
+        """processSamples(), also returning a dict with the step (index of
+        the sample being added) at which the online parser parses each
+        sample, a function giving the angles of samples as the online
+        parser sees them at given steps and the unrounded gaze positions.
+        """
+        samples = np.asarray(samples)
+        mono, valid = self.toMonocular(samples)
+        valid_ix = np.flatnonzero(valid)
+        if not len(valid_ix):
+            return mono[:0], valid[:0], None
+        # invalid samples before the first / after the last valid sample are
+        # not parsed
+        parsed = slice(valid_ix[0], valid_ix[-1] + 1)
+        mono, valid = mono[parsed], valid[parsed]
+        # (the angles are calculated from the unrounded gaze positions, as
+        # online)
+        gaze = np.array([self._monocularValues(samples[parsed], field)
+                         for field in ('gaze_x', 'gaze_y')])
+        valid_ix = valid_ix - valid_ix[0]
+        n = len(mono)
+        time = mono['time'].astype(np.float64)
+        pos_filter = self.position_filter
+        vel_filter = self.velocity_filter
+
+        angles = np.zeros((2, n))
+        angles[0, valid], angles[1, valid] = self.pix2deg(
+            gaze[0, valid], gaze[1, valid])
+        missing_ix = np.flatnonzero(~valid)
+        if len(missing_ix):
+            for values in (angles[0], angles[1], mono['pupil_measure1']):
+                values[missing_ix] = np.interp(missing_ix, valid_ix,
+                                               values[valid_ix])
+            if pos_filter.lag == 0:
+                self._interpolateFromFiltered(angles, valid)
+        filtered = np.array([pos_filter.apply(values) for values in angles])
+
+        def angle_at(ix, steps):
+            # the online position filters replace a sample's angles once
+            # the sample lag samples after it has been added
+            done = (ix >= pos_filter.lead) & (ix + pos_filter.lag <= steps)
+            return np.where(done, filtered[:, ix], angles[:, ix])
+
+        # velocities from the angles of the sample and of the previous one
+        # as it was when the sample was added. The first valid sample after
+        # missing data uses the last sample output by the velocity filters.
+        prev = np.arange(-1, n - 1)
+        gap_ends = valid_ix[1:][~valid[valid_ix[1:] - 1]]
+        prev[gap_ends] = np.maximum(gap_ends - 1 - vel_filter.lag, 0)
+        prev_angles = angle_at(prev[1:], np.arange(n - 1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dt = time[1:] - time[prev[1:]]
+            velocity_x = np.abs(angles[0, 1:] - prev_angles[0]) / dt
+            velocity_y = np.abs(angles[1, 1:] - prev_angles[1]) / dt
+        # (the first sample keeps the velocities it was recorded with)
+        velocities = {}
+        for field, values in (('velocity_x', velocity_x),
+                              ('velocity_y', velocity_y),
+                              ('velocity_xy', np.hypot(velocity_x,
+                                                       velocity_y))):
+            values = np.concatenate((mono[field][:1], values))
+            velocities[field] = vel_filter.apply(values)
+
+        # only the samples that come out of the velocity filters are parsed,
+        # when a valid sample is added after the sample lag samples later
+        ix = np.arange(vel_filter.lead, n - vel_filter.lag)
+        steps = valid_ix[np.searchsorted(valid_ix, ix + vel_filter.lag)]
+        mono, valid = mono[ix], valid[ix]
+        mono['angle_x'], mono['angle_y'] = angle_at(ix, steps)
+        for field, values in velocities.items():
+            velocities[field] = values[ix]
+            mono[field] = velocities[field]
+
+        # thresholds are only calculated for (and from) the samples output
+        # when a valid sample is added; the others keep their raw_x / raw_y
+        output_valid = steps == ix + vel_filter.lag
+        history_length = self.history_length
+        for axis in ('x', 'y'):
+            thresholds = adaptiveVelocityThresholds(
+                velocities['velocity_%s' % axis], history_length,
+                output_valid)
+            mono['raw_%s' % axis][output_valid] = thresholds[output_valid]
+
+        def local_angle_at(rows, at_steps):
+            return angle_at(ix[rows], at_steps)
+
+        return mono, valid, dict(steps=steps, angle_at=local_angle_at,
+                                 gaze=gaze[:, ix])
+
+    def _interpolateFromFiltered(self, angles, valid):
+        """With a position filter whose lag is 0 the online parser has
+        already filtered the last valid sample before missing data when it
+        interpolates the missing angles, so interpolate from that."""
+        pos_filter = self.position_filter
+        lead = pos_filter.lead
+        gap_starts = np.flatnonzero(~valid[1:] & valid[:-1]) + 1
+        gap_ends = np.flatnonzero(valid[1:] & ~valid[:-1]) + 1
+        # (gaps are done in order, as the window may hold an earlier gap)
+        for start, end in zip(gap_starts, gap_ends):
+            last = start - 1
+            if last < lead:
+                continue
+            for values in angles:
+                first = pos_filter.apply(values[last - lead:start])[lead]
+                values[start:end] = np.linspace(
+                    first, values[end], end - start + 2)[1:-1]
+
+    @staticmethod
+    def categorizeSamples(samples, valid):
+        """Category (FIX, SAC or MIS) of each processed sample."""
+        with np.errstate(invalid='ignore'):
+            saccade = ((samples['velocity_x'] >= samples['raw_x']) |
+                       (samples['velocity_y'] >= samples['raw_y']))
+        categories = np.where(saccade, SAC, FIX).astype(np.uint8)
+        categories[~valid] = MIS
+        return categories
+
+    def parse(self, samples):
+        """Parse the samples of one session into eye events.
+
+        Args:
+            samples (ndarray): MonocularEyeSampleEvent or
+                BinocularEyeSampleEvent records of one session, in time
+                order.
+
+        Returns:
+            OrderedDict: Event type id -> structured array of the events of
+            that type (in the event class's NUMPY_DTYPE), for FIXATION_START,
+            FIXATION_END, SACCADE_START, SACCADE_END, BLINK_START and
+            BLINK_END.
+        """
+        samples, valid, info = self._processSamples(samples)
+        categories = self.categorizeSamples(samples, valid)
+        run_starts = np.flatnonzero(np.diff(categories)) + 1
+        run_categories = categories[run_starts]
+        # the last run is still open, so only has a start event
+        closed = np.arange(len(run_starts)) < len(run_starts) - 1
+
+        events = OrderedDict()
+        for category, start_class, end_class in (
+                (FIX, FixationStartEvent, FixationEndEvent),
+                (SAC, SaccadeStartEvent, SaccadeEndEvent),
+                (MIS, BlinkStartEvent, BlinkEndEvent)):
+            is_category = run_categories == category
+            starts = run_starts[is_category]
+            events[start_class.EVENT_TYPE_ID] = self._createStartEvents(
+                start_class, samples[starts])
+            events[end_class.EVENT_TYPE_ID] = self._createEndEvents(
+                end_class, samples, run_starts, is_category & closed, info)
+        return events
+
+    @staticmethod
+    def _copySampleFields(events, samples):
+        for field in ('experiment_id', 'session_id', 'device_id', 'event_id',
+                      'device_time', 'logged_time', 'time', 'eye', 'status'):
+            events[field] = samples[field]
+        events['filter_id'] = PARSER_FILTER_ID
+
+    def _createStartEvents(self, event_class, samples):
+        events = np.zeros(len(samples), dtype=event_class.NUMPY_DTYPE)
+        self._copySampleFields(events, samples)
+        events['type'] = event_class.EVENT_TYPE_ID
+        for field in _SAMPLE_FIELDS:
+            if field in events.dtype.names:
+                events[field] = samples[field]
+        return events
+
+    def _createEndEvents(self, event_class, samples, run_starts, runs, info):
+        """End events for the runs (bool mask) of samples starting at
+        run_starts. The angles of the start and end samples are those
+        when the online parser parses the sample after the run."""
+        run_ends = np.append(run_starts[1:], len(samples)) - 1
+        starts, ends = run_starts[runs], run_ends[runs]
+        events = np.zeros(len(starts), dtype=event_class.NUMPY_DTYPE)
+        names = events.dtype.names
+        start_samples, end_samples = samples[starts], samples[ends]
+        self._copySampleFields(events, end_samples)
+        events['type'] = event_class.EVENT_TYPE_ID
+        events['duration'] = end_samples['time'] - start_samples['time']
+        if event_class is BlinkEndEvent or not len(events):
+            return events
+
+        for field in _SAMPLE_FIELDS:
+            events['start_%s' % field] = start_samples[field]
+            events['end_%s' % field] = end_samples[field]
+        end_steps = info['steps'][ends + 1]
+        for prefix, rows in (('start', starts), ('end', ends)):
+            events['%s_angle_x' % prefix], events['%s_angle_y' % prefix] = \
+                info['angle_at'](rows, end_steps)
+
+        # averages and peaks over the samples of each run (the runs are
+        # consecutive, so reduceat over all run starts gives one per run)
+        counts = ends - starts + 1
+        for field in ('gaze_x', 'gaze_y', 'pupil_measure1', 'velocity_x',
+                      'velocity_y', 'velocity_xy'):
+            avg_field = 'average_%s' % field
+            if avg_field in names:
+                values = samples[field].astype(np.float64)
+                events[avg_field] = np.add.reduceat(
+                    values, run_starts)[runs] / counts
+        if 'average_pupil_measure1_type' in names:
+            events['average_pupil_measure1_type'] = \
+                end_samples['pupil_measure1_type']
+        for field in ('velocity_x', 'velocity_y', 'velocity_xy'):
+            events['peak_%s' % field] = np.maximum.reduceat(
+                samples[field], run_starts)[runs]
+
+        if event_class is SaccadeEndEvent:
+            gaze = info['gaze']
+            x_diff = gaze[0, ends] - gaze[0, starts]
+            y_diff = gaze[1, ends] - gaze[1, starts]
+            events['amplitude_x'] = x_diff
+            events['amplitude_y'] = y_diff
+            events['angle'] = np.rad2deg(np.arctan2(y_diff, x_diff))
+        return events
+
+    def parseSessions(self, samples):
+        """Parse the samples of any number of sessions (e.g. a whole sample
+        table), each session separately.
+
+        Returns:
+            OrderedDict: As returned by parse(), with the events of all
+            sessions.
+        """
+        samples = np.asarray(samples)
+        session_keys = np.stack((samples['experiment_id'],
+                                 samples['session_id']), axis=1)
+        sessions = np.unique(session_keys, axis=0) if len(samples) else []
+        all_events = OrderedDict()
+        for experiment_id, session_id in sessions:
+            session = samples[(samples['experiment_id'] == experiment_id) &
+                              (samples['session_id'] == session_id)]
+            session = session[np.argsort(session['time'], kind='mergesort')]
+            for etype, events in self.parse(session).items():
+                all_events.setdefault(etype, []).append(events)
+        for etype in list(all_events):
+            all_events[etype] = np.concatenate(all_events[etype])
+        return all_events
+
+    def parseFile(self, path):
+        """Parse the eye samples saved in an ioDataStore (hdf5) file.
+
+        The BinocularEyeSampleEvent table is used if it has any samples,
+        otherwise the MonocularEyeSampleEvent table.
+
+        Returns:
+            OrderedDict: As returned by parse(), with the events of all
+            sessions in the file.
+        """
+        samples = readSampleTable(path)
+        if samples is None:
+            print2err('OfflineEyeTrackerEventParser: no eye samples in ',
+                      path)
+            return OrderedDict()
+        return self.parseSessions(samples)
+
+    @staticmethod
+    def toEventLists(events):
+        """Convert events returned by parse() to a list of event value lists
+        (as the online parser outputs) in time order."""
+        event_lists = []
+        for records in events.values():
+            event_lists.extend([list(r) for r in records.tolist()])
+        event_lists.sort(key=lambda e: e[DeviceEvent.EVENT_HUB_TIME_INDEX])
+        return event_lists
+
+
+def readSampleTable(path):
+    """Read the eye samples of an ioDataStore file.
+
+    Returns:
+        ndarray or None: All rows of the BinocularEyeSampleEvent table if it
+        has any, otherwise of the MonocularEyeSampleEvent table; None if
+        neither has any.
+    """
+    import tables
+    with tables.open_file(path, 'r') as hub_file:
+        for table_name in ('BinocularEyeSampleEvent',
+                           'MonocularEyeSampleEvent'):
+            try:
+                table = hub_file.get_node(
+                    '/data_collection/events/eyetracker', table_name)
+            except tables.NoSuchNodeError:
+                continue
+            if table.nrows:
+                return table.read()
+    return None
+
+
+def _parseFileWorker(args):
+    path, parser_kwargs = args
+    return OfflineEyeTrackerEventParser(**parser_kwargs).parseFile(path)
+
+
+def parseFiles(paths, processes=None, **parser_kwargs):
+    """Parse the eye samples of several ioDataStore files in parallel.
+
+    Args:
+        paths (list): hdf5 files to parse.
+        processes (int or None): Number of worker processes (defaults to the
+            number of cpus). With 1 the files are parsed in this process.
+        parser_kwargs: OfflineEyeTrackerEventParser arguments.
+
+    Returns:
+        list: parseFile() result for each of paths.
+    """
+    jobs = [(path, parser_kwargs) for path in paths]
+    if processes == 1 or len(jobs) < 2:
+        return [_parseFileWorker(job) for job in jobs]
+    import multiprocessing
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_parseFileWorker, jobs)
+    finally:
+        pool.close()
+        pool.join()
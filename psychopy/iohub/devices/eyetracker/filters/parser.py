@@ -131,6 +131,8 @@ Data is filtered once, similar to what a 'normal' filter level would be in the
   eyelink<tm> system. Level = 2 would be similar to the 'extra' filter level
   setting of eyelink<tm>.
 """
+import numpy as np
+
 from ....constants import EventConstants
 from ....errors import print2err
 from ... import DeviceEvent, eventfilters
@@ -183,7 +185,7 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
             pos_filter_class, pos_filter_kwargs = eventfilters.PassThroughFilter, {}
 
         if velocity_filter:
-            vel_filter_class_name = position_filter.get(
+            vel_filter_class_name = velocity_filter.get(
                 'name', 'PassThroughFilter')
             vel_filter_class = getattr(eventfilters, vel_filter_class_name)
             del velocity_filter['name']
@@ -192,10 +194,10 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
             vel_filter_class, vel_filter_kwargs = eventfilters.PassThroughFilter, {}
 
         self.adaptive_x_vthresh_buffer = np.zeros(
-            self.vel_thresh_history_dur * sampling_rate)
+            int(self.vel_thresh_history_dur * sampling_rate))
         self.x_vthresh_buffer_index = 0
         self.adaptive_y_vthresh_buffer = np.zeros(
-            self.vel_thresh_history_dur * sampling_rate)
+            int(self.vel_thresh_history_dur * sampling_rate))
         self.y_vthresh_buffer_index = 0
 
         pos_filter_kwargs['event_type'] = MONOCULAR_EYE_SAMPLE
@@ -532,12 +534,12 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
     def _addVelocity(self, prev_event, current_event):
         io_ix = self.io_event_ix
 
-        dx = np_abs(
+        dx = np.abs(
             current_event[
                 io_ix('angle_x')] -
             prev_event[
                 io_ix('angle_x')])
-        dy = np_abs(
+        dy = np.abs(
             current_event[
                 io_ix('angle_y')] -
             prev_event[
@@ -825,7 +827,7 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                     'time')] - existing_start_event[self.io_event_ix('time')],
                 xDiff,
                 yDiff,
-                rad2deg(arctan(yDiff, xDiff)),
+                np.rad2deg(np.arctan2(yDiff, xDiff)),
                 existing_start_event[gx],
                 existing_start_event[gy],
                 0.0,
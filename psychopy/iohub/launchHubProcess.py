@@ -71,7 +71,12 @@ def run(rootScriptPathDir, configFilePath):
             m.start()
             glets.append(m)
 
-        tlet = gevent.spawn(s.processEventsTasklet, 0.01)
+        # with a shared event buffer there is no getEvents request to make
+        # the server process events, so do so more often
+        proc_interval = 0.01
+        if s.sharedEventBuffer is not None:
+            proc_interval = 0.001
+        tlet = gevent.spawn(s.processEventsTasklet, proc_interval)
         glets.append(tlet)
 
         if Computer.psychopy_process:
@@ -8,6 +8,7 @@ from past.builtins import xrange
 
 import os
 import sys
+import tempfile
 from operator import itemgetter
 from collections import deque, OrderedDict
 
@@ -28,10 +29,11 @@ from . import _pkgroot
 from . import IOHUB_DIRECTORY, EXP_SCRIPT_DIRECTORY, _DATA_STORE_AVAILABLE
 from .errors import print2err, printExceptionDetailsToStdErr, ioHubError
 from .net import MAX_PACKET_SIZE
+from .shmem import SharedEventBuffer, getSlotSize
 from .util import convertCamelToSnake, win32MessagePump
 from .util import yload, yLoader
 from .constants import DeviceConstants, EventConstants
-from .devices import DeviceEvent, import_device
+from .devices import DeviceEvent, import_device, groupEventsByType
 from .devices import Computer
 from .devices.deviceConfigValidation import validateDeviceConfiguration
 getTime = Computer.getTime
@@ -86,7 +88,8 @@ class udpServer(DatagramServer):
                                payload, replyTo], replyTo)
             return True
         elif request_type == 'GET_EVENTS':
-            return self.handleGetEvents(replyTo)
+            groupByType = bool(request and request.pop(0))
+            return self.handleGetEvents(replyTo, groupByType)
         elif request_type == 'EXP_DEVICE':
             return self.handleExperimentDeviceRequest(request, replyTo)
         elif request_type == 'CUSTOM_TASK':
@@ -187,7 +190,7 @@ class udpServer(DatagramServer):
         edata = ('CUSTOM_TASK_REPLY', request)
         self.sendResponse(edata, replyTo)
 
-    def handleGetEvents(self, replyTo):
+    def handleGetEvents(self, replyTo, groupByType=False):
         try:
             self.iohub.processDeviceEvents()
             currentEvents = list(self.iohub.eventBuffer)
@@ -197,6 +200,10 @@ class udpServer(DatagramServer):
                 currentEvents = sorted(
                     currentEvents, key=itemgetter(
                         DeviceEvent.EVENT_HUB_TIME_INDEX))
+                if groupByType:
+                    # [[type_id, [event, ...]], ...] so the client can
+                    # convert each type's events to an array in one go
+                    currentEvents = groupEventsByType(currentEvents)
                 self.sendResponse(
                     ('GET_EVENTS_RESULT', currentEvents), replyTo)
             else:
@@ -464,13 +471,25 @@ class udpServer(DatagramServer):
     def setProcessAffinity(processorList):
         return Computer.setCurrentProcessAffinity(processorList)
 
+    def getSharedEventBufferPath(self):
+        sbuf = self.iohub.sharedEventBuffer
+        if sbuf is not None:
+            return sbuf.path
+        return None
+
     def flushIODataStoreFile(self):
         dsfile = self.iohub.dsfile
         if dsfile:
-            dsfile.emrtFile.flush()
+            dsfile.flush()
             return True
         return False
 
+    def getDataStoreStats(self):
+        dsfile = self.iohub.dsfile
+        if dsfile:
+            return dsfile.getStats()
+        return None
+
     def shutDown(self):
         try:
             self.setPriority('normal')
@@ -508,6 +527,7 @@ class DeviceMonitor(Greenlet):
 
 class ioServer(object):
     eventBuffer = None
+    sharedEventBuffer = None
     deviceDict = {}
     _logMessageBuffer = deque(maxlen=128)
     _pyglet_window_hnds = []
@@ -544,6 +564,26 @@ class ioServer(object):
 
         self._addPubSubListeners()
 
+        self.sharedEventBuffer = None
+        if config.get('shared_event_buffer', False):
+            self._initSharedEventBuffer(ebuf_sz)
+
+    def _initSharedEventBuffer(self, slotCount):
+        # global event buffer events are written to a memory mapped file
+        # that the experiment process reads from directly
+        try:
+            evt_classes = [c for c in EventConstants._classes.values()
+                           if isinstance(c, type)]
+            path = os.path.join(tempfile.gettempdir(),
+                                'iohub_events_{}.buf'.format(os.getpid()))
+            self.sharedEventBuffer = SharedEventBuffer(
+                path, slotCount, getSlotSize(evt_classes), create=True)
+            self.log('Shared event buffer: {}'.format(path))
+        except Exception:
+            print2err('Error creating shared event buffer, using UDP.')
+            printExceptionDetailsToStdErr()
+            self.sharedEventBuffer = None
+
     def _initDataStore(self, config, script_dir):
         try:
             # initial dataStore setup
@@ -879,6 +919,9 @@ class ioServer(object):
         while self._running:
             stime = Computer.getTime()
             self.processDeviceEvents()
+            if self.dsfile:
+                # write events that have been staged for too long
+                self.dsfile.flushStaleStages()
             dur = sleep_interval - (Computer.getTime() - stime)
             gevent.sleep(max(0.001, dur))
 
@@ -913,7 +956,10 @@ class ioServer(object):
                 print2err('--------------------------------------')
 
     def _handleEvent(self, event):
-        self.eventBuffer.append(event)
+        if self.sharedEventBuffer is not None:
+            self.sharedEventBuffer.write(event)
+        else:
+            self.eventBuffer.append(event)
 
     def clearEventBuffer(self, call_proc_events=True):
         if call_proc_events is True:
@@ -963,6 +1009,10 @@ class ioServer(object):
 
             self.closeDataStoreFile()
 
+            if self.sharedEventBuffer is not None:
+                self.sharedEventBuffer.close(remove=True)
+                self.sharedEventBuffer = None
+
             while self.devices:
                 self.devices.pop(0)._close()
         except Exception:
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# Part of the psychopy.iohub library.
+# Copyright (C) 2012-2016 iSolver Software Solutions
+# Distributed under the terms of the GNU General Public License (GPL).
+"""Shared memory transport for the ioHub global event buffer.
+
+The ioHub Server writes each event for the global event buffer into a ring
+of fixed size slots in a memory mapped file, and the experiment process
+reads all new slots in one go, without a UDP request / reply. There is one
+writer (the server) and one reader (the experiment process): the writer
+only ever updates the write count and the reader only the read count, so
+no locking is needed.
+
+Each slot holds the event type id, followed by the event as a record of
+the event class's NUMPY_DTYPE (the same format the ioDataStore uses).
+"""
+from __future__ import division, absolute_import
+
+import os
+import mmap
+from collections import OrderedDict
+
+import numpy as np
+
+from .constants import EventConstants
+from .devices import DeviceEvent
+from .errors import print2err
+
+HEADER_SIZE = 64  # bytes, 8 uint64 values
+SLOT_HEADER_SIZE = 8  # bytes, uint16 event type and uint16 record size
+_MAGIC = 0x696f487562536876
+# header value indices
+_MAGIC_IX, _SLOT_COUNT_IX, _SLOT_SIZE_IX, _WRITE_IX, _READ_IX, _DROPPED_IX = \
+    range(6)
+
+
+def getSlotSize(eventClasses):
+    """Slot size (bytes) needed for events of any of the given classes."""
+    itemSize = max([c.NUMPY_DTYPE.itemsize for c in eventClasses] or [0])
+    size = SLOT_HEADER_SIZE + itemSize
+    return size + (-size % 8)  # keep slots 8 byte aligned
+
+
+def _encode(text, size):
+    """UTF-8 encode text, cut to at most size bytes without splitting a
+    character (so that it can be decoded again)."""
+    data = text.encode('utf-8')
+    if len(data) > size:
+        data = data[:size].decode('utf-8', 'ignore').encode('utf-8')
+    return data
+
+
+class SharedEventBuffer(object):
+    """Single writer / single reader ring buffer of events held in a memory
+    mapped file.
+
+    Args:
+        path (str): File to map.
+        slotCount (int): Number of events the buffer can hold (only used,
+            with slotSize, when create is True).
+        slotSize (int): Bytes per event (see getSlotSize).
+        create (bool): Create (or overwrite) the file, as the server does.
+            Otherwise the existing file is opened to read from.
+    """
+
+    def __init__(self, path, slotCount=None, slotSize=None, create=False):
+        self.path = path
+        if create:
+            with open(path, 'wb') as f:
+                f.truncate(HEADER_SIZE + slotCount * slotSize)
+        self._file = open(path, 'r+b')
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self._header = np.frombuffer(self._mmap, dtype=np.uint64,
+                                     count=HEADER_SIZE // 8)
+        if create:
+            self._header[:] = 0
+            self._header[_SLOT_COUNT_IX] = slotCount
+            self._header[_SLOT_SIZE_IX] = slotSize
+            self._header[_MAGIC_IX] = _MAGIC
+        elif self._header[_MAGIC_IX] != _MAGIC:
+            self.close()
+            raise ValueError('{} is not an ioHub event buffer'.format(path))
+        self.slotCount = int(self._header[_SLOT_COUNT_IX])
+        self.slotSize = int(self._header[_SLOT_SIZE_IX])
+        self._slots = np.frombuffer(
+            self._mmap, dtype=np.uint8, count=self.slotCount * self.slotSize,
+            offset=HEADER_SIZE).reshape(self.slotCount, self.slotSize)
+        self._tooBig = set()
+
+    @property
+    def dropped(self):
+        """Number of events the writer dropped because the buffer was full.
+        """
+        return int(self._header[_DROPPED_IX])
+
+    def __len__(self):
+        return int(self._header[_WRITE_IX] - self._header[_READ_IX])
+
+    # server side
+    def write(self, event):
+        """Add an event (list of attribute values) to the buffer. Returns
+        False if it was dropped because the buffer is full."""
+        header = self._header
+        writeCount = int(header[_WRITE_IX])
+        if writeCount - int(header[_READ_IX]) >= self.slotCount:
+            header[_DROPPED_IX] += 1
+            return False
+        etype = event[DeviceEvent.EVENT_TYPE_ID_INDEX]
+        dtype = EventConstants.getClass(etype).NUMPY_DTYPE
+        if SLOT_HEADER_SIZE + dtype.itemsize > self.slotSize:
+            if etype not in self._tooBig:
+                self._tooBig.add(etype)
+                print2err('SharedEventBuffer: events of type ', etype,
+                          ' are too big for the buffer and are dropped.')
+            header[_DROPPED_IX] += 1
+            return False
+        try:
+            record = np.array([tuple(event)], dtype=dtype)
+        except UnicodeEncodeError:
+            record = np.array([tuple(
+                _encode(v, dtype[i].itemsize)
+                if isinstance(v, type(u'')) else v
+                for i, v in enumerate(event))], dtype=dtype)
+        slot = self._slots[writeCount % self.slotCount]
+        slot[:4].view(np.uint16)[:] = (etype, dtype.itemsize)
+        slot[SLOT_HEADER_SIZE:SLOT_HEADER_SIZE + dtype.itemsize] = \
+            record.view(np.uint8)
+        # only now let the reader see it
+        header[_WRITE_IX] = writeCount + 1
+        return True
+
+    # client side
+    def clear(self):
+        """Discard any unread events."""
+        self._header[_READ_IX] = self._header[_WRITE_IX]
+
+    def readRecords(self):
+        """Read all new events as numpy record arrays (of each class's
+        NUMPY_DTYPE).
+
+        Returns:
+            OrderedDict: event type id -> record array, for the types that
+            occurred, in the order they were written.
+        """
+        header = self._header
+        readCount = int(header[_READ_IX])
+        nNew = int(header[_WRITE_IX]) - readCount
+        records = OrderedDict()
+        if nNew <= 0:
+            return records
+        i0 = readCount % self.slotCount
+        if i0 + nNew <= self.slotCount:
+            slots = self._slots[i0:i0 + nNew].copy()
+        else:
+            slots = np.concatenate(
+                (self._slots[i0:], self._slots[:i0 + nNew - self.slotCount]))
+        # the slots are copied so the writer can reuse them
+        header[_READ_IX] = readCount + nNew
+
+        types = slots[:, :2].copy().view(np.uint16)[:, 0]
+        uniqueTypes, firstIndices = np.unique(types, return_index=True)
+        for etype in uniqueTypes[np.argsort(firstIndices)]:
+            evtClass = EventConstants.getClass(int(etype))
+            if evtClass is None:
+                print2err('SharedEventBuffer: unknown event type ', etype)
+                continue
+            dtype = evtClass.NUMPY_DTYPE
+            rows = slots[types == etype,
+                         SLOT_HEADER_SIZE:SLOT_HEADER_SIZE + dtype.itemsize]
+            records[int(etype)] = np.ascontiguousarray(rows).view(
+                dtype).reshape(-1)
+        return records
+
+    def readArrays(self):
+        """Read all new events as a dict of numpy structured arrays (one per
+        event type, sorted by time) with str rather than bytes fields, as
+        returned by ioHubConnection.getEvents(as_type='numpy')."""
+        arrays = OrderedDict()
+        for etype, records in self.readRecords().items():
+            records = records[np.argsort(records['time'], kind='mergesort')]
+            evtClass = EventConstants.getClass(etype)
+            out = np.empty(len(records),
+                           dtype=evtClass._getClientNumpyDtype())
+            for name in records.dtype.names:
+                if records.dtype[name].kind == 'S':
+                    out[name] = np.char.decode(records[name], 'utf-8')
+                else:
+                    out[name] = records[name]
+            arrays[etype] = out
+        return arrays
+
+    def readEventLists(self):
+        """Read all new events as a list of event value lists (as sent by
+        the server over UDP) sorted by time."""
+        events = []
+        for records in self.readRecords().values():
+            strFields = [i for i, name in enumerate(records.dtype.names)
+                         if records.dtype[name].kind == 'S']
+            rows = [list(r) for r in records.tolist()]
+            for r in rows:
+                for i in strFields:
+                    r[i] = r[i].decode('utf-8')
+            events.extend(rows)
+        events.sort(key=lambda e: e[DeviceEvent.EVENT_HUB_TIME_INDEX])
+        return events
+
+    def close(self, remove=False):
+        """Unmap the file (and delete it if remove is True)."""
+        # views of the map must go before it can be closed
+        self._header = self._slots = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -29,19 +29,26 @@ messages, (which PsychoPy doesn't use) using the commands::
 """
 
 # Much of the code below is based conceptually, if not syntactically, on the
-# python logging module but it's simpler (no threading) and maintaining a
+# python logging module but it's simpler and maintaining a
 # stack of log entries for later writing (don't want files written while
-# drawing)
+# drawing). Optionally the writing itself can be done by a background
+# thread (see useWriterThread)
 
 from __future__ import absolute_import, print_function
 
 from builtins import object
 from past.builtins import basestring
 from os import path
+from collections import deque
 import atexit
 import sys
 import codecs
 import locale
+import threading
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue
 from psychopy import clock
 from psychopy.constants import PY3
 
@@ -122,16 +129,32 @@ def setDefaultClock(clock):
 
 
 class _LogEntry(object):
+    """A single logged message. Uses __slots__ to stay small because many
+    thousands of these may be created (and optionally retained).
+
+    Entries can be used directly with the logger's format string, e.g.
+    ``"%(t).4f %(message)s" % entry``
+    """
+    __slots__ = ('t', 'level', 'levelname', 'message', 'obj')
 
     def __init__(self, level, message, t=None, obj=None):
-        super(_LogEntry, self).__init__()
         self.t = t
-        self.t_ms = t * 1000
         self.level = level
         self.levelname = getLevel(level)
         self.message = message
         self.obj = obj
 
+    @property
+    def t_ms(self):
+        return self.t * 1000
+
+    def __getitem__(self, key):
+        # allows string formatting with %(attrib)s
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
 
 class LogFile(object):
     """A text stream to receive inputs from the logging system
@@ -210,6 +233,56 @@ class LogFile(object):
             pass
 
 
+class _LogWriter(threading.Thread):
+    """A daemon thread that formats and writes a logger's entries to its
+    targets, so that the thread calling flush() (typically the one drawing
+    the stimuli) never waits for string formatting or file I/O.
+
+    Flushes are requested through a queue. If `maxLatency` is given (in
+    secs) the thread also flushes by itself whenever that long has passed
+    without a request, so entries never wait longer than that to be written.
+    """
+
+    def __init__(self, logger, maxLatency=None):
+        super(_LogWriter, self).__init__(name='psychopy.logging writer')
+        self.daemon = True
+        self.logger = logger
+        self.maxLatency = maxLatency
+        self.queue = queue.Queue()
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.maxLatency)
+            except queue.Empty:  # maxLatency has passed
+                self._flush()
+                continue
+            try:
+                self._flush()
+                if item is None:  # request to stop
+                    break
+            finally:
+                self.queue.task_done()
+
+    def _flush(self):
+        try:
+            self.logger._writeEntries(self.logger._takeEntries())
+        except Exception as err:
+            # nowhere else to report it
+            sys.stderr.write('psychopy.logging writer failed: %s\n' % err)
+
+    def requestFlush(self):
+        self.queue.put(True)
+
+    def wait(self):
+        """Block until all requested flushes have completed"""
+        self.queue.join()
+
+    def stop(self):
+        self.queue.put(None)
+        self.join()
+
+
 class _Logger(object):
     """Maintains a set of log targets (text streams such as files of stdout)
 
@@ -217,17 +290,24 @@ class _Logger(object):
 
     """
 
-    def __init__(self, format="%(t).4f \t%(levelname)s \t%(message)s"):
+    def __init__(self, format="%(t).4f \t%(levelname)s \t%(message)s",
+                 retention=None):
         """The string-formatted elements %(xxxx)f can be used, where
         each xxxx is an attribute of the LogEntry.
         e.g. t, t_ms, level, levelname, message
+
+        `retention` sets how many flushed entries are kept in
+        `self.flushed` (see :meth:`setRetention`)
         """
         super(_Logger, self).__init__()
         self.targets = []
-        self.flushed = []
-        self.toFlush = []
+        # a deque because (with a writer thread) entries are taken from it
+        # on one thread while being appended on another
+        self.toFlush = deque()
         self.format = format
         self.lowestTarget = 50
+        self.writer = None
+        self.setRetention(retention)
 
     def __del__(self):
         self.flush()
@@ -236,6 +316,53 @@ class _Logger(object):
         # terminal or Builder output. proper fix: fix coder unicode bug #97
         # (currently closed)
 
+    def setRetention(self, retention=None):
+        """Set how many entries are kept (in `self.flushed`) once they
+        have been written to the targets.
+
+        - None: keep all of them (the default; memory use grows for as long
+          as the logger is used)
+        - 0: keep none of them
+        - N: keep (only) the most recent N entries
+        """
+        if retention is None:
+            flushed = []
+        else:
+            flushed = deque(maxlen=int(retention))
+        # keep the most recent entries we already have
+        flushed.extend(getattr(self, 'flushed', []))
+        self.flushed = flushed
+        self.retention = retention
+
+    def useWriterThread(self, use=True, maxLatency=None):
+        """If `use` is True, :meth:`flush` just hands the entries to a
+        background thread which formats them and writes them to the
+        targets, so that neither happens on the calling (e.g. drawing)
+        thread.
+
+        If `maxLatency` (secs) is given, the thread also writes any new
+        entries by itself at least that often, so flush() need not be
+        called at all.
+
+        Use :meth:`waitForWriter` to make sure everything has been written.
+        """
+        if self.writer is not None:
+            if use and self.writer.maxLatency == maxLatency:
+                return
+            writer = self.writer
+            self.writer = None
+            writer.stop()  # writes any remaining entries
+        if use:
+            self.writer = _LogWriter(self, maxLatency=maxLatency)
+            self.writer.start()
+
+    def waitForWriter(self):
+        """Block until the writer thread (if any) has written everything
+        that has been flushed
+        """
+        if self.writer is not None:
+            self.writer.wait()
+
     def addTarget(self, target):
         """Add a target, typically a :class:`~log.LogFile` to the logger
         """
@@ -272,23 +399,49 @@ class _Logger(object):
             _LogEntry(t=t, level=level, message=message, obj=obj))
 
     def flush(self):
-        """Process all current messages to each target
+        """Process all current messages to each target (or, if the
+        writer thread is in use, ask it to do so)
+        """
+        if self.writer is not None:
+            self.writer.requestFlush()
+        else:
+            self._writeEntries(self._takeEntries())
+
+    def flushAsync(self, maxLatency=None):
+        """Like :meth:`flush` but always returns immediately, leaving the
+        formatting and writing to the writer thread (which is started if
+        necessary, see :meth:`useWriterThread`)
+        """
+        if self.writer is None:
+            self.useWriterThread(True, maxLatency=maxLatency)
+        self.writer.requestFlush()
+
+    def _takeEntries(self):
+        """Remove and return the entries that are waiting to be flushed
         """
-        # loop through targets then entries in toFlush
-        # so that stream.flush can be called just once
-        formatted = {}  # keep a dict - so only do the formatting once
+        toFlush = self.toFlush
+        return [toFlush.popleft() for n in range(len(toFlush))]
+
+    def _writeEntries(self, entries):
+        """Format the entries and write them to the targets
+        """
+        if not entries:
+            return
+        # format each entry once, and only if some target wants it
+        fmt = self.format
+        lowest = self.lowestTarget
+        lines = [(thisEntry.level, fmt % thisEntry + '\n')
+                 for thisEntry in entries if thisEntry.level >= lowest]
+        # then a single write per target
         for target in self.targets:
-            for thisEntry in self.toFlush:
-                if thisEntry.level >= target.level:
-                    if not thisEntry in formatted:
-                        # convert the entry into a formatted string
-                        formatted[thisEntry] = self.format % thisEntry.__dict__
-                    target.write(formatted[thisEntry] + '\n')
-            if hasattr(target.stream, 'flush'):
-                target.stream.flush()
+            txt = ''.join([line for level, line in lines
+                           if level >= target.level])
+            if not txt:
+                continue
+            target.write(txt)
         # finished processing entries - move them to self.flushed
-        self.flushed.extend(self.toFlush)
-        self.toFlush = []  # a new empty list
+        if self.retention != 0:
+            self.flushed.extend(entries)
 
 root = _Logger()
 console = LogFile()
@@ -298,8 +451,49 @@ def flush(logger=root):
     """Send current messages in the log to all targets
     """
     logger.flush()
+
+
+def _flushAtExit(logger=root):
+    logger.flush()
+    logger.waitForWriter()
 # make sure this function gets called as python closes
-atexit.register(flush)
+atexit.register(_flushAtExit)
+
+
+def setRetention(retention=None, logger=root):
+    """Set how many log entries the logger keeps in memory after they have
+    been written to the log targets. None (the default) keeps all of them,
+    which in long sessions with detailed (e.g. EXP or DATA level) logging
+    can use a lot of memory. 0 keeps none and N keeps the most recent N.
+
+    usage::
+        logging.setRetention(0)
+    """
+    logger.setRetention(retention)
+
+
+def flushAsync(logger=root):
+    """Send current messages in the log to all targets, without waiting.
+
+    The messages are formatted and written by a background thread (started
+    on first use) so this is safe to call during time-critical parts of a
+    study, e.g. every frame. Everything is still written when Python exits.
+    """
+    logger.flushAsync()
+
+
+def useWriterThread(use=True, maxLatency=None, logger=root):
+    """Write log files from a background thread. :func:`flush` then
+    returns immediately and the formatting and file I/O don't happen on the
+    thread that is drawing stimuli.
+
+    If `maxLatency` (in secs) is given then messages are also written at
+    least that often without any need to call :func:`flush`.
+
+    usage::
+        logging.useWriterThread(True, maxLatency=0.5)
+    """
+    logger.useWriterThread(use, maxLatency=maxLatency)
 
 
 def critical(msg, t=None, obj=None):
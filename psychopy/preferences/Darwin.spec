@@ -48,6 +48,8 @@
     gammaErrorPolicy = option('abort', 'warn', default='abort')
     # Should the Builder and Coder "run" buttons add the experiment to runner view or skip straight to running it?
     useRunner = boolean(default='True')
+    # Store the glyphs of TextBox2 fonts in the user preferences folder, so they load faster next time
+    cacheFonts = boolean(default='True')
 
 # Application settings, applied to coder, builder, & prefs windows
 [app]
@@ -65,6 +65,33 @@ class HammingWindow(object):
         self.startWindow = numpy.hanning(self.winSamples*2)[0:self.winSamples]
         self.endWindow = numpy.hanning(self.winSamples*2)[self.winSamples:]
         self.finalWinStart = self.soundSamples-self.winSamples
+        # column versions to multiply (n, nChannels) blocks in place
+        self._startCol = self.startWindow.reshape(-1, 1)
+        self._endCol = self.endWindow.reshape(-1, 1)
+
+    def applyTo(self, block, t):
+        """Multiplies a block of samples by the window, in place (no new
+        arrays are created so this is safe to use in audio callbacks)
+
+        :param block: array of shape (nSamples, nChannels)
+        :param t: position in time (secs) of the first sample of the block
+            (rounded to the nearest sample, as the sounds index their
+            samples)
+        :return: the same block
+        """
+        startSample = int(round(t*self.sampleRate))
+        stopSample = startSample + len(block)
+        if startSample < self.winSamples:
+            # (part of) the block is in the start window
+            stop = min(self.winSamples, stopSample)
+            block[:stop-startSample] *= self._startCol[startSample:stop]
+        if self.finalWinStart < stopSample and startSample < self.soundSamples:
+            # (part of) the block is in the end window
+            start = max(self.finalWinStart, startSample)
+            stop = min(self.soundSamples, stopSample)
+            block[start-startSample:stop-startSample] *= \
+                self._endCol[start-self.finalWinStart:stop-self.finalWinStart]
+        return block
 
     def nextBlock(self, t, blockSize):
         """Returns a block to be multiplied with the current sound block or 1.0
@@ -10,6 +10,7 @@ import os
 import time
 import re
 import atexit
+import threading
 
 try:
     import readline  # Work around GH-2230
@@ -17,6 +18,7 @@ except ImportError:
     pass  # all that will happen is the stderr/stdout might get redirected
 
 from psychopy import logging, exceptions
+from psychopy.clock import getTime
 from psychopy.constants import (PLAYING, PAUSED, FINISHED, STOPPED,
                                 NOT_STARTED, PY3)
 from psychopy.exceptions import SoundFormatError, DependencyError
@@ -38,6 +40,31 @@ travisCI = bool(str(os.environ.get('TRAVIS')).lower() == 'true')
 logging.info("Loaded SoundDevice with {}".format(sd.get_portaudio_version()[1]))
 
 
+def _tonePeriodSamples(freq, sampleRate, maxSamples=None):
+    """Returns the length (in samples) of the shortest whole number of
+    periods of a tone of `freq` Hz, so that the table of a tone can be
+    repeated without a discontinuity, or None if not even one period
+    fits in `maxSamples`.
+
+    When no whole number of periods fits exactly in up to `maxSamples`
+    (default 1 s of samples) the number of periods whose length is
+    closest to a whole number of samples is used; the phase then jumps by
+    less than a sample's worth each time the table repeats.
+    """
+    if maxSamples is None:
+        maxSamples = int(sampleRate)
+    if freq == 0:
+        return 1  # silence
+    period = sampleRate / abs(float(freq))
+    if period > maxSamples:
+        return None  # not even one period fits, so store the whole tone
+    lengths = np.arange(1, int(maxSamples / period) + 1) * period
+    errors = np.abs(lengths - np.round(lengths))
+    exact = np.flatnonzero(errors < 1e-6)
+    best = exact[0] if len(exact) else np.argmin(errors)
+    return max(int(round(lengths[best])), 1)
+
+
 def init(rate=44100, stereo=True, buffer=128):
     pass  # for compatibility with other backends
 
@@ -67,6 +94,10 @@ def getDevices(kind=None):
 defaultInput = None
 defaultOutput = None
 
+# number of bins in the histogram of callback durations. The bins span 0 to
+# 2 block periods, the last one also counts anything longer
+callbackHistBins = 64
+
 
 def getStreamLabel(sampleRate, channels, blockSize):
     """Returns the string repr of the stream label
@@ -159,6 +190,17 @@ class _SoundStream(object):
         if device == 'default':
             device = None
         self.sounds = []  # list of dicts for sounds currently playing
+        # the callback iterates over this snapshot of self.sounds (replaced
+        # whenever a sound is added or removed) so it needn't copy the list
+        self._playing = ()
+        self._soundsLock = threading.Lock()
+        # scratch buffers (one per number of channels) that sounds write
+        # their blocks into, so mixing doesn't create arrays in the callback
+        self._scratch = {}
+        for nChannels in set([1, channels]):
+            self._scratch[nChannels] = np.zeros((blockSize, nChannels),
+                                                dtype=np.float32)
+        self.resetCallbackStats()
         self.takeTimeStamp = False
         self.frameN = 1
         # self.frameTimes = range(5)  # DEBUGGING: store the last 5 callbacks
@@ -193,46 +235,93 @@ class _SoundStream(object):
             logging.info("Entered callback: {} ms after sound start"
                          .format(
                 (time.time() - self._tSoundRequestPlay) * 1000))
-        t0 = time.time()
+        t0 = getTime()
         self.frameN += 1
         toSpk.fill(0)
-        for thisSound in list(self.sounds): # copy (Py2 doesn't have list.copy)
-            dat = thisSound._nextBlock()  # fetch the next block of data
-            dat *= thisSound.volume  # Set the volume block by block
-            if self.channels == 2 and len(dat.shape) == 2:
-                toSpk[:len(dat), :] += dat  # add to out stream
-            elif self.channels == 2 and len(dat.shape) == 1:
-                toSpk[:len(dat), 0] += dat  # add to out stream
-                toSpk[:len(dat), 1] += dat  # add to out stream
-            elif self.channels == 1 and len(dat.shape) == 2:
-                toSpk[:len(dat), :] += dat  # add to out stream
-            else:
-                toSpk[:len(dat), 0] += dat  # add to out stream
+        for thisSound in self._playing:
+            scratch = self._scratch.get(thisSound._nChannels)
+            if scratch is None:  # unusual channels (only allocated once)
+                scratch = np.zeros((self.blockSize, thisSound._nChannels),
+                                   dtype=np.float32)
+                self._scratch[thisSound._nChannels] = scratch
+            block = scratch[:blockSize]
+            # the sound writes its data (with volume) into our buffer
+            nSamples = thisSound._fillBlock(block)
+            # add to out stream (mono sounds broadcast to all channels)
+            toSpk[:nSamples] += block[:nSamples]
             # check if that was a short block (sound is finished)
-            if len(dat) < len(toSpk[:, :]):
+            if nSamples < blockSize:
                 self.remove(thisSound)
-                thisSound._EOS()
-                # check if that took a long time
-                # t1 = time.time()
-                # if (t1-t0) > 0.001:
-                #     logging.debug("buffer_callback took {:.3f}ms that frame"
-                #                  .format((t1-t0)*1000))
-                # self.frameTimes.pop(0)
-                # if hasattr(self, 'lastFrameTime'):
-                #     self.frameTimes.append(time.time()-self.lastFrameTime)
-                # self.lastFrameTime = time.time()
-                # if self.takeTimeStamp:
-                #     logging.debug("Callback durations: {}".format(self.frameTimes))
-                #     self.takeTimeStamp = False
+                if thisSound.status != STOPPED:
+                    thisSound._EOS()
+        if status and status.output_underflow:
+            self._nUnderflows += 1
+        # record how long that took (in preallocated counters)
+        dur = getTime() - t0
+        self._durCounts[min(int(dur / self._durBinWidth),
+                            callbackHistBins - 1)] += 1
+        self._durTotal += dur
+        if dur > self._durMax:
+            self._durMax = dur
+        if dur > self._blockPeriod:
+            self._nLate += 1
+
+    def resetCallbackStats(self):
+        """Clears the statistics of callback durations (see
+        :meth:`getCallbackStats`)
+        """
+        self._blockPeriod = self.blockSize / float(self.sampleRate)
+        self._durBinWidth = 2.0 * self._blockPeriod / (callbackHistBins - 1)
+        self._durCounts = np.zeros(callbackHistBins, dtype=np.int64)
+        self._durTotal = 0.0
+        self._durMax = 0.0
+        self._nLate = 0
+        self._nUnderflows = 0
+
+    def getCallbackStats(self):
+        """Returns statistics of how long the audio callback has taken,
+        since the stream started or :meth:`resetCallbackStats` was called.
+
+        Callbacks taking longer than the duration of a block (blockSize /
+        sampleRate) are likely to cause underruns (glitches in the sound)
+        so this can help to diagnose those, e.g.::
+
+            snd = sound.Sound('A')
+            ...
+            stats = snd.stream.getCallbackStats()
+            print(stats['nLate'], stats['nUnderflows'])
+
+        :return: dict with keys:
+            - histogram: number of callbacks per bin of duration
+            - binEdges: the edges (secs) of those bins. The last bin also
+              counts any callbacks longer than its upper edge
+            - blockPeriod: the time (secs) available for each callback
+            - nCallbacks, meanDuration, maxDuration
+            - nLate: callbacks that took longer than blockPeriod
+            - nUnderflows: underflows reported by PortAudio
+        """
+        counts = self._durCounts.copy()
+        nCallbacks = int(counts.sum())
+        return {
+            'histogram': counts,
+            'binEdges': np.arange(callbackHistBins + 1) * self._durBinWidth,
+            'blockPeriod': self._blockPeriod,
+            'nCallbacks': nCallbacks,
+            'meanDuration': self._durTotal / nCallbacks if nCallbacks else 0.0,
+            'maxDuration': self._durMax,
+            'nLate': self._nLate,
+            'nUnderflows': self._nUnderflows}
 
     def add(self, sound):
-        # t0 = time.time()
-        self.sounds.append(sound)
-        # logging.debug("took {} ms to add".format((time.time()-t0)*1000))
+        with self._soundsLock:
+            self.sounds.append(sound)
+            self._playing = tuple(self.sounds)
 
     def remove(self, sound):
-        if sound in self.sounds:
-            self.sounds.remove(sound)
+        with self._soundsLock:
+            if sound in self.sounds:
+                self.sounds.remove(sound)
+                self._playing = tuple(self.sounds)
 
     def __del__(self):
         if hasattr(self, '_sdStream'):
@@ -312,6 +401,7 @@ class SoundDeviceSound(_SoundBase):
         self.sndArr = None
         self.hamming = hamming
         self._hammingWindow = None  # will be created during setSound
+        self._toneTable = None  # precomputed samples for a tone
 
         # setSound (determines sound type)
         self.setSound(value, secs=self.secs, octave=self.octave,
@@ -390,6 +480,10 @@ class SoundDeviceSound(_SoundBase):
             self._hammingWindow = HammingWindow(winSecs=hammDur,
                                                 soundSecs=self.secs,
                                                 sampleRate=self.sampleRate)
+        else:
+            self._hammingWindow = None
+        if self.sourceType == 'freq':
+            self._makeToneTable()
 
     def _setSndFromFile(self, filename):
         self.sndFile = f = sf.SoundFile(filename)
@@ -434,6 +528,22 @@ class SoundDeviceSound(_SoundBase):
         if self.stereo == -1:
             self.stereo = 0
 
+    def _makeToneTable(self):
+        """Computes the samples of a whole number of periods of the tone
+        once, so that playing it only needs to copy blocks of the table
+        (indexed modulo its length). Tones lasting less than the table are
+        stored in full. The hamming window is applied block by block.
+        """
+        nSamples = max(int(round(self.secs * self.sampleRate)), 0)
+        nPeriodSamples = _tonePeriodSamples(self.freq, self.sampleRate)
+        if nPeriodSamples is not None:
+            nSamples = min(nSamples, nPeriodSamples)
+        xx = np.arange(nSamples, dtype=np.float64)
+        xx *= 2 * np.pi * self.freq / self.sampleRate
+        table = np.sin(xx).astype(np.float32)
+        table.shape = [nSamples, 1]
+        self._toneTable = table
+
     def _setSndFromArray(self, thisArray):
 
         self.sndArr = np.asarray(thisArray)
@@ -505,62 +615,90 @@ class SoundDeviceSound(_SoundBase):
             self.seek(0)
         self.status = STOPPED
 
+    @property
+    def _nChannels(self):
+        """Number of channels in the blocks from _fillBlock"""
+        if self.sourceType == 'freq':
+            return 1
+        elif self.sourceType == 'file' and self.preBuffer == 0:
+            return self.sndFile.channels
+        else:
+            return self.sndArr.shape[1]
+
     def _nextBlock(self):
+        """Returns the next block of samples (with volume applied) as a new
+        array. The stream uses _fillBlock instead, to avoid creating arrays.
+        """
         if self.status == STOPPED:
             return
-        samplesLeft = int((self.stopTime - self.t) * self.sampleRate)
-        nSamples = min(self.blockSize, samplesLeft)
+        block = np.zeros((self.blockSize, self._nChannels), dtype=np.float32)
+        nSamples = self._fillBlock(block)
+        return block[:nSamples]
+
+    def _fillBlock(self, out):
+        """Writes the next block of samples, with the volume and hamming
+        window applied, into `out` (an array of shape (blockSize, nChannels)
+        provided by the stream) in place.
+
+        Returns the number of samples written, which is less than len(out)
+        when the sound has finished.
+        """
+        if self.status == STOPPED:
+            return 0
+        blockSize = len(out)
+        if self.sourceType == 'freq':
+            # copy from the precomputed periods of the tone
+            ii = int(round(self.t * self.sampleRate))
+            totalSamples = int(round(self.secs * self.sampleRate))
+            nSamples = max(min(blockSize, totalSamples - ii), 0)
+            table = self._toneTable
+            nTable = len(table)
+            done = 0
+            while done < nSamples:
+                start = (ii + done) % nTable
+                n = min(nTable - start, nSamples - done)
+                np.multiply(table[start:start + n], self.volume,
+                            out=out[done:done + n])
+                done += n
+            out[nSamples:] = 0  # run beyond our desired t so set to zeros
+            if self._hammingWindow and nSamples:
+                self._hammingWindow.applyTo(out[:nSamples], self.t)
+            self.t += blockSize/float(self.sampleRate)
+            if self.t > self.secs:
+                # inform our EOS function that we finished
+                self._EOS(reset=False)  # don't set t=0
+            return blockSize
+
         if self.sourceType == 'file' and self.preBuffer == 0:
             # streaming sound block-by-block direct from file
-            block = self.sndFile.read(nSamples)
+            nSamples = blockSize
+            if self.stopTime and self.stopTime > 0:
+                samplesLeft = int((self.stopTime - self.t) * self.sampleRate)
+                nSamples = max(min(blockSize, samplesLeft), 0)
+            nSamples = len(self.sndFile.read(out=out[:nSamples]))
+            out[:nSamples] *= self.volume
             # TODO: check if we already finished using sndFile?
         elif (self.sourceType == 'file' and self.preBuffer == -1) \
                 or self.sourceType == 'array':
             # An array, or a file entirely loaded into an array
+            samplesLeft = int((self.stopTime - self.t) * self.sampleRate)
+            nSamples = min(blockSize, samplesLeft)
             ii = int(round(self.t * self.sampleRate))
-            if self.stereo == 1:  # don't treat as boolean. Might be -1
-                block = self.sndArr[ii:ii + nSamples, :]
-            elif self.stereo == 0:
-                block = self.sndArr[ii:ii + nSamples]
-            else:
-                raise IOError("Unknown stereo type {!r}"
-                              .format(self.stereo))
+            nCopy = max(min(nSamples, len(self.sndArr) - ii), 0)
+            # copy and scale in one go (leaving sndArr untouched)
+            np.multiply(self.sndArr[ii:ii + nCopy], self.volume,
+                        out=out[:nCopy])
             if ii + nSamples > len(self.sndArr):
                 self._EOS()
-
-        elif self.sourceType == 'freq':
-            startT = self.t
-            stopT = self.t + self.blockSize/float(self.sampleRate)
-            xx = np.linspace(
-                start=startT * self.freq * 2 * np.pi,
-                stop=stopT * self.freq * 2 * np.pi,
-                num=self.blockSize, endpoint=False
-            )
-            xx.shape = [self.blockSize, 1]
-            block = np.sin(xx)
-            # if run beyond our desired t then set to zeros
-            if stopT > (self.secs):
-                tRange = np.linspace(startT, self.blockSize*self.sampleRate,
-                                     num=self.blockSize, endpoint=False)
-                block[tRange > self.secs] = 0
-                # and inform our EOS function that we finished
-                self._EOS(reset=False)  # don't set t=0
-
+            nSamples = nCopy
         else:
             raise IOError("SoundDeviceSound._nextBlock doesn't correctly handle"
                           "{!r} sounds yet".format(self.sourceType))
 
-        if self._hammingWindow:
-            thisWin = self._hammingWindow.nextBlock(self.t, self.blockSize)
-            if thisWin is not None:
-                if len(block) == len(thisWin):
-                    block *= thisWin
-                elif block.shape[0] == 0:
-                    pass
-                else:
-                    block *= thisWin[0:len(block)]
-        self.t += self.blockSize/float(self.sampleRate)
-        return block
+        if self._hammingWindow and nSamples:
+            self._hammingWindow.applyTo(out[:nSamples], self.t)
+        self.t += blockSize/float(self.sampleRate)
+        return nSamples
 
     def seek(self, t):
         self.t = t
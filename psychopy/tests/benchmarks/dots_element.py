@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Frame-time benchmark of a DotStim with a GratingStim element: drawing the
+elements in one batch versus moving and drawing the element once per dot.
+
+Not part of the test suite (it needs a display). Usage:
+
+    python psychopy/tests/benchmarks/dots_element.py [nFrames]
+
+The window is not synchronised to the screen refresh (waitBlanking=False) so
+that the times are of the drawing itself.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+
+import numpy as np
+
+from psychopy import core, visual
+
+DOT_COUNTS = [10, 50, 100, 200, 500, 1000]
+
+
+def frameTimes(win, dots, nFrames):
+    """Times (s) from the start of drawing to the end of each flip"""
+    clock = core.Clock()
+    times = []
+    for frameN in range(nFrames):
+        clock.reset()
+        dots.draw()
+        win.flip()
+        times.append(clock.getTime())
+    return np.array(times[1:])  # the first includes the setting up
+
+
+if __name__ == "__main__":
+    nFrames = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    win = visual.Window([800, 800], units='pix', waitBlanking=False)
+    element = visual.GratingStim(win, units='pix', size=16, sf=0.1,
+                                 mask='gauss')
+    print("median frame time (ms) over {} frames".format(nFrames))
+    print("{:>6} {:>10} {:>10} {:>8}".format(
+        "nDots", "per dot", "batched", "speedup"))
+    for nDots in DOT_COUNTS:
+        dots = visual.DotStim(win, nDots=nDots, fieldSize=700, speed=2,
+                              dotLife=30, element=element)
+        dots.batchElements = False
+        perDot = np.median(frameTimes(win, dots, nFrames))
+        dots.batchElements = True
+        batched = np.median(frameTimes(win, dots, nFrames))
+        print("{:>6} {:>10.2f} {:>10.2f} {:>8.1f}".format(
+            nDots, perDot * 1000, batched * 1000, perDot / batched))
+    win.close()
+    core.quit()
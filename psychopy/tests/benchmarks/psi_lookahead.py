@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the PsiHandler updates for several grid sizes: the size of
+the 4-D grid, and the time `addResponse` takes (the time between the
+response and the next stimulus being known) with and without look-ahead,
+with float64 and float32 grids. Each trial lasts `trialDur` s, during which
+the look-ahead runs.
+
+Not part of the test suite. Usage:
+
+    python psychopy/tests/benchmarks/psi_lookahead.py [trialDur]
+
+The default trial duration is 0.5 s.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from psychopy import data, logging
+
+N_TRIALS = 8
+PRECISIONS = [0.04, 0.02, 0.01, 0.005]  # of intensity, alpha and beta
+
+
+def timeRun(precision, trialDur, lookAhead, dtype):
+    """Returns the size of the grid (in MB) and the mean time per
+    addResponse (in s)"""
+    psi = data.PsiHandler(N_TRIALS, [0, 1], [0.1, 0.9], [0.05, 0.5],
+                          precision, precision, precision, 0.04,
+                          lookAhead=lookAhead, dtype=dtype)
+    rng = np.random.RandomState(1)
+    total = 0
+    for intensity in psi:
+        time.sleep(trialDur)
+        t0 = timeit.default_timer()
+        psi.addResponse(int(rng.rand() < 0.5 + 0.5 * (intensity > 0.5)))
+        total += timeit.default_timer() - t0
+    return psi._psi._probLambdaGivenXResponse.nbytes / 2 ** 20, \
+        total / N_TRIALS
+
+
+if __name__ == "__main__":
+    trialDur = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    logging.console.setLevel(logging.ERROR)
+    print("trials of {} s".format(trialDur))
+    print("{:>10} {:>8} {:>10} {:>14} {:>16}".format(
+        "precision", "dtype", "grid (MB)", "update (ms)",
+        "look-ahead (ms)"))
+    for precision in PRECISIONS:
+        for dtype in ['float64', 'float32']:
+            size, sync = timeRun(precision, trialDur, False, dtype)
+            _, ahead = timeRun(precision, trialDur, True, dtype)
+            print("{:>10} {:>8} {:>10.1f} {:>14.1f} {:>16.1f}".format(
+                precision, dtype, size, sync * 1e3, ahead * 1e3))
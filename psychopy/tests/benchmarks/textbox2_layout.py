@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Micro-benchmark of TextBox2 layout: laying out all of the text on every
+key press versus the incremental layout of `TextLayout`.
+
+Not part of the test suite. Usage:
+
+    python psychopy/tests/benchmarks/textbox2_layout.py [nChars]
+
+The glyph metrics are made up (no font file, freetype or OpenGL context is
+needed) so that only the cost of the layout itself is measured.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import timeit
+
+from psychopy.visual.textbox2.layout import TextLayout
+
+LINE_MAX = 500.0
+LINE_HEIGHT = 38.0
+
+_words = ("the quick brown fox jumps over the lazy dog while "
+          "psychophysicists measure well-known thresholds").split()
+
+
+class _Glyph(object):
+    def __init__(self, charcode):
+        n = ord(charcode)
+        width = 10 + n % 9
+        self.size = (width, 24)
+        self.offset = (1, 22)
+        self.advance = (width + 2, 0)
+        self.texcoords = (0, 0, 0.01, 0.01)
+
+
+class _Font(object):
+    """Stands in for a GLFont: a 32 pix font with variable width glyphs"""
+    size = 32
+    height = 38
+    descender = -8
+
+    def __init__(self):
+        self._glyphs = {}
+
+    def __getitem__(self, charcode):
+        if charcode not in self._glyphs:
+            self._glyphs[charcode] = _Glyph(charcode)
+        return self._glyphs[charcode]
+
+
+def makeText(nChars):
+    words = []
+    n = 0
+    while n < nChars:
+        word = _words[len(words) % len(_words)]
+        if len(words) % 40 == 39:
+            word += "\n"  # paragraphs
+        words.append(word)
+        n += len(word) + 1
+    return " ".join(words)[:nChars]
+
+
+def typing(text, nKeys, where):
+    """The successive texts of typing `nKeys` chars (and then deleting them)
+    at `where` ('end', 'middle' or 'start')"""
+    index = {'end': len(text), 'middle': len(text) // 2, 'start': 0}[where]
+    typed = makeText(nKeys)
+    texts = []
+    for n in range(1, nKeys + 1):
+        texts.append(text[:index] + typed[:n] + text[index:])
+    texts.extend(texts[-2::-1])  # backspace
+    return [thisText + "\n" for thisText in texts]
+
+
+def run(texts, incremental):
+    font = _Font()
+    layout = TextLayout()
+    layout.update(texts[0], font, LINE_MAX, LINE_HEIGHT)
+
+    def typeAll():
+        for text in texts:
+            if not incremental:
+                layout.clear()
+            layout.update(text, font, LINE_MAX, LINE_HEIGHT)
+
+    return min(timeit.repeat(typeAll, number=1, repeat=3)) / len(texts)
+
+
+if __name__ == "__main__":
+    nChars = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    text = makeText(nChars)
+    print("layout time per key press, {} chars of text".format(nChars))
+    print("{:>8} {:>12} {:>12} {:>8}".format(
+        "where", "full (ms)", "incr (ms)", "speedup"))
+    for where in ['end', 'middle', 'start']:
+        texts = typing(text, 50, where)
+        full = run(texts, incremental=False)
+        incr = run(texts, incremental=True)
+        print("{:>8} {:>12.3f} {:>12.3f} {:>8.1f}".format(
+            where, full * 1000, incr * 1000, full / incr))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the trial handlers' sequencing: the time to create the
+sequence and the time per trial near the start and near the end of a long
+run (which should be the same, as each trial is a lookup in the sequence).
+
+Not part of the test suite. Usage:
+
+    python psychopy/tests/benchmarks/trial_sequencing.py [nTrials]
+
+The default is 10^6 trials (of 10 conditions). TrialHandler2 keeps a dict
+for every trial, so use fewer trials if memory is short.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import timeit
+
+from psychopy import data, logging
+
+N_CONDITIONS = 10
+N_TIMED = 10000  # trials timed at the start and at the end
+
+
+def timeRun(cls, method, nReps):
+    """Returns the setup time and the times per trial for the first and
+    last `N_TIMED` trials (all in s)"""
+    conditions = [{'cond': n, 'ori': n * 10} for n in range(N_CONDITIONS)]
+    t0 = timeit.default_timer()
+    trials = cls(conditions, nReps, method=method, seed=1, autoLog=False)
+    setup = timeit.default_timer() - t0
+    nTotal = trials.nTotal
+    times = {}
+    t0 = timeit.default_timer()
+    for thisTrial in trials:
+        trials.addData('resp', 1)
+        if trials.thisN + 1 == N_TIMED:
+            times['first'] = (timeit.default_timer() - t0) / N_TIMED
+        elif trials.thisN + 1 == nTotal - N_TIMED:
+            t0 = timeit.default_timer()
+    times['last'] = (timeit.default_timer() - t0) / N_TIMED
+    return setup, times['first'], times['last']
+
+
+if __name__ == "__main__":
+    nTrials = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    nReps = max(nTrials // N_CONDITIONS, 3 * N_TIMED // N_CONDITIONS)
+    logging.console.setLevel(logging.ERROR)
+    print("{} trials ({} conditions x {} repeats)".format(
+        nReps * N_CONDITIONS, N_CONDITIONS, nReps))
+    print("{:>14} {:>11} {:>10} {:>12} {:>12}".format(
+        "handler", "method", "setup (s)", "first (us)", "last (us)"))
+    for cls in [data.TrialHandler, data.TrialHandler2]:
+        for method in ['sequential', 'random', 'fullRandom']:
+            setup, first, last = timeRun(cls, method, nReps)
+            print("{:>14} {:>11} {:>10.3f} {:>12.1f} {:>12.1f}".format(
+                cls.__name__, method, setup, first * 1e6, last * 1e6))
@@ -2,7 +2,7 @@ from __future__ import division
 from builtins import object
 
 import sys, os, copy
-from psychopy import visual, monitors, prefs, constants
+from psychopy import visual, monitors, prefs, constants, core
 from psychopy.visual import filters
 from psychopy.tools.coordinatetools import pol2cart
 from psychopy.tests import utils
@@ -274,6 +274,28 @@ class _baseVisualTest(object):
         win.flip()
         str(image)
 
+    def test_noiseSampleBank(self):
+        win = self.win
+        noise = visual.NoiseStim(win=win, units='pix', size=(64, 64),
+                                 noiseType='White', noiseClip=4.0)
+        noise.makeSampleBank(nSamples=4)
+        for n in range(100):  # wait up to 1s for the samples
+            if noise.nSamplesReady == 4:
+                break
+            core.wait(0.01)
+        assert noise.nSamplesReady == 4
+        noise.updateNoise()
+        assert noise.nSamplesReady < 4
+        noise.draw()
+        # rebuilding (after a parameter change) keeps the bank going
+        noise.noiseClip = 3.0
+        noise.draw()
+        assert noise.nSamplesReady <= 4
+        noise.clearSampleBank()
+        assert noise.nSamplesReady == 0
+        noise.updateNoise()  # made as usual
+        win.flip()
+
     def test_envelopeBeatAndRaisedCos(self):
         win = self.win
         size = numpy.array([2.0,2.0])*self.scaleFactor
@@ -663,6 +685,25 @@ class _baseVisualTest(object):
         assert not numpy.alltrue(prevVerticesPix==dots.verticesPix), \
             "dots.verticesPix failed to change after dots.setPos()"
 
+    def test_dotsElement(self):
+        win = self.win
+        if not win._haveShaders:
+            pytest.skip("Batched dot elements require shaders, which aren't available")
+        element = visual.GratingStim(win, units='pix', size=10, sf=0.2,
+                                     mask='gauss')
+        # static dots so that both draws are of the same positions
+        dots = visual.DotStim(win, nDots=50, fieldSize=1*self.scaleFactor,
+                              speed=0, dotLife=-1, element=element)
+        assert dots._canBatchElement()
+        dots.draw()
+        batched = numpy.array(win._getFrame(buffer='back'), float)
+        win.flip()
+        dots.batchElements = False
+        dots.draw()
+        perDot = numpy.array(win._getFrame(buffer='back'), float)
+        win.flip()
+        assert numpy.abs(batched - perDot).mean() < 1
+
     def test_element_array(self):
         win = self.win
         if not win._haveShaders:
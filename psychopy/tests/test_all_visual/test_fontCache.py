@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Tests for the TextBox2 glyph atlas cache (no window needed)"""
+
+import os
+import shutil
+from tempfile import mkdtemp
+
+import numpy as np
+import pytest
+
+pytest.importorskip('freetype')
+pytest.importorskip('OpenGL')
+
+from psychopy import prefs
+from psychopy.visual.textbox2 import fontmanager
+from psychopy.visual.textbox2.fontmanager import GLFont
+
+fontPath = os.path.join(prefs.paths['psychopy'], 'app', 'Resources',
+                        'DejaVuSerif.ttf')
+
+
+class TestFontCache(object):
+    def setup_method(self, method):
+        self.cacheDir = mkdtemp(prefix='psychopy-tests-fontCache')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.cacheDir)
+
+    def test_roundTrip(self):
+        font = GLFont(fontPath, 24, textureSize=512)
+        font.fetch(u'abcxyzé€ 1')
+        assert font._unsaved
+        path = font.saveToCache(self.cacheDir)
+        assert os.path.isfile(path) and not font._unsaved
+        # saving again replaces the file
+        assert font.saveToCache(self.cacheDir) == path
+
+        loaded = GLFont(fontPath, 24, textureSize=512)
+        assert loaded.loadFromCache(self.cacheDir)
+        assert np.array_equal(loaded.atlas.data, font.atlas.data)
+        assert loaded.atlas.nodes == [tuple(n) for n in font.atlas.nodes]
+        assert loaded.atlas.used == font.atlas.used
+        assert sorted(loaded.glyphs) == sorted(font.glyphs)
+        for charcode, glyph in font.glyphs.items():
+            other = loaded.glyphs[charcode]
+            assert tuple(other.size) == tuple(glyph.size)
+            assert tuple(other.offset) == tuple(glyph.offset)
+            assert np.allclose(other.advance, glyph.advance)
+            assert np.allclose(other.texcoords, glyph.texcoords)
+
+        # new glyphs go into the free space of the restored atlas
+        loaded.fetch(u'Q')
+        assert loaded._unsaved
+        glyphQ = loaded.glyphs[u'Q']
+        fresh = GLFont(fontPath, 24, textureSize=512)
+        fresh.fetch(u'abcxyzé€ 1')
+        fresh.fetch(u'Q')
+        assert np.allclose(glyphQ.texcoords, fresh.glyphs[u'Q'].texcoords)
+
+    def test_mismatch(self, monkeypatch):
+        font = GLFont(fontPath, 24, textureSize=512)
+        font.fetch(u'abc')
+        path = font.saveToCache(self.cacheDir)
+
+        # a cache from another version is ignored
+        monkeypatch.setattr(fontmanager, '_atlasCacheVersion',
+                            fontmanager._atlasCacheVersion + 1)
+        other = GLFont(fontPath, 24, textureSize=512)
+        assert not other.loadFromCache(self.cacheDir)
+        assert other.glyphs == {} and not other.atlas.data.any()
+        monkeypatch.undo()
+
+        # and so is one with an atlas of a different size
+        other = GLFont(fontPath, 24, textureSize=256)
+        shutil.copy(path, other._cachePath(self.cacheDir))
+        assert not other.loadFromCache(self.cacheDir)
+        assert other.glyphs == {}
+
+        # or another font size (a different file)
+        assert not GLFont(fontPath, 30, textureSize=512).loadFromCache(
+            self.cacheDir)
+
+    def test_pref(self, monkeypatch):
+        font = GLFont(fontPath, 24, textureSize=512)
+        font.fetch(u'abc')
+        monkeypatch.setattr(fontmanager.FontManager, '_glFonts',
+                            {'test': font})
+        monkeypatch.setitem(prefs.paths, 'userPrefsDir', self.cacheDir)
+        monkeypatch.setitem(prefs.general, 'cacheFonts', False)
+        fontmanager._saveFontCaches()
+        assert os.listdir(self.cacheDir) == []
+        monkeypatch.setitem(prefs.general, 'cacheFonts', True)
+        fontmanager._saveFontCaches()
+        assert os.listdir(os.path.join(self.cacheDir, 'fontCache')) == [
+            os.path.basename(font._cachePath())]
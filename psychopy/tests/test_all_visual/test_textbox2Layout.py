@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Tests for the TextBox2 layout engine (no window needed)"""
+
+import random
+
+import numpy as np
+
+from psychopy.visual.textbox2.layout import TextLayout, codes
+
+
+class _Glyph(object):
+    def __init__(self, charcode):
+        width = 8 + ord(charcode) % 7
+        self.size = (width, 20)
+        self.offset = (1, 18)
+        self.advance = (width + 2, 0)
+        self.texcoords = (0, 0, 0.1, 0.1)
+
+
+class _Font(object):
+    size = 24
+    height = 30
+    descender = -6
+
+    def __getitem__(self, charcode):
+        return _Glyph(charcode)
+
+
+def _layout(text, layout=None):
+    if layout is None:
+        layout = TextLayout()
+    layout.update(text + "\n", _Font(), 200.0, 30.0)
+    return layout
+
+
+def test_wrapping():
+    layout = _layout("aaaa bbbb cccc dddd eeee\nff")
+    assert len(layout.lineStarts) > 2
+    # words aren't split and lines start after the spaces
+    for start in layout.lineStarts[1:]:
+        assert layout.text[start - 1] in " \n"
+    # the first character of a wrapped line starts at the left edge
+    assert layout.vertices[layout.lineStarts[1], 0, 0] == 0
+    assert sum(layout.lineLenChars) == len(layout.text)
+    # formatting codes aren't drawn
+    layout = _layout(codes['BOLD_START'] + "bold" + codes['BOLD_END'])
+    assert layout.isCode[0] and not layout.vertices[0].any()
+
+
+def test_incremental():
+    rng = random.Random(1)
+    text = " ".join(rng.choice(["the", "quick", "brown-fox", "\n"])
+                    for n in range(60))
+    layout = _layout(text)
+    for n in range(200):
+        index = rng.randint(0, len(text))
+        if rng.random() < 0.6:
+            text = text[:index] + rng.choice("ab -\n") + text[index:]
+        else:
+            text = text[:index] + text[index + 1:]
+        assert _layout(text, layout) is layout
+        full = _layout(text)
+        assert layout.lineStarts == full.lineStarts
+        assert np.allclose(layout.vertices, full.vertices)
+        assert np.array_equal(layout.lineNs, full.lineNs)
@@ -99,6 +99,135 @@ class TestExperimentHandler(object):
             contents = f.read()
         assert contents == "mutable,\n[1],\n[9999],\n"
 
+    def test_streamWideText(self):
+        fileName = self.tmpDir + 'streamed'
+        exp = data.ExperimentHandler(
+            name='testExp',
+            extraInfo={'participant': 'jwp'},
+            savePickle=False,
+            saveWideText=True,
+            streamWideText=True,
+            dataFileName=fileName
+        )
+        trials = data.TrialHandler(
+            trialList=[{'ori': 0}, {'ori': 90}], nReps=1,
+            method='sequential', name='trials')
+        exp.addLoop(trials)
+        for trial in trials:
+            exp.addData('resp', 'a,b')
+            exp.nextEntry()
+        # rows are on disk (and not in memory) before the end of the run
+        assert exp.entries == []
+        with io.open(fileName + '.csv', 'r', encoding='utf-8-sig') as f:
+            assert len(f.read().splitlines()) == 3
+        # a new column mid-run
+        exp.addData('late', 5)
+        exp.nextEntry()
+        exp.close()
+
+        with io.open(fileName + '.csv', 'r', encoding='utf-8-sig') as f:
+            lines = f.read().splitlines()
+        assert lines[0] == ('ori,trials.thisRepN,trials.thisTrialN,'
+                            'trials.thisN,trials.thisIndex,resp,participant,'
+                            'late,')
+        assert lines[1] == '0,0,0,0,0,"a,b",jwp,'
+        assert lines[2] == '90,0,1,1,1,"a,b",jwp,'
+        assert lines[3] == ',,,,,,jwp,5,'
+
+    def test_streamWideText_savePickle(self):
+        fileName = os.path.join(self.tmpDir, 'streamedPickle')
+        exp = data.ExperimentHandler(
+            savePickle=True,
+            saveWideText=True,
+            streamWideText=True,
+            dataFileName=fileName
+        )
+        for n in range(3):
+            exp.addData('n', n)
+            exp.nextEntry()
+        # pickling mid-run doesn't end (or split) the stream
+        exp.saveAsPickle(fileName + '_mid')
+        exp.addData('n', 3)
+        exp.nextEntry()
+        exp.addData('n', 99)  # an orphan entry
+        exp.close()
+
+        assert not os.path.exists(fileName + '_1.csv')
+        with io.open(fileName + '.csv', 'r', encoding='utf-8-sig') as f:
+            lines = f.read().splitlines()
+        assert lines == ['n,', '0,', '1,', '2,', '3,', '99,']
+        assert os.path.isfile(fileName + '.psydat')
+        assert os.path.isfile(fileName + '_mid.psydat')
+
+    def test_streamWideText_append_header(self):
+        fileName = os.path.join(self.tmpDir, 'streamedAppend')
+        for run in range(2):
+            exp = data.ExperimentHandler(
+                savePickle=False,
+                saveWideText=True,
+                streamWideText=True,
+                appendFiles=True,
+                dataFileName=fileName
+            )
+            exp.addData('n', run)
+            exp.nextEntry()
+            # a new column, so the header is rewritten on close
+            exp.addData('late', run)
+            exp.nextEntry()
+            exp.close()
+
+        with open(fileName + '.csv', 'rb') as f:
+            contents = f.read()
+        assert contents.startswith(b'\xef\xbb\xbf')
+        assert contents.count(b'\xef\xbb\xbf') == 1
+        assert contents[3:].decode('utf-8').splitlines() == [
+            'n,late,', '0,', ',0,', 'n,late,', '1,', ',1,']
+
+    def test_saveAsColumnar(self):
+        sessionDir = os.path.join(self.tmpDir, 'columnar')
+        for participant in ['a', 'b']:
+            exp = data.ExperimentHandler(
+                extraInfo={'participant': participant},
+                savePickle=False,
+                saveWideText=False,
+                dataFormat='npz',
+                dataFileName=os.path.join(sessionDir, participant)
+            )
+            for n in range(3):
+                exp.addData('rt', n * 0.5)
+                exp.addData('key', 'left')
+                if n > 0:
+                    exp.addData('corr', 1)
+                exp.nextEntry()
+            exp.close()
+
+        assert os.path.isfile(os.path.join(sessionDir, 'a.npz'))
+        df = data.loadColumnar(sessionDir)
+        assert list(df.columns) == ['rt', 'key', 'corr', 'participant']
+        assert list(df['participant']) == ['a'] * 3 + ['b'] * 3
+        assert df['rt'].dtype == np.float64
+        assert np.allclose(df['rt'], [0, 0.5, 1] * 2)
+        assert np.isnan(df['corr'][0]) and df['corr'][1] == 1
+        assert list(df['key']) == ['left'] * 6
+
+    def test_saveAsColumnar_savePickle(self):
+        # the defaults (savePickle=True) and a streamed csv
+        fileName = os.path.join(self.tmpDir, 'columnarPickle', 'run')
+        exp = data.ExperimentHandler(
+            dataFormat='npz',
+            streamWideText=True,
+            dataFileName=fileName
+        )
+        for n in range(3):
+            exp.addData('n', n)
+            exp.nextEntry()
+        exp.addData('n', 99)  # an orphan entry
+        exp.close()
+
+        assert os.path.isfile(fileName + '.psydat')
+        df = data.loadColumnar(fileName + '.npz')
+        assert list(df['n']) == [0, 1, 2, 99]
+
     def test_unicode_conditions(self):
         fileName = self.tmpDir + 'unicode_conds'
 
@@ -5,6 +5,8 @@ from __future__ import division, print_function
 from builtins import range
 from builtins import object
 import numpy as np
+import os
+import pickle
 import shutil
 import json_tricks
 from tempfile import mkdtemp, mkstemp
@@ -750,6 +752,69 @@ class TestPsiHandler(_BaseTestStairHandler):
         p_loaded = fromFile(path)
         assert p == p_loaded
 
+    def test_lookAhead(self):
+        def run(**kwargs):
+            p = data.PsiHandler(nTrials=20, intensRange=[0, 1],
+                                alphaRange=[0.1, 0.9], betaRange=[0.05, 0.3],
+                                intensPrecision=0.02, alphaPrecision=0.02,
+                                betaPrecision=0.02, delta=0.04, **kwargs)
+            intensities = []
+            for intensity in p:
+                intensities.append(intensity)
+                p.addResponse(int(intensity > 0.4))
+            return p, intensities
+
+        p1, intensities1 = run()
+        p2, intensities2 = run(lookAhead=True)
+        assert intensities1 == intensities2
+        assert p1._psi == p2._psi
+        assert np.allclose(p1.estimateLambda(), p2.estimateLambda())
+
+        p3, intensities3 = run(dtype='float32')
+        assert p3._psi._probLambda.dtype == np.float32
+        assert np.allclose(p1.estimateLambda(), p3.estimateLambda(),
+                           atol=0.01)
+
+    def test_json_dump_with_lookAhead(self):
+        p = data.PsiHandler(nTrials=10, intensRange=[0.1, 10],
+                            alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                            intensPrecision=1, alphaPrecision=1,
+                            betaPrecision=0.5, delta=0.01, lookAhead=True)
+        p.__next__()
+        dump = p.saveAsJson()
+
+        p.origin = ''
+        assert p == json_tricks.loads(dump)
+
+    def test_pickle_with_lookAhead(self):
+        p = data.PsiHandler(nTrials=10, intensRange=[0.1, 10],
+                            alphaRange=[0.1, 10], betaRange=[0.1, 3],
+                            intensPrecision=1, alphaPrecision=1,
+                            betaPrecision=0.5, delta=0.01, lookAhead=True)
+        p.__next__()  # mid-trial, while the look-ahead runs
+        p2 = pickle.loads(pickle.dumps(p))
+        assert p2._lookAhead is None
+        assert p2 == p
+
+        # the unpickled handler carries on like the original
+        p.addResponse(1)
+        p2.addResponse(1)
+        assert p2.__next__() == p.__next__()
+
+        # and within an ExperimentHandler
+        tmp = mkdtemp(prefix='psychopy-tests-psi')
+        try:
+            fileName = os.path.join(tmp, 'psi')
+            exp = data.ExperimentHandler(dataFileName=fileName,
+                                         saveWideText=False, autoLog=False)
+            exp.addLoop(p)
+            exp.saveAsPickle(fileName)
+            exp.abort()
+            loaded = fromFile(fileName + '.psydat')
+        finally:
+            shutil.rmtree(tmp)
+        assert loaded.loops[0] == p
+
 
 class TestMultiStairHandler(_BaseTestMultiStairHandler):
     """
@@ -916,6 +981,38 @@ def test_QuestPlusHandler():
                        expected_mode_threshold)
 
 
+def test_QuestPlusHandler_lookAhead():
+    import sys
+    if not (sys.version_info.major == 3 and sys.version_info.minor >= 6):
+        pytest.skip('QUEST+ only works on Python 3.6+')
+
+    from psychopy.data.staircase import QuestPlusHandler
+
+    thresholds = np.arange(-40, 0 + 1)
+    response_vals = ['Correct', 'Incorrect']
+
+    def run(lookAhead):
+        q = QuestPlusHandler(nTrials=12,
+                             intensityVals=thresholds.copy(),
+                             thresholdVals=thresholds,
+                             slopeVals=3.5,
+                             lowerAsymptoteVals=0.5,
+                             lapseRateVals=0.02,
+                             responseVals=response_vals,
+                             stimScale='dB',
+                             lookAhead=lookAhead)
+        intensities = []
+        for intensity in q:
+            intensities.append(intensity)
+            q.addResponse(response_vals[int(intensity < -20)])
+        return q, intensities
+
+    q1, intensities1 = run(lookAhead=False)
+    q2, intensities2 = run(lookAhead=True)
+    assert intensities1 == intensities2
+    assert q1.paramEstimate == q2.paramEstimate
+
+
 def test_QuestPlusHandler_startIntensity():
     import sys
     if not (sys.version_info.major == 3 and sys.version_info.minor >= 6):
@@ -1243,3 +1340,55 @@ if __name__ == '__main__':
     test_QuesPlusHandler_prior()
     test_QuesPlusHandler_invalid_prior_params()
     test_QuesPlusHandler_unknown_stimSelectionOptions()
+
+
+def test_QuestObject_recompute():
+    from psychopy.contrib.quest import QuestObject
+
+    rng = np.random.RandomState(0)
+    q = QuestObject(-1, 0.5, 0.82, 3.5, 0.01, 0.5, range=3)
+    for trial in range(100):
+        intensity = q.quantile()
+        q.update(intensity, int(rng.rand() < 0.5 + 0.4 * (intensity > -1)))
+    # the incremental updates and the recompute from the history agree
+    pdf = q.pdf.copy()
+    q.recompute()
+    assert np.allclose(q.pdf, pdf, rtol=1e-9, atol=0)
+    assert np.allclose(q.logPdf, np.log(pdf))
+
+    # a pdf set directly is used by the next update
+    q.pdf = np.ones_like(q.pdf)
+    q.update(-1, 1)
+    assert np.allclose(q.pdf, q.s2[1, q.dim // 2:q.dim // 2 + len(q.pdf)])
+
+
+def test_quest_grid_analysis():
+    from psychopy.contrib.quest import QuestObject, grid_analysis
+
+    rng = np.random.RandomState(1)
+    quests = []
+    for tGuess in [-1.2, -1, -0.8]:
+        q = QuestObject(tGuess, 0.5, 0.82, 3.5, 0.01, 0.5, range=4)
+        for trial in range(40):
+            intensity = q.quantile()
+            q.update(intensity, int(rng.rand() < 0.5 + 0.4 * (intensity > -1)))
+        quests.append(q)
+
+    betas, deltas, gammas = [2, 3.5], [0.01, 0.05], [0.5, 0.25]
+    out = grid_analysis([q.intensity for q in quests],
+                        [q.response for q in quests],
+                        [q.tGuess for q in quests], 0.5, 0.82,
+                        beta=betas, delta=deltas, gamma=gammas, range=4)
+    assert out['mean'].shape == (3, 2, 2, 2)
+    for qN, q in enumerate(quests):
+        for bN, beta in enumerate(betas):
+            for dN, delta in enumerate(deltas):
+                for gN, gamma in enumerate(gammas):
+                    q.beta, q.delta, q.gamma = beta, delta, gamma
+                    q.recompute()
+                    index = (qN, bN, dN, gN)
+                    assert np.isclose(out['mean'][index], q.mean())
+                    assert np.isclose(out['sd'][index], q.sd())
+                    assert np.isclose(out['mode'][index], q.mode()[0])
+                    assert np.isclose(out['logLikelihood'][index],
+                                      np.log(np.sum(q.pdf)))
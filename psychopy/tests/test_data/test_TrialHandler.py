@@ -158,6 +158,13 @@ class TestTrialHandler(object):
         trials.saveAsWideText(pjoin(self.temp_dir, 'testRandom.csv'), delim=',', appendFile=False)#this omits values
         utils.compareTextFiles(pjoin(self.temp_dir, 'testRandom.csv'), pjoin(fixturesPath,'corrRandom.csv'))
 
+    def test_thisIndex_type(self):
+        for method in ('sequential', 'random', 'fullRandom'):
+            trials = data.TrialHandler([dict(foo=1), dict(foo=2)], 2,
+                                       method=method, autoLog=False)
+            for thisTrial in trials:
+                assert type(trials.thisIndex) is int
+
     def test_comparison_equals(self):
         t1 = data.TrialHandler([dict(foo=1)], 2)
         t2 = data.TrialHandler([dict(foo=1)], 2)
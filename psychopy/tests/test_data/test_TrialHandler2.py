@@ -55,6 +55,18 @@ class TestTrialHandler2(object):
         #so far the headers don't match those from TrialHandler so this would fail
         #assert expected_header == unicode(header)
 
+    def test_saveAsColumnar(self):
+        trials = data.TrialHandler2(self.conditions, 2, method='sequential',
+                                    autoLog=False)
+        for trial in trials:
+            trials.addData('resp', 'x')
+        fileName = trials.saveAsColumnar(pjoin(self.temp_dir, 'columnar'))
+        assert fileName.endswith('.npz')
+        df = data.loadColumnar(fileName)
+        assert list(df['foo']) == [1, 2, 3] * 2
+        assert list(df['thisN']) == list(range(6))
+        assert list(df['resp']) == ['x'] * 6
+
     def test_psydat_filename_collision_renaming2(self):
         for count in range(1,20):
             trials = data.TrialHandler2([], 1, autoLog=False)
@@ -151,6 +163,55 @@ class TestTrialHandler2(object):
         utils.compareTextFiles(pjoin(self.temp_dir, 'testRandom.csv'),
                                pjoin(fixturesPath,'corrRandomTH2.csv'))
 
+    def test_getFutureTrial(self):
+        trials = data.TrialHandler2(self.conditions, 2, method='sequential',
+                                    autoLog=False)
+        assert trials.getFutureTrial(4) == self.conditions[0]
+        seen = []
+        for thisTrial in trials:
+            seen.append(thisTrial['foo'])
+            assert trials.getFutureTrial(0)['foo'] == thisTrial['foo']
+            if len(seen) > 1:
+                assert trials.getEarlierTrial()['foo'] == seen[-2]
+            if len(seen) < 6:
+                assert trials.getFutureTrial(1)['foo'] == len(seen) % 3 + 1
+        assert trials.getFutureTrial(1) is None
+
+        trials = data.TrialHandler2(self.conditions, 2, method='random',
+                                    seed=self.random_seed, autoLog=False)
+        trials.next()
+        upcoming = [trials.getFutureTrial(n)['foo'] for n in (1, 2)]
+        assert upcoming == [trials.next()['foo'], trials.next()['foo']]
+        # the next repeat has already been drawn
+        assert trials.getFutureTrial(1)['foo'] == trials.next()['foo']
+
+    def test_fullRandom_repN(self):
+        trials = data.TrialHandler2(self.conditions, 4, method='fullRandom',
+                                    seed=self.random_seed, autoLog=False)
+        seen = []
+        for thisTrial in trials:
+            assert trials.thisRepN == seen.count(trials.thisIndex)
+            assert trials.thisTrialN == trials.thisN == len(seen)
+            seen.append(trials.thisIndex)
+        assert sorted(seen) == sorted(list(range(3)) * 4)
+
+    def test_remaining_and_prev_indices(self):
+        for method, nRemaining in (('random', [2, 1, 0, 2, 1, 0]),
+                                   ('fullRandom', [5, 4, 3, 2, 1, 0])):
+            trials = data.TrialHandler2(self.conditions, 2, method=method,
+                                        seed=self.random_seed, autoLog=False)
+            assert trials.remainingIndices == trials.prevIndices == []
+            seen = []
+            for thisTrial in trials:
+                assert trials.prevIndices == seen
+                assert len(trials.remainingIndices) == nRemaining[len(seen)]
+                if trials.remainingIndices:
+                    assert (trials.remainingIndices[0] ==
+                            trials.trialList.index(trials.getFutureTrial(1)))
+                seen.append(trials.thisIndex)
+            assert trials.prevIndices == seen
+            assert trials.remainingIndices == []
+
     def test_comparison_equals(self):
         t1 = data.TrialHandler2([dict(foo=1)], 2, seed=self.random_seed)
         t2 = data.TrialHandler2([dict(foo=1)], 2, seed=self.random_seed)
@@ -180,6 +180,18 @@ class TestTrialHandlerExt(object):
         utils.compareTextFiles(pjoin(self.temp_dir, 'testRandom.csv'),
                                pjoin(fixturesPath,'corrRandom.csv'))
 
+    def test_saveAsColumnar(self):
+        conditions = [{'foo': 1}, {'foo': 2}]
+        trials = data.TrialHandlerExt(conditions, 3, method='sequential',
+                                      autoLog=False)
+        for trial in trials:
+            trials.addData('resp', trial['foo'] * 10)
+        fileName = trials.saveAsColumnar(pjoin(self.temp_dir, 'columnar'))
+        df = data.loadColumnar(fileName)
+        assert list(df['TrialNumber']) == list(range(1, 7))
+        assert list(df['foo']) == [1, 2] * 3
+        assert list(df['resp']) == [10, 20] * 3
+
     def test_comparison_equals(self):
         t1 = data.TrialHandlerExt([dict(foo=1)], 2)
         t2 = data.TrialHandlerExt([dict(foo=1)], 2)
@@ -88,6 +88,34 @@ def test_logistic():
     if PLOTTING:
         plotFit(modResps, thresh, 'Logistic (thresh=%.2f, params=%s)' %(fit.inverse(0.75), fit.params))
 
+def test_bootstrapFit():
+    rng = numpy.random.RandomState(0)
+    intensities = numpy.repeat(contrasts[1:], 40)
+    trialResps = (rng.rand(len(intensities)) <
+                  cumNorm(intensities, sd=sd, thresh=thresh)).astype(float)
+    boot = data.bootstrapFit(data.FitCumNormal, intensities, trialResps,
+                             n=300, guess=[0.2, 0.1], seed=1, nProcesses=1)
+    assert boot.params.shape == (300, 2)
+    assert boot.thresholds.shape == (300, 1)
+    assert boot.nFailed == 0
+    lower, upper = boot.thresholdCI(95)[:, 0]
+    assert lower < boot.fit.inverse(0.75) < upper
+    assert lower < thresh < upper
+    lower, upper = boot.paramsCI(95)
+    assert numpy.all(lower < upper)
+    # the results don't depend on the number of processes
+    pooled = data.bootstrapFit(data.FitCumNormal, intensities, trialResps,
+                               n=300, guess=[0.2, 0.1], seed=1, nProcesses=2)
+    assert numpy.array_equal(boot.params, pooled.params)
+
+    # a row of trials per intensity
+    boot = data.bootstrapFit(data.FitWeibull, contrasts[1:],
+                             trialResps.reshape(len(contrasts) - 1, 40),
+                             n=100, levels=[0.6, 0.75, 0.9], seed=1)
+    assert boot.thresholds.shape == (100, 3)
+    assert numpy.all(numpy.diff(boot.thresholds[0]) > 0)
+
+
 def teardown():
     if PLOTTING:
         pylab.show()
@@ -0,0 +1,118 @@
+"""Tests for psychopy.data.simulation"""
+
+from __future__ import division
+
+import warnings
+
+import numpy as np
+import pytest
+
+from psychopy import data, logging
+
+
+def _switchingObserver(intensities, thresholds):
+    """Deterministic responses that aren't monotonic in intensity, so that
+    all the staircase rules get used"""
+    flip = np.round(intensities * 1000) % 7 < 3
+    return (flip ^ (intensities > thresholds)).astype(float)
+
+
+def _runHandler(handler, threshold):
+    """Runs the handler with _switchingObserver; returns the intensities"""
+    intensities = []
+    for intensity in handler:
+        intensities.append(float(intensity))
+        p = _switchingObserver(np.array([intensities[-1]]),
+                               np.array([threshold]))
+        handler.addResponse(int(p[0]))
+    return intensities
+
+
+def _assertMatchesHandler(makeHandler, thresholds, handlerEstimate,
+                          **kwargs):
+    sim = data.simulateStaircase(makeHandler(), thresholds,
+                                 observer=_switchingObserver, nProcesses=1,
+                                 **kwargs)
+    for n, threshold in enumerate(thresholds):
+        handler = makeHandler()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # quest intensity out of range
+            intensities = _runHandler(handler, threshold)
+        assert sim.nTrials[n] == len(intensities)
+        assert np.allclose(sim.intensities[n, :len(intensities)],
+                           intensities)
+        assert np.all(np.isnan(sim.intensities[n, len(intensities):]))
+        assert np.isclose(sim.estimates[n], handlerEstimate(handler))
+
+
+class TestSimulateStaircase(object):
+    def setup_class(self):
+        logging.console.setLevel(logging.ERROR)
+
+    def test_stairHandler(self):
+        def makeHandler():
+            return data.StairHandler(0.5, stepSizes=[4, 2, 1], nTrials=30,
+                                     nUp=1, nDown=3, autoLog=False)
+
+        _assertMatchesHandler(
+            makeHandler, np.linspace(0.05, 0.6, 8),
+            lambda stairs: np.mean(stairs.reversalIntensities[-4:]),
+            nLastReversals=4)
+
+        def makeLinear():
+            return data.StairHandler(0.5, stepSizes=0.05, nTrials=40, nUp=2,
+                                     nDown=2, stepType='lin', minVal=0,
+                                     maxVal=1, applyInitialRule=False,
+                                     autoLog=False)
+
+        _assertMatchesHandler(
+            makeLinear, np.linspace(0.05, 0.6, 8),
+            lambda stairs: np.mean(stairs.reversalIntensities[-6:]))
+
+    def test_questHandler(self):
+        def makeHandler():
+            return data.QuestHandler(-1, 0.5, nTrials=200, stopInterval=0.3,
+                                     minVal=-1.5, maxVal=-0.2,
+                                     autoLog=False)
+
+        _assertMatchesHandler(makeHandler, np.linspace(-1.6, -0.4, 6),
+                              lambda quest: quest.mean(), estimate='mean')
+
+    def test_psiHandler(self):
+        def makeHandler():
+            return data.PsiHandler(20, [0, 1], [0.1, 0.9], [0.05, 0.3],
+                                   0.05, 0.05, 0.05, 0.04)
+
+        _assertMatchesHandler(makeHandler, np.linspace(0.2, 0.8, 4),
+                              lambda psi: psi.estimateLambda()[0])
+
+    def test_summary(self):
+        quest = data.QuestHandler(-1, 0.5, nTrials=40, autoLog=False)
+        sim = data.simulateStaircase(quest, -1.2, nObservers=400, seed=1)
+        summary = sim.summary()
+        assert sim.estimates.shape == (400,)
+        assert abs(summary['bias']) < 0.05
+        assert 0 < summary['sd'] < 0.2
+        assert summary['meanTrials'] == 40
+        assert summary['nUnfinished'] == 0
+        # the same seed gives the same observers
+        again = data.simulateStaircase(quest, -1.2, nObservers=400, seed=1)
+        assert np.array_equal(sim.estimates, again.estimates)
+
+    def test_processes(self):
+        stairs = data.StairHandler(0.5, stepSizes=[4, 2], nTrials=20,
+                                   autoLog=False)
+        thresholds = np.linspace(0.05, 0.5, 1500)
+        inProcess = data.simulateStaircase(stairs, thresholds, seed=2,
+                                           nProcesses=1)
+        pooled = data.simulateStaircase(stairs, thresholds, seed=2,
+                                        nProcesses=2)
+        assert np.array_equal(inProcess.intensities, pooled.intensities,
+                              equal_nan=True)
+
+    def test_unsupported(self):
+        with pytest.raises(TypeError):
+            data.simulateStaircase(data.TrialHandler([], 1), 0.5,
+                                   nObservers=2)
+        with pytest.raises(ValueError):
+            data.simulateStaircase(data.StairHandler(0.5), 0.5)
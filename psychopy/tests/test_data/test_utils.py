@@ -60,6 +60,30 @@ class Test_utilsClass:
             utils.importConditions(fileName_docx)
         assert ('Your conditions file should be an ''xlsx, csv, dlm, tsv or pkl file') == str(errMsg.value)
 
+    def test_importConditions_cache(self):
+        import shutil
+        from tempfile import mkdtemp
+        tmpDir = mkdtemp(prefix='psychopy-tests-conds')
+        fileName = join(tmpDir, 'trialTypes.xlsx')
+        shutil.copy(join(fixturesPath, 'trialTypes.xlsx'), fileName)
+        try:
+            utils.clearConditionsCache()
+            conds = utils.importConditions(fileName, diskCache=True)
+            assert os.path.isfile(fileName + '.psycache')
+            # modifying the results mustn't change the cached conditions
+            conds[0]['text'] = 'modified'
+            again = utils.importConditions(fileName)
+            assert again[0]['text'] == 'red'
+            assert again == utils.importConditions(fileName, useCache=False)
+            # selections come from the cached conditions
+            assert utils.importConditions(fileName, selection='1:3') == \
+                again[1:3]
+            # a new session (empty memory cache) reads the file on disk
+            utils.clearConditionsCache()
+            assert utils.importConditions(fileName, diskCache=True) == again
+        finally:
+            shutil.rmtree(tmpDir)
+
     def test_isValidVariableName(self):
         assert utils.isValidVariableName('Name') == (True, '')
         assert utils.isValidVariableName('a_b_c') == (True, '')
@@ -101,6 +125,10 @@ class Test_utilsClass:
         assert utils.bootStraps(data,n = 1).shape == (1, 3, 1)
         assert utils.bootStraps(data, n = 1).size == 3
         assert utils.bootStraps(data, n=1).ndim == len(utils.bootStraps(data,n = 1).shape)
+        resamples = utils.bootStraps([[1, 2, 3], [10, 20, 30]], n=50)
+        assert resamples.shape == (2, 3, 50)
+        assert set(resamples[0].flat) <= {1, 2, 3}
+        assert set(resamples[1].flat) <= {10, 20, 30}
 
     def test_functionFromStaircase(self):
         import numpy as np
@@ -92,3 +92,30 @@ def testAllBuffersClear():
     assert len(exp_events) == 0
 
     stopHubProcess()
+
+@skip_under_travis
+def testGetEventsAsNumpy():
+    """
+    """
+    from psychopy.iohub.constants import EventConstants
+    io = startHubProcess()
+
+    exp = io.devices.experiment
+    assert exp != None
+
+    for i in range(3):
+        io.sendMessageEvent("Message %d" % i, category="NUMPY")
+    events = io.getEvents(as_type='numpy')
+    assert list(events.keys()) == [EventConstants.MESSAGE]
+    messages = events[EventConstants.MESSAGE]
+    assert len(messages) == 3
+    assert list(messages['text']) == ["Message 0", "Message 1", "Message 2"]
+    assert all(messages['category'] == "NUMPY")
+    assert all(messages['time'][1:] >= messages['time'][:-1])
+
+    assert len(io.getEvents(as_type='numpy')) == 0
+
+    messages = exp.getEvents(asType='numpy')[EventConstants.MESSAGE]
+    assert len(messages) == 3
+
+    stopHubProcess()
@@ -0,0 +1,111 @@
+""" Test the vectorized interest area tests against shapely's contains.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+shapely = pytest.importorskip('shapely')
+interestarea = pytest.importorskip(
+    'psychopy.iohub.datastore.pandas.interestarea')
+from shapely.geometry import Point, Polygon as ShapelyPolygon
+
+
+def _shapelyContains(polygon, x, y):
+    # (the interest areas' own contains takes a point tuple)
+    return np.array([ShapelyPolygon.contains(polygon, Point(px, py))
+                     for px, py in zip(x, y)])
+
+
+def _grid(minx, maxx, miny, maxy, step=0.5):
+    # includes the vertices and the midpoints of the edges of polygons
+    # with integer coordinates
+    x, y = np.meshgrid(np.arange(minx, maxx + step, step),
+                       np.arange(miny, maxy + step, step))
+    return x.ravel(), y.ravel()
+
+
+def _nearOutline(ia, center, rng):
+    # the vertices, points just inside and outside of them and of the
+    # middle of the edges, and random points around the interest area
+    # (the middle of an edge that isn't axis aligned is only on it to
+    # within rounding errors, so it could be on either side)
+    coords = np.asarray(ia.exterior.coords)
+    middles = (coords[1:] + coords[:-1]) / 2.0
+    points = [coords]
+    for scale in (0.999, 1.001):
+        points.append(center + (coords - center) * scale)
+        points.append(center + (middles - center) * scale)
+    minx, miny, maxx, maxy = ia.bounds
+    points.append(np.column_stack([rng.uniform(minx - 1, maxx + 1, 500),
+                                   rng.uniform(miny - 1, maxy + 1, 500)]))
+    points = np.concatenate(points)
+    return points[:, 0], points[:, 1]
+
+
+# concave (U shaped) outlines, clockwise and counter-clockwise
+_uShape = [(0, 0), (6, 0), (6, 5), (4, 5), (4, 2), (2, 2), (2, 5), (0, 5)]
+
+
+@pytest.mark.parametrize('vertices', [_uShape, _uShape[::-1]])
+def test_points_in_polygon(vertices):
+    x, y = _grid(-1, 7, -1, 6)
+    expected = _shapelyContains(ShapelyPolygon(vertices), x, y)
+    assert expected.any() and not expected.all()
+    assert (interestarea.points_in_polygon(x, y, vertices) ==
+            expected).all()
+
+
+def test_polygon_with_holes():
+    outline = [(0, 0), (10, 0), (10, 8), (6, 8), (6, 4), (4, 4), (4, 8),
+               (0, 8)]
+    holes = [[(1, 1), (3, 1), (3, 3), (1, 3)],
+             [(7, 1), (9, 2), (7, 3)]]
+    shapelyPolygon = ShapelyPolygon(outline, holes)
+    ia = interestarea.Polygon('holes', shapelyPolygon)
+    x, y = _grid(-1, 11, -1, 9)
+    assert (ia.contains_points(x, y) ==
+            _shapelyContains(shapelyPolygon, x, y)).all()
+
+
+def test_circle_ellipse_rectangle():
+    rng = np.random.RandomState(1)
+    areas = [
+        (interestarea.Circle('circle', (3.0, -2.0), 5.0), (3.0, -2.0)),
+        (interestarea.Ellipse('ellipse', (1.0, 2.0), 2.0, 6.0, 30),
+         (1.0, 2.0)),
+        (interestarea.Ellipse('radians', (0.0, 0.0), 3.0, 1.0, 1.2,
+                              use_radians=True), (0.0, 0.0)),
+        (interestarea.Rectangle('rect', -2, -1, 4, 3), (1.0, 1.0)),
+        (interestarea.Rectangle('cw', 4, 3, -2, -1, ccw=False), (1.0, 1.0)),
+    ]
+    for ia, center in areas:
+        x, y = _nearOutline(ia, np.array(center), rng)
+        expected = _shapelyContains(ia, x, y)
+        assert expected.any() and not expected.all()
+        assert (ia.contains_points(x, y) == expected).all(), ia.name
+        # the single point contains of the interest area agrees too
+        assert ia.contains((x[0], y[0])) == expected[0]
+
+
+def test_label_interest_areas():
+    rng = np.random.RandomState(2)
+    areas = [interestarea.Rectangle('left', 0, 0, 4, 4),
+             interestarea.Circle('overlapping', (4.0, 2.0), 2.0),
+             interestarea.Polygon('u', [(x + 8, y) for x, y in _uShape])]
+    x, y = _grid(-1, 15, -1, 6)
+    x = np.concatenate([x, rng.uniform(-1, 15, 500)])
+    y = np.concatenate([y, rng.uniform(-1, 6, 500)])
+    df = pd.DataFrame(dict(x_position=x, y_position=y))
+    labelled = interestarea.label_interest_areas(df, areas)
+
+    # the first interest area that contains a point
+    expectedIds = np.zeros(len(df), dtype=int)
+    expectedNames = np.full(len(df), None, dtype=object)
+    for ia in areas[::-1]:
+        hits = _shapelyContains(ia, x, y)
+        expectedIds[hits] = ia.ia_id
+        expectedNames[hits] = ia.name
+    assert (labelled['ia_id'].values == expectedIds).all()
+    assert list(labelled['ia_name']) == list(expectedNames)
+    assert (expectedIds == areas[1].ia_id).any()
+    assert 'ia_id' not in df
@@ -0,0 +1,241 @@
+""" Test the offline (numpy) eye tracker event parser.
+"""
+import copy
+
+import numpy as np
+import pytest
+
+from psychopy.iohub.constants import EventConstants
+from psychopy.iohub.devices import eventfilters
+from psychopy.iohub.devices.eyetracker import eye_events
+from psychopy.iohub.devices.eyetracker.eye_events import \
+    BinocularEyeSampleEvent
+from psychopy.iohub.devices.eyetracker.filters.offline import (
+    OfflineEyeTrackerEventParser, FieldFilter, adaptiveVelocityThresholds)
+from psychopy.iohub.devices.eyetracker.filters.parser import \
+    EyeTrackerEventParser
+
+RATE = 250.0
+DISPLAY = dict(mm_size=dict(width=500, height=280), pixel_res=(1920, 1080),
+               eye_distance=550)
+
+
+def _onlineThresholds(velocities, blen):
+    # the online parser's addVelocityToAdaptiveThreshold, for one axis
+    buf = np.zeros(blen)
+    index = 0
+    out = []
+    for velocity in velocities:
+        pt = np.nan
+        if velocity > 0.0:
+            buf[index % blen] = velocity
+            full = index >= blen
+            index += 1
+            if full:
+                pt = buf.min() + buf.std() * 3.0
+                below = buf[buf < pt]
+                ptd = 2.0
+                while ptd >= 1.0:
+                    last = pt
+                    pt = below.mean() + 3.0 * below.std()
+                    below = buf[buf < pt]
+                    ptd = np.abs(pt - last)
+        out.append(pt)
+    return np.array(out)
+
+
+def _samples(n=2500, blink=(1600, 1620), one_eye=False):
+    """Binocular samples fixating alternately at x=0 and x=300 pix, jumping
+    every second, with a run of missing data (and optionally more, of
+    either eye)."""
+    rng = np.random.RandomState(1)
+    samples = np.zeros(n, dtype=BinocularEyeSampleEvent.NUMPY_DTYPE)
+    samples['event_id'] = np.arange(n)
+    samples['type'] = EventConstants.BINOCULAR_EYE_SAMPLE
+    samples['time'] = np.arange(n) / RATE
+    x = np.where((np.arange(n) // int(RATE)) % 2, 300.0, 0.0)
+    for eye in ('left', 'right'):
+        samples[eye + '_gaze_x'] = x + rng.randn(n) * 0.2
+        samples[eye + '_gaze_y'] = rng.randn(n) * 0.2
+        samples[eye + '_pupil_measure1'] = 3.0
+    samples['status'][blink[0]:blink[1]] = 22
+    if one_eye:
+        for start, stop in ((60, 61), (300, 303), (306, 310), (1200, 1250),
+                            (1999, 2001)):
+            samples['status'][start:stop] = 22
+        samples['status'][700:705] = 2
+        samples['status'][900:903] = 20
+    return samples
+
+
+def test_adaptiveThresholds():
+    rng = np.random.RandomState(0)
+    velocities = np.abs(rng.randn(600)) * 20
+    velocities[rng.rand(600) < 0.1] = 0.0
+    velocities[::50] = 500.0
+    expected = _onlineThresholds(velocities, 100)
+    found = adaptiveVelocityThresholds(velocities, 100)
+    assert np.isnan(found).sum() == np.isnan(expected).sum()
+    assert np.allclose(found, expected, equal_nan=True)
+
+
+@pytest.mark.parametrize('settings, online_class', [
+    (dict(name='MovingWindowFilter', length=3, knot_pos='center'),
+     eventfilters.MovingWindowFilter),
+    (dict(name='MedianFilter', length=5, knot_pos=1),
+     eventfilters.MedianFilter),
+    (dict(name='WeightedAverageFilter', weights=(1, 2, 4), knot_pos=0),
+     eventfilters.WeightedAverageFilter),
+    # (all values are replaced, monotonic or not)
+    (dict(name='StampFilter', level=1), eventfilters.StampFilter),
+])
+def test_fieldFilters(settings, online_class):
+    values = np.random.RandomState(2).randn(40)
+    field_filter = FieldFilter(settings)
+    filtered = field_filter.apply(values)
+    kwargs = dict(settings)
+    del kwargs['name']
+    online = online_class(**kwargs)
+    for i, v in enumerate(values):
+        result = online.add(v)
+        if result is not None:
+            index = i - field_filter.lag
+            assert np.allclose(filtered[index], result[1])
+
+
+def test_parse():
+    parser = OfflineEyeTrackerEventParser(
+        sampling_rate=RATE, display_device=DISPLAY,
+        adaptive_vel_thresh_history=0.5,
+        position_filter=dict(name='MedianFilter', length=3,
+                             knot_pos='center'))
+    events = parser.parse(_samples())
+
+    # a saccade at each jump once the velocity thresholds are available
+    saccades = events[EventConstants.SACCADE_END]
+    big = saccades[saccades['peak_velocity_x'] > 1000]
+    assert np.allclose(np.round(big['time']), np.arange(1, 10))
+
+    blinks = events[EventConstants.BLINK_END]
+    assert len(blinks) == 1
+    assert np.isclose(blinks[0]['duration'], 19 / RATE)
+    blink_starts = events[EventConstants.BLINK_START]
+    assert np.isclose(blink_starts[0]['time'], 1600 / RATE)
+
+    # end events close the run opened by the matching start event
+    for start_type, end_type in ((EventConstants.FIXATION_START,
+                                  EventConstants.FIXATION_END),
+                                 (EventConstants.SACCADE_START,
+                                  EventConstants.SACCADE_END)):
+        starts, ends = events[start_type], events[end_type]
+        assert len(starts) - len(ends) in (0, 1)
+        assert np.allclose(ends['time'] - ends['duration'],
+                           starts['time'][:len(ends)])
+    fixations = events[EventConstants.FIXATION_END]
+    assert np.allclose(fixations['start_gaze_x'],
+                       events[EventConstants.FIXATION_START]['gaze_x']
+                       [:len(fixations)])
+
+    event_lists = parser.toEventLists(events)
+    assert len(event_lists) == sum(len(e) for e in events.values())
+    times = [e[7] for e in event_lists]
+    assert times == sorted(times)
+
+
+def test_parseSessions():
+    parser = OfflineEyeTrackerEventParser(
+        sampling_rate=RATE, display_device=DISPLAY,
+        adaptive_vel_thresh_history=0.5)
+    session1 = _samples()
+    session2 = _samples()
+    session2['session_id'] = 1
+    both = parser.parseSessions(np.concatenate((session2, session1)))
+    one = parser.parse(session1)
+    for etype, events in one.items():
+        assert len(both[etype]) == 2 * len(events)
+
+
+def _parseOnline(samples, **kwargs):
+    """Events output by the online parser for the samples, by type."""
+    classes = dict((name, getattr(eye_events, name)) for name in (
+        'MonocularEyeSampleEvent', 'BinocularEyeSampleEvent',
+        'FixationStartEvent', 'FixationEndEvent', 'SaccadeStartEvent',
+        'SaccadeEndEvent', 'BlinkStartEvent', 'BlinkEndEvent'))
+    EventConstants.addClassMappings(
+        [c.EVENT_TYPE_ID for c in classes.values()], classes)
+    parser = EyeTrackerEventParser(**kwargs)
+    events = {}
+    for sample in samples.tolist():
+        parser._addInputEvent(list(sample))
+        for event in parser._removeOutputEvents():
+            events.setdefault(event[4], []).append(event)
+    return events
+
+
+@pytest.mark.parametrize('position_filter, velocity_filter', [
+    (None, None),
+    (dict(name='MedianFilter', length=3, knot_pos='center'),
+     dict(name='MovingWindowFilter', length=3, knot_pos='center')),
+    (dict(name='MovingWindowFilter', length=3, knot_pos='oldest'),
+     dict(name='MedianFilter', length=5, knot_pos='latest')),
+    (dict(name='WeightedAverageFilter', weights=(1, 2, 4), knot_pos=1),
+     None),
+    (dict(name='StampFilter', level=1), dict(name='StampFilter', level=2)),
+])
+def test_onlineEquivalence(position_filter, velocity_filter):
+    kwargs = dict(sampling_rate=RATE, display_device=DISPLAY,
+                  adaptive_vel_thresh_history=0.5)
+    if position_filter:
+        kwargs['position_filter'] = position_filter
+    if velocity_filter:
+        kwargs['velocity_filter'] = velocity_filter
+    samples = _samples(one_eye=True)
+    # (the online parser removes the names from the filter settings)
+    online = _parseOnline(samples, **copy.deepcopy(kwargs))
+    offline = OfflineEyeTrackerEventParser(**kwargs).parse(samples)
+    for etype, events in offline.items():
+        assert len(events), EventConstants.getName(etype)
+        found = sorted(online.get(etype, []), key=lambda e: e[7])
+        found = np.array([tuple(e) for e in found], dtype=events.dtype)
+        assert len(found) == len(events)
+        for name in events.dtype.names:
+            if name == 'event_id':
+                # the online parser gives events new ids, offline events
+                # have the id of the sample they were created from
+                assert (events[name] == samples['event_id'][
+                    np.searchsorted(samples['time'], events['time'])]).all()
+                continue
+            assert np.allclose(found[name], events[name], equal_nan=True), \
+                name
+
+
+def test_filterLeadLag():
+    samples = _samples()
+    parser = OfflineEyeTrackerEventParser(
+        sampling_rate=RATE, display_device=DISPLAY,
+        position_filter=dict(name='MedianFilter', length=5, knot_pos=1),
+        velocity_filter=dict(name='MovingWindowFilter', length=3,
+                             knot_pos='center'))
+    processed, valid = parser.processSamples(samples)
+
+    # only the samples that don't come out of the velocity filters are
+    # dropped
+    assert (parser.velocity_filter.lead, parser.velocity_filter.lag) == (1, 1)
+    assert (processed['event_id'] ==
+            samples['event_id'][1:len(samples) - 1]).all()
+    assert valid.sum() == len(samples) - 2 - 20
+
+    # velocities are calculated from the angles before they are filtered
+    angle_x, _ = parser.pix2deg(
+        (samples['left_gaze_x'].astype(float) + samples['right_gaze_x']) / 2,
+        (samples['left_gaze_y'].astype(float) + samples['right_gaze_y']) / 2)
+    blink = samples['status'] == 22
+    angle_x[blink] = np.interp(np.flatnonzero(blink),
+                               np.flatnonzero(~blink), angle_x[~blink])
+    velocity = np.append(0.0, np.abs(np.diff(angle_x)) * RATE)
+    expected = parser.velocity_filter.apply(velocity)[1:-1]
+    # (apart from the first sample after the missing data, whose velocity
+    # is from the last sample output before it, and its neighbours)
+    near_blink = np.abs(processed['event_id'] - 1620.0) <= 1
+    assert np.allclose(processed['velocity_x'][~near_blink],
+                       expected[~near_blink], rtol=1e-5, atol=1e-4)
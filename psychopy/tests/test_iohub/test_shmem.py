@@ -0,0 +1,73 @@
+""" Test the shared memory ring buffer used for the global event buffer.
+"""
+import os
+import shutil
+from tempfile import mkdtemp
+
+import numpy as np
+
+from psychopy.iohub.constants import EventConstants
+from psychopy.iohub.devices.experiment import MessageEvent
+from psychopy.iohub.shmem import SharedEventBuffer, getSlotSize
+
+
+def _message(event_id, time, text):
+    return [0, 0, 0, event_id, MessageEvent.EVENT_TYPE_ID,
+            time, time, time, 0.0, 0.0, 0, 0.0, 'test', text]
+
+
+class TestSharedEventBuffer(object):
+    def setup_method(self, method):
+        EventConstants.addClassMappings([MessageEvent.EVENT_TYPE_ID],
+                                        {'MessageEvent': MessageEvent})
+        self.tmpDir = mkdtemp(prefix='psychopy-tests-iohub')
+        path = os.path.join(self.tmpDir, 'events.buf')
+        self.writer = SharedEventBuffer(path, 8, getSlotSize([MessageEvent]),
+                                        create=True)
+        self.reader = SharedEventBuffer(path)
+
+    def teardown_method(self, method):
+        self.reader.close()
+        self.writer.close(remove=True)
+        shutil.rmtree(self.tmpDir)
+
+    def test_readWrite(self):
+        assert self.reader.slotCount == 8
+        # written out of time order, read back in order
+        for i, t in enumerate([0.2, 0.1, 0.3]):
+            assert self.writer.write(_message(i, t, u'm%d é' % i))
+        assert len(self.reader) == 3
+        events = self.reader.readEventLists()
+        assert [e[3] for e in events] == [1, 0, 2]
+        assert events[0] == _message(1, 0.1, u'm1 é')
+        assert len(self.reader) == 0 and self.reader.readEventLists() == []
+
+        # wraps around the end of the ring
+        for i in range(6):
+            self.writer.write(_message(i, i, 'wrap'))
+        arrays = self.reader.readArrays()
+        msgs = arrays[MessageEvent.EVENT_TYPE_ID]
+        assert list(msgs['event_id']) == list(range(6))
+        assert msgs.dtype['text'].kind == 'U' and msgs['text'][0] == 'wrap'
+
+    def test_fullAndClear(self):
+        for i in range(10):
+            self.writer.write(_message(i, i, 'full'))
+        assert self.writer.dropped == 2
+        self.reader.clear()
+        assert len(self.reader) == 0
+        assert self.writer.write(_message(10, 10, 'after clear'))
+        events = self.reader.readRecords()[MessageEvent.EVENT_TYPE_ID]
+        assert len(events) == 1 and events['event_id'][0] == 10
+
+    def test_truncatedText(self):
+        # longer than the text field, and cut in the middle of a character
+        size = MessageEvent.NUMPY_DTYPE['text'].itemsize
+        text = u'a' + u'\u00e9' * size
+        assert self.writer.write(_message(0, 0.1, text))
+        assert self.writer.write(_message(1, 0.2, text))
+        events = self.reader.readEventLists()
+        assert events[0][-1] == u'a' + u'\u00e9' * ((size - 1) // 2)
+        self.writer.write(_message(2, 0.3, text))
+        msgs = self.reader.readArrays()[MessageEvent.EVENT_TYPE_ID]
+        assert msgs['text'][0] == events[0][-1]
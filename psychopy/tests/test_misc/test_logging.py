@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import time
+import shutil
+from tempfile import mkdtemp
+
+from psychopy import logging
+
+
+class TestLogger(object):
+    def setup_method(self):
+        self.tmpDir = mkdtemp(prefix='psychopy-tests-logging')
+        self.logger = logging._Logger()
+        self.fileName = os.path.join(self.tmpDir, 'test.log')
+        self.logFile = logging.LogFile(self.fileName, level=logging.INFO,
+                                       filemode='w', logger=self.logger)
+
+    def teardown_method(self):
+        self.logger.useWriterThread(False)
+        self.logFile.stream.close()
+        shutil.rmtree(self.tmpDir)
+
+    def _contents(self):
+        with io.open(self.fileName, 'r', encoding='utf8') as f:
+            return f.read()
+
+    def test_levels_and_format(self):
+        self.logger.log('hello', level=logging.EXP, t=1.5)
+        self.logger.log('hidden', level=logging.DEBUG, t=2.0)
+        self.logger.flush()
+        assert self._contents() == '1.5000 \tEXP \thello\n'
+        # entries are usable directly for string formatting
+        entry = self.logger.flushed[0]
+        assert '%(t_ms).0f %(message)s' % entry == '1500 hello'
+
+    def test_retention(self):
+        self.logger.setRetention(2)
+        for n in range(5):
+            self.logger.log('msg%i' % n, level=logging.INFO, t=n)
+        self.logger.flush()
+        assert [e.message for e in self.logger.flushed] == ['msg3', 'msg4']
+        self.logger.setRetention(0)
+        self.logger.log('another', level=logging.INFO, t=6)
+        self.logger.flush()
+        assert len(self.logger.flushed) == 0
+        assert len(self._contents().splitlines()) == 6
+
+    def test_writerThread(self):
+        self.logger.useWriterThread(True)
+        for n in range(100):
+            self.logger.log('msg%i' % n, level=logging.INFO, t=n)
+            if n % 10 == 0:
+                self.logger.flush()
+        self.logger.flush()
+        self.logger.waitForWriter()
+        lines = self._contents().splitlines()
+        assert len(lines) == 100
+        assert lines[-1].endswith('msg99')
+
+    def test_flushAsync_maxLatency(self):
+        self.logger.log('first', level=logging.INFO, t=0)
+        self.logger.flushAsync()
+        self.logger.waitForWriter()
+        assert self._contents().endswith('first\n')
+        # with a maxLatency entries get written without calls to flush()
+        self.logger.useWriterThread(True, maxLatency=0.01)
+        self.logger.log('second', level=logging.INFO, t=1)
+        for n in range(100):
+            if self._contents().endswith('second\n'):
+                break
+            time.sleep(0.01)
+        assert self._contents().endswith('second\n')
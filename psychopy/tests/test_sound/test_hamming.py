@@ -40,3 +40,40 @@ def test_HammingSmallBlock():
         plt.subplot(2,1,2)
         plt.plot(t, snd2[0:sampleRate*secs]-snd1)
         plt.show()
+
+
+def test_HammingApplyInPlace():
+    """applyTo should window blocks the same as the complete sound"""
+    win = HammingWindow(winSecs=0.005, soundSecs=secs, sampleRate=sampleRate)
+    expected = win.applyTo(np.ones([win.soundSamples, 2]), 0)
+    for blockSize in [64, 100, 128]:
+        t = 0
+        while t < secs:
+            block = np.ones([blockSize, 2])
+            assert win.applyTo(block, t) is block
+            ii = int(round(t*sampleRate))
+            nSamples = min(blockSize, win.soundSamples - ii)
+            assert np.allclose(block[:nSamples], expected[ii:ii + nSamples])
+            t += blockSize / sampleRate
+
+
+def test_ToneTable():
+    """Tones are played from a short table of whole periods"""
+    for freq, tableLen in [(441, 100), (440, 2205), (261.63, None)]:
+        longSecs = 5
+        sndDev = sd.SoundDeviceSound(freq, sampleRate=sampleRate,
+                                     secs=longSecs, hamming=True,
+                                     blockSize=128)
+        if tableLen is not None:
+            assert len(sndDev._toneTable) == tableLen
+        assert len(sndDev._toneTable) <= sampleRate
+        snd = []
+        while sndDev.status != FINISHED:
+            snd.extend(sndDev._nextBlock())
+        nTotal = int(round(longSecs * sampleRate))
+        snd = np.array(snd)[:nTotal, 0]
+        expected = np.sin(np.arange(nTotal) * 2 * np.pi * freq / sampleRate)
+        win = HammingWindow(winSecs=0.005, soundSecs=longSecs,
+                            sampleRate=sampleRate)
+        win.applyTo(expected.reshape(-1, 1), 0)
+        assert np.allclose(snd, expected, atol=1e-3)
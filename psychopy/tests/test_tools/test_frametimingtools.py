@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Tests for psychopy.tools.frametimingtools
+"""
+
+import os
+import shutil
+from tempfile import mkdtemp
+
+import numpy as np
+import pytest
+
+from psychopy.tools.frametimingtools import FrameTimeRecorder
+
+
+def _record(nFrames=1000, capacity=10):
+    rec = FrameTimeRecorder(capacity=capacity)
+    intervals = np.full(nFrames, 1 / 60.)
+    intervals[[10, 11, 12, 500]] = 2 / 60.
+    times = np.cumsum(intervals)
+    for t, interval in zip(times, intervals):
+        rec.append(t, interval, interval > 1.5 / 60.)
+    return rec, times, intervals
+
+
+def test_append_and_grow():
+    rec, times, intervals = _record()
+    assert len(rec) == 1000
+    assert np.allclose(rec.times, times)
+    assert np.allclose(rec.intervals, intervals)
+    assert rec.nDropped == 4
+    with pytest.raises(ValueError):
+        rec.intervals[0] = 1  # views are read-only
+    rec.clear()
+    assert len(rec) == 0 and len(rec.intervals) == 0
+
+
+def test_summaries():
+    rec, times, intervals = _record()
+    assert np.allclose(rec.droppedRuns(), [[10, 3], [500, 1]])
+    summary = rec.summary()
+    assert summary['nFrames'] == 1000
+    assert summary['longestDroppedRun'] == 3
+    assert np.isclose(summary['median'], 1 / 60.)
+    assert np.isclose(summary['max'], 2 / 60.)
+    assert np.isnan(FrameTimeRecorder().percentiles(50))
+
+
+def test_save():
+    rec, times, intervals = _record()
+    tmpDir = mkdtemp(prefix='psychopy-tests-frametiming')
+    try:
+        csvName = os.path.join(tmpDir, 'frames.csv')
+        rec.save(csvName)
+        loaded = np.loadtxt(csvName, delimiter=',', skiprows=1)
+        assert loaded.shape == (1000, 3)
+        assert np.allclose(loaded[:, 1], intervals, atol=1e-6)
+
+        npyName = os.path.join(tmpDir, 'frames.npy')
+        rec.save(npyName)
+        loaded = np.load(npyName)
+        assert np.array_equal(loaded['dropped'], rec.dropped)
+        assert np.array_equal(loaded['interval'], intervals)
+    finally:
+        shutil.rmtree(tmpDir)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Tests for psychopy.tools.movietools
+"""
+
+import os
+import shutil
+import time
+from tempfile import mkdtemp
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from psychopy.tools.movietools import (MovieFrameWriter, MovieFrameReader,
+                                       findFFmpeg)
+
+
+class TestMovieFrameWriter(object):
+    def setup_method(self, method):
+        self.tmpDir = mkdtemp(prefix='psychopy-tests-movietools')
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.tmpDir)
+
+    def test_imageSequence(self):
+        w, h = 16, 8
+        writer = MovieFrameWriter(os.path.join(self.tmpDir, 'frame.png'),
+                                  (w, h), nBuffers=2)
+        buffers = set()
+        for n in range(5):
+            frame = writer.getBuffer()
+            buffers.add(id(frame))
+            frame[:] = n * 10
+            frame[0] = 255  # bottom row (as read from GL)
+            writer.submit(frame)
+        writer.close()
+        # buffers are reused rather than allocated per frame
+        assert len(buffers) <= 2
+        assert writer.nFrames == 5
+        for n in range(5):
+            im = np.array(Image.open(
+                os.path.join(self.tmpDir, 'frame%05d.png' % (n + 1))))
+            assert im.shape == (h, w, 3)
+            assert np.all(im[-1] == 255)  # flipped to top row first
+            assert np.all(im[0] == n * 10)
+
+    @pytest.mark.skipif(findFFmpeg() is None, reason='needs ffmpeg')
+    def test_oddSizeMovie(self):
+        # libx264 with yuv420p needs an even size, so frames are padded
+        fileName = os.path.join(self.tmpDir, 'movie.mp4')
+        writer = MovieFrameWriter(fileName, (15, 7), fps=10)
+        for n in range(5):
+            frame = writer.getBuffer()
+            frame[:] = n * 10
+            writer.submit(frame)
+        writer.close()
+        assert writer.nFrames == 5
+        assert os.path.getsize(fileName) > 0
+
+
+def test_movieFrameReader():
+    fps = 10.0
+    decoded = []
+
+    def getFrame(t):
+        decoded.append(t)
+        if 0.45 < t < 0.55:
+            raise IOError('bad frame')
+        return np.full((4, 4, 3), int(round(t * fps)), dtype=np.uint8)
+
+    reader = MovieFrameReader(getFrame, 1 / fps, duration=1.0, nBuffers=3)
+    frameT, frame = reader.getFrame(0.0, block=True)
+    assert frameT == 0.0 and frame[0, 0, 0] == 0
+    # frames are decoded ahead, but no more than nBuffers of them
+    while len(decoded) < 4:
+        time.sleep(0.01)
+    assert reader.nReady <= 3
+    assert reader.getFrame(0.1, block=True)[0] == 0.1
+    # frames that are too old are skipped, as is the one that failed
+    frameT, frame = reader.getFrame(0.4, block=True)
+    assert np.isclose(frameT, 0.4)
+    assert np.isclose(reader.getFrame(0.5, block=True)[0], 0.6)
+
+    reader.seek(0.9)
+    assert np.isclose(reader.getFrame(0.9, block=True)[0], 0.9)
+    assert np.isclose(reader.getFrame(1.0, block=True)[0], 1.0)
+    # nothing after the end
+    assert reader.getFrame(1.1, block=True) == (None, None)
+    reader.close()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Tests for psychopy.tools.texturetools"""
+
+import gc
+
+from psychopy.tools.texturetools import TextureCache, TexturePrefetcher
+
+
+class _Window(object):
+    pass
+
+
+def test_dataLRU():
+    cache = TextureCache(maxBytes=100)
+    cache.addData('a', 'A', 40)
+    cache.addData('b', 'B', 40)
+    assert cache.getData('a') == 'A'  # 'b' is now the least recently used
+    cache.addData('c', 'C', 40)
+    assert cache.getData('b') is None
+    assert cache.getData('a') == 'A'
+    assert cache.getData('c') == 'C'
+    cache.addData('huge', 'H', 101)  # too big to keep
+    assert cache.getData('huge') is None
+    stats = cache.getStats()
+    assert stats['nData'] == 2 and stats['dataBytes'] == 80
+    cache.clear()
+    assert cache.getData('a') is None
+
+
+def test_textureSharing():
+    deleted = []
+    cache = TextureCache(maxTextureBytes=100, deleteTexture=deleted.append)
+    win1, win2 = _Window(), _Window()
+
+    assert cache.acquireTexture('sin', win1) is None
+    assert cache.addTexture('sin', win1, 1, 60)
+    # a second stimulus in the same window shares the texture
+    assert cache.acquireTexture('sin', win1) == 1
+    # but not one in another window
+    assert cache.acquireTexture('sin', win2) is None
+    assert cache.isCached(win1, 1) and not cache.isCached(win2, 1)
+
+    assert cache.releaseTexture(win1, 1)
+    assert cache.releaseTexture(win1, 1)
+    assert not cache.releaseTexture(win1, 99)  # not the cache's texture
+    assert deleted == []  # unused textures are kept for re-use
+
+    # going over the limit deletes unused textures of that window only
+    assert cache.addTexture('gauss', win2, 2, 60)
+    assert deleted == []
+    assert cache.addTexture('sqr', win1, 3, 60)
+    assert deleted == [1]
+    assert cache.acquireTexture('sin', win1) is None
+    # textures in use are never deleted
+    assert cache.addTexture('saw', win1, 4, 60)
+    assert deleted == [1]
+    assert cache.getStats()['nTextures'] == 3
+
+    cache.clearContext(win1)
+    assert not cache.isCached(win1, 3)
+    assert not cache.releaseTexture(win1, 3)
+    assert cache.isCached(win2, 2)
+
+
+def test_collectedWindow():
+    cache = TextureCache(deleteTexture=lambda texName: None)
+    win = _Window()
+    assert cache.addTexture('sin', win, 1, 60)
+    del win
+    gc.collect()
+    # a new window (which may have the same id) doesn't get its textures
+    win2 = _Window()
+    assert cache.acquireTexture('sin', win2) is None
+    assert not cache.isCached(win2, 1)
+    # and they are forgotten when the next texture is added
+    assert cache.addTexture('sin', win2, 2, 60)
+    stats = cache.getStats()
+    assert stats['nTextures'] == 1 and stats['textureBytes'] == 60
+
+
+def test_disabled():
+    cache = TextureCache()
+    cache.enabled = False
+    cache.addData('a', 'A', 1)
+    assert cache.getData('a') is None
+    assert not cache.addTexture('sin', _Window(), 1, 1)
+
+
+def test_prefetcher():
+    cache = TextureCache(maxBytes=100)
+    decoded = []
+
+    def decode(name):
+        if name == 'bad':
+            raise IOError("can't decode")
+        decoded.append(name)
+        return name.upper(), 10
+
+    prefetcher = TexturePrefetcher(decode, nWorkers=2, cache=cache)
+    assert prefetcher.prefetch('a', 'a')
+    assert prefetcher.prefetch('b', 'b')
+    assert prefetcher.prefetch('x', 'bad')
+    prefetcher.wait()
+    assert not prefetcher.prefetch('a', 'a')  # ready already
+    assert sorted(decoded) == ['a', 'b']
+
+    assert cache.getData('a') == 'A'  # hit
+    assert cache.getData('a') == 'A'  # only the first use counts
+    cache.clear()
+    assert cache.getData('b') is None  # evicted before use
+    assert cache.getData('c') is None  # not prefetched
+    stats = prefetcher.getStats()
+    assert stats['queued'] == 3 and stats['decoded'] == 2
+    assert stats['errors'] == 1 and stats['pending'] == 0
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    prefetcher.close()
+    assert not prefetcher.prefetch('d', 'd')
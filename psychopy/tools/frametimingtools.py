@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Tools for recording and summarising the timing of screen refreshes.
+#
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+from __future__ import absolute_import, division
+
+__all__ = ['FrameTimeRecorder']
+
+import numpy as np
+
+
+class FrameTimeRecorder(object):
+    """Records flip timestamps, frame intervals and dropped-frame flags in
+    preallocated NumPy arrays.
+
+    Appending a frame only writes into the arrays (no Python objects are
+    created per frame). When the arrays are full their capacity is doubled,
+    so appending is O(1) on average and the arrays are re-allocated only
+    rarely (about 20 times for a million frames with the default size).
+
+    Parameters
+    ----------
+    capacity : int
+        Number of frames to allocate space for initially (10 minutes at
+        60Hz by default).
+
+    Examples
+    --------
+    The :class:`~psychopy.visual.Window` records into one of these while
+    `win.recordFrameIntervals` is True::
+
+        win.recordFrameIntervals = True
+        # ... run some trials ...
+        print(win.frameRecorder.summary())
+        win.frameRecorder.save('frameTimes.csv')
+
+    """
+
+    def __init__(self, capacity=36000):
+        self._capacity = max(int(capacity), 1)
+        self._times = np.zeros(self._capacity, dtype=np.float64)
+        self._intervals = np.zeros(self._capacity, dtype=np.float64)
+        self._dropped = np.zeros(self._capacity, dtype=bool)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def _grow(self, minCapacity):
+        capacity = self._capacity
+        while capacity < minCapacity:
+            capacity *= 2
+        for name in ('_times', '_intervals', '_dropped'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+        self._capacity = capacity
+
+    def append(self, t, interval, dropped=False):
+        """Record a frame.
+
+        Parameters
+        ----------
+        t : float
+            Time stamp of the flip.
+        interval : float
+            Time since the previous flip.
+        dropped : bool
+            Whether the frame was considered to be dropped.
+
+        """
+        n = self._n
+        if n == self._capacity:
+            self._grow(n + 1)
+        self._times[n] = t
+        self._intervals[n] = interval
+        self._dropped[n] = dropped
+        self._n = n + 1
+
+    def extend(self, times, intervals, dropped=None):
+        """Record several frames at once (arrays of equal length)."""
+        times = np.asarray(times, dtype=np.float64)
+        intervals = np.asarray(intervals, dtype=np.float64)
+        nNew = len(intervals)
+        if dropped is None:
+            dropped = np.zeros(nNew, dtype=bool)
+        if self._n + nNew > self._capacity:
+            self._grow(self._n + nNew)
+        self._times[self._n:self._n + nNew] = times
+        self._intervals[self._n:self._n + nNew] = intervals
+        self._dropped[self._n:self._n + nNew] = dropped
+        self._n += nNew
+
+    def clear(self):
+        """Forget all recorded frames (keeps the allocated memory)."""
+        self._n = 0
+
+    @property
+    def times(self):
+        """Flip time stamps (read-only view of the recorded values)."""
+        view = self._times[:self._n]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def intervals(self):
+        """Frame intervals in secs (read-only view of the recorded values).
+        """
+        view = self._intervals[:self._n]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def dropped(self):
+        """Boolean array, True for frames considered as dropped (read-only
+        view of the recorded values)."""
+        view = self._dropped[:self._n]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def nDropped(self):
+        """Number of dropped frames recorded."""
+        return int(np.count_nonzero(self.dropped))
+
+    def percentiles(self, q=(1, 5, 50, 95, 99)):
+        """Percentiles of the frame intervals (in secs).
+
+        Parameters
+        ----------
+        q : float or sequence of floats
+            Percentiles to compute, between 0 and 100.
+
+        Returns
+        -------
+        ndarray
+            One value for each of `q` (NaN if nothing has been recorded).
+
+        """
+        if not self._n:
+            return np.full(np.shape(q), np.nan)
+        return np.percentile(self.intervals, q)
+
+    def droppedRuns(self):
+        """Find runs of consecutive dropped frames.
+
+        Returns
+        -------
+        ndarray
+            Array of shape (nRuns, 2) giving the index of the first frame of
+            each run and its length.
+
+        """
+        padded = np.concatenate(([False], self.dropped, [False]))
+        edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+        starts, stops = edges[0::2], edges[1::2]
+        return np.column_stack((starts, stops - starts))
+
+    def summary(self):
+        """Summary statistics of the recorded frame intervals.
+
+        Returns
+        -------
+        dict
+            With keys 'nFrames', 'mean', 'sd', 'min', 'max', 'median',
+            'percentiles' (dict of the 1, 5, 95 and 99th), 'nDropped' and
+            'longestDroppedRun'. Times are in secs.
+
+        """
+        intervals = self.intervals
+        out = {'nFrames': self._n,
+               'nDropped': self.nDropped}
+        if not self._n:
+            return out
+        q = (1, 5, 50, 95, 99)
+        pc = self.percentiles(q)
+        runs = self.droppedRuns()
+        out.update({
+            'mean': float(np.mean(intervals)),
+            'sd': float(np.std(intervals)),
+            'min': float(np.min(intervals)),
+            'max': float(np.max(intervals)),
+            'median': float(pc[2]),
+            'percentiles': {qq: float(val) for qq, val in zip(q, pc)},
+            'longestDroppedRun': int(runs[:, 1].max()) if len(runs) else 0})
+        return out
+
+    def save(self, fileName, fileFormat=None):
+        """Save the recorded frames to disk.
+
+        Parameters
+        ----------
+        fileName : str
+            Name of the file to save.
+        fileFormat : str or None
+            'csv' (columns time, interval and dropped), 'npy' (binary
+            structured array with the same fields) or 'npz' (one array per
+            field). If `None` this is taken from the extension of
+            `fileName`, defaulting to 'csv'.
+
+        """
+        if fileFormat is None:
+            ext = fileName.rsplit('.', 1)[-1].lower()
+            fileFormat = ext if ext in ('npy', 'npz') else 'csv'
+        if fileFormat == 'npy':
+            rec = np.empty(self._n, dtype=[('time', np.float64),
+                                           ('interval', np.float64),
+                                           ('dropped', bool)])
+            rec['time'] = self.times
+            rec['interval'] = self.intervals
+            rec['dropped'] = self.dropped
+            np.save(fileName, rec)
+        elif fileFormat == 'npz':
+            np.savez(fileName, time=self.times, interval=self.intervals,
+                     dropped=self.dropped)
+        elif fileFormat == 'csv':
+            table = np.column_stack((self.times, self.intervals,
+                                     self.dropped.astype(np.int8)))
+            # savetxt writes row by row so no huge string is built
+            np.savetxt(fileName, table, fmt=['%.6f', '%.6f', '%d'],
+                       delimiter=',', header='time,interval,dropped',
+                       comments='')
+        else:
+            raise ValueError("fileFormat should be 'csv', 'npy' or 'npz', "
+                             "not %r" % fileFormat)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Tools for writing frames captured from a window to movie or image files,
+# and for decoding movie frames ahead of playback.
+#
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+from __future__ import absolute_import, division
+
+__all__ = ['MovieFrameWriter', 'MovieFrameReader', 'findFFmpeg']
+
+import os
+import threading
+import subprocess
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue
+try:
+    from shutil import which
+except ImportError:  # python 2
+    from distutils.spawn import find_executable as which
+
+import numpy as np
+from PIL import Image
+
+from psychopy import logging
+
+# file types that are encoded as a movie by ffmpeg (others are written as a
+# sequence of images by PIL)
+movieExtensions = ('.mp4', '.mov', '.mpg', '.mpeg', '.avi', '.mkv', '.gif')
+
+
+def findFFmpeg():
+    """Find an ffmpeg executable.
+
+    Uses the one shipped with `imageio-ffmpeg` (installed along with
+    moviepy) if available, otherwise looks for `ffmpeg` on the system path.
+
+    Returns
+    -------
+    str or None
+        Path to the executable or `None` if it wasn't found.
+
+    """
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return which('ffmpeg')
+
+
+class MovieFrameWriter(object):
+    """Writes frames to a movie (through an ffmpeg pipe) or to a sequence of
+    image files, on a background thread, as they are captured.
+
+    Frames are raw RGBA pixel arrays, bottom row first (as returned by
+    `glReadPixels`). They are written into buffers that come from a small
+    pool owned by the writer (see :meth:`getBuffer`) and the buffers are
+    returned to the pool once written, so memory use doesn't depend on the
+    number of frames. If the encoder falls behind, :meth:`getBuffer` waits
+    for a buffer to become free.
+
+    Parameters
+    ----------
+    fileName : str
+        Movie file (e.g. 'stim.mp4') or, for any other extension, the
+        pattern for image files: 'frame.png' gives frame00001.png,
+        frame00002.png, ...
+    size : (int, int)
+        Width and height of the frames in pixels.
+    fps : int
+        Frame rate of the movie.
+    codec : str or None
+        Video codec used by ffmpeg (e.g. 'libx264', 'mpeg4'). `None` lets
+        ffmpeg choose one for the file type.
+    nBuffers : int
+        Number of frame buffers, i.e. how many frames can be waiting to be
+        written before capturing has to wait.
+
+    """
+
+    def __init__(self, fileName, size, fps=30, codec='libx264', nBuffers=4):
+        self.fileName = fileName
+        self.size = (int(size[0]), int(size[1]))
+        self.fps = fps
+        self.codec = codec
+        self.nFrames = 0
+        self._error = None
+
+        fileRoot, fileExt = os.path.splitext(fileName)
+        self.isMovie = fileExt.lower() in movieExtensions
+        self._imageNameFormat = fileRoot + '%05d' + fileExt
+
+        w, h = self.size
+        self._pool = queue.Queue()
+        for n in range(max(int(nBuffers), 1)):
+            self._pool.put(np.empty((h, w, 4), dtype=np.uint8))
+        self._queue = queue.Queue()
+
+        self._proc = None
+        if self.isMovie:
+            self._proc = self._startFFmpeg()
+        self._thread = threading.Thread(target=self._run,
+                                        name='MovieFrameWriter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _startFFmpeg(self):
+        ffmpeg = findFFmpeg()
+        if ffmpeg is None:
+            raise RuntimeError('Writing movies needs ffmpeg (e.g. '
+                               '`pip install imageio-ffmpeg`)')
+        w, h = self.size
+        cmd = [ffmpeg, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgba',
+               '-s', '%ix%i' % (w, h), '-r', str(self.fps), '-i', '-']
+        filters = ['vflip']  # frames come from GL bottom row first
+        codecArgs = []
+        if self.codec and not self.fileName.lower().endswith('.gif'):
+            codecArgs += ['-vcodec', self.codec]
+            if self.codec == 'libx264':
+                codecArgs += ['-pix_fmt', 'yuv420p']  # plays on most players
+                # yuv420p needs an even width and height
+                filters.append('pad=ceil(iw/2)*2:ceil(ih/2)*2')
+        cmd += ['-vf', ','.join(filters)] + codecArgs
+        cmd.append(self.fileName)
+        return subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def getBuffer(self):
+        """Get an empty frame buffer (an ndarray of shape (h, w, 4), uint8)
+        to fill and pass to :meth:`submit`.
+        """
+        if self._error is not None:
+            raise self._error
+        return self._pool.get()
+
+    def submit(self, frame):
+        """Queue a frame (a buffer from :meth:`getBuffer`) to be written.
+        """
+        self.nFrames += 1
+        self._queue.put(frame)
+
+    @property
+    def nPending(self):
+        """Number of frames waiting to be written."""
+        return self._queue.qsize()
+
+    def _run(self):
+        frameN = 0
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            frameN += 1
+            try:
+                if self._error is None:
+                    self._write(frame, frameN)
+            except Exception as err:
+                self._error = err
+                logging.error('Failed to write movie frame to %s: %s'
+                              % (self.fileName, err))
+            finally:
+                self._pool.put(frame)
+
+    def _write(self, frame, frameN):
+        if self._proc is not None:
+            self._proc.stdin.write(frame.data)
+        else:
+            im = Image.fromarray(frame[::-1], mode='RGBA').convert('RGB')
+            im.save(self._imageNameFormat % frameN)
+
+    def close(self):
+        """Write any remaining frames and close the file(s).
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._proc is not None:
+            self._proc.stdin.close()
+            self._proc.wait()
+            self._proc = None
+        logging.info('Wrote %i frames to %s' % (self.nFrames, self.fileName))
+        if self._error is not None:
+            raise self._error
+
+
+class MovieFrameReader(object):
+    """Decodes movie frames on a background thread, keeping a bounded queue
+    of frames ready ahead of playback.
+
+    Frames are decoded in order from the position given to :meth:`seek`,
+    one every `frameInterval` seconds of movie time, until the end of the
+    movie. Once `nBuffers` frames are waiting the decoder waits for the
+    player to take one with :meth:`getFrame`.
+
+    Parameters
+    ----------
+    getFrame : callable
+        Returns the frame (an ndarray) at a given time in the movie, e.g.
+        the `get_frame` method of a moviepy clip. It is only called from
+        the reader's thread.
+    frameInterval : float
+        Time between frames (1/fps).
+    duration : float
+        Duration of the movie; no frames are decoded after it.
+    nBuffers : int
+        Maximum number of decoded frames waiting to be shown.
+
+    """
+
+    def __init__(self, getFrame, frameInterval, duration, nBuffers=8):
+        self.frameInterval = frameInterval
+        self.duration = duration
+        self._getFrame = getFrame
+        self._ready = queue.Queue(maxsize=max(int(nBuffers), 1))
+        self._cond = threading.Condition()
+        self._generation = 0  # incremented by each seek
+        self._startT = 0.0
+        self._idle = False  # decoded everything up to the end
+        self._closing = False
+        self._thread = threading.Thread(target=self._run,
+                                        name='MovieFrameReader')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def seek(self, t):
+        """Drop the frames decoded so far and continue decoding from `t`.
+        """
+        with self._cond:
+            self._generation += 1
+            self._startT = t
+            self._idle = False
+            self._drain()
+            self._cond.notify()
+
+    def _drain(self):
+        while True:
+            try:
+                self._ready.get_nowait()
+            except queue.Empty:
+                break
+
+    @property
+    def nReady(self):
+        """Number of decoded frames waiting to be shown."""
+        return self._ready.qsize()
+
+    def getFrame(self, t, block=False):
+        """Take the next decoded frame, skipping any from before `t`.
+
+        Parameters
+        ----------
+        t : float
+            Movie time of the frame wanted.
+        block : bool
+            Wait for the frame to be decoded, unless the decoder has
+            reached the end of the movie.
+
+        Returns
+        -------
+        tuple
+            The time and the frame, or `(None, None)` if no frame is ready.
+
+        """
+        while True:
+            try:
+                item = self._ready.get(block, 0.05)
+            except queue.Empty:
+                if block and not self._idle and not self._closing:
+                    continue
+                return None, None
+            generation, frameT, frame = item
+            if generation != self._generation:
+                continue  # decoded before a seek
+            if frameT < t - self.frameInterval / 2.0:
+                continue  # too late to show
+            return frameT, frame
+
+    def _run(self):
+        generation = None
+        frameN = 0
+        while True:
+            with self._cond:
+                if self._closing:
+                    return
+                if generation != self._generation:
+                    generation = self._generation
+                    startT = self._startT
+                    frameN = 0
+                t = startT + frameN * self.frameInterval
+                if t > self.duration:
+                    self._idle = True
+                    self._cond.wait()
+                    continue
+            frameN += 1
+            try:
+                frame = self._getFrame(t)
+            except Exception as err:
+                logging.warning("Couldn't decode the movie frame at %.3fs: "
+                                "%s" % (t, err))
+                continue
+            item = (generation, t, frame)
+            while generation == self._generation and not self._closing:
+                try:
+                    self._ready.put(item, timeout=0.05)
+                    break
+                except queue.Full:
+                    pass
+
+    def close(self):
+        """Stop decoding and drop the decoded frames.
+        """
+        if self._thread is None:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        self._drain()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Tools for sharing texture data between stimuli.
+#
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+from __future__ import absolute_import, division
+
+__all__ = ['TextureCache', 'textureCache', 'TexturePrefetcher']
+
+import ctypes
+import itertools
+import threading
+import weakref
+from collections import OrderedDict
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue
+
+from psychopy import logging
+
+
+def _glDeleteTexture(texName):
+    from pyglet import gl
+    gl.glDeleteTextures(1, ctypes.byref(gl.GLuint(texName)))
+
+
+class TextureCache(object):
+    """Process-wide cache of decoded texture data and of uploaded textures.
+
+    Stimuli that use the same image file, array or procedural texture
+    (e.g. 'sin' or 'gauss' at the same resolution) with the same settings
+    share one decoded intensity array and, within each OpenGL context, one
+    texture, so the image is only decoded and uploaded once.
+
+    Two kinds of entry are held, each in least-recently-used order:
+
+    * data: decoded arrays (and whatever else is needed to rebuild the
+      texture), bounded by `maxBytes`. When adding an entry takes the total
+      over the limit the least recently used entries are dropped.
+    * textures: OpenGL texture names, per context (window), with the
+      number of stimuli using each. Contexts are told apart by a token
+      (rather than their `id`, which a new window may re-use) and their
+      entries are dropped once they are garbage collected. Textures that are no longer used by any
+      stimulus are kept until `maxTextureBytes` is exceeded and are then
+      deleted, least recently used first. Textures in use are never
+      deleted, so the total can exceed the limit.
+
+    Decoded data may be added from other threads (e.g. by an
+    :class:`~psychopy.visual.prefetch.ImagePrefetcher`); textures are only
+    handled on the thread that draws.
+
+    Parameters
+    ----------
+    maxBytes : int
+        Memory limit for decoded data.
+    maxTextureBytes : int
+        Memory limit (estimated from the uploaded data) for unused textures
+        kept for re-use.
+    deleteTexture : callable or None
+        Called with a texture name to delete an evicted texture (deletes it
+        with `glDeleteTextures` by default). Textures are only deleted when
+        a texture is added for the same context, so while that context is
+        current.
+
+    """
+
+    def __init__(self, maxBytes=256 * 2 ** 20, maxTextureBytes=256 * 2 ** 20,
+                 deleteTexture=None):
+        self.maxBytes = maxBytes
+        self.maxTextureBytes = maxTextureBytes
+        self.enabled = True
+        self._deleteTexture = deleteTexture or _glDeleteTexture
+        self._data = OrderedDict()  # key: (value, nBytes)
+        self._dataBytes = 0
+        self._dataLock = threading.Lock()
+        self._dataListeners = []
+        # context: contextKey, and contextKey: weakref to the context
+        self._contextKeys = weakref.WeakKeyDictionary()
+        self._contextRefs = {}
+        self._nextContextKey = itertools.count(1)
+        self._deadContexts = []  # keys of contexts garbage collected
+        # (contextKey, key): [texName, nBytes, nUsers]
+        self._textures = OrderedDict()
+        self._textureKeys = {}  # (contextKey, texName): key
+        self._textureBytes = 0
+        self._stats = dict.fromkeys(
+            ('dataHits', 'dataMisses', 'textureHits', 'textureMisses',
+             'texturesDeleted'), 0)
+
+    # decoded data
+    def getData(self, key):
+        """Return the value stored for `key` (or `None`)."""
+        if not self.enabled or key is None:
+            return None
+        with self._dataLock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._data[key] = entry  # most recently used
+                self._stats['dataHits'] += 1
+            else:
+                self._stats['dataMisses'] += 1
+        for listener in self._dataListeners:
+            listener(key, entry is not None)
+        return None if entry is None else entry[0]
+
+    def hasData(self, key):
+        """Whether a value is stored for `key` (without counting as a
+        lookup)."""
+        return self.enabled and key is not None and key in self._data
+
+    def addData(self, key, value, nBytes):
+        """Store a value (of `nBytes` in size) for `key`. Values that are
+        bigger than `maxBytes` are not stored."""
+        if not self.enabled or key is None or nBytes > self.maxBytes:
+            return
+        with self._dataLock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._dataBytes -= old[1]
+            self._data[key] = (value, nBytes)
+            self._dataBytes += nBytes
+            while self._dataBytes > self.maxBytes:
+                _key, (_value, oldBytes) = self._data.popitem(last=False)
+                self._dataBytes -= oldBytes
+
+    def addDataListener(self, listener):
+        """Call `listener(key, hit)` on every lookup of decoded data."""
+        if listener not in self._dataListeners:
+            self._dataListeners.append(listener)
+
+    def removeDataListener(self, listener):
+        if listener in self._dataListeners:
+            self._dataListeners.remove(listener)
+
+    # uploaded textures
+    def _contextKey(self, context, create=False):
+        """The token of a context (`None` if it has none and `create` is
+        False)."""
+        ctxKey = self._contextKeys.get(context)
+        if ctxKey is None and create:
+            ctxKey = next(self._nextContextKey)
+            self._contextKeys[context] = ctxKey
+            # (collected windows are only forgotten on the drawing thread,
+            # in addTexture, as this can be called during any allocation)
+            self._contextRefs[ctxKey] = weakref.ref(
+                context, lambda ref, ctxKey=ctxKey:
+                self._deadContexts.append(ctxKey))
+        return ctxKey
+
+    def acquireTexture(self, key, context):
+        """Return the name of the texture stored for `key` in `context` (a
+        window), counting the caller as one of its users, or `None`."""
+        if not self.enabled or key is None:
+            return None
+        entryKey = (self._contextKey(context), key)
+        entry = self._textures.get(entryKey)
+        if entry is None:
+            self._stats['textureMisses'] += 1
+            return None
+        self._textures.pop(entryKey)
+        self._textures[entryKey] = entry
+        entry[2] += 1
+        self._stats['textureHits'] += 1
+        return entry[0]
+
+    def addTexture(self, key, context, texName, nBytes):
+        """Hand a texture (just uploaded by the caller, who is its first
+        user) over to the cache. Unused textures of the same context may be
+        deleted to stay within `maxTextureBytes`.
+
+        Returns `True` if the cache took the texture (`False` if caching is
+        disabled or there already is a texture for `key`, in which case the
+        caller keeps ownership).
+        """
+        if not self.enabled or key is None:
+            return False
+        while self._deadContexts:
+            self._forgetContext(self._deadContexts.pop())
+        ctxKey = self._contextKey(context, create=True)
+        entryKey = (ctxKey, key)
+        if entryKey in self._textures:
+            return False
+        self._textures[entryKey] = [texName, nBytes, 1]
+        self._textureKeys[(ctxKey, texName)] = key
+        self._textureBytes += nBytes
+        self._evictTextures(ctxKey)
+        return True
+
+    def releaseTexture(self, context, texName):
+        """Tell the cache a user has finished with a texture.
+
+        Returns `True` if the texture is held by the cache (so must not be
+        deleted by the caller) and `False` if it isn't one of the cache's
+        textures.
+        """
+        ctxKey = self._contextKey(context)
+        key = self._textureKeys.get((ctxKey, texName))
+        if key is None:
+            return False
+        entry = self._textures[(ctxKey, key)]
+        entry[2] = max(entry[2] - 1, 0)
+        return True
+
+    def isCached(self, context, texName):
+        """Whether the texture is held by the cache."""
+        return (self._contextKey(context), texName) in self._textureKeys
+
+    def _evictTextures(self, ctxKey):
+        if self._textureBytes <= self.maxTextureBytes:
+            return
+        for entryKey in list(self._textures):
+            if self._textureBytes <= self.maxTextureBytes:
+                break
+            entry = self._textures[entryKey]
+            if entryKey[0] != ctxKey or entry[2] > 0:
+                continue
+            del self._textures[entryKey]
+            self._textureBytes -= entry[1]
+            self._deleteEntryTexture(ctxKey, entry)
+
+    def _deleteEntryTexture(self, ctxKey, entry):
+        self._textureKeys.pop((ctxKey, entry[0]), None)
+        self._deleteTexture(entry[0])
+        self._stats['texturesDeleted'] += 1
+
+    def clearContext(self, context):
+        """Forget the textures of a context (e.g. when its window is
+        closed, which deletes them anyway)."""
+        ctxKey = self._contextKey(context)
+        if ctxKey is not None:
+            self._forgetContext(ctxKey)
+
+    def _forgetContext(self, ctxKey):
+        self._contextRefs.pop(ctxKey, None)
+        for entryKey in [k for k in self._textures if k[0] == ctxKey]:
+            entry = self._textures.pop(entryKey)
+            self._textureBytes -= entry[1]
+            self._textureKeys.pop((ctxKey, entry[0]), None)
+
+    def clear(self):
+        """Drop all decoded data. (Textures stay until they are evicted or
+        their context is cleared, as stimuli may be using them.)"""
+        with self._dataLock:
+            self._data.clear()
+            self._dataBytes = 0
+
+    def getStats(self):
+        """Return a dict with the number of entries and bytes held and the
+        hit / miss counts."""
+        stats = dict(self._stats)
+        stats.update(nData=len(self._data), dataBytes=self._dataBytes,
+                     nTextures=len(self._textures),
+                     textureBytes=self._textureBytes)
+        return stats
+
+
+# the cache used by visual stimuli (see TextureMixin._createTexture)
+textureCache = TextureCache()
+
+
+class TexturePrefetcher(object):
+    """Decodes texture data on a pool of worker threads, ahead of the
+    stimuli that will use it, and puts it in a :class:`TextureCache`.
+
+    A stimulus that then needs the data finds it in the cache, leaving only
+    the upload to be done on the drawing thread. See
+    :class:`~psychopy.visual.prefetch.ImagePrefetcher` for prefetching the
+    images of upcoming trials.
+
+    Parameters
+    ----------
+    decode : callable
+        Called on a worker thread with the arguments given to
+        :meth:`prefetch`; returns the value to cache and its size in bytes.
+    nWorkers : int
+        Number of worker threads.
+    cache : TextureCache or None
+        Cache to fill (the one used by visual stimuli by default).
+
+    """
+
+    def __init__(self, decode, nWorkers=2, cache=None):
+        self.cache = textureCache if cache is None else cache
+        self._decode = decode
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = set()  # keys queued or being decoded
+        self._fetched = set()  # keys decoded but not used yet
+        self._stats = dict.fromkeys(
+            ('queued', 'decoded', 'errors', 'hits', 'misses'), 0)
+        self.cache.addDataListener(self._onLookup)
+        self._threads = []
+        for ii in range(nWorkers):
+            thread = threading.Thread(target=self._run,
+                                      name='TexturePrefetcher%i' % ii)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def prefetch(self, key, *args):
+        """Queue `decode(*args)` for `key`, unless it is already cached or
+        queued.
+
+        Returns `True` if it was queued.
+        """
+        if key is None or not self._threads:
+            return False
+        with self._lock:
+            if key in self._pending or key in self._fetched:
+                return False
+            if self.cache.hasData(key):
+                self._fetched.add(key)  # its next use counts as a hit
+                return False
+            self._pending.add(key)
+            self._stats['queued'] += 1
+        self._queue.put((key, args))
+        return True
+
+    @property
+    def nPending(self):
+        """Number of entries queued or being decoded."""
+        return len(self._pending)
+
+    def wait(self):
+        """Wait until everything queued has been decoded."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                key, args = item
+                try:
+                    value, nBytes = self._decode(*args)
+                except Exception as err:
+                    # the stimulus will report the error when it loads it
+                    logging.warning("Couldn't prefetch texture %s: %s"
+                                    % (args[0] if args else key, err))
+                    with self._lock:
+                        self._pending.discard(key)
+                        self._stats['errors'] += 1
+                    continue
+                with self._lock:
+                    wanted = key in self._pending
+                    self._pending.discard(key)
+                    self._stats['decoded'] += 1
+                    if wanted:  # not already loaded by the stimulus
+                        self._fetched.add(key)
+                if wanted:
+                    self.cache.addData(key, value, nBytes)
+            finally:
+                self._queue.task_done()
+
+    def _onLookup(self, key, hit):
+        """Count lookups of prefetched data as hits, or as misses if it
+        wasn't ready (still being decoded or already evicted)."""
+        if key not in self._pending and key not in self._fetched:
+            return
+        with self._lock:
+            if key in self._pending:
+                self._pending.discard(key)  # decoded by the stimulus itself
+                self._stats['misses'] += 1
+            elif key in self._fetched:
+                self._fetched.discard(key)
+                self._stats['hits' if hit else 'misses'] += 1
+
+    def getStats(self):
+        """Return a dict with the number of entries queued, decoded and that
+        failed to decode, the hits (prefetched data that was ready when
+        used) and misses (used before it was ready, or evicted first)."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending'] = len(self._pending)
+        return stats
+
+    def close(self, wait=False):
+        """Stop the worker threads (after finishing what is queued if `wait`
+        is True)."""
+        if not self._threads:
+            return
+        if not wait:
+            with self._lock:
+                self._pending.clear()
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+        for thread in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.cache.removeDataListener(self._onLookup)
@@ -52,6 +52,7 @@ from psychopy.visual.elementarray import ElementArrayStim
 from psychopy.visual.ratingscale import RatingScale
 from psychopy.visual.slider import Slider
 from psychopy.visual.simpleimage import SimpleImageStim
+from psychopy.visual.prefetch import ImagePrefetcher
 
 # stimuli derived from BaseVisualStim
 from psychopy.visual.dot import DotStim
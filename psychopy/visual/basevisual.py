@@ -30,6 +30,8 @@ except ImportError:
 import copy
 import sys
 import os
+import ctypes
+import hashlib
 
 from psychopy import logging
 
@@ -45,6 +47,7 @@ from psychopy.visual.helpers import (pointInPolygon, polygonsOverlap,
                                      setColor, findImageFile)
 from psychopy.tools.typetools import float_uint8
 from psychopy.tools.arraytools import makeRadialMatrix
+from psychopy.tools.texturetools import textureCache
 from . import globalVars
 
 import numpy
@@ -618,6 +621,12 @@ class TextureMixin(object):
     # def __init__(self):
     #    super(TextureMixin, self).__init__()
 
+    # array textures are usually new data each time they are set (e.g. the
+    # samples of a NoiseStim) so by default they aren't hashed and kept in
+    # the texture cache, and are uploaded to the stimulus' own texture.
+    # Set this to True for stimuli that re-use the same arrays.
+    _cacheArrayTextures = False
+
     def _createTexture(self, tex, id, pixFormat,
                        stim, res=128, maskParams=None,
                        forcePOW2=True, dataType=None,
@@ -643,10 +652,16 @@ class TextureMixin(object):
         For grating stimuli (anything that needs multiple cycles)
         forcePOW2 should be set to be True. Otherwise the wrapping
         of the texture will not work.
+
+        Decoded textures (image files and the procedural textures, and
+        arrays if `_cacheArrayTextures` is True) are kept in
+        `psychopy.tools.texturetools.textureCache`, and
+        textures that don't depend on the stimulus color are shared
+        (through `id`) by all stimuli with the same texture and settings
+        in a window.
         """
 
         # Create an intensity texture, ranging -1:1.0
-        notSqr = False  # most of the options will be creating a sqr texture
         wasImage = False  # change this if image loading works
         useShaders = stim.useShaders
         interpolate = stim.interpolate
@@ -664,8 +679,22 @@ class TextureMixin(object):
         allMaskParams = {'fringeWidth': 0.2, 'sd': 3}
         allMaskParams.update(maskParams)
 
+        dataKey = self._textureDataKey(tex, res, allMaskParams, pixFormat,
+                                       dataType, useShaders, forcePOW2)
+        cached = textureCache.getData(dataKey)
+        forcedWrapping = None
+
         sin = numpy.sin
-        if type(tex) == numpy.ndarray:
+        if cached is not None:
+            intensity = cached['intensity']
+            wasLum = cached['wasLum']
+            wasImage = cached['wasImage']
+            dataType = cached['dataType']
+            if cached['forcedWrapping'] is not None:
+                wrapping = cached['forcedWrapping']
+            for attrib, value in cached['stimAttribs'].items():
+                setattr(stim, attrib, value)
+        elif type(tex) == numpy.ndarray:
             # handle a numpy array
             # for now this needs to be an NxN intensity array
             intensity = tex.astype(numpy.float32)
@@ -703,6 +732,7 @@ class TextureMixin(object):
             intensity = numpy.ones([res, res], numpy.float32)
             wasLum = True
             wrapping = True  # override any wrapping setting for None
+            forcedWrapping = True
         elif tex == "sin":
             # NB 1j*res is a special mgrid notation
             onePeriodX, onePeriodY = numpy.mgrid[0:res, 0:2 * pi:1j * res]
@@ -810,21 +840,7 @@ class TextureMixin(object):
         else:
             if isinstance(tex, basestring):
                 # maybe tex is the name of a file:
-                filename = findImageFile(tex)
-                if not filename:
-                    msg = "Couldn't find image %s; check path? (tried: %s)"
-                    logging.error(msg % (tex, os.path.abspath(tex)))
-                    logging.flush()
-                    raise IOError(msg % (tex, os.path.abspath(tex)))
-                try:
-                    im = Image.open(filename)
-                    im = im.transpose(Image.FLIP_TOP_BOTTOM)
-                except IOError:
-                    msg = "Found file '%s', failed to load as an image"
-                    logging.error(msg % (filename))
-                    logging.flush()
-                    msg = "Found file '%s' [= %s], failed to load as an image"
-                    raise IOError(msg % (tex, os.path.abspath(tex)))
+                im = self._loadImage(tex)
             else:
                 # can't be a file; maybe its an image already in memory?
                 try:
@@ -837,46 +853,40 @@ class TextureMixin(object):
             # at this point we have a valid im
             stim._origSize = im.size
             wasImage = True
-            # is it 1D?
-            if im.size[0] == 1 or im.size[1] == 1:
-                logging.error("Only 2D textures are supported at the moment")
-            else:
-                maxDim = max(im.size)
-                powerOf2 = int(2**numpy.ceil(numpy.log2(maxDim)))
-                if im.size[0] != powerOf2 or im.size[1] != powerOf2:
-                    if not forcePOW2:
-                        notSqr = True
-                    elif globalVars.nImageResizes < reportNImageResizes:
-                        msg = ("Image '%s' was not a square power-of-two ' "
-                               "'image. Linearly interpolating to be %ix%i")
-                        logging.warning(msg % (tex, powerOf2, powerOf2))
-                        globalVars.nImageResizes += 1
-                        im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
-                    elif globalVars.nImageResizes == reportNImageResizes:
-                        logging.warning("Multiple images have needed resizing"
-                                        " - I'll stop bothering you!")
-                        im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
-            # is it Luminance or RGB?
-            if pixFormat == GL.GL_ALPHA and im.mode != 'L':
-                # we have RGB and need Lum
-                wasLum = True
-                im = im.convert("L")  # force to intensity (need if was rgb)
-            elif im.mode == 'L':  # we have lum and no need to change
-                wasLum = True
-                if useShaders:
-                    dataType = GL.GL_FLOAT
-            elif pixFormat == GL.GL_RGB:
-                # we want RGB and might need to convert from CMYK or Lm
-                # texture = im.tostring("raw", "RGB", 0, -1)
-                im = im.convert("RGBA")
-                wasLum = False
-            if dataType == GL.GL_FLOAT:
-                # convert from ubyte to float
-                # much faster to avoid division 2/255
-                intensity = numpy.array(im).astype(
-                    numpy.float32) * 0.0078431372549019607 - 1.0
-            else:
-                intensity = numpy.array(im)
+            intensity, wasLum, dataType = self._imageToIntensity(
+                im, tex, pixFormat, dataType, useShaders, forcePOW2)
+
+        if cached is None and dataKey is not None:
+            stimAttribs = {}
+            if type(tex) == numpy.ndarray:
+                stimAttribs['_tex1D'] = stim._tex1D
+            if wasImage:
+                stimAttribs['_origSize'] = stim._origSize
+            intensity = numpy.asarray(intensity)
+            intensity.flags.writeable = False  # shared from now on
+            textureCache.addData(
+                dataKey,
+                {'intensity': intensity, 'wasLum': wasLum,
+                 'wasImage': wasImage, 'dataType': dataType,
+                 'forcedWrapping': forcedWrapping,
+                 'stimAttribs': stimAttribs},
+                intensity.nbytes)
+
+        # only the textures scaled by the stim color on legacy hardware
+        # (see below) can't be shared
+        legacyLum = (pixFormat == GL.GL_RGB and wasLum and
+                     dataType != GL.GL_FLOAT and not stim.useShaders)
+        textureKey = None
+        if dataKey is not None and not legacyLum:
+            textureKey = dataKey + (interpolate, wrapping)
+            sharedID = textureCache.acquireTexture(textureKey, stim.win)
+            if sharedID is not None:
+                # use the texture already uploaded by another stimulus
+                # (without building its data)
+                self._releaseTexture(id)
+                id.value = sharedID
+                return wasLum
+
         if pixFormat == GL.GL_RGB and wasLum and dataType == GL.GL_FLOAT:
             # grating stim on good machine
             # keep as float32 -1:1
@@ -909,7 +919,7 @@ class TextureMixin(object):
             data[:, :, 1] = intensity  # G
             data[:, :, 2] = intensity  # B
         # Grating on legacy hardware, or ImageStim with wasLum=True
-        elif pixFormat == GL.GL_RGB and wasLum and not stim.useShaders:
+        elif legacyLum:
             # scale by rgb and convert to ubyte
             internalFormat = GL.GL_RGB
             if stim.colorSpace in ('rgb', 'dkl', 'lms', 'hsv'):
@@ -956,6 +966,11 @@ class TextureMixin(object):
                 internalFormat = GL.GL_RGBA32F_ARB
         texture = data.ctypes  # serialise
 
+        if textureCache.isCached(stim.win, id.value):
+            # the current texture is shared so upload to a new one
+            self._releaseTexture(id)
+            GL.glGenTextures(1, ctypes.byref(id))
+
         # bind the texture in openGL
         GL.glEnable(GL.GL_TEXTURE_2D)
         GL.glBindTexture(GL.GL_TEXTURE_2D, id)  # bind that name to the target
@@ -1004,17 +1019,141 @@ class TextureMixin(object):
                      GL.GL_MODULATE)  # ?? do we need this - think not!
         # unbind our texture so that it doesn't affect other rendering
         GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        if textureKey is not None:
+            textureCache.addTexture(textureKey, stim.win, id.value,
+                                    data.nbytes)
         return wasLum
 
+    def _textureDataKey(self, tex, res, maskParams, pixFormat, dataType,
+                        useShaders, forcePOW2):
+        """Key for the decoded texture in the texture cache, or None if it
+        can't be cached (e.g. a PIL image or a file that can't be found).
+        """
+        if isinstance(tex, numpy.ndarray):
+            if not self._cacheArrayTextures:
+                return None
+            tex = numpy.ascontiguousarray(tex)
+            try:
+                digest = hashlib.sha1(tex.view(numpy.uint8)).hexdigest()
+            except (TypeError, ValueError):  # e.g. an object array
+                return None
+            source = ('array', tex.shape, tex.dtype.str, digest)
+        elif tex is None or isinstance(tex, basestring) and tex in (
+                'none', 'None', 'color', 'sin', 'sqr', 'saw', 'tri',
+                'sinXsin', 'sqrXsqr', 'circle', 'gauss', 'cross', 'radRamp',
+                'raisedCos'):
+            source = ('tex', tex, res,
+                      tuple(sorted(maskParams.items())))
+        elif isinstance(tex, basestring):
+            filename = findImageFile(tex)
+            if not filename:
+                return None
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                return None
+            source = ('file', os.path.abspath(filename), stat.st_mtime,
+                      stat.st_size)
+        else:
+            return None
+        key = source + (pixFormat, dataType, bool(useShaders),
+                        bool(forcePOW2))
+        try:
+            hash(key)
+        except TypeError:  # unhashable maskParams
+            return None
+        return key
+
+    @staticmethod
+    def _loadImage(tex):
+        """Open an image file (flipped, as textures are bottom row first).
+        """
+        filename = findImageFile(tex)
+        if not filename:
+            msg = "Couldn't find image %s; check path? (tried: %s)"
+            logging.error(msg % (tex, os.path.abspath(tex)))
+            logging.flush()
+            raise IOError(msg % (tex, os.path.abspath(tex)))
+        try:
+            im = Image.open(filename)
+            im = im.transpose(Image.FLIP_TOP_BOTTOM)
+        except IOError:
+            msg = "Found file '%s', failed to load as an image"
+            logging.error(msg % (filename))
+            logging.flush()
+            msg = "Found file '%s' [= %s], failed to load as an image"
+            raise IOError(msg % (tex, os.path.abspath(tex)))
+        return im
+
+    @staticmethod
+    def _imageToIntensity(im, tex, pixFormat, dataType, useShaders,
+                          forcePOW2):
+        """Convert a PIL image to the intensity array of a texture.
+
+        Doesn't use any OpenGL calls, so can be run on another thread (see
+        :class:`~psychopy.visual.prefetch.ImagePrefetcher`).
+
+        Returns the intensity array, whether the image was luminance and the
+        data type to upload it as.
+        """
+        # is it 1D?
+        if im.size[0] == 1 or im.size[1] == 1:
+            logging.error("Only 2D textures are supported at the moment")
+        else:
+            maxDim = max(im.size)
+            powerOf2 = int(2**numpy.ceil(numpy.log2(maxDim)))
+            if forcePOW2 and (im.size[0] != powerOf2 or
+                              im.size[1] != powerOf2):
+                if globalVars.nImageResizes < reportNImageResizes:
+                    msg = ("Image '%s' was not a square power-of-two ' "
+                           "'image. Linearly interpolating to be %ix%i")
+                    logging.warning(msg % (tex, powerOf2, powerOf2))
+                    globalVars.nImageResizes += 1
+                    im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
+                elif globalVars.nImageResizes == reportNImageResizes:
+                    logging.warning("Multiple images have needed resizing"
+                                    " - I'll stop bothering you!")
+                    im = im.resize([powerOf2, powerOf2], Image.BILINEAR)
+        # is it Luminance or RGB?
+        if pixFormat == GL.GL_ALPHA and im.mode != 'L':
+            # we have RGB and need Lum
+            wasLum = True
+            im = im.convert("L")  # force to intensity (need if was rgb)
+        elif im.mode == 'L':  # we have lum and no need to change
+            wasLum = True
+            if useShaders:
+                dataType = GL.GL_FLOAT
+        elif pixFormat == GL.GL_RGB:
+            # we want RGB and might need to convert from CMYK or Lm
+            # texture = im.tostring("raw", "RGB", 0, -1)
+            im = im.convert("RGBA")
+            wasLum = False
+        if dataType == GL.GL_FLOAT:
+            # convert from ubyte to float
+            # much faster to avoid division 2/255
+            intensity = numpy.array(im).astype(
+                numpy.float32) * 0.0078431372549019607 - 1.0
+        else:
+            intensity = numpy.array(im)
+        return intensity, wasLum, dataType
+
+    def _releaseTexture(self, texID):
+        """Delete a texture, or release it if it is shared through the
+        texture cache."""
+        if texID is None:
+            return
+        if not textureCache.releaseTexture(self.win, texID.value):
+            GL.glDeleteTextures(1, texID)
+
     def clearTextures(self):
         """Clear all textures associated with the stimulus.
 
         As of v1.61.00 this is called automatically during garbage collection
         of your stimulus, so doesn't need calling explicitly by the user.
         """
-        GL.glDeleteTextures(1, self._texID)
+        self._releaseTexture(self._texID)
         if hasattr(self, '_maskID'):
-            GL.glDeleteTextures(1, self._maskID)
+            self._releaseTexture(self._maskID)
 
     @attributeSetter
     def mask(self, value):
@@ -40,8 +40,10 @@ from psychopy import logging
 # (JWP has no idea why!)
 from psychopy.tools.attributetools import attributeSetter, setAttribute
 from psychopy.tools.arraytools import val2array
+from psychopy.tools.monitorunittools import convertToPix
 from psychopy.visual.basevisual import (BaseVisualStim, ColorMixin,
                                         ContainerMixin)
+from psychopy.visual.grating import GratingStim
 
 import numpy as np
 
@@ -105,6 +107,11 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         ``.setPos([x,y])`` method (e.g. a GratingStim, TextStim...)!! DotStim
         assumes that the element uses pixels as units. ``None`` defaults to
         dots.
+    batchElements : bool
+        If `True` (default) and the `element` is a GratingStim (drawn with
+        shaders), all of the elements are drawn in a single call, as in an
+        :class:`~psychopy.visual.ElementArrayStim`, rather than by moving
+        and drawing the element once per dot.
     fieldPos : array_like
         Specifying the location of the centre of the stimulus using a
         :ref:`x,y-pair <attrib-xy>`. See e.g. :class:`.ShapeStim` for more
@@ -252,6 +259,8 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         self.__dict__['dir'] = dir
         self.speed = speed
         self.element = element
+        self.batchElements = True
+        self._elementCoords = None
         self.dotLife = dotLife
         self.signalDots = signalDots
         self.opacity = float(opacity)
@@ -355,7 +364,9 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         DotStim assumes that the element uses pixels as units.
         ``None`` defaults to dots.
 
-        See `ElementArrayStim` for a faster implementation of this idea.
+        A GratingStim element is drawn for all the dots at once (see
+        `batchElements`), other elements are moved and drawn once per dot.
+        See `ElementArrayStim` for more control over the elements.
         """
         self.__dict__['element'] = element
 
@@ -516,6 +527,8 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
             GL.glDrawArrays(GL.GL_POINTS, 0, self.nDots)
             GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+        elif self._canBatchElement():
+            self._drawElementBatch(win)
         else:
             # we don't want to do the screen scaling twice so for each dot
             # subtract the screen centre
@@ -528,6 +541,110 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             self.element.setDepth(initialDepth)
         GL.glPopMatrix()
 
+    def _canBatchElement(self):
+        """Whether the element can be drawn for all the dots at once: it must
+        be drawn like a GratingStim (texture and mask, with shaders)."""
+        element = self.element
+        return (self.batchElements and
+                isinstance(element, GratingStim) and
+                element.useShaders and
+                type(element).draw is GratingStim.draw and
+                type(element)._updateListShaders is
+                GratingStim._updateListShaders)
+
+    def _drawElementBatch(self, win):
+        """Draw the element at every dot with one call, using vertex arrays
+        as ElementArrayStim does (rather than a draw() per dot).
+        """
+        element = self.element
+        saveBlendMode = win.blendMode
+        win.setBlendMode(element.blendmode, log=False)
+        win.setScale('pix')
+        if element._needTextureUpdate:
+            element.setTex(value=element.tex, log=False)
+
+        # the element's quad relative to its centre, placed at each dot
+        # (the element is positioned at verticesPix + fieldPos as in the
+        # per-dot drawing)
+        elementPix = convertToPix(vertices=[0, 0], pos=element.pos,
+                                  units=element.units, win=win)
+        quad = element.verticesPix - elementPix
+        centres = convertToPix(vertices=self.verticesPix + self.fieldPos,
+                               pos=[0, 0], units=element.units, win=win)
+        vertsPix = np.empty((self.nDots, 4, 2), dtype=float)
+        vertsPix[:] = quad
+        vertsPix += centres.reshape(-1, 1, 2)
+
+        # texture coordinates are the same for all of the elements
+        cycles, phase = element._cycles, element.phase
+        Ltex = (-cycles[0] / 2) - phase[0] + 0.5
+        Rtex = (+cycles[0] / 2) - phase[0] + 0.5
+        Ttex = (+cycles[1] / 2) - phase[1] + 0.5
+        Btex = (-cycles[1] / 2) - phase[1] + 0.5
+        key = (self.nDots, Ltex, Rtex, Ttex, Btex)
+        if self._elementCoords is None or self._elementCoords[0] != key:
+            texCoords = np.array([[Rtex, Btex], [Ltex, Btex],
+                                  [Ltex, Ttex], [Rtex, Ttex]], dtype=float)
+            maskCoords = np.array([[1, 0], [0, 0], [0, 1], [1, 1]],
+                                  dtype=float)
+            self._elementCoords = (
+                key,
+                np.ascontiguousarray(np.tile(texCoords, (self.nDots, 1))),
+                np.ascontiguousarray(np.tile(maskCoords, (self.nDots, 1))))
+        texCoords, maskCoords = self._elementCoords[1:]
+
+        desiredRGB = element._getDesiredRGB(element.rgb, element.colorSpace,
+                                            element.contrast)
+        GL.glColor4f(desiredRGB[0], desiredRGB[1], desiredRGB[2],
+                     element.opacity)
+
+        GL.glPushClientAttrib(GL.GL_CLIENT_ALL_ATTRIB_BITS)
+        # setup the shaderprogram
+        _prog = win._progSignedTexMask
+        GL.glUseProgram(_prog)
+        # set the texture to be texture unit 0
+        GL.glUniform1i(GL.glGetUniformLocation(_prog, b"texture"), 0)
+        # mask is texture unit 1
+        GL.glUniform1i(GL.glGetUniformLocation(_prog, b"mask"), 1)
+
+        # bind textures
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, element._maskID)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, element._texID)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+
+        cpcd = ctypes.POINTER(ctypes.c_double)
+        GL.glClientActiveTexture(GL.GL_TEXTURE0)
+        GL.glTexCoordPointer(2, GL.GL_DOUBLE, 0,
+                             texCoords.ctypes.data_as(cpcd))
+        GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+        GL.glClientActiveTexture(GL.GL_TEXTURE1)
+        GL.glTexCoordPointer(2, GL.GL_DOUBLE, 0,
+                             maskCoords.ctypes.data_as(cpcd))
+        GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+        GL.glVertexPointer(2, GL.GL_DOUBLE, 0, vertsPix.ctypes.data_as(cpcd))
+        GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glDrawArrays(GL.GL_QUADS, 0, self.nDots * 4)
+
+        # unbind the textures
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)
+        # disable states
+        GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glDisableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+        GL.glClientActiveTexture(GL.GL_TEXTURE0)
+        GL.glDisableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+
+        GL.glUseProgram(0)
+        GL.glPopClientAttrib()
+        win.setBlendMode(saveBlendMode, log=False)
+
     def _newDotsXY(self, nDots):
         """Returns a uniform spread of dots, according to the `fieldShape` and
         `fieldSize`.
@@ -32,6 +32,7 @@ from __future__ import absolute_import, division, print_function
 
 from builtins import str
 reportNDroppedFrames = 10
+nFramesAhead = 8  # decoded frames kept ready ahead of playback
 
 import os
 
@@ -39,6 +40,7 @@ from psychopy import logging, prefs #adding prefs to be able to check sound lib
 from psychopy.tools.arraytools import val2array
 from psychopy.tools.attributetools import logAttrib, setAttribute
 from psychopy.tools.filetools import pathToString
+from psychopy.tools.movietools import MovieFrameReader
 from psychopy.visual.basevisual import BaseVisualStim, ContainerMixin, TextureMixin
 
 from moviepy.video.io.VideoFileClip import VideoFileClip
@@ -132,9 +134,12 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
             self.sound = sound
 
         self._videoClock = Clock()
+        self._frameReader = None
+        self._pbo = None  # pixel buffer object for uploads (if supported)
+        self.nDroppedFrames = 0
+        self.nLateFrames = 0
         self.loadMovie(self.filename)
         self.setVolume(volume)
-        self.nDroppedFrames = 0
 
         # size
         if size is None:
@@ -179,6 +184,9 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
 
         # Create Video Stream stuff
         if os.path.isfile(filename):
+            if self._frameReader is not None:
+                self._frameReader.close()
+                self._frameReader = None
             self._mov = VideoFileClip(filename, audio=(1 - self.noAudio))
             if (not self.noAudio) and (self._mov.audio is not None):
                 sound = self.sound
@@ -207,6 +215,10 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
         self._frameInterval = 1.0/self._mov.fps
         self.duration = self._mov.duration
         self.filename = filename
+        # frames are decoded on a background thread, from the start
+        self._frameReader = MovieFrameReader(
+            self._mov.get_frame, self._frameInterval, self.duration,
+            nBuffers=nFramesAhead)
         self._updateFrameTexture()
         logAttrib(self, log, 'movie', filename)
 
@@ -299,30 +311,64 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
         """
         return self._nextFrameT - self._frameInterval
 
+    @property
+    def nQueuedFrames(self):
+        """Number of decoded frames waiting to be shown.
+        """
+        if self._frameReader is None:
+            return 0
+        return self._frameReader.nReady
+
     def _updateFrameTexture(self):
+        """Swap in the next decoded frame, if it is due.
+
+        Frames are decoded ahead by a :class:`MovieFrameReader` thread, so
+        this only uploads the frame. If the due frame isn't decoded yet the
+        current one stays up and the frame counts as late
+        (`nLateFrames`).
+        """
         if self._nextFrameT is None or self._nextFrameT < 0:
             # movie has no current position (or invalid position -JK), 
             # need to reset the clock to zero in order to have the 
             # timing logic work otherwise the video stream would skip 
             # frames until the time since creating the movie object has passed
+            if self._nextFrameT is not None:
+                self._frameReader.seek(0.0)
             self._videoClock.reset()
             self._nextFrameT = 0.0
 
         # only advance if next frame (half of next retrace rate)
         if self._nextFrameT > self.duration:
             self._onEos()
+            if self._frameReader is None:  # stopped
+                return None
         elif self._numpyFrame is not None:
+            if self.status != PLAYING:
+                return None  # keep showing the current frame
             if self._nextFrameT > (self._videoClock.getTime() -
                                    self._retraceInterval/2.0):
                 return None
-        try:
-            self._numpyFrame = self._mov.get_frame(self._nextFrameT) 
-        except OSError:
-            if self.autoLog:
-                logging.warning("Frame {} not found, moving one frame and trying again" 
-                    .format(self._nextFrameT), obj=self)
-            self._nextFrameT += self._frameInterval
-            self._updateFrameTexture()
+        # with nothing to show yet we wait for the decoder
+        frameT, frame = self._frameReader.getFrame(
+            self._nextFrameT, block=self._numpyFrame is None)
+        if frame is None:
+            if self._numpyFrame is not None and self.status == PLAYING:
+                self.nLateFrames += 1
+                if self.nLateFrames < reportNDroppedFrames:
+                    msg = "MovieStim3 frame at %.3fs wasn't decoded in time"
+                    logging.warning(msg % self._nextFrameT, obj=self)
+                elif self.nLateFrames == reportNDroppedFrames:
+                    logging.warning("Multiple movie frames were late - "
+                                    "I'll stop bothering you about them!")
+            return None
+        self._numpyFrame = numpy.ascontiguousarray(frame)
+        self._uploadFrame()
+        self._nextFrameT = frameT + self._frameInterval
+
+    def _uploadFrame(self):
+        """Upload the current frame to the movie's texture, through a
+        (reused) pixel buffer object if possible."""
+        frame = self._numpyFrame
         useSubTex = self.useTexSubImage2D
         if self._texID is None:
             self._texID = GL.GLuint()
@@ -343,44 +389,54 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
         # important if using bits++ because GL_LINEAR
         # sometimes extrapolates to pixel vals outside range
         if self.interpolate:
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
-            if useSubTex is False:
-                GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB8,
-                                self._numpyFrame.shape[1],
-                                self._numpyFrame.shape[0], 0,
-                                GL.GL_RGB, GL.GL_UNSIGNED_BYTE,
-                                self._numpyFrame.ctypes)
-            else:
-                GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0,
-                                   self._numpyFrame.shape[1],
-                                   self._numpyFrame.shape[0],
-                                   GL.GL_RGB, GL.GL_UNSIGNED_BYTE,
-                                   self._numpyFrame.ctypes)
+            texFilter = GL.GL_LINEAR
+            pixFormat = GL.GL_RGB
+        else:
+            texFilter = GL.GL_NEAREST
+            pixFormat = GL.GL_BGR
+        GL.glTexParameteri(
+            GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, texFilter)
+        GL.glTexParameteri(
+            GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, texFilter)
+
+        data = frame.ctypes
+        if useSubTex and self._getPBO() is not None:
+            # copy into the buffer and let the driver transfer it to the
+            # texture asynchronously (orphaning the previous frame's data
+            # so we don't wait for that transfer)
+            GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, self._pbo)
+            GL.glBufferData(GL.GL_PIXEL_UNPACK_BUFFER, frame.nbytes, None,
+                            GL.GL_STREAM_DRAW)
+            ptr = GL.glMapBuffer(GL.GL_PIXEL_UNPACK_BUFFER, GL.GL_WRITE_ONLY)
+            ctypes.memmove(ptr, frame.ctypes.data, frame.nbytes)
+            GL.glUnmapBuffer(GL.GL_PIXEL_UNPACK_BUFFER)
+            data = None  # i.e. from the start of the bound buffer
+        if useSubTex is False:
+            GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB8,
+                            frame.shape[1], frame.shape[0], 0,
+                            pixFormat, GL.GL_UNSIGNED_BYTE, data)
         else:
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_NEAREST)
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_NEAREST)
-            if useSubTex is False:
-                GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB8,
-                                self._numpyFrame.shape[1],
-                                self._numpyFrame.shape[0], 0,
-                                GL.GL_BGR, GL.GL_UNSIGNED_BYTE,
-                                self._numpyFrame.ctypes)
-            else:
-                GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0,
-                                   self._numpyFrame.shape[1],
-                                   self._numpyFrame.shape[0],
-                                   GL.GL_BGR, GL.GL_UNSIGNED_BYTE,
-                                   self._numpyFrame.ctypes)
+            GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0,
+                               frame.shape[1], frame.shape[0],
+                               pixFormat, GL.GL_UNSIGNED_BYTE, data)
+        if data is None:
+            GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
         GL.glTexEnvi(GL.GL_TEXTURE_ENV, GL.GL_TEXTURE_ENV_MODE,
                      GL.GL_MODULATE)  # ?? do we need this - think not!
 
-        if self.status == PLAYING:
-            self._nextFrameT += self._frameInterval
+    def _getPBO(self):
+        """The pixel buffer object used for uploads, or None if they aren't
+        supported."""
+        if self._pbo is None:
+            try:
+                pbo = GL.GLuint()
+                GL.glGenBuffers(1, ctypes.byref(pbo))
+                self._pbo = pbo
+            except Exception:
+                logging.debug('Pixel buffer objects not available, movie '
+                              'frames will be uploaded directly')
+                self._pbo = False
+        return self._pbo or None
 
     def draw(self, win=None):
         """Draw the current frame to a particular visual.Window (or to the
@@ -448,6 +504,10 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
         # video is easy: set both times to zero and update the frame texture
         self._nextFrameT = t
         self._videoClock.reset(t)
+        if self._frameReader is not None:
+            self._frameReader.seek(t)
+        if self.status != PLAYING:
+            self._numpyFrame = None  # so the next draw shows the new frame
         self._audioSeek(t)
 
     def _audioSeek(self, t):
@@ -473,6 +533,12 @@ class MovieStim3(BaseVisualStim, ContainerMixin, TextureMixin):
     def _unload(self):
         # remove textures from graphics card to prevent crash
         self.clearTextures()
+        if self._frameReader is not None:
+            self._frameReader.close()
+            self._frameReader = None
+        if self._pbo:
+            GL.glDeleteBuffers(1, ctypes.byref(self._pbo))
+        self._pbo = None
         if self._mov is not None:
             self._mov.close()
         self._mov = None
@@ -22,6 +22,13 @@ import pyglet
 pyglet.options['debug_gl'] = False
 import ctypes
 GL = pyglet.gl
+import collections
+import threading
+import weakref
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 try:
     from PIL import Image
 except ImportError:
@@ -34,10 +41,123 @@ from psychopy.tools.attributetools import attributeSetter
 from .grating import GratingStim
 import numpy
 from numpy import exp, sin, cos
-from numpy.fft import fft2, ifft2, fftshift, ifftshift
+from numpy.fft import fft2, rfft2, irfft2, fftshift, ifftshift
 
 from . import shaders as _shaders
 
+# filter kernels (they only depend on the noise parameters) by
+# (type, size, parameters), most recently used last
+_kernelCache = collections.OrderedDict()
+_maxKernels = 16
+
+
+def _cachedKernel(key, makeKernel):
+    """Return the kernel for `key`, calling `makeKernel()` if it isn't
+    cached. Kernels are read-only as they are shared between stimuli."""
+    try:
+        kernel = _kernelCache.pop(key)
+    except KeyError:
+        kernel = numpy.asarray(makeKernel())
+        kernel.flags.writeable = False
+    _kernelCache[key] = kernel
+    while len(_kernelCache) > _maxKernels:
+        _kernelCache.popitem(last=False)
+    return kernel
+
+
+def _polar(amplitude, phase):
+    """`amplitude * exp(1j*phase)`, but much quicker than the complex exp."""
+    spectrum = numpy.empty(numpy.shape(phase), dtype=complex)
+    numpy.cos(phase, out=spectrum.real)
+    numpy.sin(phase, out=spectrum.imag)
+    spectrum *= amplitude
+    return spectrum
+
+
+def _hermitianHalf(spectrum):
+    """The non-negative frequencies (as used by irfft2) of the Hermitian part
+    of a 2D spectrum, so that `irfft2(_hermitianHalf(X), s=X.shape)` equals
+    `numpy.real(ifft2(X))` (the noise image) with half of the transform."""
+    nHalf = spectrum.shape[1] // 2 + 1
+    # the spectrum at the negative of each frequency
+    negative = numpy.concatenate((spectrum[:, :1], spectrum[:, :-nHalf:-1]),
+                                 axis=1)
+    negative = numpy.concatenate((negative[:1], negative[:0:-1]), axis=0)
+    half = spectrum[:, :nHalf] + numpy.conj(negative)
+    half *= 0.5
+    return half
+
+
+class _NoiseSampleBank(object):
+    """Makes noise samples for a NoiseStim on a background thread.
+
+    With `refill` the samples are used once and the thread keeps `nSamples`
+    new ones ready. Otherwise the thread makes `nSamples` and stops, and
+    :meth:`get` cycles through them.
+    """
+
+    def __init__(self, stim, nSamples=16, refill=True):
+        self.nSamples = nSamples
+        self.refill = refill
+        self._stim = weakref.ref(stim)  # don't keep the stimulus alive
+        self._ready = queue.Queue(maxsize=nSamples)
+        self._cycle = []
+        self._cycleN = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        name='NoiseSampleBank')
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def nReady(self):
+        """Number of samples ready to use."""
+        return self._ready.qsize() + len(self._cycle)
+
+    def _run(self):
+        nMade = 0
+        while not self._stopped.is_set():
+            if not self.refill and nMade >= self.nSamples:
+                break
+            stim = self._stim()
+            if stim is None:
+                break
+            try:
+                sample = stim._newSample()
+            except Exception as err:
+                logging.warning("NoiseStim sample bank stopped: %s" % err)
+                break
+            del stim
+            nMade += 1
+            while not self._stopped.is_set():
+                try:
+                    self._ready.put(sample, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def get(self):
+        """The next sample, or None if none is ready yet."""
+        try:
+            sample = self._ready.get_nowait()
+        except queue.Empty:
+            sample = None
+        if self.refill:
+            return sample
+        if sample is not None:
+            self._cycle.append(sample)
+            return sample
+        if not self._cycle:
+            return None
+        sample = self._cycle[self._cycleN % len(self._cycle)]
+        self._cycleN += 1
+        return sample
+
+    def stop(self):
+        """Stop making samples (waits for the one in progress)."""
+        self._stopped.set()
+        self._thread.join()
+
 
 class NoiseStim(GratingStim):
     """A stimulus with 2 textures: a radom noise sample and a mask
@@ -110,6 +230,8 @@ class NoiseStim(GratingStim):
     Samples of Binary, Normal or Uniform noise can usually be made at frame rate using noiseUpdate. 
     Updating or building other noise types at frame rate may result in dropped frames. 
     An alternative is to build a large sample of noise at the start of the routien and place it off the screen then cut a samples out of this at random locations and feed that as a numpy array into the texture of a visible gratingStim.
+    Or use makeSampleBank() to have new samples made on a background thread: updateNoise() then only has to upload a sample that is ready (making one itself only if the bank has run out).
+    The filter kernels are cached, so rebuilding with parameters used before is quicker.
 
     **Notes on size**
     If units = pix and noiseType = Binary, Normal or Uniform will make noise sample of requested size.
@@ -204,6 +326,8 @@ class NoiseStim(GratingStim):
                              maskParams=None)
         # use shaders if available by default, this is a good thing
         self.__dict__['useShaders'] = win._haveShaders
+        self._sampleBank = None  # see makeSampleBank()
+        self._sampleBankParams = None
         # UGLY HACK: Some parameters depend on each other for processing.
         # They are set "superficially" here.
         # TO DO: postpone calls to _createTexture, setColor and
@@ -494,10 +618,26 @@ class NoiseStim(GratingStim):
         """ Helper function to apply Butterworth filter in 
             frequensy domain.
         """
+        return FT * self._filterKernel()
+
+    def _filterKernel(self, half=False):
+        """The (centred) Butterworth filter, including the
+        noiseFractalPower spectrum (see _kernel() for `half`)."""
+        filterSize = numpy.max(self._size)
+        if self.noiseFilterOrder > 0.01 and self._lowsf > 0:
+            if self._lowsf > filterSize/2:
+                msg = ('Lower cut off frequency for filtered '
+                'noise is too high (exceeds Nyquist limit).')
+                raise Warning(msg)
+        key = ('butterworth', float(filterSize), self.noiseFractalPower,
+               self.noiseFilterOrder, float(self._upsf), float(self._lowsf))
+        return self._kernel(key, self._makeFilterKernel, half)
+
+    def _makeFilterKernel(self):
         filterSize = numpy.max(self._size)
         pin=filters.makeRadialMatrix(matrixSize=filterSize, center=(0,0), radius=1.0)
         pin[int(filterSize / 2)][int(filterSize / 2)] = 0.00000001  # Prevents divide by zero error. This is DC and is set to zero later anyway.
-        FT = numpy.multiply(FT,(pin) ** self.noiseFractalPower)
+        kernel = pin ** self.noiseFractalPower
         if self.noiseFilterOrder > 0.01:
             if self._upsf<(filterSize/2.0):
                 filter = filters.butter2d_lp_elliptic(size = [filterSize,filterSize], 
@@ -510,10 +650,6 @@ class NoiseStim(GratingStim):
             else:
                 filter = numpy.ones((int(filterSize),int(filterSize)))
             if self._lowsf > 0:
-                if self._lowsf > filterSize/2:
-                    msg = ('Lower cut off frequency for filtered '
-                    'noise is too high (exceeds Nyquist limit).')
-                    raise Warning(msg)
                 filter = filter-filters.butter2d_lp_elliptic(size = [filterSize,filterSize], 
                                                                 cutoff_x = self._lowsf / filterSize, 
                                                                 cutoff_y = self._lowsf / filterSize, 
@@ -521,18 +657,26 @@ class NoiseStim(GratingStim):
                                                                 alpha = 0, 
                                                                 offset_x = 0.5/filterSize, #becuase FFTs are slightly off centred.
                                                                 offset_y = 0.5/filterSize)
-            return FT * filter
-        else:
-            return FT
+            kernel = kernel * filter
+        return kernel
             
     def _isotropic(self, FT):
         """ Helper function to apply isotropic filter in 
             frequensy domain.
         """
+        return FT * self._isotropicKernel()
+
+    def _isotropicKernel(self, half=False):
+        """The (centred) isotropic filter (see _kernel() for `half`)."""
         if self._sf > self._size / 2:
             msg = ('Base frequency for isotropic '
                   'noise is  too high (exceeds Nyquist limit).')
             raise Warning(msg)
+        key = ('isotropic', tuple(numpy.ravel(self._size)), float(self._sf),
+               self.noiseBW)
+        return self._kernel(key, self._makeIsotropicKernel, half)
+
+    def _makeIsotropicKernel(self):
         localf = self._sf / self._size
         linbw = 2 ** self.noiseBW
         lowf = 2.0 * localf / (linbw+1.0)
@@ -540,17 +684,25 @@ class NoiseStim(GratingStim):
         FWF = highf - lowf
         sigmaF = FWF / (2*numpy.sqrt(2*numpy.log(2)))
         pin = filters.makeRadialMatrix(matrixSize=self._size, center=(0,0), radius=2)
-        filter = filters.makeGauss(pin, mean=localf, sd=sigmaF)
-        return FT*filter
+        return filters.makeGauss(pin, mean=localf, sd=sigmaF)
         
     def _gabor(self, FT):
         """ Helper function to apply Gabor filter in 
             frequensy domain.
         """
+        return FT * self._gaborKernel()
+
+    def _gaborKernel(self, half=False):
+        """The (centred) Gabor filter (see _kernel() for `half`)."""
         if self._sf > self._size / 2:
             msg = ('Base frequency for Gabor '
                   'noise is  too high (exceeds Nyquist limit).')
             raise Warning(msg)
+        key = ('gabor', tuple(numpy.ravel(self._size)), float(self._sf),
+               self.noiseBW, self.noiseBWO, self.noiseOri)
+        return self._kernel(key, self._makeGaborKernel, half)
+
+    def _makeGaborKernel(self):
         localf = self._sf / self._size
         linbw = 2 ** self.noiseBW
         lowf = 2.0 * localf / (linbw + 1.0)
@@ -570,91 +722,162 @@ class NoiseStim(GratingStim):
                         Image.BICUBIC
                 )
         )
-        return FT*filter
+        return filter
+
+    @staticmethod
+    def _kernel(key, makeKernel, half=False):
+        """A filter kernel from the cache. With `half` the kernel to apply to
+        the non-negative frequencies from rfft2 (not centred, and made
+        symmetric as the spectrum of a real image is).
+        """
+        if not half:
+            return _cachedKernel(key, makeKernel)
+
+        def makeHalf():
+            kernel = fftshift(_cachedKernel(key, makeKernel))
+            return numpy.real(_hermitianHalf(kernel))
+
+        return _cachedKernel(('half',) + key, makeHalf)
+
+    def _filterHalfKernel(self):
+        """Half kernel of the filter set by `filter` (None if no filter)."""
+        if self.filter in ['butterworth', 'Butterworth']:
+            return self._filterKernel(half=True)
+        elif self.filter in ['gabor', 'Gabor']:
+            return self._gaborKernel(half=True)
+        elif self.filter in ['isotropic', 'Isotropic']:
+            return self._isotropicKernel(half=True)
+        return None
 
     def updateNoise(self):
         """Updates the noise sample. Does not change any of the noise parameters 
             but choses a new random sample given the previously set parameters.
+            If there is a sample bank (see makeSampleBank()) with a sample
+            ready that is used, so only the texture has to be uploaded.
         """
-
+        if self._sampleBank is not None and not self._needBuild:
+            sample = self._sampleBank.get()
+            if sample is not None:
+                self.tex = sample
+                return
+        self.tex = self._newSample()
+
+    def _newSample(self):
+        """Make a new random noise sample (the texture) with the current
+        parameters. This doesn't change the stimulus, so that it can also
+        run on the thread of a sample bank.
+        """
+        # the noise images are real so only the non-negative frequencies
+        # of their spectra are transformed back (irfft2)
         if not(self.noiseType in ['binary','Binary','normal','Normal','uniform','Uniform']):
+            size = int(self._size)
             if (self.noiseType in ['image', 'Image']) and (self.imageComponent in ['amplitude','Amplitude']):
-                self.noiseTex = numpy.random.uniform(0,1,int(self._size**2))
-                self.noiseTex = numpy.reshape(self.noiseTex,(int(self._size),int(self._size)))
+                noiseTex = numpy.random.uniform(0,1,int(self._size**2))
+                noiseTex = numpy.reshape(noiseTex,(size,size))
                 if self.filter in ['Butterworth','butterworth']:
-                    self.noiseTex = fftshift(self._filter(self.noiseTex))
+                    noiseTex = fftshift(self._filter(noiseTex))
                 elif self.filter in ['Gabor','gabor']:
-                    self.noiseTex = fftshift(self._gabor(self.noiseTex))
+                    noiseTex = fftshift(self._gabor(noiseTex))
                 elif self.filter in ['Isotropic','isotropic']:
-                    self.noiseTex = fftshift(self._isotropic(self.noiseTex))
-                self.noiseTex[0][0] = 0
-                In = self.noiseTex * exp(1j*self.noisePh)
-                Im = numpy.real(ifft2(In))
+                    noiseTex = fftshift(self._isotropic(noiseTex))
+                noiseTex[0][0] = 0
+                In = _polar(noiseTex, self.noisePh)
+                Im = irfft2(_hermitianHalf(In), s=In.shape)
             else:
                 Ph = numpy.random.uniform(0,2*numpy.pi,int(self._size**2))
-                Ph = numpy.reshape(Ph,(int(self._size),int(self._size)))
-                In = self.noiseTex * exp(1j*Ph)
-                Im = numpy.real(ifft2(In))
+                Ph = numpy.reshape(Ph,(size,size))
+                In = _polar(self.noiseTex, Ph)
+                Im = irfft2(_hermitianHalf(In), s=In.shape)
                 Im = ifftshift(Im)
             gsd = filters.getRMScontrast(Im)
             factor = gsd*self.noiseClip
             numpy.clip(Im, -factor, factor, Im)
-            self.tex = Im / factor
-        elif self.noiseType in ['normal','Normal']:
-            self.noiseTex = numpy.random.randn(int(self._sideLength[1]),int(self._sideLength[0])) / self.noiseClip
+            return Im / factor
+
+        shape = (int(self._sideLength[1]), int(self._sideLength[0]))
+        if self.noiseType in ['normal','Normal']:
+            noiseTex = numpy.random.randn(*shape) / self.noiseClip
         elif self.noiseType in ['uniform','Uniform']:
-            self.noiseTex = 2.0 * numpy.random.rand(int(self._sideLength[1]),int(self._sideLength[0])) - 1.0
+            noiseTex = 2.0 * numpy.random.rand(*shape) - 1.0
         else:
-            numpy.random.shuffle(self.noiseTex)  # pick random noise sample by shuffleing values
-            self.noiseTex = numpy.reshape(self.noiseTex,(int(self._sideLength[1]),int(self._sideLength[0])))
-        if self.noiseType in ['binary','Binary','normal','Normal','uniform','Uniform']:
-            if self.filter in ['butterworth', 'Butterworth', 'Gabor','gabor','Isotropic','isotropic']:
-                if self.units == 'pix':
-                    if self._size[0] == self._size[1]:
-                        baseImage = numpy.array(
-                                Image.fromarray(self.noiseTex).resize(
-                                        (int(self._size[0]), int(self._size[1])),
-                                        Image.NEAREST
-                                )
+            # pick random noise sample by shuffling the values
+            noiseTex = numpy.random.permutation(self.noiseTex.ravel())
+            noiseTex = numpy.reshape(noiseTex, shape)
+        kernel = self._filterHalfKernel()
+        if kernel is None:
+            return noiseTex
+        if self.units == 'pix':
+            if self._size[0] == self._size[1]:
+                baseImage = numpy.array(
+                        Image.fromarray(noiseTex).resize(
+                                (int(self._size[0]), int(self._size[1])),
+                                Image.NEAREST
                         )
-                    else:
-                        msg = ('NoiseStim can only apply filters to square noise images')
-                        raise ValueError(msg)
-                else:
-                    baseImage = numpy.array(
-                            Image.fromarray(self.noiseTex).resize(
-                                    (int(self._size), int(self._size)),
-                                    Image.NEAREST
-                            )
-                    )
-                baseImage = numpy.array(baseImage).astype(
-                        numpy.float32) * 0.0078431372549019607 - 1.0
-                FT = fft2(baseImage)
-                spectrum = numpy.absolute(fftshift(FT))
-                angle = numpy.angle(FT)
-                if self.filter in ['butterworth','Butterworth']:
-                    spectrum = fftshift(self._filter(spectrum))
-                elif self.filter in ['isotropic','Isotropic']:
-                    spectrum = fftshift(self._isotropic(spectrum))
-                elif self.filter in ['gabor','Gabor']:
-                    spectrum = fftshift(self._gabor(spectrum))
-                spectrum[0][0] = 0 # set DC to zero
-                FT = spectrum * exp(1j*angle)
-                
-                Im = numpy.real(ifft2(FT))
-                gsd = filters.getRMScontrast(Im)
-                factor = gsd*self.noiseClip
-                numpy.clip(Im, -factor, factor, Im)
-                self.tex = Im / factor
+                )
             else:
-                if not(self.noiseType in ['image','Image']):
-                    self.tex = self.noiseTex
-                
-    
-            
+                msg = ('NoiseStim can only apply filters to square noise images')
+                raise ValueError(msg)
+        else:
+            baseImage = numpy.array(
+                    Image.fromarray(noiseTex).resize(
+                            (int(self._size), int(self._size)),
+                            Image.NEAREST
+                    )
+            )
+        baseImage = numpy.array(baseImage).astype(
+                numpy.float32) * 0.0078431372549019607 - 1.0
+        # filtering the amplitude spectrum keeping the phases is the same
+        # as multiplying by the filter
+        FT = rfft2(baseImage) * kernel
+        FT[0][0] = 0 # set DC to zero
+        Im = irfft2(FT, s=baseImage.shape)
+        gsd = filters.getRMScontrast(Im)
+        factor = gsd*self.noiseClip
+        numpy.clip(Im, -factor, factor, Im)
+        return Im / factor
+
+    def makeSampleBank(self, nSamples=16, refill=True):
+        """Make noise samples on a background thread for updateNoise() to
+        use, so that a new sample every frame only costs a texture upload.
+
+        Parameters
+        ----------
+        nSamples : int
+            Number of samples to keep ready.
+        refill : bool
+            If True each sample is used once and replaced by a new one in
+            the background. If False `nSamples` are made and updateNoise()
+            cycles through them (so they repeat).
+
+        The bank is remade with the new parameters whenever the noise is
+        rebuilt. If no sample is ready updateNoise() makes one as usual.
+        Samples are made with numpy.random from another thread, so the
+        sequence of samples isn't reproducible with numpy.random.seed().
+        """
+        self.clearSampleBank()
+        self._sampleBankParams = (nSamples, refill)
+        self._sampleBank = _NoiseSampleBank(self, nSamples, refill)
+
+    def clearSampleBank(self):
+        """Stop making samples in the background (see makeSampleBank)."""
+        if self._sampleBank is not None:
+            self._sampleBank.stop()
+        self._sampleBank = None
+        self._sampleBankParams = None
+
+    @property
+    def nSamplesReady(self):
+        """Number of samples in the sample bank ready to use."""
+        if self._sampleBank is None:
+            return 0
+        return self._sampleBank.nReady
+
     def buildNoise(self):
         """build a new noise sample. Required to act on changes to any noise parameters or texRes.
         """
+        # stop the sample bank while the parameters change
+        bankParams = self._sampleBankParams
+        self.clearSampleBank()
 
         if self.units == 'pix':
             if not (self.noiseType in ['Binary','binary','Normal','normal','uniform','Uniform']):
@@ -726,4 +949,6 @@ class NoiseStim(GratingStim):
   
         self._needBuild = False # prevent noise from being re-built at next draw() unless a parameter is changed in the mean time.
         self.updateNoise()  # now choose the initial random sample.
+        if bankParams is not None:
+            self.makeSampleBank(*bankParams)
 
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Decode the images of upcoming trials in the background.
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+from __future__ import absolute_import, division, print_function
+from past.builtins import basestring
+
+import os
+
+import pyglet
+pyglet.options['debug_gl'] = False
+GL = pyglet.gl
+
+try:
+    from PIL import Image
+except ImportError:
+    from . import Image
+
+from psychopy.tools.texturetools import TexturePrefetcher
+from psychopy.visual.basevisual import TextureMixin
+
+
+def _decodeImage(image, useShaders):
+    """Decode an image file into the texture data that `ImageStim.image`
+    would create from it."""
+    im = TextureMixin._loadImage(image)
+    intensity, wasLum, dataType = TextureMixin._imageToIntensity(
+        im, image, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, useShaders,
+        forcePOW2=False)
+    intensity.flags.writeable = False
+    value = {'intensity': intensity, 'wasLum': wasLum, 'wasImage': True,
+             'dataType': dataType, 'forcedWrapping': None,
+             'stimAttribs': {'_origSize': im.size}}
+    return value, intensity.nbytes
+
+
+class ImagePrefetcher(TexturePrefetcher):
+    """Decodes the image files of the next trials on worker threads, so
+    that setting `ImageStim.image` for them only has to upload the texture.
+
+    Changing the image of an :class:`~psychopy.visual.ImageStim` normally
+    reads and decodes the file there and then, which for large photographs
+    can take longer than a frame. Call :meth:`update` once per trial (e.g.
+    at the start of the routine, after the trial handler has moved on) and
+    the images named by the next `nAhead` trials are decoded in the
+    background into the texture cache
+    (:data:`psychopy.tools.texturetools.textureCache`), where the stimulus
+    finds them::
+
+        prefetcher = visual.ImagePrefetcher(stim, trials, params=['image'])
+        for trial in trials:
+            prefetcher.update()
+            stim.image = trial['image']  # only uploads the texture
+            ...
+        print(prefetcher.getStats())
+        prefetcher.close()
+
+    Parameters
+    ----------
+    stim : ImageStim
+        The stimulus the images are for (the decoded data depends on
+        whether it uses shaders).
+    trials : TrialHandler, TrialHandler2 or None
+        Handler whose `getFutureTrial()` gives the upcoming conditions. If
+        `None` only images passed to :meth:`prefetchImage` are decoded.
+    params : list of str or None
+        Condition parameters that name image files. `None` uses any
+        parameter whose value is the name of an existing image file.
+    nAhead : int
+        Number of trials to look ahead.
+    nWorkers : int
+        Number of worker threads.
+
+    Notes
+    -----
+    The trial handlers draw their whole sequence in advance, so images are
+    prefetched across repeats too. The cache has a memory limit
+    (`textureCache.maxBytes`), so `nAhead` should stay small for very large
+    images.
+
+    """
+
+    def __init__(self, stim, trials=None, params=None, nAhead=2,
+                 nWorkers=2):
+        super(ImagePrefetcher, self).__init__(_decodeImage,
+                                              nWorkers=nWorkers)
+        self.stim = stim
+        self.trials = trials
+        if isinstance(params, basestring):
+            params = [params]
+        self.params = params
+        self.nAhead = nAhead
+        try:
+            self._extensions = set(Image.registered_extensions())
+        except AttributeError:  # old PIL
+            Image.init()
+            self._extensions = set(Image.EXTENSION)
+
+    def prefetchImage(self, image):
+        """Queue an image file for decoding.
+
+        Returns `True` if it was queued (`False` if it is already cached or
+        queued, or isn't an image file that can be found).
+        """
+        if not isinstance(image, basestring):
+            return False
+        if os.path.splitext(image)[1].lower() not in self._extensions:
+            return False
+        stim = self.stim
+        # the key that ImageStim.image looks the data up with
+        key = stim._textureDataKey(image, res=128, maskParams={},
+                                   pixFormat=GL.GL_RGB,
+                                   dataType=GL.GL_UNSIGNED_BYTE,
+                                   useShaders=stim.useShaders,
+                                   forcePOW2=False)
+        if key is None or key[0] != 'file':
+            return False
+        return self.prefetch(key, image, stim.useShaders)
+
+    def update(self):
+        """Queue the images of the next `nAhead` trials.
+
+        Returns the number of images queued.
+        """
+        if self.trials is None:
+            return 0
+        nQueued = 0
+        for n in range(1, self.nAhead + 1):
+            trial = self.trials.getFutureTrial(n)
+            if trial is None:
+                continue
+            if self.params is None:
+                values = list(trial.values())
+            else:
+                values = [trial[param] for param in self.params
+                          if param in trial]
+            for value in values:
+                nQueued += self.prefetchImage(value)
+        return nQueued
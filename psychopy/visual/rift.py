@@ -1922,8 +1922,9 @@ class Rift(window.Window):
             if self.recordFrameIntervalsJustTurnedOn:  # don't do anything
                 self.recordFrameIntervalsJustTurnedOn = False
             else:  # past the first frame since turned on
-                self.frameIntervals.append(deltaT)
-                if deltaT > self.refreshThreshold:
+                dropped = deltaT > self.refreshThreshold
+                self.frameRecorder.append(now, deltaT, dropped)
+                if dropped:
                     self.nDroppedFrames += 1
                     if self.nDroppedFrames < reportNDroppedFrames:
                         txt = 't of last frame was %.2fms (=1/%i)'
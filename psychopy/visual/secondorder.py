@@ -716,9 +716,9 @@ class EnvelopeGrating(GratingStim):
     def clearTextures(self):
         """This will be used by the __del__ method of EnvelopeGrating
         """
-        GL.glDeleteTextures(1, self._carrierID)
-        GL.glDeleteTextures(1, self._envelopeID)
-        GL.glDeleteTextures(1, self._maskID)
+        self._releaseTexture(self._carrierID)
+        self._releaseTexture(self._envelopeID)
+        self._releaseTexture(self._maskID)
 
     def _calcEnvCyclesPerStim(self):
         """The user should never need to call this function directly as it is
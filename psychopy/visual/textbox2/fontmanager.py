@@ -17,6 +17,8 @@
 
 import sys, os
 import math
+import atexit
+import hashlib
 import numpy as np
 import freetype as ft
 import OpenGL.GL as gl
@@ -55,6 +57,11 @@ _OSXFontDirectories = [
 
 supportedExtensions = ['ttf', 'otf', 'ttc', 'dfont']
 
+# version of the glyph atlas cache files (see GLFont.saveToCache); change
+# this when the way glyphs are rendered or stored changes
+_atlasCacheVersion = 1
+_fontFileHashes = {}  # (path, mtime, size): sha1 of the font file
+
 
 def unicode(s, fmt='utf-8'):
     """Force to unicode if bytes"""
@@ -343,6 +350,7 @@ class GLFont:
         self.height = metrics.height / self.scale
         self.linegap = self.height - self.ascender + self.descender
         self.format = self.atlas.format
+        self._unsaved = False  # glyphs were added since loading/saving cache
 
     def __getitem__(self, charcode):
         """
@@ -466,6 +474,7 @@ class GLFont:
             texcoords = (u0, v0, u1, v1)
             glyph = TextureGlyph(charcode, size, offset, advance, texcoords)
             self.glyphs[charcode] = glyph
+            self._unsaved = True
 
             # Generate kerning
             # for g in self.glyphs.values():
@@ -482,19 +491,108 @@ class GLFont:
         logging.info("TextBox2 loaded {} chars with {} blanks and {} valid"
                      .format(len(charcodes), nBlanks, len(charcodes) - nBlanks))
 
-    def saveToCache(self):
-        """Store the current font texture as an image file.
-
-        As yet we aren't storing the offset, advance and texcoords as needed to
-        retrieve the necessary chars, but it's a start!
-            (see  TextureGlyph(charcode, size, offset, advance, texcoords) )
-
+    def _cachePath(self, cacheDir=None):
+        """Path of the glyph atlas cache file for this font file, size and
+        atlas format (or None if the font file can't be read)."""
+        if cacheDir is None:
+            cacheDir = os.path.join(prefs.paths['userPrefsDir'], 'fontCache')
+        try:
+            fontHash = _fontFileHash(self.filename)
+        except (IOError, OSError):
+            return None
+        # (the name includes the size)
+        fileName = "{}_{}_{}{}.npz".format(
+            self.name, fontHash[:16], self.format, self.atlas.width)
+        return os.path.join(cacheDir, fileName.replace(' ', ''))
+
+    def saveToCache(self, cacheDir=None):
+        """Store the glyph atlas (the texture and the size, offset, advance
+        and texcoords of each glyph) so that the font can be restored with
+        :meth:`loadFromCache`.
+
+        The cache file is keyed by the contents of the font file, the size
+        and the atlas format. By default cache files are kept in the
+        'fontCache' folder of the user preferences folder. Fonts loaded by
+        the FontManager are saved automatically when Python exits, if
+        glyphs were added and prefs.general['cacheFonts'] is True.
+
+        Returns the path of the cache file (or None if it couldn't be
+        written).
         """
-        from PIL import Image
-        im = Image.fromarray(self.atlas.data)
-        fname = "{}/.psychopy3/{}_{}_texture.png".format(
-            os.path.expanduser("~"), self.name, self.size)
-        im.save(fname)
+        path = self._cachePath(cacheDir)
+        if path is None:
+            return None
+        glyphs = list(self.glyphs.values())
+        tmpPath = path + '.tmp.npz'
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            np.savez_compressed(
+                tmpPath,
+                version=_atlasCacheVersion,
+                data=self.atlas.data,
+                nodes=np.array(self.atlas.nodes, dtype=int).reshape(-1, 3),
+                used=self.atlas.used,
+                charcodes=np.array([g.charcode for g in glyphs], dtype='U1'),
+                sizes=np.array([g.size for g in glyphs],
+                               dtype=int).reshape(-1, 2),
+                offsets=np.array([g.offset for g in glyphs],
+                                 dtype=int).reshape(-1, 2),
+                advances=np.array([g.advance for g in glyphs],
+                                  dtype=float).reshape(-1, 2),
+                texcoords=np.array([g.texcoords for g in glyphs],
+                                   dtype=float).reshape(-1, 4))
+            _replaceFile(tmpPath, path)  # so readers never see a partial file
+        except (IOError, OSError) as err:
+            logging.warning("Couldn't save glyph cache for font {}: {}"
+                            .format(self.name, err))
+            return None
+        self._unsaved = False
+        logging.debug("Saved {} glyphs of Texture Font {} to {}"
+                      .format(len(glyphs), self.name, path))
+        return path
+
+    def loadFromCache(self, cacheDir=None):
+        """Restore the glyph atlas saved by :meth:`saveToCache`, if there is
+        one for this font file, size and format.
+
+        Glyphs that aren't in the cache are still rasterised when first
+        used. Returns True if the cache was loaded.
+        """
+        path = self._cachePath(cacheDir)
+        if path is None or not os.path.isfile(path):
+            return False
+        try:
+            with np.load(path) as cache:
+                if (int(cache['version']) != _atlasCacheVersion or
+                        cache['data'].shape != self.atlas.data.shape):
+                    return False
+                data = cache['data']
+                nodes = cache['nodes']
+                used = int(cache['used'])
+                glyphArrays = [cache[name] for name in (
+                    'charcodes', 'sizes', 'offsets', 'advances',
+                    'texcoords')]
+        except Exception as err:  # corrupt or from an incompatible version
+            logging.warning("Couldn't load glyph cache {}: {}"
+                            .format(path, err))
+            return False
+        self.atlas.data[...] = data
+        self.atlas.nodes = [tuple(int(v) for v in node) for node in nodes]
+        self.atlas.used = used
+        self.glyphs = {}
+        for charcode, size, offset, advance, texcoords in zip(*glyphArrays):
+            charcode = str(charcode)
+            self.glyphs[charcode] = TextureGlyph(
+                charcode, tuple(int(v) for v in size),
+                tuple(int(v) for v in offset),
+                tuple(float(v) for v in advance),
+                tuple(float(v) for v in texcoords))
+        self._dirty = True  # needs uploading
+        self._unsaved = False
+        logging.debug("Loaded {} glyphs of Texture Font {} from {}"
+                      .format(len(self.glyphs), self.name, path))
+        return True
 
     def upload(self):
         """Upload the font data into graphics card memory.
@@ -553,6 +651,31 @@ class TextureGlyph:
             return 0
 
 
+def _replaceFile(src, dst):
+    """Move src to dst, replacing dst if it exists (os.replace)"""
+    if PY3:
+        os.replace(src, dst)
+    else:
+        # os.rename doesn't replace files on Windows
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def _fontFileHash(filename):
+    """SHA1 of the contents of a font file (remembered while the file is
+    unchanged)."""
+    stat = os.stat(str(filename))
+    key = (os.path.abspath(str(filename)), stat.st_mtime, stat.st_size)
+    if key not in _fontFileHashes:
+        sha1 = hashlib.sha1()
+        with open(str(filename), 'rb') as f:
+            for chunk in iter(lambda: f.read(2 ** 20), b''):
+                sha1.update(chunk)
+        _fontFileHashes[key] = sha1.hexdigest()
+    return _fontFileHashes[key]
+
+
 def findFontFiles(folders=(), recursive=True):
     """Search for font files in the folder (or system folders)
 
@@ -794,6 +917,12 @@ class FontManager(object):
         TextBox instances use the same font (with matching font properties)
         then the existing FontAtlas is returned. Otherwise, a new FontAtlas is
         created , added to the cache, and returned.
+
+        If prefs.general['cacheFonts'] is True (the default), new fonts
+        start with the glyphs stored by a previous session, so only glyphs
+        missing from that are rasterised, and fonts with new glyphs are
+        stored when Python exits, in the 'fontCache' folder of the user
+        preferences folder (see `GLFont.saveToCache`).
         """
         fontInfos = self.getFontsMatching(name, bold, italic)
         if not fontInfos:
@@ -803,6 +932,8 @@ class FontManager(object):
         glFont = self._glFonts.get(identifier)
         if glFont is None:
             glFont = GLFont(fontInfo.path, size)
+            if _cacheFonts():
+                glFont.loadFromCache()
             self._glFonts[identifier] = glFont
 
         return glFont
@@ -858,6 +989,22 @@ class FontManager(object):
             self._fontInfos = None
 
 
+def _cacheFonts():
+    return prefs.general.get('cacheFonts', True)
+
+
+def _saveFontCaches():
+    """Save the glyph atlases of loaded fonts that have new glyphs."""
+    if not _cacheFonts():
+        return
+    for glFont in list((FontManager._glFonts or {}).values()):
+        if glFont._unsaved:
+            glFont.saveToCache()
+
+
+atexit.register(_saveFontCaches)
+
+
 class FontInfo(object):
 
     def __init__(self, fp, face):
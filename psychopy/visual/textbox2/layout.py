@@ -0,0 +1,403 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Text layout (line wrapping and glyph vertices) for TextBox2
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+import bisect
+
+import numpy as np
+
+codes = {'BOLD_START': u'\uE100',
+         'BOLD_END': u'\uE101',
+         'ITAL_START': u'\uE102',
+         'ITAL_END': u'\uE103'}
+
+wordBreaks = " -\n"  # what about ",."?
+
+# chars assessed at a time when looking for the end of a line
+_lineWindow = 128
+
+
+def _charCodes(text):
+    """The unicode code points of a string as an array."""
+    return np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+
+
+class TextLayout(object):
+    """Lays out text for a :class:`TextBox2`, keeping what it needs to
+    update the layout incrementally when the text changes.
+
+    Glyph metrics are kept in arrays (one row per distinct character) and
+    each line is laid out with array operations: its characters' advances
+    are summed to find where it wraps and all of its vertices are generated
+    at once. When the text changes (e.g. a key press in an editable box)
+    lines are only laid out again from the line before the first change.
+    Once a new line starts at the same place in the unchanged end of the
+    text as one of the old lines, the old lines from there on are reused
+    (just moved up or down).
+
+    Text is expected with formatting tags already replaced by `codes` and
+    ending with a newline, as in `TextBox2._layout()`. Positions are in
+    pixels, with the pen starting at (0, 0) and lines going downwards.
+
+    Attributes
+    ----------
+    vertices : ndarray
+        (nChars, 4, 2) top-left, bottom-left, bottom-right and top-right
+        corners of each character's quad (zeros for formatting codes).
+    texcoords : ndarray
+        (nChars, 4, 2) texture coordinates of those corners.
+    lineNs : ndarray
+        Line number of each character.
+    isCode : ndarray
+        Whether each character is a formatting code.
+    lineStarts : list of int
+        Index of the first character of each line.
+    lineLenChars : list of int
+        Number of characters (not counting formatting codes) in each line.
+    lineWidths : list of float
+        Width of each line.
+
+    """
+
+    def __init__(self):
+        self.text = u''
+        self._params = None
+        self._glyphRows = {}  # char: row in the metric arrays
+        self._glyphChars = []
+        self._metrics = None
+        self.clear()
+
+    def clear(self):
+        """Forget the current layout (the next update lays out all of the
+        text, though glyph metrics are kept)."""
+        self.text = u''
+        self._chars = _charCodes(u'')
+        self._rows = np.zeros(0, dtype=int)
+        self.vertices = np.zeros((0, 4, 2), dtype=np.float32)
+        self.texcoords = np.zeros((0, 4, 2), dtype=np.float32)
+        self.lineNs = np.zeros(0, dtype=int)
+        self.isCode = np.zeros(0, dtype=bool)
+        self._fmtState = np.zeros(0, dtype=np.int8)
+        self.lineStarts = []
+        self._lineX0 = []
+        self.lineLenChars = []
+        self.lineWidths = []
+
+    @property
+    def nLines(self):
+        """Number of completed lines (the text ends with a newline, which
+        starts one more, empty, line)."""
+        return len(self.lineStarts)
+
+    def update(self, text, font, lineMax, lineHeight, alphaCorrection=1.0,
+               showWhiteSpace=False):
+        """Lay out `text`, reusing as much of the previous layout as
+        possible.
+
+        Parameters
+        ----------
+        text : str
+            The text (with formatting codes, ending with a newline).
+        font : GLFont
+            Font to lay out with (glyphs are fetched as needed).
+        lineMax : float
+            Line length at which words wrap onto the next line.
+        lineHeight : float
+            Distance between lines.
+        alphaCorrection : float
+            Scaling of the glyph widths.
+        showWhiteSpace : bool
+            Draw spaces as a middle dot.
+
+        Returns
+        -------
+        bool
+            True if the layout was updated incrementally, False if the text
+            was laid out from scratch.
+
+        """
+        params = (font, lineMax, lineHeight, alphaCorrection, showWhiteSpace)
+        if params != self._params:
+            if self._params is None or font is not self._params[0]:
+                self._glyphRows = {}
+                self._glyphChars = []
+                self._metrics = None
+            self._params = params
+            self.clear()
+        self._font = font
+        self._lineMax = lineMax
+        self._lineHeight = lineHeight
+        self._alphaCorrection = alphaCorrection
+        self._showWhiteSpace = showWhiteSpace
+        return self._relayout(text)
+
+    # character properties
+    def _glyphChar(self, char):
+        """The glyph used to draw a character (None for formatting codes).
+        """
+        if char in self._codeChars:
+            return None
+        if char == u'\n' or (char == u' ' and self._showWhiteSpace):
+            return u"·"
+        return char
+
+    _codeChars = set(codes.values())
+
+    def _lookupRows(self, text):
+        """Rows of the glyph metric arrays for the characters of `text`."""
+        glyphRows = self._glyphRows
+        rows = []
+        for char in text:
+            row = glyphRows.get(char)
+            if row is None:
+                glyphChar = self._glyphChar(char)
+                if glyphChar is None:
+                    row = -1
+                else:
+                    self._font[glyphChar]  # fetch it (or raise KeyError)
+                    row = len(self._glyphChars)
+                    self._glyphChars.append(glyphChar)
+                    self._metrics = None
+                glyphRows[char] = row
+            rows.append(row)
+        return np.array(rows, dtype=int)
+
+    def _glyphMetrics(self):
+        """Offset, size, advance and texcoords arrays of all glyphs used,
+        with an extra row of zeros (row -1) for formatting codes."""
+        if self._metrics is None:
+            glyphs = [self._font[char] for char in self._glyphChars]
+            n = len(glyphs)
+            offsets = np.zeros((n + 1, 2))
+            sizes = np.zeros((n + 1, 2))
+            advances = np.zeros(n + 1)
+            texcoords = np.zeros((n + 1, 4))
+            for ii, glyph in enumerate(glyphs):
+                offsets[ii] = glyph.offset
+                sizes[ii] = glyph.size
+                advances[ii] = glyph.advance[0]
+                texcoords[ii] = glyph.texcoords
+            self._metrics = offsets, sizes, advances, texcoords
+        return self._metrics
+
+    def _charProperties(self, chars, rows):
+        """Per-character arrays used for line breaking and vertices."""
+        offsets, sizes, advances, texcoords = self._glyphMetrics()
+        fontSize = self._font.size
+        isCode = rows == -1
+        isNewline = chars == ord(u'\n')
+        isBreak = np.zeros(len(chars), dtype=bool)
+        for char in wordBreaks:
+            isBreak |= chars == ord(char)
+        # bold/italic state at each character: the last start/end code
+        # before it (forward filled)
+        boldOn = self._formatState(chars, codes['BOLD_START'],
+                                   codes['BOLD_END'])
+        italicOn = self._formatState(chars, codes['ITAL_START'],
+                                     codes['ITAL_END'])
+        fakeBold = boldOn * (0.3 * fontSize)
+        fakeItalic = italicOn * (0.1 * fontSize)
+        advance = advances[rows] + fakeBold / 2
+        advance[isCode] = 0.0
+        # the end of bold takes back the extra advance that was expected
+        boldEnd = chars == ord(codes['BOLD_END'])
+        advance[boldEnd] = -fakeBold[boldEnd] / 2
+        fmtState = boldOn.astype(np.int8) + 2 * italicOn.astype(np.int8)
+        return dict(isCode=isCode, isNewline=isNewline, isBreak=isBreak,
+                    isWordChar=~(isCode | isBreak), fakeBold=fakeBold,
+                    fakeItalic=fakeItalic, advance=advance,
+                    fmtState=fmtState)
+
+    @staticmethod
+    def _formatState(chars, startCode, endCode):
+        """Whether a start code is in effect at each character (the codes
+        themselves take the state before them)."""
+        n = len(chars)
+        isStart = chars == ord(startCode)
+        isEnd = chars == ord(endCode)
+        marks = np.flatnonzero(isStart | isEnd)
+        if not len(marks):
+            return np.zeros(n, dtype=bool)
+        # index of the last start/end code strictly before each char
+        last = np.full(n, -1)
+        last[marks[marks + 1 < n] + 1] = marks[marks + 1 < n]
+        last = np.maximum.accumulate(last)
+        on = np.zeros(n, dtype=bool)
+        valid = last >= 0
+        on[valid] = isStart[last[valid]]
+        return on
+
+    # layout
+    def _relayout(self, text):
+        oldText = self.text
+        oldChars = self._chars
+        chars = _charCodes(text)
+        n, nOld = len(chars), len(oldChars)
+        # the changed region: text[p:n - q] replaced oldText[p:nOld - q]
+        nCommon = min(n, nOld)
+        diff = np.flatnonzero(chars[:nCommon] != oldChars[:nCommon])
+        p = diff[0] if len(diff) else nCommon
+        maxQ = nCommon - p
+        diff = np.flatnonzero(chars[::-1][:maxQ] != oldChars[::-1][:maxQ])
+        q = diff[0] if len(diff) else maxQ
+        if p == n == nOld and self.lineStarts:
+            return True  # nothing changed
+
+        rows = np.concatenate((self._rows[:p],
+                               self._lookupRows(text[p:n - q]),
+                               self._rows[nOld - q:]))
+        props = self._charProperties(chars, rows)
+
+        # restart from the line before the one with the first change (a
+        # change to the first word of a line can let it fit on the previous
+        # line)
+        incremental = bool(self.lineStarts)
+        startLine = max(bisect.bisect_right(self.lineStarts, p) - 2, 0)
+
+        old = (self.vertices, self.texcoords, self.lineNs,
+               self.lineStarts, self._lineX0, self.lineLenChars,
+               self.lineWidths, self._fmtState)
+        self.text = text
+        self._chars = chars
+        self._rows = rows
+        self.isCode = props['isCode']
+        self._fmtState = props['fmtState']
+        self.lineStarts = self.lineStarts[:startLine]
+        self._lineX0 = self._lineX0[:startLine]
+        self.lineLenChars = self.lineLenChars[:startLine]
+        self.lineWidths = self.lineWidths[:startLine]
+
+        # lay out lines until we get back in step with the old layout
+        start = old[3][startLine] if startLine < len(old[3]) else 0
+        x0 = old[4][startLine] if startLine < len(old[4]) else 0.0
+        pieces = []  # (vertices, texcoords, lineNs) of new lines
+        delta = n - nOld
+        resync = None
+        newlines = np.flatnonzero(props['isNewline'])
+        while start < n:
+            lineN = len(self.lineStarts)
+            if start >= n - q and start - delta in old[3]:
+                oldLine = old[3].index(start - delta)
+                if (old[4][oldLine] == x0 and
+                        old[7][start - delta] == self._fmtState[start]):
+                    resync = oldLine
+                    break
+            end, nextX0, width = self._breakLine(start, x0, props, newlines)
+            pieces.append(self._lineVertices(start, end, x0, lineN, props))
+            self.lineStarts.append(start)
+            self._lineX0.append(x0)
+            self.lineLenChars.append(
+                int(end - start - props['isCode'][start:end].sum()))
+            self.lineWidths.append(width)
+            start, x0 = end, nextX0
+
+        prefixEnd = self.lineStarts[startLine] if pieces else start
+        vertices = [old[0][:prefixEnd]]
+        texcoords = [old[1][:prefixEnd]]
+        lineNs = [old[2][:prefixEnd]]
+        for theseVerts, theseTexcoords, theseLineNs in pieces:
+            vertices.append(theseVerts)
+            texcoords.append(theseTexcoords)
+            lineNs.append(theseLineNs)
+        if resync is not None:
+            # reuse the old lines, moved by the change in number of lines
+            shift = len(self.lineStarts) - resync
+            oldStart = start - delta
+            theseVerts = old[0][oldStart:].copy()
+            if shift:
+                isChar = ~self.isCode[start:]
+                theseVerts[isChar, :, 1] -= shift * self._lineHeight
+            vertices.append(theseVerts)
+            texcoords.append(old[1][oldStart:])
+            lineNs.append(old[2][oldStart:] + shift)
+            self.lineStarts.extend(s + delta for s in old[3][resync:])
+            self._lineX0.extend(old[4][resync:])
+            self.lineLenChars.extend(old[5][resync:])
+            self.lineWidths.extend(old[6][resync:])
+        self.vertices = np.concatenate(vertices)
+        self.texcoords = np.concatenate(texcoords)
+        self.lineNs = np.concatenate(lineNs)
+        return incremental
+
+    def _breakLine(self, start, x0, props, newlines):
+        """Find the end of the line starting at `start` (with the pen at
+        `x0`).
+
+        Returns the index after its last character, the pen position for
+        the next line and the width of this line.
+        """
+        advance = props['advance']
+        lineEnd = newlines[np.searchsorted(newlines, start)] + 1
+        window = _lineWindow
+        while True:
+            stop = min(lineEnd, start + window)
+            penAfter = x0 + np.cumsum(advance[start:stop])
+            # the last word break up to each character (start - 1 if none)
+            indices = np.arange(start, stop)
+            lastBreak = np.maximum.accumulate(
+                np.where(props['isBreak'][start:stop], indices, start - 1))
+            # wrap at the first character that goes past the end of the
+            # line, unless its word is the first on the line
+            wraps = np.flatnonzero((penAfter >= self._lineMax) &
+                                   props['isWordChar'][start:stop] &
+                                   (lastBreak >= start))
+            if len(wraps):
+                wordStart = lastBreak[wraps[0]] + 1
+                # the first drawn character of the word starts the new line
+                first = wordStart + np.flatnonzero(
+                    ~props['isCode'][wordStart:stop])[0]
+                offset = (self._glyphMetrics()[0][self._rows[first], 0] -
+                          props['fakeBold'][first] / 2)
+                penFirst = x0 + advance[start:first].sum()
+                nextX0 = -offset - advance[wordStart:first].sum()
+                return wordStart, nextX0, penFirst + offset
+            if stop == lineEnd:
+                return lineEnd, 0.0, penAfter[-1]
+            window *= 4
+
+    def _lineVertices(self, start, end, x0, lineN, props):
+        """Vertices, texcoords and line numbers of the chars of a line."""
+        offsets, sizes, advances, texcoords = self._glyphMetrics()
+        rows = self._rows[start:end]
+        advance = props['advance'][start:end]
+        pen = x0 + np.concatenate(([0.0], np.cumsum(advance[:-1])))
+        offset = offsets[rows]
+        size = sizes[rows]
+        fakeBold = props['fakeBold'][start:end]
+        fakeItalic = props['fakeItalic'][start:end]
+        isNewline = props['isNewline'][start:end]
+        isCode = props['isCode'][start:end]
+        # newlines are drawn as a zero-width glyph, without bold/italic
+        fakeBold = np.where(isNewline, 0.0, fakeBold)
+        fakeItalic = np.where(isNewline, 0.0, fakeItalic)
+        width = np.where(isNewline, 0.0,
+                         size[:, 0] * self._alphaCorrection + fakeBold)
+
+        xTopL = pen + offset[:, 0] - fakeBold / 2
+        xBotL = xTopL - fakeItalic
+        yTop = -lineN * self._lineHeight + offset[:, 1]
+        yBot = yTop - size[:, 1]
+        vertices = np.empty((end - start, 4, 2), dtype=np.float32)
+        vertices[:, 0, 0] = xTopL
+        vertices[:, 0, 1] = yTop
+        vertices[:, 1, 0] = xBotL
+        vertices[:, 1, 1] = yBot
+        vertices[:, 2, 0] = xBotL + width
+        vertices[:, 2, 1] = yBot
+        vertices[:, 3, 0] = xTopL + width
+        vertices[:, 3, 1] = yTop
+        vertices[isCode] = 0
+
+        u0, v0, u1, v1 = texcoords[rows].T
+        theseTexcoords = np.empty((end - start, 4, 2), dtype=np.float32)
+        theseTexcoords[:, :, 0] = np.stack((u0, u0, u1, u1), axis=1)
+        theseTexcoords[:, :, 1] = np.stack((v0, v1, v1, v0), axis=1)
+        theseTexcoords[isCode] = 0
+
+        return vertices, theseTexcoords, np.full(end - start, lineN)
@@ -24,6 +24,7 @@ from psychopy.tools.attributetools import attributeSetter
 from psychopy.tools.arraytools import val2array
 from psychopy.tools.monitorunittools import convertToPix
 from .fontmanager import FontManager, GLFont
+from .layout import TextLayout, codes, wordBreaks
 from .. import shaders
 from ..rect import Rect
 from ..line import Line
@@ -36,11 +37,6 @@ rgbShader = None
 alphaShader = None
 showWhiteSpace = False
 
-codes = {'BOLD_START': u'\uE100',
-         'BOLD_END': u'\uE101',
-         'ITAL_START': u'\uE102',
-         'ITAL_END': u'\uE103'}
-
 defaultLetterHeight = {'cm': 1.0,
                        'deg': 1.0,
                        'degs': 1.0,
@@ -61,8 +57,6 @@ defaultBoxWidth = {'cm': 15.0,
                    'pix': 500,
                    'pixels': 500}
 
-wordBreaks = " -\n"  # what about ",."?
-
 
 # If text is ". " we don't want to start next line with single space?
 
@@ -121,6 +115,7 @@ class TextBox2(BaseVisualStim, ContainerMixin, ColorMixin):
             padding = defaultLetterHeight[units] / 2.0
         self.padding = padding
         self.glFont = None  # will be set by the self.font attribute setter
+        self._textLayout = TextLayout()  # keeps the layout between edits
         self.font = font
         # once font is set up we can set the shader (depends on rgb/a of font)
         if self.glFont.atlas.format == 'rgb':
@@ -262,138 +257,39 @@ class TextBox2(BaseVisualStim, ContainerMixin, ColorMixin):
         # the vertices are initially pix (natural for freetype)
         # then we convert them to the requested units for self._vertices
         # then they are converted back during rendering using standard BaseStim
-        vertices = np.zeros((len(text) * 4, 2), dtype=np.float32)
-        self._charIndices = np.zeros((len(text)), dtype=int)
-        self._colors = np.zeros((len(text) * 4, 4), dtype=np.float32)
-        self._texcoords = np.zeros((len(text) * 4, 2), dtype=np.float32)
-        self._glIndices = np.zeros((len(text) * 4), dtype=int)
-
-        # the following are used internally for layout
-        self._lineNs = np.zeros(len(text), dtype=int)
-        self._lineTops = []  # just length of nLines
-        self._lineBottoms = []
-        self._lineLenChars = []  #
-        self._lineWidths = []  # width in stim units of each line
-
         self._lineHeight = font.height * self.lineSpacing
         lineMax = (self.size[0] - self.padding) * self._pixelScaling
-        current = [0, 0]
-        fakeItalic = 0.0
-        fakeBold = 0.0
         # for some reason glyphs too wide when using alpha channel only
         if font.atlas.format == 'alpha':
             alphaCorrection = 1 / 3.0
         else:
             alphaCorrection = 1
+        # only re-lays out the lines from the first change (see TextLayout)
+        layout = self._textLayout
+        layout.update(text, font, lineMax, self._lineHeight,
+                      alphaCorrection=alphaCorrection,
+                      showWhiteSpace=showWhiteSpace)
+        vertices = layout.vertices.reshape(-1, 2)
+        self._texcoords = layout.texcoords.reshape(-1, 2)
+        self._colors = np.zeros((len(text), 4, 4), dtype=np.float32)
+        isChar = ~layout.isCode
+        self._colors[isChar, :, :3] = rgb
+        self._colors[isChar, :, 3] = self.opacity
+        self._colors.shape = (len(text) * 4, 4)
+        self._glIndices = np.arange(len(text) * 4, dtype=np.uint32)
 
-        wordLen = 0
-        charsThisLine = 0
-        lineN = 0
-        for i, charcode in enumerate(text):
-
-            printable = True  # unless we decide otherwise
-            # handle formatting codes
-            if charcode in codes.values():
-                if charcode == codes['ITAL_START']:
-                    fakeItalic = 0.1 * font.size
-                elif charcode == codes['ITAL_END']:
-                    fakeItalic = 0.0
-                elif charcode == codes['BOLD_START']:
-                    fakeBold = 0.3 * font.size
-                elif charcode == codes['BOLD_END']:
-                    current[0] -= fakeBold / 2  # we expected bigger current
-                    fakeBold = 0.0
-                continue
-            # handle newline
-            if charcode == '\n':
-                printable = False
-
-            # handle printable characters
-            if printable:
-                if showWhiteSpace and charcode == " ":
-                    glyph = font[u"·"]
-                else:
-                    glyph = font[charcode]
-                xBotL = current[0] + glyph.offset[0] - fakeItalic - fakeBold / 2
-                xTopL = current[0] + glyph.offset[0] - fakeBold / 2
-                yTop = current[1] + glyph.offset[1]
-                xBotR = xBotL + glyph.size[0] * alphaCorrection + fakeBold
-                xTopR = xTopL + glyph.size[0] * alphaCorrection + fakeBold
-                yBot = yTop - glyph.size[1]
-                u0 = glyph.texcoords[0]
-                v0 = glyph.texcoords[1]
-                u1 = glyph.texcoords[2]
-                v1 = glyph.texcoords[3]
-            else:
-                glyph = font[u"·"]
-                x = current[0] + glyph.offset[0]
-                yTop = current[1] + glyph.offset[1]
-                yBot = yTop - glyph.size[1]
-                xBotL = x
-                xTopL = x
-                xBotR = x
-                xTopR = x
-                u0 = glyph.texcoords[0]
-                v0 = glyph.texcoords[1]
-                u1 = glyph.texcoords[2]
-                v1 = glyph.texcoords[3]
-
-            index = i * 4
-            theseVertices = [[xTopL, yTop], [xBotL, yBot],
-                             [xBotR, yBot], [xTopR, yTop]]
-            texcoords = [[u0, v0], [u0, v1],
-                         [u1, v1], [u1, v0]]
-
-            vertices[i * 4:i * 4 + 4] = theseVertices
-            self._texcoords[i * 4:i * 4 + 4] = texcoords
-            self._colors[i*4 : i*4+4, :3] = rgb
-            self._colors[i*4 : i*4+4, 3] = self.opacity
-            self._lineNs[i] = lineN
-            current[0] = current[0] + glyph.advance[0] + fakeBold / 2
-            current[1] = current[1] + glyph.advance[1]
-
-            # are we wrapping the line?
-            if charcode == "\n":
-                lineWPix = current[0]
-                current[0] = 0
-                current[1] -= self._lineHeight
-                lineN += 1
-                charsThisLine += 1
-                self._lineLenChars.append(charsThisLine)
-                lineWidth = lineWPix / self._pixelScaling + self.padding * 2
-                self._lineWidths.append(lineWidth)
-                charsThisLine = 0
-            elif charcode in wordBreaks:
-                wordLen = 0
-                charsThisLine += 1
-            elif printable:
-                wordLen += 1
-                charsThisLine += 1
-
-            # end line with auto-wrap
-            if current[0] >= lineMax and wordLen > 0:
-                # move the current word to next line
-                lineBreakPt = vertices[(i - wordLen + 1) * 4, 0]
-                wordWidth = current[0] - lineBreakPt
-                # shift all chars of the word left by wordStartX
-                vertices[(i - wordLen + 1) * 4: (i + 1) * 4, 0] -= lineBreakPt
-                vertices[(i - wordLen + 1) * 4: (i + 1) * 4, 1] -= self._lineHeight
-                # update line values
-                self._lineNs[i - wordLen + 1: i + 1] += 1
-                self._lineLenChars.append(charsThisLine - wordLen)
-                self._lineWidths.append(
-                        lineBreakPt / self._pixelScaling + self.padding * 2)
-                lineN += 1
-                # and set current to correct location
-                current[0] = wordWidth
-                current[1] -= self._lineHeight
-                charsThisLine = wordLen
-
-            # have we stored the top/bottom of this line yet
-            if lineN + 1 > len(self._lineTops):
-                self._lineBottoms.append(current[1] + font.descender)
-                self._lineTops.append(current[1] + self._lineHeight
-                                      + font.descender/2)
+        # the following are used internally for layout
+        self._lineNs = layout.lineNs
+        self._lineLenChars = list(layout.lineLenChars)
+        # width in stim units of each line
+        self._lineWidths = [lineWPix / self._pixelScaling + self.padding * 2
+                            for lineWPix in layout.lineWidths]
+        lineN = layout.nLines
+        # tops and bottoms of each line (and of the empty one after the
+        # final newline)
+        lineYs = -np.arange(lineN + 1) * self._lineHeight
+        self._lineBottoms = list(lineYs + font.descender)
+        self._lineTops = list(lineYs + self._lineHeight + font.descender / 2)
 
         # convert the vertices to stimulus units
         self._rawVerts = vertices / self._pixelScaling
@@ -438,9 +334,8 @@ class TextBox2(BaseVisualStim, ContainerMixin, ColorMixin):
         self.shader.bind()
         self.shader.setInt('texture', 0)
         self.shader.setFloat('pixel', [1.0 / 512, 1.0 / 512])
-        nVerts = len(self.text)*4
-        gl.glDrawElements(gl.GL_QUADS, nVerts,
-                          gl.GL_UNSIGNED_INT, list(range(nVerts)))
+        gl.glDrawElements(gl.GL_QUADS, len(self._glIndices),
+                          gl.GL_UNSIGNED_INT, self._glIndices)
         self.shader.unbind()
 
         # removed the colors and font texture
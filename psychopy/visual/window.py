@@ -84,6 +84,9 @@ from psychopy.tools.arraytools import val2array
 from psychopy.tools.monitorunittools import convertToPix
 import psychopy.tools.viewtools as viewtools
 import psychopy.tools.gltools as gltools
+from psychopy.tools.frametimingtools import FrameTimeRecorder
+from psychopy.tools.movietools import MovieFrameWriter
+from psychopy.tools.texturetools import textureCache
 from .text import TextStim
 from .grating import GratingStim
 from .helpers import setColor
@@ -524,12 +527,15 @@ class Window(object):
         self.frameClock = core.Clock()  # from psycho/core
         self.frames = 0  # frames since last fps calc
         self.movieFrames = []  # list of captured frames (Image objects)
+        self._movieWriter = None  # when streaming frames (streamMovieFrames)
+        self._moviePBOs = None
 
         self.recordFrameIntervals = False
         # Be able to omit the long timegap that follows each time turn it off
         self.recordFrameIntervalsJustTurnedOn = False
         self.nDroppedFrames = 0
-        self.frameIntervals = []
+        # flip times, intervals and dropped frames while recordFrameIntervals
+        self.frameRecorder = FrameTimeRecorder()
         self._frameTimes = deque(maxlen=1000)  # 1000 keeps overhead low
 
         self._toDraw = []
@@ -699,6 +705,26 @@ class Window(object):
         self.__dict__['recordFrameIntervals'] = value
         self.frameClock.reset()
 
+    @property
+    def frameIntervals(self):
+        """Frame intervals (in secs) recorded while
+        :py:attr:`~Window.recordFrameIntervals` was `True`.
+
+        This is a read-only numpy array (a view of the values held by
+        :py:attr:`~Window.frameRecorder`, which also has the flip times,
+        dropped-frame flags and summary statistics). Set it to ``[]`` to
+        clear the recorded intervals.
+
+        """
+        return self.frameRecorder.intervals
+
+    @frameIntervals.setter
+    def frameIntervals(self, value):
+        self.frameRecorder.clear()
+        if len(value):
+            self.frameRecorder.extend(numpy.full(len(value), numpy.nan),
+                                      value)
+
     def setRecordFrameIntervals(self, value=True, log=None):
         """Usually you can use 'stim.attribute = value' syntax instead,
         but use this method if you need to suppress the log message.
@@ -714,6 +740,9 @@ class Window(object):
         fileName : *None* or str
             *None* or the filename (including path if necessary) in which to
             store the data. If None then 'lastFrameIntervals.log' will be used.
+            If the name ends with '.npy' or '.npz' the flip times, intervals
+            and dropped frames are saved in binary form instead (see
+            :py:meth:`~psychopy.tools.frametimingtools.FrameTimeRecorder.save`).
         clear : bool
             Clear buffer frames intervals were stored after saving. Default is
             `True`.
@@ -721,13 +750,21 @@ class Window(object):
         """
         if not fileName:
             fileName = 'lastFrameIntervals.log'
-        if len(self.frameIntervals):
-            intervalStr = str(self.frameIntervals)[1:-1]
-            f = open(fileName, 'w')
-            f.write(intervalStr)
-            f.close()
+        if len(self.frameRecorder):
+            if fileName.endswith(('.npy', '.npz')):
+                self.frameRecorder.save(fileName)
+            else:
+                intervals = self.frameRecorder.intervals
+                with open(fileName, 'w') as f:
+                    # write in chunks rather than building one huge string
+                    chunkSize = 10000
+                    for start in range(0, len(intervals), chunkSize):
+                        if start:
+                            f.write(', ')
+                        chunk = intervals[start:start + chunkSize].tolist()
+                        f.write(', '.join(map(repr, chunk)))
         if clear:
-            self.frameIntervals = []
+            self.frameRecorder.clear()
             self.frameClock.reset()
 
     def _setCurrent(self):
@@ -1140,8 +1177,9 @@ class Window(object):
             if self.recordFrameIntervalsJustTurnedOn:  # don't do anything
                 self.recordFrameIntervalsJustTurnedOn = False
             else:  # past the first frame since turned on
-                self.frameIntervals.append(deltaT)
-                if deltaT > self.refreshThreshold:
+                dropped = deltaT > self.refreshThreshold
+                self.frameRecorder.append(now, deltaT, dropped)
+                if dropped:
                     self.nDroppedFrames += 1
                     if self.nDroppedFrames < reportNDroppedFrames:
                         txt = 't of last frame was %.2fms (=1/%i)'
@@ -1153,13 +1191,17 @@ class Window(object):
                                         "about them!")
 
         # log events
-        for logEntry in self._toLog:
-            # {'msg':msg, 'level':level, 'obj':copy.copy(obj)}
-            logging.log(msg=logEntry['msg'],
-                        level=logEntry['level'],
-                        t=now,
-                        obj=logEntry['obj'])
-        del self._toLog[:]
+        if self._toLog:
+            for logEntry in self._toLog:
+                # {'msg':msg, 'level':level, 'obj':copy.copy(obj)}
+                logging.log(msg=logEntry['msg'],
+                            level=logEntry['level'],
+                            t=now,
+                            obj=logEntry['obj'])
+            del self._toLog[:]
+            if logging.root.writer is not None:
+                # the writer thread formats/writes them while we carry on
+                logging.root.flush()
 
         # keep the system awake (prevent screen-saver or sleep)
         platform_specific.sendStayAwake()
@@ -2083,6 +2125,8 @@ class Window(object):
         Frames are stored in memory until a :py:attr:`~Window.saveMovieFrames()`
         command is issued. You can issue :py:attr:`~Window.getMovieFrame()` as
         often as you like and then save them all in one go when finished.
+        Alternatively, after :py:attr:`~Window.streamMovieFrames()` frames are
+        written to file as they are captured (and nothing is returned).
 
         The back buffer will return the frame that hasn't yet been 'flipped'
         to be visible on screen but has the advantage that the mouse and any
@@ -2103,15 +2147,129 @@ class Window(object):
             Buffer pixel contents as a PIL/Pillow image object.
 
         """
+        if self._movieWriter is not None:
+            self._streamFrame(buffer=buffer)
+            return None
         im = self._getFrame(buffer=buffer)
         self.movieFrames.append(im)
         return im
 
-    def _getFrame(self, rect=None, buffer='front'):
-        """Return the current Window as an image.
+    def streamMovieFrames(self, fileName, fps=30, codec='libx264',
+                          nBuffers=4):
+        """Write frames captured by :py:attr:`~Window.getMovieFrame()`
+        straight to a file (by a background thread) rather than keeping them
+        in memory until :py:attr:`~Window.saveMovieFrames()`.
+
+        Memory use then stays constant however many frames are captured.
+        Where pixel buffer objects are supported the pixels are read
+        asynchronously, alternating between two buffers, so capturing
+        doesn't stall drawing either.
+
+        Call :py:attr:`~Window.saveMovieFrames()` (or
+        :py:attr:`~Window.close()`) when finished to finalize the file.
+
+        Parameters
+        ----------
+        fileName : str
+            Movie files (.mp4, .mov, .mpg, .avi, .mkv, .gif) are encoded by
+            ffmpeg, which must be available (it comes with moviepy). For
+            other extensions (e.g. .png) each frame is saved as a numbered
+            image: frame00001.png, frame00002.png etc.
+        fps : int, optional
+            The frame rate of the movie. Default is `30`.
+        codec : str, optional
+            The codec to be used by ffmpeg. Default is ``libx264``.
+        nBuffers : int, optional
+            Number of captured frames that can wait to be encoded before
+            capturing has to wait for the encoder. Default is `4`.
+
+        Examples
+        --------
+        Write the next 300 frames to a movie as they are drawn::
+
+            win.streamMovieFrames('stimuli.mp4', fps=60)
+            for frameN in range(300):
+                stim.draw()
+                win.flip()
+                win.getMovieFrame()
+            win.saveMovieFrames('stimuli.mp4')
+
+        """
+        if self._movieWriter is not None:
+            self._stopMovieStream()
+        self._movieWriter = MovieFrameWriter(fileName, self.size, fps=fps,
+                                             codec=codec, nBuffers=nBuffers)
+        self._moviePBOs = None
+        self._moviePBOIndex = 0
+        self._moviePBOPending = False
+        try:
+            w, h = self._movieWriter.size
+            pbos = (GL.GLuint * 2)()
+            GL.glGenBuffers(2, pbos)
+            for pbo in pbos:
+                GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, pbo)
+                GL.glBufferData(GL.GL_PIXEL_PACK_BUFFER, w * h * 4, None,
+                                GL.GL_STREAM_READ)
+            GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+            self._moviePBOs = pbos
+        except Exception:
+            logging.debug('Pixel buffer objects not available, movie frames '
+                          'will be read synchronously')
+
+    def _streamFrame(self, buffer='front'):
+        """Read the current frame and pass it to the movie writer
+        """
+        writer = self._movieWriter
+        w, h = writer.size
+        self._setReadBuffer(buffer)
+        if self._moviePBOs is None:
+            # read straight into a (reused) buffer from the writer's pool
+            frame = writer.getBuffer()
+            GL.glReadPixels(0, 0, w, h, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE,
+                            frame.ctypes.data_as(ctypes.c_void_p))
+            writer.submit(frame)
+        else:
+            # start an asynchronous read into one PBO and meanwhile copy the
+            # previous frame out of the other one
+            GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER,
+                            self._moviePBOs[self._moviePBOIndex])
+            GL.glReadPixels(0, 0, w, h, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, 0)
+            self._moviePBOIndex = 1 - self._moviePBOIndex
+            if self._moviePBOPending:
+                self._submitPBO(self._moviePBOs[self._moviePBOIndex])
+            self._moviePBOPending = True
+            GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        self._restoreReadBuffer(buffer)
+
+    def _submitPBO(self, pbo):
+        """Copy the pixels from a pixel buffer object to the movie writer
+        """
+        writer = self._movieWriter
+        frame = writer.getBuffer()
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, pbo)
+        ptr = GL.glMapBuffer(GL.GL_PIXEL_PACK_BUFFER, GL.GL_READ_ONLY)
+        ctypes.memmove(frame.ctypes.data, ptr, frame.nbytes)
+        GL.glUnmapBuffer(GL.GL_PIXEL_PACK_BUFFER)
+        writer.submit(frame)
+
+    def _stopMovieStream(self):
+        """Finish writing streamed movie frames (see streamMovieFrames)
+        """
+        writer = self._movieWriter
+        if writer is None:
+            return
+        if self._moviePBOs is not None:
+            if self._moviePBOPending:  # the last frame read
+                self._submitPBO(self._moviePBOs[1 - self._moviePBOIndex])
+                GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+            GL.glDeleteBuffers(2, self._moviePBOs)
+            self._moviePBOs = None
+        self._movieWriter = None
+        writer.close()
+
+    def _setReadBuffer(self, buffer='front'):
+        """Select the buffer that glReadPixels will read from
         """
-        # GL.glLoadIdentity()
-        # do the reading of the pixels
         if buffer == 'back' and self.useFBO:
             GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0_EXT)
         elif buffer == 'back':
@@ -2124,6 +2282,19 @@ class Window(object):
             raise ValueError("Requested read from buffer '{}' but should be "
                              "'front' or 'back'".format(buffer))
 
+    def _restoreReadBuffer(self, buffer='front'):
+        """Rebind our framebuffer if _setReadBuffer unbound it
+        """
+        if self.useFBO and buffer == 'front':
+            GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, self.frameBuffer)
+
+    def _getFrame(self, rect=None, buffer='front'):
+        """Return the current Window as an image.
+        """
+        # GL.glLoadIdentity()
+        # do the reading of the pixels
+        self._setReadBuffer(buffer)
+
         if rect:
             x, y = self.size  # of window, not image
             imType = 'RGBA'  # not tested with anything else
@@ -2151,8 +2322,7 @@ class Window(object):
         im = im.transpose(Image.FLIP_TOP_BOTTOM)
         im = im.convert('RGB')
 
-        if self.useFBO and buffer == 'front':
-            GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, self.frameBuffer)
+        self._restoreReadBuffer(buffer)
         return im
 
     def saveMovieFrames(self, fileName, codec='libx264',
@@ -2201,7 +2371,17 @@ class Window(object):
             myWin.saveMovieFrames('stimuli.mov')
             myWin.saveMovieFrames('stimuli.gif')
 
+        If frames are being streamed to a file (see
+        :py:attr:`~Window.streamMovieFrames()`) this finishes that file
+        instead.
+
         """
+        if self._movieWriter is not None:
+            if fileName != self._movieWriter.fileName:
+                logging.warning('Movie frames were streamed to %s (not %s)'
+                                % (self._movieWriter.fileName, fileName))
+            self._stopMovieStream()
+            return
         fileRoot, fileExt = os.path.splitext(fileName)
         fileExt = fileExt.lower()  # easier than testing both later
         if len(self.movieFrames) == 0:
@@ -2268,7 +2448,22 @@ class Window(object):
     def close(self):
         """Close the window (and reset the Bits++ if necess).
         """
+        try:
+            if self._movieWriter is not None:
+                self._stopMovieStream()
+        except Exception as err:
+            # the window is still closed, then the error is raised
+            logging.error("Failed to finish writing the movie: %s" % err)
+            raise
+        finally:
+            self._closeWindow()
+
+    def _closeWindow(self):
+        """Close the window's backend and reset its state (see close)
+        """
         self._closed = True
+        # shared textures go with the window's context
+        textureCache.clearContext(self)
 
         self.backend.close()  # moved here, dereferencing the window prevents
                               # backend specific actions to take place